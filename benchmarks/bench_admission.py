@@ -0,0 +1,102 @@
+"""Benchmark: latency of well-behaved senders while a few numbers flood the webhook.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_admission
+
+For DURATION seconds, FLOODERS numbers each post FLOOD_RATE messages a
+second, while QUIET senders post one message each, spread over the same
+period. Everything goes
+through the real app (middleware, route, agent) in-process over httpx's ASGI
+transport. Tool calls are replaced by a stand-in for the Sheets API that
+takes SHEETS_LATENCY seconds and serves at most SHEETS_RATE calls a second;
+calls beyond the quota wait their turn, which is what the flood competes
+for.
+
+* off: admission limits set high enough that they never trigger, as before.
+* on: the defaults: the per-sender bucket (ADMISSION_SENDER_BURST messages,
+  then ADMISSION_SENDER_RATE_PER_MINUTE), ADMISSION_SENDER_MAX_IN_FLIGHT
+  requests per sender, the global concurrency limit and shedding.
+
+Reports webhook latency percentiles for the quiet senders and how many
+requests were admitted, throttled and shed.
+"""
+import asyncio
+import logging
+import random
+import statistics
+import time
+
+import httpx
+from twilio.request_validator import RequestValidator
+
+from src.langgraph_whatsapp import agent as agent_module
+from src.langgraph_whatsapp import server
+from src.langgraph_whatsapp.admission import AdmissionController
+from src.langgraph_whatsapp.outbound import TokenBucket
+from src.langgraph_whatsapp.config import (
+    TWILIO_AUTH_TOKEN, ADMISSION_SENDER_RATE_PER_MINUTE, ADMISSION_SENDER_BURST, ADMISSION_MAX_CONCURRENCY,
+    ADMISSION_MAX_WAITING, ADMISSION_MAX_WAIT_SECONDS, ADMISSION_MAX_TRACKED_SENDERS, ADMISSION_SENDER_MAX_IN_FLIGHT,
+)
+
+DURATION = 6
+FLOODERS = 80
+FLOOD_RATE = 4
+QUIET = 100
+SHEETS_LATENCY = 0.1
+SHEETS_RATE = 100
+
+
+def _sheets_stand_in():
+    quota = TokenBucket(SHEETS_RATE, burst=SHEETS_RATE / 10)
+
+    async def run_blocking(func, *args, **kwargs):
+        await asyncio.sleep(quota.reserve() + SHEETS_LATENCY)
+        return "ok"
+    return run_blocking
+
+
+async def _run(controller: AdmissionController):
+    server.WEBHOOK_ADMISSION = controller
+    agent_module.run_blocking = _sheets_stand_in()
+    transport = httpx.ASGITransport(app=server.APP)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def post(sender: str, delay: float):
+            await asyncio.sleep(delay)
+            form = {"From": sender, "Body": "I spent 500 on groceries"}
+            # Signed like Twilio's deliveries: only those are limited per sender
+            signature = RequestValidator(TWILIO_AUTH_TOKEN).compute_signature("http://bench/whatsapp", form)
+            started = time.perf_counter()
+            response = await client.post("/whatsapp", data=form, headers={"X-Twilio-Signature": signature})
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+        flood = [post(f"whatsapp:+1999{f:04d}", i / FLOOD_RATE + random.uniform(0, 0.05))
+                 for f in range(FLOODERS) for i in range(DURATION * FLOOD_RATE)]
+        quiet = [post(f"whatsapp:+1555{q:04d}", random.uniform(0, DURATION)) for q in range(QUIET)]
+        results = await asyncio.gather(*flood, *quiet)
+    return sorted(results[len(flood):])
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    print(f"{FLOODERS} numbers x {FLOOD_RATE}/s and {QUIET} quiet senders over {DURATION} s; "
+          f"Sheets stand-in {SHEETS_LATENCY * 1000:.0f} ms, {SHEETS_RATE} calls/s")
+    print(f"{'admission':>9} {'quiet p50 ms':>13} {'quiet p99 ms':>13} {'admitted':>9} {'throttled':>10} {'shed':>6}")
+    modes = (
+        ("off", AdmissionController(sender_rate_per_minute=0, max_concurrency=100000, sender_max_in_flight=0)),
+        ("on", AdmissionController(ADMISSION_SENDER_RATE_PER_MINUTE, ADMISSION_SENDER_BURST, ADMISSION_MAX_CONCURRENCY,
+                                   ADMISSION_MAX_WAITING, ADMISSION_MAX_WAIT_SECONDS, ADMISSION_MAX_TRACKED_SENDERS,
+                                   ADMISSION_SENDER_MAX_IN_FLIGHT)),
+    )
+    for mode, controller in modes:
+        random.seed(0)
+        latencies = asyncio.run(_run(controller))
+        stats = controller.stats()
+        p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+        print(f"{mode:>9} {statistics.median(latencies) * 1000:>13.1f} {p99 * 1000:>13.1f} "
+              f"{stats['admitted']:>9} {stats['throttled']:>10} {stats['shed']:>6}")
+
+
+if __name__ == "__main__":
+    main()
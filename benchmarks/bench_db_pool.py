@@ -0,0 +1,98 @@
+"""Benchmark: connect-per-call SQLite vs. the pooled WAL connections in db.py.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_db_pool
+
+50 writer threads each save links the way save_link does (get a connection,
+INSERT, commit, close) while 5 reader threads run the retrieve_links query.
+"connect-per-call" is the old get_db_connection (a fresh sqlite3.connect in
+rollback-journal mode per call); "pooled" is db.ConnectionPool. Reported:
+inserts/sec, p50/p99 read latency, and how many calls failed with
+"database is locked".
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from src.langgraph_whatsapp.database_setup import setup_database
+from src.langgraph_whatsapp.db import ConnectionPool
+
+WRITERS = 50
+INSERTS_PER_WRITER = 100
+READERS = 5
+READ_QUERY = "SELECT link FROM links WHERE user_id = ? ORDER BY timestamp DESC"
+
+
+def connect_per_call(db_path):
+    def connect():
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+    return connect
+
+
+def run(connect):
+    errors = []
+    failed_writes = []
+    read_latencies = []
+    writers_done = threading.Event()
+
+    def writer(n):
+        for i in range(INSERTS_PER_WRITER):
+            try:
+                conn = connect()
+                cursor = conn.cursor()
+                cursor.execute("INSERT INTO links (user_id, link) VALUES (?, ?)", (f"user{n}", f"https://example.com/{n}/{i}"))
+                conn.commit()
+                conn.close()
+            except sqlite3.OperationalError as e:
+                failed_writes.append(e)
+
+    def reader(n):
+        while not writers_done.is_set():
+            start = time.perf_counter()
+            try:
+                conn = connect()
+                conn.execute(READ_QUERY, (f"user{n}",)).fetchall()
+                conn.close()
+            except sqlite3.OperationalError as e:
+                errors.append(e)
+            read_latencies.append(time.perf_counter() - start)
+
+    writers = [threading.Thread(target=writer, args=(n,)) for n in range(WRITERS)]
+    readers = [threading.Thread(target=reader, args=(n,)) for n in range(READERS)]
+    start = time.perf_counter()
+    for thread in writers + readers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    writers_done.set()
+    for thread in readers:
+        thread.join()
+
+    read_latencies.sort()
+    inserted = WRITERS * INSERTS_PER_WRITER - len(failed_writes)
+    p50 = read_latencies[len(read_latencies) // 2] * 1000
+    p99 = read_latencies[min(len(read_latencies) - 1, int(len(read_latencies) * 0.99))] * 1000
+    return inserted / elapsed, p50, p99, len(errors) + len(failed_writes)
+
+
+def main():
+    print(f"{WRITERS} writers x {INSERTS_PER_WRITER} inserts, {READERS} readers")
+    print(f"{'mode':>18} {'inserts/s':>10} {'read p50 ms':>12} {'read p99 ms':>12} {'locked':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = setup_database(os.path.join(tmp, "legacy.db"))
+        pooled_path = setup_database(os.path.join(tmp, "pooled.db"))
+        pool = ConnectionPool(pooled_path)
+        for mode, connect in (("connect-per-call", connect_per_call(legacy_path)), ("pooled", pool.connection)):
+            rate, p50, p99, locked = run(connect)
+            print(f"{mode:>18} {rate:>10.0f} {p50:>12.2f} {p99:>12.2f} {locked:>7}")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark: month-to-date budget lookups from the local totals store vs. full sheet scans.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_expense_aggregates
+
+For each ledger size the Expenses rows are generated in memory, loaded into a
+temporary SQLite store with expense_aggregates.rebuild(), and a budget query
+for one month is timed both ways: summing every row (what check_budget did on
+each message) and reading the precomputed totals.
+"""
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from src.langgraph_whatsapp import expense_aggregates
+from src.langgraph_whatsapp.database_setup import setup_database
+
+CATEGORIES = ["Food", "Groceries", "Rent", "Fuel", "Movies", "Shopping", "Travel", "Medical", "Books", "Other"]
+USERS = [f"whatsapp:+91000000{i:03d}" for i in range(50)]
+MONTH = "2026-10"
+
+
+def make_rows(count: int):
+    rng = random.Random(count)
+    months = ["2026-08", "2026-09", MONTH]
+    return [
+        [f"{rng.choice(months)}-{rng.randint(1, 28):02d}", str(rng.randint(10, 5000)), rng.choice(CATEGORIES), rng.choice(USERS)]
+        for _ in range(count)
+    ]
+
+
+def scan_month(rows, month):
+    """What check_budget/get_consolidated_budget_report did per message."""
+    spent = {}
+    for row in rows:
+        if row[0].startswith(month):
+            spent[row[2]] = spent.get(row[2], 0) + float(row[1])
+    return spent
+
+
+def median_us(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def main():
+    print(f"{'rows':>8} {'scan µs':>12} {'store µs':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (100, 1_000, 10_000, 100_000):
+            rows = make_rows(count)
+            conn = sqlite3.connect(setup_database(os.path.join(tmp, f"bench_{count}.db")))
+            expense_aggregates.rebuild(rows, conn)
+            assert expense_aggregates.month_totals(MONTH, conn=conn).keys() == scan_month(rows, MONTH).keys()
+
+            scan = median_us(lambda: scan_month(rows, MONTH), repeat=max(5, 20_000 // count))
+            store = median_us(lambda: expense_aggregates.month_totals(MONTH, conn=conn), repeat=2_000)
+            print(f"{count:>8} {scan:>12.1f} {store:>10.1f}")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
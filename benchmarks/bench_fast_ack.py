@@ -0,0 +1,103 @@
+"""Benchmark: webhook acceptance rate with slow tools, inline replies vs fast-ack.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_fast_ack
+
+REQUESTS webhook deliveries are posted to the real app (middleware, route,
+WhatsAppAgentTwilio) in-process over httpx's ASGI transport, with at most
+CONNECTIONS open at a time, the way Twilio's concurrent deliveries meet a
+connection-limited server. Every tool call the agent makes is replaced by a
+stand-in that waits SHEETS_LATENCY seconds (a slow Sheets request) without
+occupying a thread, so the numbers show the webhook path rather than the
+size of the tool pool.
+
+* inline: the default; the webhook answers once the agent has replied.
+* fast-ack: WEBHOOK_FAST_ACK=1; the webhook queues the message and answers
+  with empty TwiML, and each reply is handed to a stand-in for the outbound
+  dispatcher as soon as the sender's mailbox has computed it.
+
+Both modes run at most AGENT_RUNS agent runs at once, and a request keeps
+its admission slot until its reply is computed, fast-acked or not. Requests
+are signed, so each sender is limited separately.
+
+Reports accepted requests/second (webhooks answered / time to answer them
+all), webhook latency percentiles and, for fast-ack, when the last reply
+was handed to the dispatcher.
+"""
+import asyncio
+import logging
+import statistics
+import time
+from concurrent.futures import Future
+
+import httpx
+from twilio.request_validator import RequestValidator
+
+from src.langgraph_whatsapp import agent as agent_module
+from src.langgraph_whatsapp import channel
+from src.langgraph_whatsapp.config import TWILIO_AUTH_TOKEN
+from src.langgraph_whatsapp.mailboxes import SENDER_MAILBOXES
+from src.langgraph_whatsapp.server import APP, WSP_AGENT
+
+REQUESTS = 300
+CONNECTIONS = 50
+SHEETS_LATENCY = 2.0
+AGENT_RUNS = 64
+MESSAGES = ["I spent 500 on groceries", "What's my budget for food?", "budget summary"]
+
+
+async def _slow_sheets(func, *args, **kwargs):
+    await asyncio.sleep(SHEETS_LATENCY)
+    return "ok"
+
+
+async def _run(fast_ack: bool):
+    channel.WEBHOOK_FAST_ACK = int(fast_ack)
+    SENDER_MAILBOXES.max_concurrency = AGENT_RUNS
+    replies = []
+
+    def send(to, body):
+        replies.append(time.perf_counter())
+        future = Future()
+        future.set_result(None)
+        return future
+
+    WSP_AGENT.work_queue.send = send
+    slots = asyncio.Semaphore(CONNECTIONS)
+    transport = httpx.ASGITransport(app=APP)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+
+        async def deliver(i: int):
+            async with slots:
+                form = {"From": f"whatsapp:+1555{i:06d}", "Body": MESSAGES[i % len(MESSAGES)]}
+                signature = RequestValidator(TWILIO_AUTH_TOKEN).compute_signature("http://bench/whatsapp", form)
+                sent = time.perf_counter()
+                response = await client.post("/whatsapp", data=form, headers={"X-Twilio-Signature": signature})
+                response.raise_for_status()
+                return time.perf_counter() - sent
+
+        latencies = sorted(await asyncio.gather(*(deliver(i) for i in range(REQUESTS))))
+        accepted_in = time.perf_counter() - start
+        await WSP_AGENT.work_queue.stop(timeout=600)
+    drained_in = (max(replies) - start) if replies else None
+    return latencies, accepted_in, drained_in
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    agent_module.run_blocking = _slow_sheets
+    print(f"{REQUESTS} webhooks, {CONNECTIONS} concurrent connections, {SHEETS_LATENCY:.0f} s per tool call, "
+          f"{AGENT_RUNS} agent runs at once")
+    print(f"{'mode':>9} {'accepted/s':>11} {'p50 ms':>9} {'p99 ms':>9} {'answered s':>11} {'replied s':>10}")
+    for mode, fast_ack in (("inline", False), ("fast-ack", True)):
+        latencies, accepted_in, drained_in = asyncio.run(_run(fast_ack))
+        p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+        replied = f"{drained_in:.2f}" if drained_in is not None else "-"
+        print(f"{mode:>9} {REQUESTS / accepted_in:>11.1f} {statistics.median(latencies) * 1000:>9.1f} "
+              f"{p99 * 1000:>9.1f} {accepted_in:>11.2f} {replied:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Import-time report for the webhook app, in the style of ``python -X importtime``.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import_time [--budget-ms 1000] [--runs 5]
+
+Imports ``src.langgraph_whatsapp.server`` in fresh interpreters with
+``-X importtime`` and reports the median cumulative import time, the
+slowest top-level packages, and which of the heavy, first-use-only
+dependencies (Google API client, OAuth flow, dateparser, APScheduler,
+requests, the Twilio REST client) were loaded. Exits non-zero when the
+median exceeds the budget or a deferred dependency was imported, so it can
+gate cold-start regressions in CI.
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+MODULE = "src.langgraph_whatsapp.server"
+DEFERRED = ["googleapiclient", "google_auth_oauthlib", "google_auth_httplib2", "httplib2", "dateparser",
+            "apscheduler", "requests", "twilio.rest"]
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def profile():
+    """One fresh import. Returns (cumulative us, {module: (self us, cumulative us, depth)}, loaded deferred)."""
+    probe = f"import sys, {MODULE}; print(','.join(m for m in {DEFERRED!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2)
+    loaded = [name for name in result.stdout.strip().splitlines()[-1].split(",") if name] if result.stdout.strip() else []
+    return modules[MODULE][1], modules, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=1000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [profile() for _ in range(args.runs)]
+    totals = sorted(total for total, _, _ in runs)
+    median_ms = statistics.median(totals) / 1000
+    _, modules, loaded = runs[len(runs) // 2]
+
+    # Self time grouped by top-level package, which is where the cost really lives
+    by_package = defaultdict(int)
+    for name, (self_us, _, _) in modules.items():
+        by_package[name.split(".")[0] if not name.startswith("src.") else name] += self_us
+
+    print(f"import {MODULE}: median {median_ms:.0f} ms over {args.runs} fresh interpreters "
+          f"(min {totals[0] / 1000:.0f}, max {totals[-1] / 1000:.0f}); budget {args.budget_ms:.0f} ms")
+    print(f"\n{'self ms':>8}  package")
+    for name, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:15]:
+        print(f"{self_us / 1000:>8.1f}  {name}")
+    print(f"\n{'cum ms':>8}  application module")
+    for name, (_, cumulative, _) in sorted(modules.items(), key=lambda item: -item[1][1]):
+        if name.startswith("src."):
+            print(f"{cumulative / 1000:>8.1f}  {name}")
+    print(f"\ndeferred dependencies loaded at import: {', '.join(loaded) or 'none'}")
+
+    if median_ms > args.budget_ms or loaded:
+        print("FAIL: over budget" if median_ms > args.budget_ms else "FAIL: deferred dependency imported eagerly")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
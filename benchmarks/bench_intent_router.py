@@ -0,0 +1,159 @@
+"""Micro-benchmark: precompiled intent router vs. the legacy regex cascade.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_intent_router
+
+The legacy cascade below reproduces the routing decisions Agent.invoke made
+before the router existed (string patterns passed to ``re.search`` one after
+another), without calling any tools. Both implementations are timed over the
+same corpus and their intent decisions are compared.
+"""
+import re
+import statistics
+import timeit
+
+from src.langgraph_whatsapp import intents
+from src.langgraph_whatsapp.intents import route
+
+CORPUS = [
+    "I spent 500 on groceries",
+    "I have spent 300 on transportation",
+    "I paid 1000 for rent",
+    "I bought food for 200",
+    "I used 300 on transportation",
+    "What's my budget for groceries?",
+    "How much can I spend on food?",
+    "Check budget for entertainment",
+    "Show my last 5 expenses",
+    "List recent expenses",
+    "Show spending history",
+    "Book a meeting with John at 3 PM",
+    "Create appointment with dentist on Friday",
+    "Remind me to call John at 3pm",
+    "Remind me tomorrow to check email",
+    "Remind me in 2 hours to take a break",
+    "check this out https://github.com/SkyworkAI/SkyReels-V2",
+    "Show my saved links",
+    "Find my GitHub links",
+    "this is the budget",
+    "budget summary",
+    "I spent 200 on food\nI spent 100 on fuel\nI spent 50 on movies",
+    "hello there, how are you doing today?",
+    "1 2 3 4 5 6 7 8 9 10 " * 20 + "on",
+]
+
+
+def legacy_route(user_message: str) -> str:
+    """Intent decision of the pre-router Agent.invoke cascade."""
+    msg_lower = user_message.lower()
+    links = re.findall(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[-\w%/.\[\]~!$&\'()*+,;=:@]*)*/?', user_message)
+    if "remnind" in msg_lower:
+        msg_lower = msg_lower.replace("remnind", "remind")
+    elif "rmeind" in msg_lower:
+        msg_lower = msg_lower.replace("rmeind", "remind")
+
+    expense_patterns = [
+        r"(?:i|we)\s+(?:have\s+)?(?:spent|paid|bought)\s+(?:\$)?(\d+(?:\.\d+)?)\s+(?:on|for)\s+([a-zA-Z\s]+)",
+        r"(?:i|we)\s+(?:have\s+)?(?:spent|paid|bought)\s+(?:on|for)\s+([a-zA-Z\s]+)\s+(?:\$)?(\d+(?:\.\d+)?)",
+        r"(?:track|add|record)\s+(?:expense|transaction|purchase)\s+(?:of\s+)?(?:\$)?(\d+(?:\.\d+)?)\s+(?:on|for)\s+([a-zA-Z\s]+)",
+        r"(?:\$)?(\d+(?:\.\d+)?)\s+(?:spent|paid)\s+(?:on|for)\s+([a-zA-Z\s]+)",
+        r"(?:i|we)\s+(?:used|put|invested)\s+(?:\$)?(\d+(?:\.\d+)?)\s+(?:on|for|in)\s+([a-zA-Z\s]+)",
+        r"(\d+(?:\.\d+)?).+(?:on|for)\s+([a-zA-Z\s]+)"
+    ]
+    if "\n" in user_message and "spent" in msg_lower:
+        found = False
+        for line in user_message.split("\n"):
+            line_lower = line.lower()
+            if "spent" in line_lower:
+                if any(re.search(p, line_lower) for p in expense_patterns):
+                    found = True
+                elif re.search(r'\d+', line_lower) and re.search(r'(?:on|for)\s+([a-zA-Z\s]+)(?:$|\.)', line_lower):
+                    found = True
+        if found:
+            return intents.EXPENSE_BATCH
+    for pattern in expense_patterns:
+        if re.search(pattern, msg_lower):
+            return intents.EXPENSE
+    if "spent" in msg_lower and re.search(r'\d+', msg_lower):
+        if re.search(r'(\d+(?:\.\d+)?)', msg_lower) and re.search(r'(?:on|for)\s+([a-zA-Z\s]+)(?:$|\.)', msg_lower):
+            return intents.EXPENSE
+
+    budget_patterns = [
+        r"(?:what(?:'s|s|\sis)?\s+my|check|show)\s+(?:budget|spending|limit)\s+(?:for|on)?\s+([a-zA-Z\s]+)",
+        r"how\s+much\s+(?:can\s+i\s+spend|do\s+i\s+have\s+left)\s+(?:on|for)\s+([a-zA-Z\s]+)",
+        r"budget\s+(?:for|on)\s+([a-zA-Z\s]+)"
+    ]
+    if "\n" in user_message and "budget" in msg_lower:
+        for line in user_message.split("\n"):
+            line_lower = line.lower()
+            if "budget" in line_lower and any(re.search(p, line_lower) for p in budget_patterns):
+                return intents.BUDGET_BATCH
+    for pattern in budget_patterns:
+        if re.search(pattern, msg_lower):
+            return intents.BUDGET
+    if "budget" in msg_lower and (msg_lower.startswith("this is") or msg_lower.startswith("here is") or "show" in msg_lower or "list" in msg_lower):
+        return intents.ALL_BUDGETS
+    if any(phrase in msg_lower for phrase in ["all budget", "budget summary", "total budget", "overall budget"]):
+        return intents.BUDGET_SUMMARY
+
+    expense_history_keywords = ["expense", "expenses", "spent", "spending", "transactions", "purchases", "costs", "payments"]
+    view_keywords = ["show", "list", "recent", "last", "history", "view", "see", "get", "what are"]
+    if any(k in msg_lower for k in expense_history_keywords) and any(k in msg_lower for k in view_keywords):
+        re.search(r"(?:last|recent)\s+(\d+)", msg_lower)
+        return intents.EXPENSE_HISTORY
+
+    if ("book" in msg_lower or "schedule" in msg_lower or "create" in msg_lower) and ("meeting" in msg_lower or "event" in msg_lower or "appointment" in msg_lower):
+        for pattern in [
+            r"(?:book|schedule|create)\s+(?:a\s+)?(?:meeting|event|appointment)\s+with\s+([^\d\n]+?)(?:\s+on|\s+at|$)",
+            r"meeting\s+with\s+([^\d\n]+?)(?:\s+on|\s+at|$)",
+            r"(?:book|schedule|create)\s+(?:a\s+)?([^\d\n]+?)(?:\s+on|\s+at|$)"
+        ]:
+            if re.search(pattern, user_message, re.IGNORECASE):
+                break
+        re.search(r"(?:on|for)\s+([a-zA-Z]+\s+\d+(?:st|nd|rd|th)?|tomorrow|today|next\s+[a-zA-Z]+|\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?)", user_message, re.IGNORECASE)
+        re.search(r"at\s+(\d{1,2}(?::\d{2})?\s*(?:am|pm)?|\d{1,2}(?::\d{2})?)", user_message, re.IGNORECASE)
+        re.search(r"for\s+(\d+)\s*(?:min|minutes|hour|hours)?", user_message, re.IGNORECASE)
+        return intents.CALENDAR
+
+    if "remind" in msg_lower:
+        return intents.REMINDER
+    if links:
+        return intents.SAVE_LINKS
+    if any(w in msg_lower for w in ["reminder", "reminders"]) and any(w in msg_lower for w in ["show", "get", "my", "list", "see"]):
+        return intents.LIST_REMINDERS
+    if any(k in msg_lower for k in ["show", "get", "my", "share", "find"]) and any(k in msg_lower for k in ["link", "links", "repo", "repository"]):
+        return intents.LIST_LINKS
+    return intents.UNKNOWN
+
+
+def _time_per_message(func, repeat: int = 5, number: int = 200) -> float:
+    """Best-of-``repeat`` mean time (µs) to route one message of the corpus."""
+    def run():
+        for message in CORPUS:
+            func(message)
+    timings = timeit.repeat(run, repeat=repeat, number=number)
+    return min(timings) / (number * len(CORPUS)) * 1e6
+
+
+def main():
+    mismatches = [(m, legacy_route(m), route(m).name) for m in CORPUS if legacy_route(m) != route(m).name]
+    for message, old, new in mismatches:
+        print(f"MISMATCH {message[:40]!r}: legacy={old} router={new}")
+
+    legacy_us = _time_per_message(legacy_route)
+    router_us = _time_per_message(route)
+    print(f"messages in corpus : {len(CORPUS)}")
+    print(f"legacy cascade     : {legacy_us:8.2f} µs/message")
+    print(f"compiled router    : {router_us:8.2f} µs/message")
+    print(f"speedup            : {legacy_us / router_us:8.2f}x")
+
+    # Per-message cost for the worst-case input of the generic expense fallback
+    worst = "1 " * 2000 + "on "
+    for label, func in (("legacy", legacy_route), ("router", route)):
+        samples = timeit.repeat(lambda: func(worst), repeat=5, number=3)
+        print(f"{label:6} pathological 4k-char message: {statistics.median(samples) / 3 * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark: saved-link keyword search, LIKE scan vs. the FTS5 index.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_link_search
+
+One user has 5,000 saved links among 200,000 links of other users. Each
+keyword is searched the old way (retrieve_links' ``link LIKE '%kw%'``) and
+through link_search.search_links (first page of 20, bm25 + recency).
+"""
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from src.langgraph_whatsapp.database_setup import setup_database
+from src.langgraph_whatsapp.link_search import search_links
+
+USER = "whatsapp:+15550000001"
+USER_LINKS = 5_000
+OTHER_LINKS = 200_000
+HOSTS = ["github.com", "x.com", "linkedin.com", "youtube.com", "arxiv.org", "news.ycombinator.com", "medium.com", "docs.python.org"]
+WORDS = ["langgraph", "whatsapp", "agent", "sqlite", "fastapi", "rust", "kubernetes", "python", "llm", "skyreels",
+         "vector", "search", "async", "benchmark", "twilio", "budget", "calendar", "reminder", "postgres", "redis"]
+KEYWORDS = ["github", "skyreels", "kubernetes", "arxiv", "nothingmatches"]
+
+LIKE_QUERY = "SELECT link FROM links WHERE user_id = ? AND link LIKE ? ORDER BY timestamp DESC"
+
+
+def populate(conn):
+    rng = random.Random(7)
+
+    def rows(user_for, count):
+        for i in range(count):
+            path = "/".join(rng.sample(WORDS, 2)) + f"-{i}"
+            yield user_for(i), f"https://{rng.choice(HOSTS)}/{path}", f"-{rng.randint(0, 365)} days"
+
+    conn.executemany(
+        "INSERT INTO links (user_id, link, timestamp) VALUES (?, ?, datetime('now', ?))",
+        rows(lambda i: USER, USER_LINKS)
+    )
+    conn.executemany(
+        "INSERT INTO links (user_id, link, timestamp) VALUES (?, ?, datetime('now', ?))",
+        rows(lambda i: f"whatsapp:+1666{i % 2000:07d}", OTHER_LINKS)
+    )
+    conn.commit()
+
+
+def timed_us(func, repeat=200):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples) * 1e6, samples[int(len(samples) * 0.99) - 1] * 1e6
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(setup_database(os.path.join(tmp, "links.db")))
+        populate(conn)
+        print(f"{USER_LINKS} links for the user, {OTHER_LINKS} for others")
+        print(f"{'keyword':>15} {'LIKE p50 µs':>12} {'LIKE p99 µs':>12} {'FTS p50 µs':>11} {'FTS p99 µs':>11} {'hits':>6}")
+        for keyword in KEYWORDS:
+            hits = len(conn.execute(LIKE_QUERY, (USER, f"%{keyword}%")).fetchall())
+            like = timed_us(lambda: conn.execute(LIKE_QUERY, (USER, f"%{keyword}%")).fetchall(), repeat=50)
+            fts = timed_us(lambda: search_links(USER, keyword, conn=conn))
+            print(f"{keyword:>15} {like[0]:>12.0f} {like[1]:>12.0f} {fts[0]:>11.0f} {fts[1]:>11.0f} {hits:>6}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
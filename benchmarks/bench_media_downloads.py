@@ -0,0 +1,105 @@
+"""Benchmark: serial vs. concurrent download of a 10-image message.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_media_downloads
+
+A local HTTP server stands in for Twilio's media endpoint. Each image is
+~300 KB and takes between 100 and 400 ms to serve. "serial" is the old
+handle_message loop (requests.get + base64 per image); "concurrent" is
+MediaFetcher.fetch_all over one keep-alive pool. The concurrent total should
+track the slowest image rather than the sum. "cached retry" replays the same
+message through a fetcher with a MediaCache, as a retried webhook would.
+"""
+import asyncio
+import base64
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.langgraph_whatsapp.media import MediaFetcher
+from src.langgraph_whatsapp.media_cache import MediaCache
+
+IMAGES = 10
+IMAGE_BYTES = 300 * 1024
+DELAYS_MS = [100 + 300 * i / (IMAGES - 1) for i in range(IMAGES)]
+BODY = bytes(range(256)) * (IMAGE_BYTES // 256)
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        index = int(self.path.rsplit("/", 1)[-1])
+        time.sleep(DELAYS_MS[index] / 1000)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class _MediaServer(ThreadingHTTPServer):
+    request_queue_size = 64  # accept all parallel connections without SYN retries
+
+
+def serial(urls):
+    """The pre-pipeline loop: one blocking download and base64 copy per image."""
+    uris = []
+    for url in urls:
+        resp = requests.get(url, timeout=20)
+        resp.raise_for_status()
+        uris.append(f"data:image/jpeg;base64,{base64.b64encode(resp.content).decode()}")
+    return uris
+
+
+async def concurrent(urls, fetcher=None):
+    fetcher = fetcher or MediaFetcher()
+    items = await fetcher.fetch_all([(url, "image/jpeg") for url in urls])
+    uris = [item.data_uri() for item in items]
+    for item in items:
+        item.close()
+    await fetcher.close()
+    return uris
+
+
+def main():
+    server = _MediaServer(("127.0.0.1", 0), _MediaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{server.server_port}/media/{i}" for i in range(IMAGES)]
+    try:
+        start = time.perf_counter()
+        expected = serial(urls)
+        serial_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        uris = asyncio.run(concurrent(urls))
+        concurrent_s = time.perf_counter() - start
+        assert uris == expected
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            fetcher = MediaFetcher(cache=MediaCache(cache_dir, 64 * 1024 * 1024))
+            asyncio.run(concurrent(urls, fetcher))
+            start = time.perf_counter()
+            uris = asyncio.run(concurrent(urls, fetcher))
+            cached_s = time.perf_counter() - start
+            assert uris == expected
+    finally:
+        server.shutdown()
+
+    print(f"images              : {IMAGES} x {IMAGE_BYTES // 1024} KB")
+    print(f"sum of image delays : {sum(DELAYS_MS):8.0f} ms")
+    print(f"slowest image delay : {max(DELAYS_MS):8.0f} ms")
+    print(f"serial              : {serial_s * 1000:8.0f} ms")
+    print(f"concurrent          : {concurrent_s * 1000:8.0f} ms")
+    print(f"cached retry        : {cached_s * 1000:8.0f} ms  (hit ratio {fetcher.cache.stats()['hit_ratio']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Benchmark: outbound WhatsApp sends, per-call Twilio Client vs the pooled dispatcher.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_outbound
+
+A local stand-in for the Messages API answers on 127.0.0.1 with 20 ms of
+latency and limits each sender to LIMIT messages per second, answering 429
+beyond it (like Twilio's per-number throughput errors). MESSAGES sends are
+pushed through each mode with 4-way concurrency:
+
+* per-call client: the previous send_whatsapp_message path, a new
+  twilio.rest.Client (new session, new TCP connection) per message and no
+  pacing or retry, so a 429 is a lost message.
+* dispatcher: OutboundDispatcher with 4 workers on one keep-alive session,
+  paced just under the limit, retrying 429/5xx with jittered backoff.
+
+A second run sends a top-of-the-hour burst of BURST reminders through the
+dispatcher with one sender and with a pool of POOL senders (16 workers),
+reporting how long the burst takes to drain and how it spread per sender.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from twilio.rest import Client
+
+from src.langgraph_whatsapp.outbound import OutboundDispatcher, TokenBucket
+
+MESSAGES = 300
+LIMIT = 50
+LATENCY = 0.02
+BURST = 1000
+POOL = 4
+
+
+class _Twilio(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    limiters = {}
+    lock = threading.Lock()
+    connections = set()
+    statuses = []
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode())
+        sender = (form.get("From") or form.get("MessagingServiceSid"))[0]
+        time.sleep(LATENCY)
+        with _Twilio.lock:
+            limiter = _Twilio.limiters.setdefault(sender, TokenBucket(LIMIT, burst=LIMIT / 5))
+        status = 201 if limiter.try_acquire() else 429
+        _Twilio.statuses.append(status)
+        _Twilio.connections.add(self.client_address)
+        body = json.dumps({"sid": f"SM{len(_Twilio.statuses)}", "message": "Too Many Requests"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 64
+    daemon_threads = True
+
+
+def _reset():
+    _Twilio.limiters = {}
+    _Twilio.connections = set()
+    _Twilio.statuses = []
+
+
+def per_call_client(base_url):
+    def send(i):
+        client = Client("AC123", "secret")
+        client.api.base_url = base_url
+        try:
+            client.messages.create(from_="whatsapp:+14155238886", body=f"reminder {i}", to=f"whatsapp:+1555{i:07d}")
+            return True
+        except Exception:
+            return False
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        return sum(pool.map(send, range(MESSAGES))), None
+
+
+def dispatcher(base_url):
+    outbound = OutboundDispatcher("AC123", "secret", "+14155238886", base_url=base_url,
+                                  rate=LIMIT * 0.9, burst=LIMIT / 5, workers=4)
+    futures = [outbound.send(f"+1555{i:07d}", f"reminder {i}") for i in range(MESSAGES)]
+    delivered = sum(1 for future in futures if not future.exception())
+    outbound.stop()
+    return delivered, outbound.stats()
+
+
+def main():
+    server = _Server(("127.0.0.1", 0), _Twilio)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    print(f"{MESSAGES} messages from one sender, limit {LIMIT}/s, {LATENCY * 1000:.0f} ms per request")
+    print(f"{'mode':>16} {'seconds':>8} {'msgs/s':>7} {'delivered':>10} {'429s':>5} {'TCP conns':>10} {'max lag ms':>11}")
+    for name, mode in (("per-call client", per_call_client), ("dispatcher", dispatcher)):
+        _reset()
+        start = time.perf_counter()
+        delivered, stats = mode(base_url)
+        elapsed = time.perf_counter() - start
+        lag = f"{stats['max_queue_lag_ms']:.0f}" if stats else "-"
+        print(f"{name:>16} {elapsed:>8.2f} {delivered / elapsed:>7.1f} {delivered:>10} "
+              f"{_Twilio.statuses.count(429):>5} {len(_Twilio.connections):>10} {lag:>11}")
+
+    print(f"\n{BURST}-reminder burst, {LIMIT}/s per sender")
+    print(f"{'senders':>8} {'seconds':>8} {'msgs/s':>7} {'429s':>5} {'spilled':>8}  sent per sender")
+    for senders in (["+14155238886"], [f"+1415555{i:04d}" for i in range(POOL)]):
+        _reset()
+        outbound = OutboundDispatcher("AC123", "secret", senders, base_url=base_url,
+                                      rate=LIMIT * 0.9, burst=LIMIT / 5, workers=16)
+        start = time.perf_counter()
+        futures = [outbound.send(f"+1555{i:07d}", f"📅 Reminder: task {i}") for i in range(BURST)]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+        outbound.stop()
+        per_sender = outbound.stats()["senders"]
+        spilled = sum(stats["spilled_in"] for stats in per_sender.values())
+        print(f"{len(senders):>8} {elapsed:>8.2f} {BURST / elapsed:>7.1f} {_Twilio.statuses.count(429):>5} "
+              f"{spilled:>8}  {' '.join(str(stats['sent']) for stats in per_sender.values())}")
+
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
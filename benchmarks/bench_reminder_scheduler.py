@@ -0,0 +1,166 @@
+"""Benchmark: reminder scheduler startup, memory and firing jitter with a large backlog.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_reminder_scheduler
+
+A database gets 1,000,000 pending reminders spread over the next 30 days.
+Each mode then runs in a fresh subprocess and reports how much its RSS grew
+while starting up (imports excluded):
+
+* legacy: the previous startup path. It SELECTs every pending row, runs
+  dateparser.parse on each and calls BackgroundScheduler.add_job. This takes
+  minutes per million rows, so it loads only the first LEGACY_ROWS rows; the
+  1M figure is extrapolated linearly, which is a lower bound because
+  add_job's sorted insert is O(n).
+* windowed: ReminderScheduler keeps only the next 10 minutes in memory.
+
+Both modes also fire 300 probe reminders due over the next 6 seconds and
+report how late each fired, measured from its whole-second due time.
+"""
+import argparse
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+PENDING = 1_000_000
+LEGACY_ROWS = 20_000
+PROBES = 300
+PROBE_SECONDS = 6
+
+
+def build(db_path):
+    from src.langgraph_whatsapp.database_setup import setup_database
+    import sqlite3
+
+    setup_database(db_path)
+    conn = sqlite3.connect(db_path)
+    start = datetime.now() + timedelta(minutes=1)
+    conn.executemany(
+        "INSERT INTO reminders (user_id, task, reminder_time) VALUES (?, ?, ?)",
+        (
+            (f"whatsapp:+1555{i % 50_000:07d}", f"task {i}",
+             (start + timedelta(seconds=i * 30 * 86400 // PENDING)).strftime("%Y-%m-%d %H:%M:%S"))
+            for i in range(PENDING)
+        )
+    )
+    conn.commit()
+    conn.close()
+
+
+def add_probes(db_path, tag):
+    """Reminders due over the next few seconds; returns {task: due epoch seconds}."""
+    import sqlite3
+
+    conn = sqlite3.connect(db_path)
+    first = int(time.time()) + 2
+    probes = {}
+    rows = []
+    for i in range(PROBES):
+        due = first + i * PROBE_SECONDS // PROBES
+        probes[f"{tag} probe {i}"] = due
+        rows.append(("whatsapp:+15550000000", f"{tag} probe {i}", datetime.fromtimestamp(due).strftime("%Y-%m-%d %H:%M:%S")))
+    conn.executemany("INSERT INTO reminders (user_id, task, reminder_time) VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return probes
+
+
+def rss_mb():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize() / (1024 * 1024)
+
+
+def run_mode(mode, db_path):
+    import sqlite3
+    import dateparser
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from src.langgraph_whatsapp.db import ConnectionPool
+    from src.langgraph_whatsapp.reminder_scheduler import ReminderScheduler
+
+    lateness = []
+    done = threading.Event()
+    probes = add_probes(db_path, mode)
+
+    def send(user_id, body):
+        task = body.replace("📅 Reminder: ", "")
+        if task in probes:
+            lateness.append((time.time() - probes[task]) * 1000)
+            if len(lateness) == PROBES:
+                done.set()
+
+    baseline = rss_mb()
+    if mode == "legacy":
+        start = time.perf_counter()
+        scheduler = BackgroundScheduler(timezone="UTC", job_defaults={"misfire_grace_time": 1})
+        scheduler.start()
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute(
+            """
+            SELECT id, user_id, task, reminder_time FROM reminders
+            WHERE completed = 0 AND reminder_time > ? ORDER BY reminder_time ASC LIMIT ?
+            """,
+            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), LEGACY_ROWS)
+        ).fetchall()
+        conn.close()
+        for reminder_id, user_id, task, reminder_time in rows:
+            scheduler.add_job(send, "date", run_date=dateparser.parse(reminder_time),
+                              args=[user_id, f"📅 Reminder: {task}"], id=f"reminder_{reminder_id}")
+        startup = time.perf_counter() - start
+        loaded = len(rows)
+    else:
+        pool = ConnectionPool(db_path)
+        scheduler = ReminderScheduler(lambda user_id, task: send(user_id, f"📅 Reminder: {task}"),
+                                      window=600, connect=pool.connection)
+        start = time.perf_counter()
+        scheduler.start()
+        while not scheduler.stats()["pages"]:
+            time.sleep(0.001)
+        startup = time.perf_counter() - start
+        loaded = scheduler.stats()["in_memory"]
+
+    rss = rss_mb() - baseline
+    done.wait(PROBE_SECONDS + 10)
+    scheduler.shutdown(wait=False) if mode == "legacy" else scheduler.stop()
+    lateness.sort()
+    print(f"{mode} {loaded} {startup:.3f} {rss:.1f} {statistics.median(lateness):.1f} "
+          f"{lateness[int(len(lateness) * 0.99) - 1]:.1f} {lateness[-1]:.1f} {len(lateness)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["legacy", "windowed"])
+    parser.add_argument("--db")
+    args = parser.parse_args()
+    if args.mode:
+        run_mode(args.mode, args.db)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "links.db")
+        start = time.perf_counter()
+        build(db_path)
+        print(f"{PENDING} pending reminders built in {time.perf_counter() - start:.1f}s")
+        print(f"{'mode':>9} {'loaded':>8} {'startup s':>10} {'RSS +MB':>8} {'late p50 ms':>12} "
+              f"{'p99 ms':>7} {'max ms':>7} {'fired':>6}")
+        for mode in ("legacy", "windowed"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_reminder_scheduler", "--mode", mode, "--db", db_path],
+                capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1].split()
+            name, loaded, startup, rss, p50, p99, worst, fired = output
+            print(f"{name:>9} {loaded:>8} {float(startup):>10.3f} {float(rss):>8.1f} {float(p50):>12.1f} "
+                  f"{float(p99):>7.1f} {float(worst):>7.1f} {fired:>6}")
+            if name == "legacy":
+                per_million = float(startup) * PENDING / int(loaded)
+                print(f"{'':>9} legacy startup extrapolated to {PENDING} rows: >= {per_million:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
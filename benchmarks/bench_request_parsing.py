@@ -0,0 +1,106 @@
+"""Micro-benchmark: per-request parsing of Twilio webhook bodies.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_request_parsing
+
+A typical inbound message body (sender, text, MessageSid, the other fields
+Twilio sends, optionally two image attachments) is parsed ROUNDS times the
+way each path did it, on a starlette Request like the one the middleware and
+handlers see:
+
+* before, /whatsapp: the middleware's ``parse_qs`` + flattening for the
+  signature check, then ``await request.form()`` in handle_message and the
+  NumMedia loop over the form;
+* before, POST /: the same, plus another ``request.form()`` in root_post
+  before forwarding;
+* single parse: ``TwilioRequestContext.from_body`` once in the middleware;
+  handlers read the fields and media descriptors from request.state.
+
+The signature HMAC is not included: it is computed once on both paths.
+"""
+import asyncio
+import statistics
+import time
+from urllib.parse import parse_qs, urlencode
+
+from starlette.requests import Request
+
+from src.langgraph_whatsapp.request_context import TwilioRequestContext
+
+ROUNDS = 5000
+FIELDS = [
+    ("SmsMessageSid", "SM" + "a" * 32), ("NumMedia", "0"), ("ProfileName", "Asha"), ("MessageType", "text"),
+    ("SmsSid", "SM" + "a" * 32), ("WaId", "919900000000"), ("SmsStatus", "received"),
+    ("Body", "I spent 500 on groceries and 120 on coffee"), ("To", "whatsapp:+14155238886"),
+    ("NumSegments", "1"), ("ReferralNumMedia", "0"), ("MessageSid", "SM" + "a" * 32),
+    ("AccountSid", "AC" + "b" * 32), ("From", "whatsapp:+919900000000"), ("ApiVersion", "2010-04-01"),
+]
+MEDIA = [("NumMedia", "2"), ("MediaUrl0", "https://api.twilio.com/2010-04-01/Accounts/AC1/Messages/MM1/Media/ME1"),
+         ("MediaContentType0", "image/jpeg"),
+         ("MediaUrl1", "https://api.twilio.com/2010-04-01/Accounts/AC1/Messages/MM1/Media/ME2"),
+         ("MediaContentType1", "image/png")]
+
+
+def _request(body: bytes) -> Request:
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {"type": "http", "method": "POST", "path": "/whatsapp", "query_string": b"",
+             "headers": [(b"content-type", b"application/x-www-form-urlencoded"),
+                         (b"content-length", str(len(body)).encode())]}
+    return Request(scope, receive)
+
+
+async def _before(body: bytes, forwarded: bool):
+    # TwilioMiddleware
+    request = _request(body)
+    body = await request.body()
+    form_dict = parse_qs(body.decode(), keep_blank_values=True)
+    {k: v[0] if isinstance(v, list) and v else v for k, v in form_dict.items()}
+    if forwarded:
+        # root_post parsed the form, then handed the request on
+        form = await _request(body).form()
+        form["From"], form["Body"]
+    # handle_message
+    form = await _request(body).form()
+    form.get("From", "").strip(), form.get("Body", "").strip(), form.get("MessageSid", "").strip()
+    for i in range(int(form.get("NumMedia", "0"))):
+        form.get(f"MediaUrl{i}", ""), form.get(f"MediaContentType{i}", "")
+
+
+async def _single(body: bytes, forwarded: bool):
+    request = _request(body)
+    request.state.twilio = TwilioRequestContext.from_body(await request.body())
+    context = request.state.twilio
+    if forwarded:
+        context.is_whatsapp_message
+    context.sender, context.content, context.message_sid, context.media
+
+
+async def _time(parse, body: bytes, forwarded: bool) -> float:
+    samples = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        await parse(body, forwarded)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+async def _main():
+    print(f"median us per request over {ROUNDS} requests")
+    print(f"{'body':>12} {'before /whatsapp':>17} {'before POST /':>14} {'single parse':>13}")
+    for name, fields in (("text", FIELDS), ("two images", FIELDS + MEDIA)):
+        body = urlencode(fields).encode()
+        whatsapp = await _time(_before, body, False)
+        root = await _time(_before, body, True)
+        single = await _time(_single, body, True)
+        print(f"{name:>12} {whatsapp:>17.1f} {root:>14.1f} {single:>13.1f}")
+
+
+def main():
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark: parsing reminder / calendar time expressions.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_timeparse
+
+The corpus is the kind of time slot the intent router extracts from real
+reminder and booking messages ("7pm", "in 2 hours", "tomorrow 9:00 AM",
+"May 1 3:00 PM"...). It is parsed ROUNDS times by:
+
+* dateparser: ``dateparser.parse`` on every phrase, as book_calendar_event did;
+* legacy set_reminder: the previous hand parsing of "7pm" / "18:39", with
+  unrestricted ``dateparser.parse`` for everything else;
+* TimeParser: rules first, then dateparser restricted to English behind the
+  LRU memo.
+
+The import cost of dateparser, which TimeParser now only pays on the first
+fallback, is measured in a fresh interpreter.
+"""
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+CORPUS = [
+    "7pm", "7:30pm", "7.03pm", "9am", "10:15 am", "6 PM", "18:39", "18.39", "1830", "21:00",
+    "at 7pm", "at 9:30 am", "in 2 hours", "in 30 minutes", "in 5 mins", "in 1 hour", "in an hour",
+    "in half an hour", "in 1 hour and 30 minutes", "in 2 days", "in 10 minutes", "in 45 minutes",
+    "tomorrow", "tomorrow at 10am", "tomorrow 9:00 AM", "tomorrow at 8:30", "tomorrow morning",
+    "today 5pm", "tonight", "tonight at 9", "evening", "morning", "afternoon",
+    "monday", "friday 3pm", "next monday 9am", "on wednesday at 11am", "saturday 10:00 AM",
+    "sunday evening", "2026-11-02", "2026-11-02 18:30", "2026-11-02T09:00:00",
+    "May 1 3:00 PM", "1st december 10am", "next week", "december 25", "15 june at 4pm",
+    "3 days from now", "noon", "midnight",
+]
+ROUNDS = 20
+
+
+def legacy_set_reminder(text):
+    """The hand parsing set_reminder used before TimeParser."""
+    import dateparser
+
+    match = re.compile(r'(\d+)(?:[\.:](\d+))?\s*(am|pm)', re.IGNORECASE).match(text)
+    now = datetime.now()
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        if match.group(3).lower() == "pm" and hour < 12:
+            hour += 12
+        elif match.group(3).lower() == "am" and hour == 12:
+            hour = 0
+        result = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return result if result > now else result + timedelta(days=1)
+    if text.replace(":", "").replace(".", "").isdigit():
+        text = text.replace(".", ":")
+        hours, minutes = map(int, text.split(":")) if ":" in text else (int(text.zfill(4)[:2]), int(text.zfill(4)[2:]))
+        return now.replace(hour=hours % 24, minute=minutes % 60, second=0, microsecond=0)
+    return dateparser.parse(text)
+
+
+def timed(parse):
+    samples = []
+    for _ in range(ROUNDS):
+        for phrase in CORPUS:
+            start = time.perf_counter()
+            parse(phrase)
+            samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.median(samples), statistics.mean(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    import_ms = float(subprocess.run(
+        [sys.executable, "-c", "import time; s = time.perf_counter(); import dateparser; print((time.perf_counter() - s) * 1000)"],
+        capture_output=True, text=True, check=True,
+    ).stdout)
+
+    import dateparser
+    from src.langgraph_whatsapp.timeparse import TimeParser
+
+    parser = TimeParser(languages=["en"], cache_size=1024)
+    # Warm dateparser's own lazy loading so the first mode isn't charged for it
+    dateparser.parse("tomorrow")
+
+    print(f"{len(CORPUS)} phrases x {ROUNDS} rounds; importing dateparser costs {import_ms:.0f} ms")
+    print(f"{'parser':>20} {'p50 us':>9} {'mean us':>9} {'p99 us':>9}")
+    for name, parse in (("dateparser", dateparser.parse), ("legacy set_reminder", legacy_set_reminder),
+                        ("TimeParser", parser.parse)):
+        p50, mean, p99 = timed(parse)
+        print(f"{name:>20} {p50:>9.1f} {mean:>9.1f} {p99:>9.1f}")
+    stats = parser.stats()
+    print(f"TimeParser: {stats['rule_hits'] / ROUNDS:.0f}/{len(CORPUS)} phrases by rule, "
+          f"{stats['fallback_cache_misses']} dateparser calls, {stats['fallback_cache_hits']} memo hits")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark: background link unfurling throughput and conditional-GET refreshes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_unfurl
+
+A local stand-in site answers on 127.0.0.1-127.0.0.8 (eight "hosts") with
+30 ms of latency, 40 KB HTML pages and ETags. 400 saved links are unfurled
+cold, then their metadata is expired and refreshed, once by a single worker
+and once by the pool (8 workers, 2 requests per host).
+"""
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.langgraph_whatsapp.database_setup import setup_database
+from src.langgraph_whatsapp.db import ConnectionPool
+from src.langgraph_whatsapp.link_store import save_links
+from src.langgraph_whatsapp.unfurl import LinkUnfurler
+
+HOSTS = [f"127.0.0.{i}" for i in range(1, 9)]
+LINKS = 400
+LATENCY = 0.03
+FILLER = "<p>" + "lorem ipsum " * 3400 + "</p>"
+
+
+class _Site(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    bytes_sent = 0
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        etag = f'"{self.path}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = f"<html><head><title>Article {self.path}</title></head><body>{FILLER}</body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        _Site.bytes_sent += len(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 64
+    daemon_threads = True
+
+
+def run(unfurler, pool, urls, reset_sql):
+    conn = pool.connection()
+    conn.execute(reset_sql)
+    conn.commit()
+    conn.close()
+    before, sent = unfurler.stats(), _Site.bytes_sent
+    start = time.perf_counter()
+    unfurler.submit(urls)
+    unfurler.join()
+    elapsed = time.perf_counter() - start
+    after = unfurler.stats()
+    fetched = after["fetched"] - before["fetched"]
+    revalidated = after["revalidated"] - before["revalidated"]
+    return len(urls) / elapsed, fetched, revalidated, (_Site.bytes_sent - sent) / 1e6
+
+
+def main():
+    servers = []
+    port = None
+    for host in HOSTS:
+        server = _Server((host, port or 0), _Site)
+        port = server.server_port
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    urls = [f"http://{HOSTS[i % len(HOSTS)]}:{port}/article/{i}" for i in range(LINKS)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(setup_database(os.path.join(tmp, "links.db")))
+        conn = pool.connection()
+        save_links("whatsapp:+15550000001", urls, conn=conn)
+        conn.commit()
+        conn.close()
+
+        print(f"{LINKS} links over {len(HOSTS)} hosts, {LATENCY * 1000:.0f} ms per request")
+        print(f"{'mode':>24} {'pass':>8} {'URLs/s':>8} {'200s':>6} {'304s':>6} {'body MB':>8}")
+        for label, workers, per_host in (("1 worker", 1, 1), ("8 workers, 2 per host", 8, 2)):
+            unfurler = LinkUnfurler(workers=workers, per_host=per_host, connect=pool.connection,
+                                    allow_private_addresses=True)
+            # Cold: no metadata yet. Refresh: every row is past refresh_after
+            for name, reset_sql in (("cold", "DELETE FROM link_metadata"),
+                                    ("refresh", "UPDATE link_metadata SET fetched_at = 0")):
+                rate, fetched, revalidated, body_mb = run(unfurler, pool, urls, reset_sql)
+                print(f"{label:>24} {name:>8} {rate:>8.0f} {fetched:>6} {revalidated:>6} {body_mb:>8.1f}")
+            unfurler.stop()
+            print(f"{'':>24} revalidation ratio {unfurler.stats()['revalidation_ratio']}")
+        pool.close_all()
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
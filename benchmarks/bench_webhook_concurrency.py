@@ -0,0 +1,96 @@
+"""Load test: webhook latency under concurrent senders, tools inline vs. on the tool pool.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_webhook_concurrency
+
+200 senders each post one message (100 messages/second over two seconds)
+and Agent.invoke routes it to a tool. The tools are replaced by stand-ins
+that block their thread for as long as a typical Sheets/SQLite call
+(time.sleep, like a real ``.execute()``), so no credentials or network are
+needed.
+
+"inline" reproduces the old behaviour, where the tool ran on the event loop;
+"pooled" awaits it through async_tools.run_blocking. Percentiles are per
+request, measured from each message's scheduled arrival.
+"""
+import asyncio
+import random
+import statistics
+import time
+
+from src.langgraph_whatsapp import agent as agent_module
+from src.langgraph_whatsapp.agent import Agent
+from src.langgraph_whatsapp.async_tools import TOOL_EXECUTOR, run_blocking
+
+SENDERS = 200
+ARRIVALS_PER_SECOND = 100
+MESSAGES = [
+    "I spent 500 on groceries",
+    "What's my budget for food?",
+    "Show my last 5 expenses",
+    "budget summary",
+]
+
+
+def _blocking_tool(low_ms: float, high_ms: float):
+    def tool(*args, **kwargs):
+        time.sleep(random.uniform(low_ms, high_ms) / 1000)
+        return "ok"
+    return tool
+
+
+STAND_INS = {
+    "track_expense": _blocking_tool(2, 5),  # SQLite enqueue + aggregate upsert
+    "get_budget_status": _blocking_tool(5, 15),  # totals store + catalog lookup
+    "get_recent_expenses": _blocking_tool(150, 300),  # Sheets values().get()
+    "get_consolidated_budget_report": _blocking_tool(5, 15),
+}
+
+
+async def _inline(func, *args, **kwargs):
+    """What Agent.invoke did before: call the tool on the event loop."""
+    return func(*args, **kwargs)
+
+
+async def _run(agent: Agent):
+    start = time.perf_counter()
+
+    async def sender(i: int):
+        # Messages arrive at ARRIVALS_PER_SECOND; latency counts from the
+        # scheduled arrival, so time spent waiting behind a blocked loop counts too
+        arrival = i / ARRIVALS_PER_SECOND
+        await asyncio.sleep(arrival)
+        await agent.invoke(f"whatsapp:+1555000{i:04d}", MESSAGES[i % len(MESSAGES)])
+        return time.perf_counter() - start - arrival
+
+    latencies = await asyncio.gather(*(sender(i) for i in range(SENDERS)))
+    return sorted(latencies), time.perf_counter() - start
+
+
+def _percentile(samples, q: float) -> float:
+    return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+
+def main():
+    originals = {name: getattr(agent_module, name) for name in STAND_INS}
+    original_runner = agent_module.run_blocking
+    agent_module.__dict__.update(STAND_INS)
+    try:
+        agent = Agent()
+        print(f"{SENDERS} senders at {ARRIVALS_PER_SECOND}/s, tool pool size {TOOL_EXECUTOR.size}")
+        print(f"{'mode':>8} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10} {'wall s':>8}")
+        for mode, runner in (("inline", _inline), ("pooled", run_blocking)):
+            random.seed(0)
+            agent_module.run_blocking = runner
+            latencies, wall = asyncio.run(_run(agent))
+            print(f"{mode:>8} {statistics.median(latencies) * 1000:>10.1f} {_percentile(latencies, 0.99):>10.1f} "
+                  f"{latencies[-1] * 1000:>10.1f} {wall:>8.2f}")
+    finally:
+        agent_module.run_blocking = original_runner
+        agent_module.__dict__.update(originals)
+        TOOL_EXECUTOR.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,19 @@
+import json
 import uvicorn
 from fastapi import FastAPI, Request, Form, Response
 from src.langgraph_whatsapp.server import APP, WSP_AGENT
+from src.langgraph_whatsapp.channel import request_context
 import logging
-import atexit
-from src.langgraph_whatsapp.database_setup import reset_database
-from src.langgraph_whatsapp.tools import initialize_scheduler, cleanup_scheduler, set_reminder, send_whatsapp_message
+from src.langgraph_whatsapp.tools import set_reminder, send_whatsapp_message
+from src.langgraph_whatsapp.async_tools import run_blocking
 from datetime import datetime, timedelta
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Reset database on startup
-logger.info("Resetting database for fresh start")
-reset_database()
-
-# Initialize scheduler
-logger.info("Initializing reminder scheduler")
-scheduler = initialize_scheduler()
-if scheduler:
-    logger.info("Reminder scheduler started successfully")
-    # Register cleanup function
-    atexit.register(cleanup_scheduler)
-else:
-    logger.error("Failed to initialize scheduler")
+# Migrations, the reminder scheduler and the expense queue are started by the
+# app's startup hook (server.start_background_services), not at import
 
 @APP.get("/")
 async def root():
@@ -32,11 +22,11 @@ async def root():
 
 @APP.post("/")
 async def root_post(request: Request):
+    # TwilioMiddleware has already read and parsed the body once
+    context = await request_context(request)
     try:
-        # Try to parse form data first (which is what Twilio sends)
-        form_data = await request.form()
-        if "From" in form_data and "Body" in form_data:
-            logger.info(f"Received WhatsApp message from {form_data['From']}: {form_data['Body']}")
+        if context.is_whatsapp_message:
+            logger.info(f"Received WhatsApp message from {context.sender}: {context.content}")
             # Forward to WhatsApp handler
             xml = await WSP_AGENT.handle_message(request)
             logger.debug(f"Sending response: {xml}")
@@ -51,55 +41,11 @@ async def root_post(request: Request):
             )
         
         # If not form data, try JSON
-        body = await request.json()
+        body = json.loads(context.body)
         logger.debug(f"POST request received with body: {body}")
         return {"message": "POST request received", "data": body}
     except Exception as e:
         logger.error(f"Error in root_post: {e}")
-        try:
-            # Last attempt - check if it's a WhatsApp request without properly parsing
-            # Get the raw body and check for WhatsApp-related fields
-            raw_body = await request.body()
-            body_str = raw_body.decode()
-            
-            if "From=" in body_str and "Body=" in body_str:
-                logger.info("Detected WhatsApp message in raw body, forwarding to handler")
-                # Rewind the request body for the handler
-                async def _replay():
-                    return {"type": "http.request", "body": raw_body, "more_body": False}
-                request._body = raw_body
-                request._receive = _replay
-                
-                # Forward to WhatsApp handler
-                xml = await WSP_AGENT.handle_message(request)
-                logger.debug(f"Sending response: {xml}")
-                return Response(
-                    content=xml,
-                    media_type="text/xml",
-                    headers={
-                        "Content-Type": "text/xml; charset=utf-8",
-                        "Cache-Control": "no-cache",
-                        "X-Powered-By": "FastAPI"
-                    }
-                )
-        except Exception as inner_e:
-            logger.error(f"Error processing potential WhatsApp message: {inner_e}")
-            # Return a proper TwiML error response
-            from twilio.twiml.messaging_response import MessagingResponse
-            twiml = MessagingResponse()
-            msg = twiml.message()
-            msg.body("I'm sorry, I encountered a technical issue. Please try again later.")
-            error_response = str(twiml)
-            return Response(
-                content=error_response,
-                media_type="text/xml",
-                headers={
-                    "Content-Type": "text/xml; charset=utf-8",
-                    "Cache-Control": "no-cache",
-                    "X-Powered-By": "FastAPI"
-                }
-            )
-            
         return Response(
             content='<?xml version="1.0" encoding="UTF-8"?><Response><Message>Error processing request</Message></Response>',
             media_type="text/xml",
@@ -137,10 +83,10 @@ async def test_reminder(phone: str = None):
     time_str = reminder_time.strftime("%H:%M")
     
     # Set the reminder
-    result = set_reminder(phone, time_str, "TEST REMINDER")
+    result = await run_blocking(set_reminder, phone, time_str, "TEST REMINDER")
     
     # Also try to send a direct message
-    send_result = send_whatsapp_message(phone, "This is a test message from your WhatsApp agent")
+    send_result = await run_blocking(send_whatsapp_message, phone, "This is a test message from your WhatsApp agent")
     
     return {
         "status": "ok",
@@ -168,7 +114,7 @@ async def test_reminder_now(phone: str = None):
     from src.langgraph_whatsapp.tools import send_whatsapp_message
     
     # Set the reminder normally (will be scheduled for 10 seconds later)
-    result = set_reminder(phone, time_str, "TEST REMINDER - IMMEDIATE")
+    result = await run_blocking(set_reminder, phone, time_str, "TEST REMINDER - IMMEDIATE")
     
     return {
         "status": "ok",
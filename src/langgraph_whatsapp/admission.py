@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+
+from src.langgraph_whatsapp.config import (
+    ADMISSION_SENDER_RATE_PER_MINUTE, ADMISSION_SENDER_BURST, ADMISSION_MAX_CONCURRENCY,
+    ADMISSION_MAX_WAITING, ADMISSION_MAX_WAIT_SECONDS, ADMISSION_MAX_TRACKED_SENDERS, ADMISSION_SENDER_MAX_IN_FLIGHT,
+)
+from src.langgraph_whatsapp.outbound import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+ADMITTED = "admitted"
+THROTTLED = "throttled"
+SHED = "shed"
+
+THROTTLED_REPLY = "You're sending messages faster than I can keep up. Please wait a moment and try again."
+SHED_REPLY = "I'm very busy right now. Please try again in a minute."
+
+# Admission key shared by every request whose Twilio signature did not verify: its From could be anything
+UNVERIFIED_SENDER = "unverified"
+
+
+class AdmissionController:
+    """Decides, at the webhook edge, which requests get to run.
+
+    Each sender has a token bucket of ``sender_rate_per_minute`` with
+    ``sender_burst`` saved up, so one chatty number cannot use up the Sheets
+    quota for everyone; requests beyond it are throttled, as are requests
+    from a sender that already has ``sender_max_in_flight`` running or
+    waiting (its messages run one at a time anyway, so extra ones would only
+    sit on slots other senders could use). Across all senders
+    at most ``max_concurrency`` requests run at once. Up to ``max_waiting``
+    more queue in arrival order for a free slot for at most ``max_wait``
+    seconds; the rest are shed at once rather than pile up behind a spike.
+
+    The caller passes the sender only for requests whose Twilio signature
+    verified, and ``UNVERIFIED_SENDER`` for all others, so a forged ``From``
+    can neither dodge the per-sender limits nor use up a real number's
+    bucket.
+
+    Throttled and shed requests cost a dictionary lookup and are answered
+    with a canned reply, which keeps latency for everyone else bounded.
+    Buckets are kept for the ``max_senders`` most recent senders; an evicted
+    sender starts again with a full bucket. A rate of 0 disables the
+    per-sender limit.
+    """
+
+    def __init__(self, sender_rate_per_minute: float = 20, sender_burst: float = 10, max_concurrency: int = 256,
+                 max_waiting: int = 512, max_wait: float = 2.0, max_senders: int = 10000,
+                 sender_max_in_flight: int = 2, clock=time.monotonic):
+        self.sender_rate_per_minute = sender_rate_per_minute
+        self.sender_burst = sender_burst
+        self.sender_max_in_flight = sender_max_in_flight
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.max_senders = max_senders
+        self._clock = clock
+        self._buckets = OrderedDict()
+        self._sender_in_flight = {}
+        self._waiters = deque()
+        self._loop = None
+        self.in_flight = 0
+        self.admitted = 0
+        self.throttled = 0
+        self.shed = 0
+        self.max_wait_ms = 0.0
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._waiters = deque()
+            self._sender_in_flight = {}
+            self.in_flight = 0
+
+    def _allow_sender(self, sender: str) -> bool:
+        if not sender:
+            return True
+        if self.sender_max_in_flight and self._sender_in_flight.get(sender, 0) >= self.sender_max_in_flight:
+            return False
+        if self.sender_rate_per_minute <= 0:
+            return True
+        bucket = self._buckets.get(sender)
+        if bucket is None:
+            bucket = self._buckets[sender] = TokenBucket(self.sender_rate_per_minute / 60, self.sender_burst,
+                                                         clock=self._clock)
+            while len(self._buckets) > self.max_senders:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(sender)
+        return bucket.try_acquire()
+
+    async def acquire(self, sender: str = None) -> str:
+        """ADMITTED, THROTTLED or SHED. An admitted request must ``release(sender)`` when done."""
+        self._ensure_loop()
+        if not self._allow_sender(sender):
+            self.throttled += 1
+            logger.info(f"Throttled a request from {sender}")
+            return THROTTLED
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self._count_sender(sender, 1)
+            self.admitted += 1
+            return ADMITTED
+        if len(self._waiters) >= self.max_waiting:
+            self.shed += 1
+            logger.warning(f"Shedding a request from {sender}: {self.in_flight} running, {len(self._waiters)} waiting")
+            return SHED
+
+        slot = self._loop.create_future()
+        self._waiters.append(slot)
+        # Waiting counts against the sender too
+        self._count_sender(sender, 1)
+        started = time.perf_counter()
+        try:
+            # release() hands its slot straight to the first waiter
+            await asyncio.wait_for(slot, self.max_wait)
+        except asyncio.TimeoutError:
+            self._count_sender(sender, -1)
+            self.shed += 1
+            logger.warning(f"Shedding a request from {sender} after waiting {self.max_wait}s for a slot")
+            return SHED
+        except asyncio.CancelledError:
+            if slot.done() and not slot.cancelled():
+                self.release(sender)
+            else:
+                self._count_sender(sender, -1)
+            raise
+        finally:
+            if slot in self._waiters:
+                self._waiters.remove(slot)
+        self.max_wait_ms = max(self.max_wait_ms, (time.perf_counter() - started) * 1000)
+        self.admitted += 1
+        return ADMITTED
+
+    def _count_sender(self, sender: str, delta: int):
+        if not sender:
+            return
+        count = self._sender_in_flight.get(sender, 0) + delta
+        if count > 0:
+            self._sender_in_flight[sender] = count
+        else:
+            self._sender_in_flight.pop(sender, None)
+
+    def release(self, sender: str = None):
+        """Free an admitted request's slot, handing it to the oldest waiter if there is one."""
+        self._count_sender(sender, -1)
+        while self._waiters:
+            slot = self._waiters.popleft()
+            if not slot.done():
+                slot.set_result(None)
+                return
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def stats(self) -> dict:
+        return {
+            "admitted": self.admitted,
+            "throttled": self.throttled,
+            "shed": self.shed,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "tracked_senders": len(self._buckets),
+            "max_wait_ms": round(self.max_wait_ms, 1),
+        }
+
+
+WEBHOOK_ADMISSION = AdmissionController(
+    sender_rate_per_minute=ADMISSION_SENDER_RATE_PER_MINUTE,
+    sender_burst=ADMISSION_SENDER_BURST,
+    max_concurrency=ADMISSION_MAX_CONCURRENCY,
+    max_waiting=ADMISSION_MAX_WAITING,
+    max_wait=ADMISSION_MAX_WAIT_SECONDS,
+    max_senders=ADMISSION_MAX_TRACKED_SENDERS,
+    sender_max_in_flight=ADMISSION_SENDER_MAX_IN_FLIGHT,
+)
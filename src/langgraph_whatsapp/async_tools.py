@@ -0,0 +1,113 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from src.langgraph_whatsapp.config import TOOL_THREAD_POOL_SIZE, HTTP_CLIENT_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class ToolExecutor:
+    """Bounded thread pool for the blocking tools (sqlite, dateparser, Google API calls).
+
+    Coroutines await ``run(func, *args)`` instead of calling the tool on the
+    event loop, so one slow Sheets request only occupies a worker thread while
+    other conversations keep being served. At most ``size`` tool calls run at
+    once; the rest wait in the executor queue.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._executor = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.max_wait_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="tool")
+        return self._executor
+
+    def _call(self, func, args, kwargs, enqueued: float):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.max_wait_seconds = max(self.max_wait_seconds, time.perf_counter() - enqueued)
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+        return result
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking callable on the pool and await its result."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.submitted += 1
+        call = functools.partial(self._call, func, args, kwargs, time.perf_counter())
+        return await loop.run_in_executor(self._get_executor(), call)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "in_flight": self.in_flight,
+                "queued": self.submitted - self.completed - self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 1),
+            }
+
+
+TOOL_EXECUTOR = ToolExecutor(size=TOOL_THREAD_POOL_SIZE)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Await a blocking tool call on the shared tool thread pool."""
+    return await TOOL_EXECUTOR.run(func, *args, **kwargs)
+
+
+_http_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared async HTTP client for outbound calls made from request handlers.
+
+    Created lazily so it binds to the running event loop.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=HTTP_CLIENT_TIMEOUT_SECONDS, follow_redirects=True)
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
@@ -1,9 +1,6 @@
 import os
 import logging
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from src.langgraph_whatsapp.google_clients import SERVICE_REGISTRY
 from datetime import datetime, timedelta
 import pickle
 
@@ -12,8 +9,8 @@ logger = logging.getLogger(__name__)
 # If modifying these scopes, delete the file token.pickle.
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
-def get_calendar_service():
-    """Get a Google Calendar service object for making API calls."""
+def _load_calendar_credentials(interactive: bool = True):
+    """Load stored Calendar credentials, refreshing them or running the OAuth flow if needed."""
     creds = None
     # The file token.pickle stores the user's access and refresh tokens
     token_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'token.pickle')
@@ -36,12 +33,17 @@ def get_calendar_service():
         if creds and creds.expired and creds.refresh_token:
             logger.info("Refreshing expired credentials")
             try:
+                from google.auth.transport.requests import Request
+
                 creds.refresh(Request())
             except Exception as e:
                 logger.error(f"Error refreshing credentials: {e}")
                 creds = None
         
         if not creds:
+            if not interactive:
+                return None
+            
             if not os.path.exists(credentials_file):
                 logger.error(f"Credentials file not found at {credentials_file}")
                 logger.error("Please download credentials.json from Google Cloud Console")
@@ -53,6 +55,8 @@ def get_calendar_service():
                 
             logger.info(f"Getting fresh credentials using {credentials_file}")
             try:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+
                 flow = InstalledAppFlow.from_client_secrets_file(credentials_file, SCOPES)
                 creds = flow.run_local_server(port=0)
             except Exception as e:
@@ -64,13 +68,16 @@ def get_calendar_service():
                 pickle.dump(creds, token)
                 logger.info(f"Saved credentials to {token_file}")
     
-    try:
-        service = build('calendar', 'v3', credentials=creds)
-        logger.info("Google Calendar service created successfully")
-        return service
-    except Exception as e:
-        logger.error(f"Error building calendar service: {e}")
-        return None
+    return creds
+
+SERVICE_REGISTRY.register(
+    'calendar', 'calendar', 'v3', _load_calendar_credentials,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'token.pickle')
+)
+
+def get_calendar_service():
+    """Get the shared Google Calendar service object for making API calls."""
+    return SERVICE_REGISTRY.get('calendar')
 
 def setup_google_calendar():
     """Validate Google Calendar API access."""
@@ -1,37 +1,57 @@
 # channel.py
-import base64, logging, requests
+import asyncio
+import logging
 from abc import ABC, abstractmethod
 
+from typing import Optional, Tuple
+
 from fastapi import Request, HTTPException
 from twilio.twiml.messaging_response import MessagingResponse
 
 from src.langgraph_whatsapp.agent import Agent
-from src.langgraph_whatsapp.config import TWILIO_AUTH_TOKEN, TWILIO_ACCOUNT_SID
+from src.langgraph_whatsapp.config import (
+    TWILIO_AUTH_TOKEN, TWILIO_ACCOUNT_SID, WEBHOOK_FAST_ACK, WEBHOOK_QUEUE_SIZE,
+)
+from src.langgraph_whatsapp.idempotency import WEBHOOK_IDEMPOTENCY
+from src.langgraph_whatsapp.mailboxes import SENDER_MAILBOXES
+from src.langgraph_whatsapp.media import create_media_fetcher
+from src.langgraph_whatsapp.outbound import OUTBOUND_DISPATCHER
+from src.langgraph_whatsapp.request_context import TwilioRequestContext
+from src.langgraph_whatsapp.webhook_queue import FALLBACK_REPLY, InboundMessage, WebhookWorkQueue
 
 LOGGER = logging.getLogger("whatsapp")
 
+# Shared downloader: one keep-alive pool and one global concurrency cap for all messages
+MEDIA_FETCHER = create_media_fetcher((TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN))
+
 
-def twilio_url_to_data_uri(url: str, content_type: str = None) -> str:
+async def twilio_url_to_data_uri(url: str, content_type: str = None) -> str:
     """Download the Twilio media URL and convert to data‑URI (base64)."""
     if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN):
         raise RuntimeError("Twilio credentials are missing")
 
     LOGGER.info(f"Downloading image from Twilio URL: {url}")
-    resp = requests.get(url, auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN), timeout=20)
-    resp.raise_for_status()
-
-    # Use provided content_type or get from headers
-    mime = content_type or resp.headers.get('Content-Type')
-
-    # Ensure we have a proper image mime type
-    if not mime or not mime.startswith('image/'):
-        LOGGER.warning(f"Converting non-image MIME type '{mime}' to 'image/jpeg'")
-        mime = "image/jpeg"  # Default to jpeg if not an image type
-
-    b64 = base64.b64encode(resp.content).decode()
-    data_uri = f"data:{mime};base64,{b64}"
-
-    return data_uri
+    item = (await MEDIA_FETCHER.fetch_all([(url, content_type)]))[0]
+    if item is None:
+        raise RuntimeError(f"Could not download media from {url}")
+    try:
+        return item.data_uri()
+    finally:
+        item.close()
+
+def _fallback_twiml() -> str:
+    twiml = MessagingResponse()
+    msg = twiml.message()
+    msg.body(FALLBACK_REPLY)
+    return str(twiml)
+
+async def request_context(request: Request) -> TwilioRequestContext:
+    """The context TwilioMiddleware parsed for this request, or one parsed now if it did not run."""
+    context = getattr(request.state, "twilio", None)
+    if context is None:
+        context = TwilioRequestContext.from_body(await request.body())
+        request.state.twilio = context
+    return context
 
 class WhatsAppAgent(ABC):
     @abstractmethod
@@ -42,61 +62,104 @@ class WhatsAppAgentTwilio(WhatsAppAgent):
         if not (TWILIO_AUTH_TOKEN and TWILIO_ACCOUNT_SID):
             raise ValueError("Twilio credentials are not configured")
         self.agent = Agent()
+        self.work_queue = WebhookWorkQueue(OUTBOUND_DISPATCHER.send, queue_size=WEBHOOK_QUEUE_SIZE)
 
     async def handle_message(self, request: Request) -> str:
         try:
             LOGGER.info("Receiving WhatsApp message request")
-            form = await request.form()
+            context = await request_context(request)
             
             # Log all form data for debugging
-            LOGGER.debug(f"Received WhatsApp form data: {dict(form)}")
+            LOGGER.debug(f"Received WhatsApp form data: {context.fields}")
 
-            sender = form.get("From", "").strip()
-            content = form.get("Body", "").strip()
+            sender = context.sender
             
             if not sender:
                 LOGGER.error("Missing 'From' field in request form")
                 raise HTTPException(400, detail="Missing 'From' in request form")
-                
-            LOGGER.info(f"Processing message from {sender}: {content[:50]}{'...' if len(content) > 50 else ''}")
-
-            # Collect ALL images
-            images = []
-            num_media = int(form.get("NumMedia", "0"))
-            LOGGER.info(f"Message contains {num_media} media attachments")
-            
-            for i in range(num_media):
-                url = form.get(f"MediaUrl{i}", "")
-                ctype = form.get(f"MediaContentType{i}", "")
-                if url and ctype.startswith("image/"):
-                    try:
-                        LOGGER.info(f"Processing image {i+1}/{num_media} of type {ctype}")
-                        images.append({
-                            "url": url,
-                            "data_uri": twilio_url_to_data_uri(url, ctype),
-                        })
-                    except Exception as err:
-                        LOGGER.error(f"Failed to download image from {url}: {err}")
-
-            LOGGER.info(f"Invoking agent with sender ID: {sender}")
-            response = await self.agent.invoke(sender, content, images if images else None)
-            
-            # Extract response text from the new format
-            reply = response.get('response', "I'm sorry, I encountered a technical issue.")
-            LOGGER.info(f"Agent response: {reply[:50]}{'...' if len(reply) > 50 else ''}")
 
-            # Create TwiML response
+            LOGGER.info(f"Message contains {len(context.media)} image attachments")
+            message = InboundMessage(sender, context.content, context.media, context.message_sid)
+            # Both paths queue the job in the sender's mailbox before the first await, so a text never
+            # overtakes the photo sent before it; media is downloaded by the job itself
+
+            # Fast-ack: answer Twilio now and send the reply through the REST API once it is ready
+            if WEBHOOK_FAST_ACK:
+                answered = self.work_queue.submit(
+                    message, lambda: SENDER_MAILBOXES.submit(sender, lambda: self._fast_ack_reply(message))
+                )
+                if answered is not None:
+                    # Admission keeps this request's slot until the reply is computed
+                    request.state.answered = answered
+                    return str(MessagingResponse())
+                # Queue full: answer inline
+
+            # Shielded: a caller that disconnects must not drop the message from the mailbox
+            reply, _ = await asyncio.shield(SENDER_MAILBOXES.submit(sender, lambda: self._answer_once(message)))
             twiml = MessagingResponse()
             msg = twiml.message()
             msg.body(reply)  # Use body() method to set message content
             response_xml = str(twiml)  # TwiML already includes XML declaration
             LOGGER.debug(f"Generated TwiML response: {response_xml}")
             return response_xml
-            
+
         except Exception as e:
             LOGGER.exception(f"Error handling WhatsApp message: {str(e)}")
             # Return a fallback response instead of crashing
-            twiml = MessagingResponse()
-            msg = twiml.message()
-            msg.body("I'm sorry, I encountered a technical issue. Please try again later.")
-            return str(twiml)
+            return _fallback_twiml()
+
+    async def _fast_ack_reply(self, message: InboundMessage) -> Optional[str]:
+        """The reply to send for a fast-acked message, or None if an earlier delivery already sent it."""
+        reply, duplicate = await self._answer_once(message)
+        return None if duplicate else reply
+
+    async def _answer_once(self, message: InboundMessage) -> Tuple[str, bool]:
+        """The reply to ``message`` and whether it was already answered (a retried delivery)."""
+        computed = False
+
+        async def compute() -> str:
+            nonlocal computed
+            computed = True
+            try:
+                return await self._answer(message)
+            except Exception as e:
+                LOGGER.exception(f"Error handling WhatsApp message: {str(e)}")
+                # The fallback is stored like any reply: a retry must not redo side effects of a partial run
+                return FALLBACK_REPLY
+
+        # Twilio retries a timed-out webhook with the same MessageSid: answer it once
+        if message.message_sid:
+            reply = await WEBHOOK_IDEMPOTENCY.run(message.message_sid, compute)
+        else:
+            reply = await compute()
+        return reply, not computed
+
+    async def _answer(self, message: InboundMessage) -> str:
+        """Run the agent on one inbound message and return the reply text.
+
+        Runs as a job in the sender's mailbox, so a budget question never
+        overtakes the expense sent before it.
+        """
+        sender, content, media = message.sender, message.content, message.media
+        LOGGER.info(f"Processing message from {sender}: {content[:50]}{'...' if len(content) > 50 else ''}")
+
+        images = []
+        downloaded = []
+        # Download all images concurrently (or read them from the media cache);
+        # data-URIs are only encoded if the agent asks for them
+        if media:
+            LOGGER.info(f"Fetching {len(media)} images")
+            downloaded = [item for item in await MEDIA_FETCHER.fetch_all(media) if item is not None]
+            images = [item.as_image() for item in downloaded]
+
+        LOGGER.info(f"Invoking agent with sender ID: {sender}")
+        try:
+            response = await self.agent.invoke(sender, content, images if images else None)
+        finally:
+            for item in downloaded:
+                item.close()
+
+        # Extract response text from the new format
+        reply = response.get('response', "I'm sorry, I encountered a technical issue.")
+        LOGGER.info(f"Agent response: {reply[:50]}{'...' if len(reply) > 50 else ''}")
+        return reply
@@ -22,4 +22,130 @@ if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_PHONE_NUMBER:
     # Fallback testing values - NEVER USE THESE IN PRODUCTION
     TWILIO_ACCOUNT_SID = "AC590ae2b260a5a1ee9819fc0b89a9e3c7"  # From your logs
     TWILIO_AUTH_TOKEN = "your_auth_token_here"  # You need to set this
-    TWILIO_PHONE_NUMBER = "whatsapp:+14155238886"  # From your logs
\ No newline at end of file
+    TWILIO_PHONE_NUMBER = "whatsapp:+14155238886"  # From your logs
+
+# Google Sheets budget catalog cache
+BUDGET_CACHE_TTL_SECONDS = float(os.getenv("BUDGET_CACHE_TTL_SECONDS", "300"))
+# After a failed refresh, wait this long before reading the sheet again
+BUDGET_CACHE_RETRY_SECONDS = float(os.getenv("BUDGET_CACHE_RETRY_SECONDS", "30"))
+
+# Shared Google API clients
+GOOGLE_HTTP_POOL_SIZE = int(os.getenv("GOOGLE_HTTP_POOL_SIZE", "8"))
+GOOGLE_HTTP_TIMEOUT_SECONDS = float(os.getenv("GOOGLE_HTTP_TIMEOUT_SECONDS", "30"))
+GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS = float(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+# Build the clients in the background at startup (0 defers them to first use: no network I/O at boot)
+GOOGLE_WARM_UP_ON_STARTUP = int(os.getenv("GOOGLE_WARM_UP_ON_STARTUP", "1"))
+
+# Local month-to-date expense totals
+EXPENSE_RECONCILE_INTERVAL_MINUTES = float(os.getenv("EXPENSE_RECONCILE_INTERVAL_MINUTES", "30"))
+
+# Write-behind queue for Expenses sheet appends
+EXPENSE_FLUSH_INTERVAL_SECONDS = float(os.getenv("EXPENSE_FLUSH_INTERVAL_SECONDS", "2"))
+EXPENSE_FLUSH_BATCH_SIZE = int(os.getenv("EXPENSE_FLUSH_BATCH_SIZE", "100"))
+EXPENSE_FLUSH_MAX_BACKOFF_SECONDS = float(os.getenv("EXPENSE_FLUSH_MAX_BACKOFF_SECONDS", "60"))
+# A flush claim older than this is treated as abandoned by a crashed process
+EXPENSE_FLUSH_CLAIM_TIMEOUT_SECONDS = float(os.getenv("EXPENSE_FLUSH_CLAIM_TIMEOUT_SECONDS", "120"))
+
+# Async execution layer for blocking tools
+TOOL_THREAD_POOL_SIZE = int(os.getenv("TOOL_THREAD_POOL_SIZE", "16"))
+HTTP_CLIENT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CLIENT_TIMEOUT_SECONDS", "20"))
+
+# Concurrent media downloads
+MEDIA_MAX_CONCURRENCY = int(os.getenv("MEDIA_MAX_CONCURRENCY", "32"))
+MEDIA_PER_MESSAGE_CONCURRENCY = int(os.getenv("MEDIA_PER_MESSAGE_CONCURRENCY", "10"))
+MEDIA_MAX_BYTES = int(os.getenv("MEDIA_MAX_BYTES", str(16 * 1024 * 1024)))
+MEDIA_SPOOL_MEMORY_BYTES = int(os.getenv("MEDIA_SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+MEDIA_DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv("MEDIA_DOWNLOAD_TIMEOUT_SECONDS", "20"))
+
+# On-disk media cache (0 disables it)
+MEDIA_CACHE_DIR = os.getenv(
+    "MEDIA_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "media_cache")
+)
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# SQLite connection pool
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "8192"))
+DB_MMAP_SIZE_BYTES = int(os.getenv("DB_MMAP_SIZE_BYTES", str(64 * 1024 * 1024)))
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+
+# Saved-link search
+LINK_SEARCH_PAGE_SIZE = int(os.getenv("LINK_SEARCH_PAGE_SIZE", "20"))
+LINK_SEARCH_RECENCY_WEIGHT = float(os.getenv("LINK_SEARCH_RECENCY_WEIGHT", "0.5"))
+
+# Background link unfurling: page title / canonical URL of saved links (0 workers disables it)
+LINK_UNFURL_WORKERS = int(os.getenv("LINK_UNFURL_WORKERS", "8"))
+LINK_UNFURL_PER_HOST = int(os.getenv("LINK_UNFURL_PER_HOST", "2"))
+LINK_UNFURL_TIMEOUT_SECONDS = float(os.getenv("LINK_UNFURL_TIMEOUT_SECONDS", "10"))
+LINK_UNFURL_MAX_BYTES = int(os.getenv("LINK_UNFURL_MAX_BYTES", str(256 * 1024)))
+LINK_UNFURL_REFRESH_HOURS = float(os.getenv("LINK_UNFURL_REFRESH_HOURS", "24"))
+LINK_UNFURL_QUEUE_SIZE = int(os.getenv("LINK_UNFURL_QUEUE_SIZE", "1000"))
+# A link that could not be fetched (timeout, DNS, 5xx) is tried again after this long
+LINK_UNFURL_ERROR_RETRY_MINUTES = float(os.getenv("LINK_UNFURL_ERROR_RETRY_MINUTES", "15"))
+
+# Reminder scheduler: only the next window of reminders is held in memory
+REMINDER_WINDOW_SECONDS = float(os.getenv("REMINDER_WINDOW_SECONDS", "600"))
+REMINDER_PAGE_SIZE = int(os.getenv("REMINDER_PAGE_SIZE", "5000"))
+REMINDER_MISFIRE_GRACE_SECONDS = float(os.getenv("REMINDER_MISFIRE_GRACE_SECONDS", "60"))
+REMINDER_SEND_WORKERS = int(os.getenv("REMINDER_SEND_WORKERS", "4"))
+# How often the scheduler looks for reminders other workers inserted; 0 leaves them to the next page
+REMINDER_POLL_SECONDS = float(os.getenv("REMINDER_POLL_SECONDS", "5"))
+
+# Reminder housekeeping: mark missed reminders, archive finished ones, return free pages
+REMINDER_MAINTENANCE_INTERVAL_MINUTES = int(os.getenv("REMINDER_MAINTENANCE_INTERVAL_MINUTES", "60"))
+REMINDER_ARCHIVE_AFTER_DAYS = float(os.getenv("REMINDER_ARCHIVE_AFTER_DAYS", "30"))
+REMINDER_ARCHIVE_BATCH_SIZE = int(os.getenv("REMINDER_ARCHIVE_BATCH_SIZE", "1000"))
+REMINDER_MISSED_AFTER_SECONDS = float(os.getenv("REMINDER_MISSED_AFTER_SECONDS", "3600"))
+REMINDER_VACUUM_PAGES = int(os.getenv("REMINDER_VACUUM_PAGES", "2000"))
+
+# Outbound WhatsApp messages (reminders, proactive sends): one pooled, rate-paced dispatcher
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL", "https://api.twilio.com")
+# Comma-separated sender numbers and/or Messaging Service SIDs (MG...); empty uses TWILIO_PHONE_NUMBER
+TWILIO_SENDER_POOL = os.getenv("TWILIO_SENDER_POOL", "")
+# Per sender: the pool's throughput is this times the number of senders
+OUTBOUND_RATE_PER_SECOND = float(os.getenv("OUTBOUND_RATE_PER_SECOND", "10"))
+OUTBOUND_BURST = float(os.getenv("OUTBOUND_BURST", "10"))
+OUTBOUND_WORKERS = int(os.getenv("OUTBOUND_WORKERS", "4"))
+OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "5"))
+OUTBOUND_MAX_BACKOFF_SECONDS = float(os.getenv("OUTBOUND_MAX_BACKOFF_SECONDS", "30"))
+OUTBOUND_TIMEOUT_SECONDS = float(os.getenv("OUTBOUND_TIMEOUT_SECONDS", "10"))
+OUTBOUND_QUEUE_SIZE = int(os.getenv("OUTBOUND_QUEUE_SIZE", "10000"))
+
+# Time expressions: rules first, then dateparser limited to these languages behind an LRU memo
+TIMEPARSE_LANGUAGES = os.getenv("TIMEPARSE_LANGUAGES", "en")
+TIMEPARSE_CACHE_SIZE = int(os.getenv("TIMEPARSE_CACHE_SIZE", "1024"))
+
+# Webhook idempotency: the TwiML answered per MessageSid, so Twilio's retries are not reprocessed
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_MEMORY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_MEMORY_TTL_SECONDS", "300"))
+IDEMPOTENCY_RETENTION_HOURS = float(os.getenv("IDEMPOTENCY_RETENTION_HOURS", "24"))
+# A MessageSid claimed by a worker that has not stored a response after this long is processed again
+IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS = float(os.getenv("IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS", "120"))
+IDEMPOTENCY_POLL_SECONDS = float(os.getenv("IDEMPOTENCY_POLL_SECONDS", "0.5"))
+
+# Fast-ack webhooks: 1 answers Twilio with empty TwiML at once and replies via the REST API
+WEBHOOK_FAST_ACK = int(os.getenv("WEBHOOK_FAST_ACK", "0"))
+# At most this many messages acked and not yet answered; beyond that they are answered inline
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+
+# Per-sender mailboxes: one sender's messages run in order, at most this many agent runs at once
+AGENT_MAX_CONCURRENCY = int(os.getenv("AGENT_MAX_CONCURRENCY", "32"))
+AGENT_MAILBOX_IDLE_SECONDS = float(os.getenv("AGENT_MAILBOX_IDLE_SECONDS", "60"))
+
+# Scheduler leader election: one process per database fires reminders and runs the periodic jobs
+SCHEDULER_LEASE_TTL_SECONDS = float(os.getenv("SCHEDULER_LEASE_TTL_SECONDS", "15"))
+SCHEDULER_LEASE_RENEW_SECONDS = float(os.getenv("SCHEDULER_LEASE_RENEW_SECONDS", "5"))
+
+# Admission control at the webhook edge: per-sender rate, global concurrency, load shedding
+ADMISSION_SENDER_RATE_PER_MINUTE = float(os.getenv("ADMISSION_SENDER_RATE_PER_MINUTE", "20"))
+ADMISSION_SENDER_BURST = float(os.getenv("ADMISSION_SENDER_BURST", "10"))
+# Requests one sender may have running or waiting at once; 0 for no limit
+ADMISSION_SENDER_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_SENDER_MAX_IN_FLIGHT", "2"))
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "256"))
+ADMISSION_MAX_WAITING = int(os.getenv("ADMISSION_MAX_WAITING", "512"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "2"))
+ADMISSION_MAX_TRACKED_SENDERS = int(os.getenv("ADMISSION_MAX_TRACKED_SENDERS", "10000"))
+# 1 answers requests with a bad X-Twilio-Signature with 403; 0 only logs them
+TWILIO_REJECT_INVALID_SIGNATURES = int(os.getenv("TWILIO_REJECT_INVALID_SIGNATURES", "0"))
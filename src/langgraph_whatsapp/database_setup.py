@@ -1,23 +1,14 @@
+import hashlib
 import sqlite3
 import os
 import logging
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 logger = logging.getLogger(__name__)
 
-def setup_database():
-    """Set up the SQLite database with necessary tables."""
-    logger.info("Setting up the database...")
-    
-    # Ensure the data directory exists
-    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
-    os.makedirs(data_dir, exist_ok=True)
-    
-    db_path = os.path.join(data_dir, "links.db")
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
+def _create_baseline_tables(conn):
     # Create table for links
-    cursor.execute('''
+    conn.execute('''
     CREATE TABLE IF NOT EXISTS links (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         user_id TEXT NOT NULL,
@@ -25,9 +16,9 @@ def setup_database():
         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
     )
     ''')
-    
+
     # Create table for reminders
-    cursor.execute('''
+    conn.execute('''
     CREATE TABLE IF NOT EXISTS reminders (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         user_id TEXT NOT NULL,
@@ -37,9 +28,9 @@ def setup_database():
         completed BOOLEAN DEFAULT 0
     )
     ''')
-    
+
     # Create table for shown links (to handle "yes" responses)
-    cursor.execute('''
+    conn.execute('''
     CREATE TABLE IF NOT EXISTS shown_links (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         user_id TEXT NOT NULL,
@@ -48,9 +39,400 @@ def setup_database():
     )
     ''')
 
-    conn.commit()
-    conn.close()
-    logger.info(f"Database setup complete. Database created at {db_path}")
+    # Create table for month-to-date expense totals, keyed by (user, month, category)
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS expense_totals (
+        user_id TEXT NOT NULL,
+        month TEXT NOT NULL,
+        category TEXT NOT NULL,
+        total REAL NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, month, category)
+    )
+    ''')
+
+    # Create table for expenses acknowledged to the user but not yet written to the sheet
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS pending_expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        date TEXT NOT NULL,
+        amount REAL NOT NULL,
+        category TEXT NOT NULL,
+        enqueued_at REAL NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'pending'
+    )
+    ''')
+
+    # Bookkeeping for the expense totals store (last rebuild from the sheet)
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS expense_totals_state (
+        name TEXT PRIMARY KEY,
+        value TEXT
+    )
+    ''')
+
+
+def _add_lookup_indexes(conn):
+    # retrieve_links: WHERE user_id = ? ORDER BY timestamp DESC
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_links_user_timestamp ON links (user_id, timestamp)")
+    # _load_existing_reminders: WHERE completed = 0 AND reminder_time > now
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reminders_completed_time ON reminders (completed, reminder_time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_shown_links_user_timestamp ON shown_links (user_id, timestamp)")
+
+
+# Characters replaced by spaces before owner-prefixing link/title terms: the
+# separators that occur in URLs and common title punctuation. unicode61 splits
+# on every non-alphanumeric character; a term split off by a character not
+# listed here stays unprefixed and is simply not searchable. The prefix only
+# narrows the postings a search walks: search_links filters on links.user_id,
+# so a term that looks like another owner's prefix exposes nothing. (Each
+# character adds a nested replace(), and SQLite's parser caps nesting at about 30.)
+_FTS_SEPARATORS = "/.-_?=&:%#+~,;!()'\"\n"
+
+
+def _fts_terms_sql(text_sql: str, owner_sql: str) -> str:
+    """SQL expression turning ``text_sql`` into owner-scoped search terms.
+
+    Every term is prefixed with ``u<owner id>x``, so "github" saved by owner 7
+    is indexed as "u7xgithub" and a search only walks that user's postings,
+    however many other users saved GitHub links. This is for speed, not
+    access control: link text can forge a prefix.
+    """
+    expr = f"(' ' || coalesce({text_sql}, ''))"
+    for ch in _FTS_SEPARATORS:
+        literal = ch.replace("'", "''")
+        expr = f"replace({expr}, '{literal}', ' ')"
+    return f"replace({expr}, ' ', ' u' || {owner_sql} || 'x')"
+
+
+def _fts_row_terms_sql(row: str) -> str:
+    """The (link_terms, title_terms) values indexed for ``row`` of links."""
+    owner = f"(SELECT id FROM link_owners WHERE user_id = {row}.user_id)"
+    return f"{_fts_terms_sql(f'{row}.link', owner)}, {_fts_terms_sql(f'{row}.title', owner)}"
+
+
+def _create_links_fts(conn):
+    # Contentless full-text index over link and title terms (see _fts_terms_sql)
+    conn.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS links_fts USING fts5(
+        link_terms, title_terms,
+        content='',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''')
+
+
+def _reindex_links_fts(conn):
+    conn.execute("DELETE FROM links_fts")
+    conn.execute(f"INSERT INTO links_fts (rowid, link_terms, title_terms) SELECT id, {_fts_row_terms_sql('links')} FROM links")
+
+
+def _add_link_search(conn):
+    # Page titles, filled in when a link is unfurled
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(links)")}
+    if "title" not in columns:
+        conn.execute("ALTER TABLE links ADD COLUMN title TEXT")
+
+    # Small integer per user, used to scope search terms
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS link_owners (
+        id INTEGER PRIMARY KEY,
+        user_id TEXT NOT NULL UNIQUE
+    )
+    ''')
+
+    _create_links_fts(conn)
+
+    # Keep the index in sync with every write to links
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS links_fts_insert AFTER INSERT ON links BEGIN
+        INSERT OR IGNORE INTO link_owners (user_id) VALUES (new.user_id);
+        INSERT INTO links_fts (rowid, link_terms, title_terms) VALUES (new.id, {_fts_row_terms_sql("new")});
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS links_fts_delete AFTER DELETE ON links BEGIN
+        INSERT INTO links_fts (links_fts, rowid, link_terms, title_terms) VALUES ('delete', old.id, {_fts_row_terms_sql("old")});
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS links_fts_update AFTER UPDATE ON links BEGIN
+        INSERT INTO links_fts (links_fts, rowid, link_terms, title_terms) VALUES ('delete', old.id, {_fts_row_terms_sql("old")});
+        INSERT OR IGNORE INTO link_owners (user_id) VALUES (new.user_id);
+        INSERT INTO links_fts (rowid, link_terms, title_terms) VALUES (new.id, {_fts_row_terms_sql("new")});
+    END
+    ''')
+
+    # Index the links saved before this migration
+    conn.execute("INSERT OR IGNORE INTO link_owners (user_id) SELECT DISTINCT user_id FROM links")
+    _reindex_links_fts(conn)
+
+
+# URL canonicalization as of migration 4, frozen here: link_store's may change, but an applied
+# migration must backfill the same keys on every database. A later change to link_store.canonical_url
+# needs its own migration re-keying links.url_hash.
+_V4_TRACKING_PARAMS = frozenset((
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "ref_src", "ref_url", "si",
+))
+_V4_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _v4_url_hash(url: str) -> int:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    netloc = host
+    if parts.port and parts.port != _V4_DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        netloc = f"{userinfo}@{netloc}"
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _V4_TRACKING_PARAMS and not key.lower().startswith("utm_")
+    ])
+    canonical = urlunsplit((scheme, netloc, parts.path.rstrip("/"), query, parts.fragment))
+    digest = hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _add_link_dedupe_key(conn):
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(links)")}
+    if "url_hash" not in columns:
+        conn.execute("ALTER TABLE links ADD COLUMN url_hash INTEGER")
+
+    # Re-sharing a link only bumps its timestamp; neither that nor the
+    # url_hash backfill below should re-index unchanged terms
+    conn.execute("DROP TRIGGER IF EXISTS links_fts_update")
+    conn.execute(f'''
+    CREATE TRIGGER links_fts_update AFTER UPDATE OF user_id, link, title ON links BEGIN
+        INSERT INTO links_fts (links_fts, rowid, link_terms, title_terms) VALUES ('delete', old.id, {_fts_row_terms_sql("old")});
+        INSERT OR IGNORE INTO link_owners (user_id) VALUES (new.user_id);
+        INSERT INTO links_fts (rowid, link_terms, title_terms) VALUES (new.id, {_fts_row_terms_sql("new")});
+    END
+    ''')
+
+    rows = conn.execute("SELECT id, link FROM links WHERE url_hash IS NULL").fetchall()
+    conn.executemany("UPDATE links SET url_hash = ? WHERE id = ?", [(_v4_url_hash(link), id) for id, link in rows])
+
+    # Keep the most recently saved copy of each re-shared link
+    conn.execute('''
+    DELETE FROM links WHERE id NOT IN (
+        SELECT max(id) FROM links GROUP BY user_id, url_hash
+    )
+    ''')
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_links_user_url_hash ON links (user_id, url_hash)")
+
+
+def _add_link_metadata(conn):
+    # Unfurled page metadata, one row per canonical URL (keyed like links.url_hash)
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS link_metadata (
+        url_hash INTEGER PRIMARY KEY,
+        url TEXT NOT NULL,
+        canonical_url TEXT,
+        title TEXT,
+        content_type TEXT,
+        status INTEGER,
+        etag TEXT,
+        last_modified TEXT,
+        fetched_at REAL,
+        error TEXT
+    )
+    ''')
+    # Filling a title: UPDATE links SET title = ? WHERE url_hash = ?
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_links_url_hash ON links (url_hash)")
+
+
+def _add_reminder_lifecycle(conn):
+    # When a reminder fired and whether the message went out ('sent', 'failed', 'missed')
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(reminders)")}
+    for column in ("fired_at", "outcome", "outcome_detail"):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE reminders ADD COLUMN {column} TEXT")
+
+    # Reminders that came due under the old scheduler were never marked; their outcome is unknown
+    conn.execute('''
+    UPDATE reminders SET completed = 1, outcome = 'unknown'
+    WHERE completed = 0 AND reminder_time < datetime('now', 'localtime', '-1 hour')
+    ''')
+
+    # Finished reminders are moved here in batches (see reminder_lifecycle)
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS reminders_archive (
+        id INTEGER PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        task TEXT NOT NULL,
+        reminder_time DATETIME NOT NULL,
+        created_at DATETIME,
+        fired_at TEXT,
+        outcome TEXT,
+        outcome_detail TEXT,
+        archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # list_reminders: WHERE user_id = ? AND completed = 0 ORDER BY reminder_time
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_reminders_user_pending ON reminders (user_id, reminder_time) WHERE completed = 0"
+    )
+
+
+def _add_webhook_responses(conn):
+    # TwiML sent for each inbound MessageSid, so Twilio's retries are answered without reprocessing
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS webhook_responses (
+        message_sid TEXT PRIMARY KEY,
+        response TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_webhook_responses_created ON webhook_responses (created_at)")
+
+
+def _add_scheduler_leases(conn):
+    # One row per singleton job; the process holding an unexpired lease runs it
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS scheduler_leases (
+        name TEXT PRIMARY KEY,
+        holder TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    ''')
+
+
+def _add_expense_claims(conn):
+    # A flush claims its batch before appending it and deletes it afterwards; every row carries
+    # an entry id written to the sheet with it, so a batch retried after a crash is not appended twice
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(pending_expenses)")}
+    if "holder" not in columns:
+        conn.execute("ALTER TABLE pending_expenses ADD COLUMN holder TEXT")
+    if "claimed_at" not in columns:
+        conn.execute("ALTER TABLE pending_expenses ADD COLUMN claimed_at REAL")
+    if "entry_id" not in columns:
+        conn.execute("ALTER TABLE pending_expenses ADD COLUMN entry_id TEXT")
+    conn.execute("UPDATE pending_expenses SET entry_id = lower(hex(randomblob(16))) WHERE entry_id IS NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pending_expenses_status ON pending_expenses (status, id)")
+
+
+def _add_webhook_claims(conn):
+    # The worker processing a MessageSid claims it first, so a retry reaching another worker
+    # waits for the stored response instead of running the agent again
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS webhook_claims (
+        message_sid TEXT PRIMARY KEY,
+        holder TEXT NOT NULL,
+        claimed_at REAL NOT NULL
+    )
+    ''')
+
+
+def _drop_link_prefix_indexes(conn):
+    # Owner-prefixed query terms are almost never 2-4 characters long, so the prefix indexes
+    # did not serve searches and only made every write larger; recreate the index without them
+    conn.execute("DROP TABLE IF EXISTS links_fts")
+    _create_links_fts(conn)
+    _reindex_links_fts(conn)
+
+
+def _enable_incremental_vacuum(conn):
+    """Switch the file to incremental auto-vacuum so freed pages can be returned in steps.
+
+    The mode only takes effect after a full VACUUM, which cannot run inside
+    the migration's transaction: the statement is returned for migrate() to
+    run once, on the connection that committed this step. Afterwards
+    ``PRAGMA incremental_vacuum`` is cheap.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return None
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    return "VACUUM"
+
+
+# Ordered schema migrations: (version, description, apply(conn)).
+# The database records the last applied version in PRAGMA user_version;
+# append new steps here and never edit or reorder released ones. A step may
+# return a statement that cannot run in a transaction (VACUUM); it runs
+# right after the step commits.
+MIGRATIONS = [
+    (1, "baseline tables", _create_baseline_tables),
+    (2, "lookup indexes for links, reminders and shown_links", _add_lookup_indexes),
+    (3, "full-text search over links", _add_link_search),
+    (4, "canonical-URL dedupe key on links", _add_link_dedupe_key),
+    (5, "unfurled link metadata", _add_link_metadata),
+    (6, "reminder outcomes, archive table and pending-reminder index", _add_reminder_lifecycle),
+    (7, "stored webhook responses for MessageSid idempotency", _add_webhook_responses),
+    (8, "leases for leader-elected schedulers", _add_scheduler_leases),
+    (9, "flush claims and entry ids on queued expense rows", _add_expense_claims),
+    (10, "incremental auto-vacuum (one-time VACUUM)", _enable_incremental_vacuum),
+    (11, "link search index without prefix indexes", _drop_link_prefix_indexes),
+    (12, "MessageSid claims shared by all workers", _add_webhook_claims),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn) -> int:
+    """Apply pending migrations in order, each in its own transaction.
+
+    Safe on a live database: steps only add tables and indexes, and every
+    step is idempotent so a database created before versioning (version 0,
+    tables already present) is adopted as-is. Several processes may migrate
+    the same file at startup: the version is read again once the write lock
+    is held, so each step is applied by exactly one of them. Returns the
+    resulting version.
+    """
+    current = schema_version(conn)
+    for version, description, apply in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = schema_version(conn)
+            if version <= current:
+                # Another process applied it while we waited for the lock
+                conn.execute("COMMIT")
+                continue
+            logger.info(f"Applying database migration {version}: {description}")
+            after_commit = apply(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        current = version
+        if after_commit:
+            try:
+                conn.execute(after_commit)
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Could not run '{after_commit}' after migration {version}: {e}")
+    return current
+
+
+def setup_database(db_path: str = None):
+    """Set up the SQLite database with necessary tables."""
+    logger.info("Setting up the database...")
+    
+    if db_path is None:
+        # Ensure the data directory exists
+        data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+        os.makedirs(data_dir, exist_ok=True)
+        
+        db_path = os.path.join(data_dir, "links.db")
+    # Autocommit mode: migrate() manages its own transactions
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        version = migrate(conn)
+    finally:
+        conn.close()
+    logger.info(f"Database setup complete (schema version {version}). Database at {db_path}")
     return db_path
 
 def reset_shown_links():
@@ -83,6 +465,10 @@ def reset_database():
     data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
     db_path = os.path.join(data_dir, "links.db")
     
+    # Drop pooled connections to the old file before it goes away
+    from src.langgraph_whatsapp.db import POOL
+    POOL.close_all()
+
     # If file exists, delete it first
     if os.path.exists(db_path):
         try:
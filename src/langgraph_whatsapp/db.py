@@ -1,23 +1,284 @@
 import sqlite3
 import os
 import logging
+import threading
+import time
+
+from src.langgraph_whatsapp.config import (
+    DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE_BYTES, DB_SYNCHRONOUS, DB_STATEMENT_CACHE_SIZE,
+)
 
 logger = logging.getLogger(__name__)
 
-def get_db_connection():
-    """Establishes a connection to the SQLite database."""
+# Statements that never need the write lane (PRAGMA only when it doesn't assign or vacuum)
+_READ_KEYWORDS = ("SELECT", "EXPLAIN", "VALUES")
+
+
+def _is_write(sql: str) -> bool:
+    keyword = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    if keyword in _READ_KEYWORDS:
+        return False
+    if keyword == "PRAGMA":
+        return "=" in sql or "incremental_vacuum" in sql.lower()
+    return True
+
+
+def default_db_path() -> str:
     data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
-    
-    # Create data directory if it doesn't exist
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
-        
-    db_path = os.path.join(data_dir, "links.db")
-    
-    if not os.path.exists(db_path):
-        from src.langgraph_whatsapp.database_setup import setup_database
-        setup_database()
-        
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn 
\ No newline at end of file
+    return os.path.join(data_dir, "links.db")
+
+
+class PooledCursor:
+    """Cursor wrapper that routes write statements through the pool's write lane."""
+
+    def __init__(self, connection: "PooledConnection", cursor: sqlite3.Cursor):
+        self._connection = connection
+        self._cursor = cursor
+
+    def execute(self, sql, parameters=()):
+        self._connection._run(self._cursor.execute, sql, parameters)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._connection._run(self._cursor.executemany, sql, seq_of_parameters)
+        return self
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class PooledConnection:
+    """Handle on the calling thread's long-lived connection.
+
+    Behaves like the sqlite3.Connection callers used to get, except that
+    ``close()`` keeps the underlying connection open for reuse (discarding
+    uncommitted changes, as a real close would).
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw: sqlite3.Connection):
+        self._pool = pool
+        self._raw = raw
+        self._closed = False
+        pool._local.handles = getattr(pool._local, "handles", 0) + 1
+
+    def _run(self, method, sql, *args):
+        if _is_write(sql):
+            self._pool._enter_write_lane()
+        try:
+            return method(sql, *args)
+        finally:
+            self._pool._leave_write_lane(self._raw)
+
+    def execute(self, sql, parameters=()):
+        return self._run(self._raw.execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(self._raw.executemany, sql, seq_of_parameters)
+
+    def executescript(self, script):
+        self._pool._enter_write_lane()
+        try:
+            return self._raw.executescript(script)
+        finally:
+            self._pool._leave_write_lane(self._raw)
+
+    def cursor(self):
+        return PooledCursor(self, self._raw.cursor())
+
+    def commit(self):
+        try:
+            self._raw.commit()
+        finally:
+            self._pool._leave_write_lane(self._raw)
+
+    def rollback(self):
+        try:
+            self._raw.rollback()
+        finally:
+            self._pool._leave_write_lane(self._raw)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        local = self._pool._local
+        local.handles -= 1
+        # Only the outermost handle on this thread may discard an open transaction
+        if local.handles == 0 and self._raw is getattr(local, "conn", None) and self._raw.in_transaction:
+            self.rollback()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        self._raw.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            return self._raw.__exit__(*exc_info)
+        finally:
+            self._pool._leave_write_lane(self._raw)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class ConnectionPool:
+    """Per-thread, long-lived SQLite connections for one database file.
+
+    Each thread (webhook tool workers, scheduler jobs, the expense flusher)
+    keeps one connection open in WAL mode, so readers never wait for writers
+    and sqlite3's per-connection statement cache keeps prepared statements
+    across calls. Writers from this process queue on a single write lane
+    instead of racing for the database lock and failing with "database is
+    locked"; the lane is held from a thread's first write until it commits
+    or rolls back.
+    """
+
+    def __init__(self, db_path: str = None, busy_timeout_ms: int = 5000, cache_size_kb: int = 8192,
+                 mmap_size: int = 64 * 1024 * 1024, synchronous: str = "NORMAL", statement_cache_size: int = 256):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.synchronous = synchronous
+        self.statement_cache_size = statement_cache_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._write_lane = threading.Lock()
+        self._connections = {}  # thread ident -> (thread, connection)
+        self._generation = 0
+        self._ready = False
+        self.opened = 0
+        self.checkouts = 0
+        self.lane_acquisitions = 0
+        self.lane_timeouts = 0
+        self.lane_wait_seconds = 0.0
+        self.max_lane_wait_seconds = 0.0
+
+    def _ensure_database(self):
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            if self.db_path is None:
+                self.db_path = default_db_path()
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            # Creates the file if needed and applies any pending schema migrations
+            from src.langgraph_whatsapp.database_setup import setup_database
+            setup_database(self.db_path)
+            self._ready = True
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "conn", None) is not None and local.generation == self._generation:
+            return local.conn
+        self._ensure_database()
+        conn = self._open()
+        current = threading.current_thread()
+        with self._lock:
+            # Close connections left behind by threads that have exited
+            for ident, (thread, stale) in list(self._connections.items()):
+                if not thread.is_alive():
+                    stale.close()
+                    del self._connections[ident]
+            self._connections[current.ident] = (current, conn)
+            self.opened += 1
+        if getattr(local, "lane_held", False):
+            # The previous connection was closed mid-transaction by close_all()
+            local.lane_held = False
+            self._write_lane.release()
+        local.conn, local.generation = conn, self._generation
+        return conn
+
+    def connection(self) -> PooledConnection:
+        """The calling thread's connection; ``close()`` on it returns it to the pool."""
+        self.checkouts += 1
+        return PooledConnection(self, self._thread_connection())
+
+    def _enter_write_lane(self):
+        local = self._local
+        if getattr(local, "lane_held", False):
+            return
+        start = time.perf_counter()
+        if not self._write_lane.acquire(timeout=self.busy_timeout_ms / 1000):
+            self.lane_timeouts += 1
+            raise sqlite3.OperationalError("database is locked (timed out waiting for the write lane)")
+        waited = time.perf_counter() - start
+        local.lane_held = True
+        self.lane_acquisitions += 1
+        self.lane_wait_seconds += waited
+        self.max_lane_wait_seconds = max(self.max_lane_wait_seconds, waited)
+
+    def _leave_write_lane(self, raw: sqlite3.Connection):
+        local = self._local
+        if getattr(local, "lane_held", False) and not raw.in_transaction:
+            local.lane_held = False
+            self._write_lane.release()
+
+    def close_all(self):
+        """Close every pooled connection, e.g. before the database file is replaced.
+
+        Threads transparently open a fresh connection on their next checkout.
+        """
+        with self._lock:
+            for _, conn in self._connections.values():
+                try:
+                    conn.close()
+                except Exception as e:
+                    logger.warning(f"Error closing pooled connection: {e}")
+            self._connections.clear()
+            self._generation += 1
+            self._ready = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            open_connections = len(self._connections)
+        return {
+            "db_path": self.db_path,
+            "open_connections": open_connections,
+            "opened": self.opened,
+            "checkouts": self.checkouts,
+            "write_lane_acquisitions": self.lane_acquisitions,
+            "write_lane_timeouts": self.lane_timeouts,
+            "write_lane_avg_wait_ms": round(self.lane_wait_seconds / self.lane_acquisitions * 1000, 2) if self.lane_acquisitions else None,
+            "write_lane_max_wait_ms": round(self.max_lane_wait_seconds * 1000, 2),
+        }
+
+
+POOL = ConnectionPool(
+    busy_timeout_ms=DB_BUSY_TIMEOUT_MS,
+    cache_size_kb=DB_CACHE_SIZE_KB,
+    mmap_size=DB_MMAP_SIZE_BYTES,
+    synchronous=DB_SYNCHRONOUS,
+    statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+)
+
+
+def get_db_connection():
+    """Returns this thread's pooled connection to the SQLite database."""
+    return POOL.connection()
@@ -0,0 +1,149 @@
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.langgraph_whatsapp.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Bucket that receives every expense regardless of sender. Budgets live in a
+# single shared sheet, so budget queries read this bucket.
+ALL_USERS = "*"
+
+# Marker stored in expense_totals_state once the store has been built from the sheet
+_BUILT_KEY = "built_at"
+
+
+def _parse_row(row) -> Optional[Tuple[str, str, str, float]]:
+    """Turn an Expenses sheet row [date, amount, category, user?] into (user, month, category, amount)."""
+    if len(row) < 3:
+        return None
+    try:
+        amount = float(str(row[1]).replace(',', ''))
+    except ValueError:
+        return None
+    user_id = row[3] if len(row) >= 4 and row[3] else ""
+    return user_id, str(row[0])[:7], row[2], amount
+
+
+def compute_totals(rows: Iterable) -> Dict[Tuple[str, str, str], Tuple[float, int]]:
+    """Aggregate sheet rows into {(user, month, category): (total, count)}."""
+    totals = defaultdict(lambda: [0.0, 0])
+    for row in rows:
+        parsed = _parse_row(row)
+        if not parsed:
+            continue
+        user_id, month, category, amount = parsed
+        for bucket in {user_id, ALL_USERS}:
+            entry = totals[(bucket, month, category)]
+            entry[0] += amount
+            entry[1] += 1
+    return {key: (total, count) for key, (total, count) in totals.items()}
+
+
+def record_expense(user_id: str, date_str: str, category: str, amount: float, conn=None) -> None:
+    """Add one expense to the (user, month, category) totals and the all-users bucket.
+
+    With ``conn``, the update is part of the caller's transaction and the caller commits.
+    """
+    own_conn = conn is None
+    conn = conn or get_db_connection()
+    try:
+        month = date_str[:7]
+        conn.executemany(
+            """
+            INSERT INTO expense_totals (user_id, month, category, total, count) VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT (user_id, month, category)
+            DO UPDATE SET total = total + excluded.total, count = count + 1
+            """,
+            [(bucket, month, category, amount) for bucket in {user_id or "", ALL_USERS}]
+        )
+        if own_conn:
+            conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def month_totals(month: str, user_id: str = ALL_USERS, conn=None) -> Dict[str, float]:
+    """Return {category: total} for one user (or all users) and one 'YYYY-MM' month."""
+    own_conn = conn is None
+    conn = conn or get_db_connection()
+    try:
+        cursor = conn.execute(
+            "SELECT category, total FROM expense_totals WHERE user_id = ? AND month = ?",
+            (user_id, month)
+        )
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def is_built(conn=None) -> bool:
+    """True once the store has been rebuilt from the sheet at least once."""
+    own_conn = conn is None
+    conn = conn or get_db_connection()
+    try:
+        row = conn.execute("SELECT value FROM expense_totals_state WHERE name = ?", (_BUILT_KEY,)).fetchone()
+        return row is not None
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def rebuild(rows: Iterable, conn=None) -> int:
+    """Replace the whole store with totals computed from the sheet rows.
+
+    Returns the number of (user, month, category) buckets written.
+    """
+    totals = compute_totals(rows)
+    own_conn = conn is None
+    conn = conn or get_db_connection()
+    try:
+        with conn:
+            conn.execute("DELETE FROM expense_totals")
+            conn.executemany(
+                "INSERT INTO expense_totals (user_id, month, category, total, count) VALUES (?, ?, ?, ?, ?)",
+                [(user_id, month, category, total, count) for (user_id, month, category), (total, count) in totals.items()]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO expense_totals_state (name, value) VALUES (?, datetime('now'))",
+                (_BUILT_KEY,)
+            )
+        logger.info(f"Rebuilt expense totals: {len(totals)} buckets")
+        return len(totals)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def find_drift(rows: Iterable, conn=None, tolerance: float = 0.005) -> List[dict]:
+    """Compare the store with totals computed from the sheet rows.
+
+    Returns one entry per bucket whose total or count differs.
+    """
+    expected = compute_totals(rows)
+    own_conn = conn is None
+    conn = conn or get_db_connection()
+    try:
+        stored = {
+            (row[0], row[1], row[2]): (row[3], row[4])
+            for row in conn.execute("SELECT user_id, month, category, total, count FROM expense_totals")
+        }
+    finally:
+        if own_conn:
+            conn.close()
+
+    drift = []
+    for key in expected.keys() | stored.keys():
+        sheet_total, sheet_count = expected.get(key, (0.0, 0))
+        store_total, store_count = stored.get(key, (0.0, 0))
+        if abs(sheet_total - store_total) > tolerance or sheet_count != store_count:
+            user_id, month, category = key
+            drift.append({
+                "user_id": user_id, "month": month, "category": category,
+                "sheet_total": sheet_total, "store_total": store_total,
+                "sheet_count": sheet_count, "store_count": store_count,
+            })
+    return drift
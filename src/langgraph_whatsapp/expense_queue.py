@@ -0,0 +1,306 @@
+import logging
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, List, Set
+
+from src.langgraph_whatsapp.db import get_db_connection
+from src.langgraph_whatsapp.leader import default_holder_id
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: quota exhaustion and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """True for Sheets quota/5xx errors and network failures."""
+    status = getattr(getattr(error, "resp", None), "status", None)
+    if status is not None:
+        return int(status) in RETRYABLE_STATUSES
+    return isinstance(error, (OSError, TimeoutError))
+
+
+class ExpenseWriteQueue:
+    """Durable write-behind queue for Expenses sheet rows.
+
+    Rows are stored in the pending_expenses table and acknowledged right away.
+    Between ``start()`` and ``stop()``, a background thread coalesces everything pending (from all users) into a
+    single ``flush_rows(rows)`` call every ``interval`` seconds, or sooner once
+    ``batch_size`` rows are waiting. Retryable failures back off exponentially
+    with jitter; rows that keep failing with non-retryable errors are marked
+    'failed' after ``max_attempts`` so they don't block the queue.
+
+    Every row carries an entry id, written to the sheet as its last column.
+    A flush claims its batch (one UPDATE ... RETURNING, so two flushers never
+    take the same rows), appends it, then deletes the claimed rows. A claim
+    left behind by a crash is released after ``claim_timeout`` seconds. A
+    row whose earlier attempt may have reached the sheet (a failed append
+    can still have gone through) is only appended again if its entry id is
+    not among ``written_entries()``, the ids already in the sheet.
+
+    ``enqueue`` never starts the thread: with several workers sharing the
+    database, only the one holding the scheduler lease runs it, and the
+    others just queue rows for it.
+    """
+
+    def __init__(self, flush_rows: Callable[[List[list]], None], interval: float = 2.0,
+                 batch_size: int = 100, max_backoff: float = 60.0, max_attempts: int = 5,
+                 written_entries: Callable[[], Set[str]] = None, claim_timeout: float = 120,
+                 holder: str = None, connect=get_db_connection, clock: Callable[[], float] = time.time):
+        self.flush_rows = flush_rows
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.written_entries = written_entries
+        self.claim_timeout = claim_timeout
+        self.holder = holder or default_holder_id()
+        self._connect = connect
+        self._clock = clock
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.failures = 0
+        self.dead_lettered = 0
+        self.reclaimed = 0
+        self.skipped_duplicates = 0
+        self.last_flush_seconds = None
+        self.max_flush_seconds = 0.0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="expense-write-behind", daemon=True)
+            self._thread.start()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def stop(self, flush: bool = True):
+        """Stop the flusher thread, optionally draining what is pending first."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        if flush:
+            self.flush()
+
+    def enqueue(self, user_id: str, date_str: str, amount: float, category: str, conn=None):
+        """Durably queue one expense row for the sheet.
+
+        With ``conn``, the row is part of the caller's transaction and the caller commits.
+        """
+        own_conn = conn is None
+        conn = conn or self._connect()
+        try:
+            cursor = conn.execute(
+                """
+                INSERT INTO pending_expenses (user_id, date, amount, category, enqueued_at, entry_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (user_id, date_str, amount, category, self._clock(), uuid.uuid4().hex)
+            )
+            if own_conn:
+                conn.commit()
+            row_id = cursor.lastrowid
+            depth = conn.execute("SELECT COUNT(*) FROM pending_expenses WHERE status = 'pending'").fetchone()[0]
+        finally:
+            if own_conn:
+                conn.close()
+        if depth >= self.batch_size:
+            self._wakeup.set()
+        return row_id
+
+    def _run(self):
+        while not self._stop.is_set():
+            delay = self._retry_at - time.monotonic()
+            if delay > 0:
+                # Backing off: only a stop request cuts the wait short
+                self._stop.wait(delay)
+            else:
+                self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Unexpected error in expense write-behind loop: {e}")
+
+    def flush(self) -> int:
+        """Write pending rows to the sheet in batches. Returns the number of rows written."""
+        written = 0
+        with self._flush_lock:
+            self._release_stale_claims()
+            while True:
+                batch = self._claim()
+                if not batch:
+                    self._backoff = self._retry_at = 0.0
+                    return written
+
+                ids = [row[0] for row in batch]
+                rows = [[row[2], row[3], row[4], row[1], row[6]] for row in batch]
+                start = time.perf_counter()
+                try:
+                    if self.written_entries and any(row[5] for row in batch):
+                        # An earlier attempt may have reached the sheet
+                        already_written = self.written_entries()
+                        unwritten = [row for row in rows if row[4] not in already_written]
+                        self.skipped_duplicates += len(rows) - len(unwritten)
+                        rows = unwritten
+                    if rows:
+                        self.flush_rows(rows)
+                except Exception as e:
+                    self.failures += 1
+                    self._record_failure(ids, batch, e)
+                    return written
+                elapsed = time.perf_counter() - start
+
+                conn = self._connect()
+                try:
+                    conn.executemany(
+                        "DELETE FROM pending_expenses WHERE id = ? AND holder = ?", [(i, self.holder) for i in ids]
+                    )
+                    conn.commit()
+                finally:
+                    conn.close()
+
+                self._backoff = self._retry_at = 0.0
+                self.flushes += 1
+                self.rows_flushed += len(rows)
+                self.last_flush_seconds = elapsed
+                self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+                written += len(rows)
+                logger.info(f"Flushed {len(rows)} expense rows to the sheet in {elapsed * 1000:.0f} ms")
+                if len(batch) < self.batch_size:
+                    return written
+
+    def _claim(self) -> list:
+        """Mark the oldest pending rows as being flushed by this process and return them."""
+        conn = self._connect()
+        try:
+            batch = conn.execute(
+                """
+                UPDATE pending_expenses SET status = 'flushing', holder = ?, claimed_at = ?
+                WHERE id IN (SELECT id FROM pending_expenses WHERE status = 'pending' ORDER BY id LIMIT ?)
+                RETURNING id, user_id, date, amount, category, attempts, entry_id
+                """,
+                (self.holder, self._clock(), self.batch_size)
+            ).fetchall()
+            conn.commit()
+        finally:
+            conn.close()
+        return sorted(tuple(row) for row in batch)
+
+    def _release_stale_claims(self):
+        """Put back rows whose flusher died between claiming and deleting them."""
+        conn = self._connect()
+        try:
+            released = conn.execute(
+                """
+                UPDATE pending_expenses SET status = 'pending', holder = NULL, claimed_at = NULL, attempts = attempts + 1
+                WHERE status = 'flushing' AND claimed_at < ?
+                """,
+                (self._clock() - self.claim_timeout,)
+            ).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        if released:
+            self.reclaimed += released
+            logger.warning(f"Released {released} expense rows left claimed by a flush that did not finish")
+
+    def _record_failure(self, ids, batch, error: Exception):
+        retryable = is_retryable_error(error)
+        self._backoff = min(self.max_backoff, max(self.interval, self._backoff * 2 or 1.0))
+        self._backoff *= random.uniform(0.8, 1.2)
+        self._retry_at = time.monotonic() + self._backoff
+        logger.warning(
+            f"Expense flush of {len(ids)} rows failed ({'retryable' if retryable else 'non-retryable'}): {error}. "
+            f"Retrying in {self._backoff:.1f}s"
+        )
+        conn = self._connect()
+        try:
+            conn.executemany(
+                """
+                UPDATE pending_expenses SET status = 'pending', holder = NULL, claimed_at = NULL, attempts = attempts + 1
+                WHERE id = ? AND holder = ?
+                """,
+                [(i, self.holder) for i in ids]
+            )
+            if not retryable:
+                exhausted = [row[0] for row in batch if row[5] + 1 >= self.max_attempts]
+                if exhausted:
+                    conn.executemany("UPDATE pending_expenses SET status = 'failed' WHERE id = ?", [(i,) for i in exhausted])
+                    self.dead_lettered += len(exhausted)
+                    logger.error(f"Gave up on {len(exhausted)} expense rows after {self.max_attempts} attempts")
+            conn.commit()
+        finally:
+            conn.close()
+
+    @contextmanager
+    def paused(self):
+        """Hold off flushes, e.g. while reading the sheet and the queue as one snapshot."""
+        with self._flush_lock:
+            yield
+
+    def pending_rows(self, conn=None) -> List[list]:
+        """Rows not yet acknowledged by a flush, in sheet layout: [date, amount, category, user, entry id].
+
+        Rows being flushed are included; they may already be in the sheet,
+        which callers can tell from the entry id.
+        """
+        own_conn = conn is None
+        conn = conn or self._connect()
+        try:
+            return [
+                [row[0], row[1], row[2], row[3], row[4]]
+                for row in conn.execute(
+                    """
+                    SELECT date, amount, category, user_id, entry_id FROM pending_expenses
+                    WHERE status IN ('pending', 'flushing') ORDER BY id
+                    """
+                )
+            ]
+        finally:
+            if own_conn:
+                conn.close()
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        try:
+            depth, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(enqueued_at) FROM pending_expenses WHERE status = 'pending'"
+            ).fetchone()
+            failed = conn.execute("SELECT COUNT(*) FROM pending_expenses WHERE status = 'failed'").fetchone()[0]
+            claimed = conn.execute("SELECT COUNT(*) FROM pending_expenses WHERE status = 'flushing'").fetchone()[0]
+        finally:
+            conn.close()
+        return {
+            "flusher_running": self.running,
+            "depth": depth,
+            "oldest_pending_seconds": round(self._clock() - oldest, 1) if oldest else None,
+            "claimed_rows": claimed,
+            "failed_rows": failed,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "failures": self.failures,
+            "dead_lettered": self.dead_lettered,
+            "reclaimed": self.reclaimed,
+            "skipped_duplicates": self.skipped_duplicates,
+            "backoff_seconds": round(self._backoff, 1),
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 1) if self.last_flush_seconds is not None else None,
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 1),
+        }
@@ -0,0 +1,221 @@
+import os
+import logging
+import pickle
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import datetime, timedelta
+
+from src.langgraph_whatsapp.config import GOOGLE_HTTP_POOL_SIZE, GOOGLE_HTTP_TIMEOUT_SECONDS, GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class TransportPool:
+    """Bounded pool of authorized HTTP transports sharing one set of credentials.
+
+    httplib2 connections are not thread-safe, so each in-flight request leases
+    its own transport. Transports are created lazily up to ``size`` and callers
+    block once all of them are in use.
+    """
+
+    def __init__(self, credentials, size: int, timeout: float):
+        self._credentials = credentials
+        self._timeout = timeout
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.size = size
+        self.created = 0
+        self.in_use = 0
+
+    def _create(self):
+        import google_auth_httplib2
+        import httplib2
+
+        http = google_auth_httplib2.AuthorizedHttp(self._credentials, http=httplib2.Http(timeout=self._timeout))
+        self.created += 1
+        return http
+
+    @contextmanager
+    def lease(self):
+        self._slots.acquire()
+        try:
+            with self._lock:
+                http = self._idle.pop() if self._idle else self._create()
+                self.in_use += 1
+            try:
+                yield http
+            finally:
+                with self._lock:
+                    self.in_use -= 1
+                    self._idle.append(http)
+        finally:
+            self._slots.release()
+
+
+@lru_cache(maxsize=None)
+def _pooled_request_class():
+    """HttpRequest subclass that executes on a transport leased from a TransportPool.
+
+    Built on first use so importing this module does not load googleapiclient.
+    """
+    from googleapiclient.http import HttpRequest
+
+    class PooledHttpRequest(HttpRequest):
+        pool = None
+
+        def execute(self, http=None, num_retries=0):
+            if http is not None or self.pool is None:
+                return super().execute(http=http, num_retries=num_retries)
+            with self.pool.lease() as pooled_http:
+                return super().execute(http=pooled_http, num_retries=num_retries)
+
+    return PooledHttpRequest
+
+
+class _ServiceEntry:
+    def __init__(self, api: str, version: str, loader, token_file: str):
+        self.api = api
+        self.version = version
+        self.loader = loader
+        self.token_file = token_file
+        self.lock = threading.Lock()
+        self.credentials = None
+        self.service = None
+        self.pool = None
+        self.builds = 0
+        self.refreshes = 0
+
+
+class GoogleServiceRegistry:
+    """Process-wide registry of Google API clients.
+
+    Each service is built once from its credentials and shared by every
+    webhook handler and scheduler thread. Requests run on a bounded pool of
+    HTTP transports, and credentials are refreshed before they expire instead
+    of on the first failing call.
+    """
+
+    def __init__(self, pool_size: int = 8, timeout: float = 30, refresh_margin: float = 300):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self._entries = {}
+
+    def register(self, name: str, api: str, version: str, loader, token_file: str):
+        """Register a service.
+
+        ``loader(interactive)`` returns credentials or None; it may only start
+        an OAuth browser flow when ``interactive`` is true.
+        """
+        self._entries[name] = _ServiceEntry(api, version, loader, token_file)
+
+    def _needs_refresh(self, credentials) -> bool:
+        if not credentials.valid:
+            return True
+        expiry = getattr(credentials, "expiry", None)
+        return expiry is not None and expiry - datetime.utcnow() < self.refresh_margin
+
+    def _refresh(self, name: str, entry: _ServiceEntry) -> bool:
+        credentials = entry.credentials
+        if not getattr(credentials, "refresh_token", None):
+            return False
+        try:
+            logger.info(f"Refreshing {name} credentials before expiry")
+            from google.auth.transport.requests import Request
+
+            credentials.refresh(Request())
+            entry.refreshes += 1
+        except Exception as e:
+            logger.error(f"Error refreshing {name} credentials: {e}")
+            return False
+        try:
+            with open(entry.token_file, 'wb') as token:
+                pickle.dump(credentials, token)
+        except Exception as e:
+            logger.warning(f"Could not persist refreshed {name} credentials: {e}")
+        return True
+
+    def _build(self, name: str, entry: _ServiceEntry, interactive: bool) -> bool:
+        credentials = entry.loader(interactive)
+        if not credentials:
+            return False
+        import google_auth_httplib2
+        import httplib2
+        from googleapiclient.discovery import build
+
+        pool = TransportPool(credentials, self.pool_size, self.timeout)
+        pooled_request = _pooled_request_class()
+
+        def request_builder(*args, **kwargs):
+            request = pooled_request(*args, **kwargs)
+            request.pool = pool
+            return request
+
+        try:
+            service = build(
+                entry.api, entry.version,
+                http=google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http(timeout=self.timeout)),
+                requestBuilder=request_builder,
+                cache_discovery=False,
+            )
+        except Exception as e:
+            logger.error(f"Error building {name} service: {e}")
+            return False
+        entry.credentials, entry.pool, entry.service = credentials, pool, service
+        entry.builds += 1
+        logger.info(f"Google {entry.api} {entry.version} service created")
+        return True
+
+    def get(self, name: str, interactive: bool = True):
+        """Return the shared service object, building or refreshing it if needed."""
+        entry = self._entries[name]
+        service, credentials = entry.service, entry.credentials
+        if service is not None and not self._needs_refresh(credentials):
+            return service
+
+        with entry.lock:
+            if entry.service is not None and self._needs_refresh(entry.credentials):
+                if not self._refresh(name, entry) and not entry.credentials.valid:
+                    entry.service = None
+            if entry.service is None and not self._build(name, entry, interactive):
+                return None
+            return entry.service
+
+    def warm_up(self):
+        """Build every registered service without starting interactive OAuth flows."""
+        for name in list(self._entries):
+            try:
+                ready = self.get(name, interactive=False) is not None
+                logger.info(f"Google client '{name}' warm-up {'done' if ready else 'skipped: no stored credentials'}")
+            except Exception as e:
+                logger.error(f"Error warming up Google client '{name}': {e}")
+
+    def stats(self) -> dict:
+        stats = {}
+        for name, entry in self._entries.items():
+            credentials = entry.credentials
+            expiry = getattr(credentials, "expiry", None)
+            stats[name] = {
+                "built": entry.service is not None,
+                "builds": entry.builds,
+                "refreshes": entry.refreshes,
+                "expires_in_seconds": int((expiry - datetime.utcnow()).total_seconds()) if expiry else None,
+                "transports": entry.pool.created if entry.pool else 0,
+                "transports_in_use": entry.pool.in_use if entry.pool else 0,
+                "pool_size": self.pool_size,
+            }
+        return stats
+
+
+SERVICE_REGISTRY = GoogleServiceRegistry(
+    pool_size=GOOGLE_HTTP_POOL_SIZE,
+    timeout=GOOGLE_HTTP_TIMEOUT_SECONDS,
+    refresh_margin=GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS,
+)
+
+
+def warm_up_google_clients():
+    """Startup hook: build the Sheets and Calendar clients ahead of the first request."""
+    SERVICE_REGISTRY.warm_up()
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Tuple
+
+from src.langgraph_whatsapp.async_tools import run_blocking
+from src.langgraph_whatsapp.config import (
+    IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_MEMORY_TTL_SECONDS, IDEMPOTENCY_RETENTION_HOURS,
+    IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS, IDEMPOTENCY_POLL_SECONDS,
+)
+from src.langgraph_whatsapp.db import get_db_connection
+from src.langgraph_whatsapp.leader import default_holder_id
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyStore:
+    """Processes each inbound webhook once per Twilio ``MessageSid``.
+
+    Twilio retries a webhook that timed out, with the same MessageSid. The
+    reply given for a MessageSid is kept in an in-memory LRU of
+    ``cache_size`` entries for ``memory_ttl`` seconds and in the
+    webhook_responses table for ``retention_hours``, so a retry gets the
+    stored response without the agent running again. A retry that arrives
+    while the first delivery is still being processed awaits that same
+    computation.
+
+    Across workers, the first delivery claims its MessageSid in
+    webhook_claims before computing; checking for a stored response and
+    claiming are one transaction, and the response is stored and the claim
+    dropped in another. A retry that reaches another worker meanwhile
+    polls every ``poll_interval`` seconds for the stored response. A claim
+    whose holder has not stored a response after ``claim_timeout`` seconds
+    (it crashed) is taken over and the message processed again.
+
+    The computation runs as its own task: a caller that disconnects (Twilio
+    gives up after 15 seconds) does not cancel it, and the retry picks up
+    its result.
+    """
+
+    def __init__(self, cache_size: int = 10000, memory_ttl: float = 300, retention_hours: float = 24,
+                 purge_every: int = 500, claim_timeout: float = 120, poll_interval: float = 0.5,
+                 holder: str = None, connect=get_db_connection, clock: Callable[[], float] = time.time):
+        self.cache_size = cache_size
+        self.memory_ttl = memory_ttl
+        self.retention_hours = retention_hours
+        self.purge_every = purge_every
+        self.claim_timeout = claim_timeout
+        self.poll_interval = poll_interval
+        self.holder = holder or default_holder_id()
+        self._connect = connect
+        self._clock = clock
+        self._memory = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.joined = 0
+        self.computed = 0
+        self.waited = 0
+        self.purged = 0
+
+    async def run(self, message_sid: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """The response for ``message_sid``: stored, in progress, or computed now by ``compute()``."""
+        response = self._remember(message_sid)
+        if response is not None:
+            self.memory_hits += 1
+            logger.info(f"Duplicate delivery of {message_sid}, answering from memory")
+            return response
+
+        task = self._in_flight.get(message_sid)
+        if task is not None:
+            self.joined += 1
+            logger.info(f"Duplicate delivery of {message_sid} while it is in flight, waiting on the first")
+        else:
+            task = asyncio.ensure_future(self._compute_once(message_sid, compute))
+            self._in_flight[message_sid] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(message_sid, None))
+        return await asyncio.shield(task)
+
+    async def _compute_once(self, message_sid: str, compute: Callable[[], Awaitable[str]]) -> str:
+        waited = False
+        while True:
+            response, claimed = await run_blocking(self.claim, message_sid)
+            if response is not None:
+                self.db_hits += 1
+                logger.info(f"Duplicate delivery of {message_sid}, answering from the database")
+                break
+            if claimed:
+                try:
+                    response = await compute()
+                except BaseException:
+                    # Let a retry process it rather than wait out the claim
+                    await run_blocking(self.release, message_sid)
+                    raise
+                self.computed += 1
+                try:
+                    await run_blocking(self.save, message_sid, response)
+                except Exception as e:
+                    # The reply still goes out; a retry after the claim times out would run again
+                    logger.error(f"Could not store the response for {message_sid}: {e}")
+                break
+            if not waited:
+                waited = True
+                self.waited += 1
+                logger.info(f"Duplicate delivery of {message_sid} while another worker processes it, waiting")
+            await asyncio.sleep(self.poll_interval)
+        self._put(message_sid, response)
+        return response
+
+    def _remember(self, message_sid: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(message_sid)
+            if entry is None:
+                return None
+            response, stored_at = entry
+            if self._clock() - stored_at > self.memory_ttl:
+                del self._memory[message_sid]
+                return None
+            self._memory.move_to_end(message_sid)
+            return response
+
+    def _put(self, message_sid: str, response: str):
+        with self._lock:
+            self._memory[message_sid] = (response, self._clock())
+            self._memory.move_to_end(message_sid)
+            while len(self._memory) > self.cache_size:
+                self._memory.popitem(last=False)
+
+    def claim(self, message_sid: str) -> Tuple[Optional[str], bool]:
+        """(the stored response within the retention period or None, whether this process now holds the claim)."""
+        now = self._clock()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT response FROM webhook_responses WHERE message_sid = ? AND created_at >= ?",
+                (message_sid, now - self.retention_hours * 3600)
+            ).fetchone()
+            if row:
+                conn.commit()
+                return row[0], False
+            claimed = conn.execute(
+                """
+                INSERT INTO webhook_claims (message_sid, holder, claimed_at) VALUES (?, ?, ?)
+                ON CONFLICT (message_sid) DO UPDATE SET holder = excluded.holder, claimed_at = excluded.claimed_at
+                WHERE webhook_claims.claimed_at < ?
+                """,
+                (message_sid, self.holder, now, now - self.claim_timeout)
+            ).rowcount == 1
+            conn.commit()
+            return None, claimed
+        finally:
+            conn.close()
+
+    def release(self, message_sid: str):
+        """Drop this process's claim on ``message_sid`` without storing a response."""
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM webhook_claims WHERE message_sid = ? AND holder = ?", (message_sid, self.holder))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def save(self, message_sid: str, response: str):
+        """Store the response for ``message_sid``; every ``purge_every`` writes, drop expired rows."""
+        now = self._clock()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO webhook_responses (message_sid, response, created_at) VALUES (?, ?, ?)",
+                (message_sid, response, now)
+            )
+            conn.execute("DELETE FROM webhook_claims WHERE message_sid = ?", (message_sid,))
+            with self._lock:
+                self._writes += 1
+                purge = self._writes % self.purge_every == 0
+            if purge:
+                purged = conn.execute(
+                    "DELETE FROM webhook_responses WHERE created_at < ?", (now - self.retention_hours * 3600,)
+                ).rowcount
+                # Left behind by workers that died mid-message
+                conn.execute("DELETE FROM webhook_claims WHERE claimed_at < ?", (now - self.retention_hours * 3600,))
+                with self._lock:
+                    self.purged += purged
+            conn.commit()
+        finally:
+            conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._memory)
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "joined": self.joined,
+            "computed": self.computed,
+            "waited": self.waited,
+            "entries": entries,
+            "in_flight": len(self._in_flight),
+            "purged": self.purged,
+        }
+
+
+WEBHOOK_IDEMPOTENCY = IdempotencyStore(
+    cache_size=IDEMPOTENCY_CACHE_SIZE,
+    memory_ttl=IDEMPOTENCY_MEMORY_TTL_SECONDS,
+    retention_hours=IDEMPOTENCY_RETENTION_HOURS,
+    claim_timeout=IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS,
+    poll_interval=IDEMPOTENCY_POLL_SECONDS,
+)
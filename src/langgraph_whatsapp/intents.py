@@ -0,0 +1,429 @@
+import re
+import logging
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# Intent names, listed in the priority order used by Agent.invoke
+EXPENSE_BATCH = "expense_batch"
+EXPENSE = "expense"
+BUDGET_BATCH = "budget_batch"
+BUDGET = "budget"
+ALL_BUDGETS = "all_budgets"
+BUDGET_SUMMARY = "budget_summary"
+EXPENSE_HISTORY = "expense_history"
+CALENDAR = "calendar"
+REMINDER = "reminder"
+SAVE_LINKS = "save_links"
+LIST_REMINDERS = "list_reminders"
+LIST_LINKS = "list_links"
+UNKNOWN = "unknown"
+
+# URL pattern shared with tools.extract_links
+URL_PATTERN = re.compile(
+    r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?::\d+)?(?:/[-\w%/.\[\]~!$&\'()*+,;=:@]*)*/?'
+    r'(?:\?[-\w%/.~!$&\'()*+,;=:@?]*)?(?:#[-\w%/.~!$&\'()*+,;=:@?]*)?'
+)
+
+
+class Intent(NamedTuple):
+    """Routing decision for a single message."""
+    name: str
+    slots: dict
+    text: str  # message after typo normalization
+
+
+# --- Keyword scan ---
+
+_DIGIT = "#digit"
+
+_KEYWORDS = (
+    # expenses
+    "spent", "paid", "bought", "track", "add", "record", "used", "put", "invested", "on", "for",
+    # budgets
+    "budget", "spending", "limit", "how much", "show", "list", "what", "check",
+    "all budget", "budget summary", "total budget", "overall budget",
+    # expense history
+    "expense", "expenses", "transactions", "purchases", "costs", "payments",
+    "recent", "last", "history", "view", "see", "get", "what are",
+    # calendar
+    "book", "schedule", "create", "meeting", "event", "appointment",
+    # reminders
+    "remind", "reminder", "reminders",
+    # links
+    "http", "my", "share", "find", "link", "links", "repo", "repository",
+)
+
+
+def _trie_pattern(words) -> str:
+    """Build a regex whose alternation is shaped like a trie of the given words.
+
+    Matching cost at each position is bounded by the longest keyword instead of
+    growing with the number of keywords.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+# Zero-width lookahead so that every start position is reported, including
+# keywords that overlap each other (e.g. "show" and "how much").
+_KEYWORD_SCAN = re.compile(r"(?=(" + _trie_pattern(_KEYWORDS) + r"|\d))")
+
+# The scan reports the longest keyword at each position; expand it to every
+# keyword it contains so plain set membership replaces substring checks.
+_CLOSURE: Dict[str, FrozenSet[str]] = {
+    keyword: frozenset(k for k in _KEYWORDS if k in keyword) for keyword in _KEYWORDS
+}
+_CLOSURE.update({d: frozenset((_DIGIT,)) for d in "0123456789"})
+
+
+def scan_keywords(text_lower: str) -> FrozenSet[str]:
+    """Return every routing keyword present in the (lowercased) text in one pass."""
+    found = set()
+    for match in _KEYWORD_SCAN.finditer(text_lower):
+        found |= _CLOSURE.get(match.group(1), _CLOSURE["0"])
+    return frozenset(found)
+
+
+# --- Expense slots ---
+
+# (pattern, amount group, category group, gate keywords)
+_EXPENSE_RULES: Tuple[Tuple[re.Pattern, int, int, FrozenSet[str]], ...] = (
+    (re.compile(r"(?:i|we)\s+(?:have\s+)?(?:spent|paid|bought)\s+(?:\$)?(\d+(?:\.\d+)?)\s+(?:on|for)\s+([a-zA-Z\s]+)"),
+     1, 2, frozenset(("spent", "paid", "bought"))),
+    (re.compile(r"(?:i|we)\s+(?:have\s+)?(?:spent|paid|bought)\s+(?:on|for)\s+([a-zA-Z\s]+)\s+(?:\$)?(\d+(?:\.\d+)?)"),
+     2, 1, frozenset(("spent", "paid", "bought"))),
+    (re.compile(r"(?:track|add|record)\s+(?:expense|transaction|purchase)\s+(?:of\s+)?(?:\$)?(\d+(?:\.\d+)?)\s+(?:on|for)\s+([a-zA-Z\s]+)"),
+     1, 2, frozenset(("track", "add", "record"))),
+    (re.compile(r"(?:\$)?(\d+(?:\.\d+)?)\s+(?:spent|paid)\s+(?:on|for)\s+([a-zA-Z\s]+)"),
+     1, 2, frozenset(("spent", "paid"))),
+    (re.compile(r"(?:i|we)\s+(?:used|put|invested)\s+(?:\$)?(\d+(?:\.\d+)?)\s+(?:on|for|in)\s+([a-zA-Z\s]+)"),
+     1, 2, frozenset(("used", "put", "invested"))),
+)
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_ON_FOR = re.compile(r"on|for")
+_CATEGORY_TAIL = re.compile(r"(?:on|for)\s+([a-zA-Z\s]+)")
+_DIRECT_CATEGORY = re.compile(r'(?:on|for)\s+([a-zA-Z\s]+)(?:$|\.)')
+
+
+def _match_generic_expense(text: str) -> Optional[Tuple[str, str]]:
+    """Linear-time equivalent of ``(\\d+(?:\\.\\d+)?).+(?:on|for)\\s+([a-zA-Z\\s]+)``.
+
+    The greedy ``.+`` picks the last "on"/"for" on the same line as the first
+    usable number; the regex form re-scans the line for every digit it tries.
+    """
+    line_start = 0
+    while line_start <= len(text):
+        line_end = text.find("\n", line_start)
+        if line_end == -1:
+            line_end = len(text)
+        number = _NUMBER.search(text, line_start, line_end)
+        if number:
+            category = None
+            for on_for in _ON_FOR.finditer(text, number.end() + 1, line_end):
+                tail = _CATEGORY_TAIL.match(text, on_for.start())
+                if tail:
+                    category = tail.group(1)
+            if category is not None:
+                return number.group(0), category
+        line_start = line_end + 1
+    return None
+
+
+def _match_expense(text_lower: str, keywords: FrozenSet[str]) -> Optional[Tuple[str, str]]:
+    """Return (amount, category) for the first expense rule that matches."""
+    for pattern, amount_group, category_group, gate in _EXPENSE_RULES:
+        if gate.isdisjoint(keywords):
+            continue
+        match = pattern.search(text_lower)
+        if match:
+            return match.group(amount_group), match.group(category_group).strip()
+
+    if _DIGIT in keywords and ("on" in keywords or "for" in keywords):
+        generic = _match_generic_expense(text_lower)
+        if generic:
+            return generic[0], generic[1].strip()
+    return None
+
+
+def _match_direct_expense(text_lower: str, keywords: FrozenSet[str]) -> Optional[Tuple[str, str]]:
+    """Fallback for messages that mention "spent" and a number but fit no rule."""
+    if "spent" not in keywords or _DIGIT not in keywords:
+        return None
+    amount = _NUMBER.search(text_lower)
+    category = _DIRECT_CATEGORY.search(text_lower)
+    if amount and category:
+        return amount.group(0), category.group(1).strip()
+    return None
+
+
+# --- Budget slots ---
+
+_BUDGET_RULES: Tuple[Tuple[re.Pattern, FrozenSet[str]], ...] = (
+    (re.compile(r"(?:what(?:'s|s|\sis)?\s+my|check|show)\s+(?:budget|spending|limit)\s+(?:for|on)?\s+([a-zA-Z\s]+)"),
+     frozenset(("budget", "spending", "limit"))),
+    (re.compile(r"how\s+much\s+(?:can\s+i\s+spend|do\s+i\s+have\s+left)\s+(?:on|for)\s+([a-zA-Z\s]+)"),
+     frozenset(("how much",))),
+    (re.compile(r"budget\s+(?:for|on)\s+([a-zA-Z\s]+)"),
+     frozenset(("budget",))),
+)
+
+
+def _match_budget(text_lower: str, keywords: FrozenSet[str]) -> Optional[str]:
+    """Return the category of the first budget rule that matches."""
+    for pattern, gate in _BUDGET_RULES:
+        if gate.isdisjoint(keywords):
+            continue
+        match = pattern.search(text_lower)
+        if match:
+            return match.group(1).strip()
+    return None
+
+
+_BUDGET_SUMMARY_PHRASES = frozenset(("all budget", "budget summary", "total budget", "overall budget"))
+
+# --- Expense history slots ---
+
+_HISTORY_KEYWORDS = frozenset(("expense", "spent", "spending", "transactions", "purchases", "costs", "payments"))
+_VIEW_KEYWORDS = frozenset(("show", "list", "recent", "last", "history", "view", "see", "get", "what are"))
+_HISTORY_LIMIT = re.compile(r"(?:last|recent)\s+(\d+)")
+
+# --- Calendar slots ---
+
+_CALENDAR_VERBS = frozenset(("book", "schedule", "create"))
+_CALENDAR_NOUNS = frozenset(("meeting", "event", "appointment"))
+_CALENDAR_TITLES = (
+    re.compile(r"(?:book|schedule|create)\s+(?:a\s+)?(?:meeting|event|appointment)\s+with\s+([^\d\n]+?)(?:\s+on|\s+at|$)", re.IGNORECASE),
+    re.compile(r"meeting\s+with\s+([^\d\n]+?)(?:\s+on|\s+at|$)", re.IGNORECASE),
+    re.compile(r"(?:book|schedule|create)\s+(?:a\s+)?([^\d\n]+?)(?:\s+on|\s+at|$)", re.IGNORECASE),
+)
+_CALENDAR_DATE = re.compile(r"(?:on|for)\s+([a-zA-Z]+\s+\d+(?:st|nd|rd|th)?|tomorrow|today|next\s+[a-zA-Z]+|\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?)", re.IGNORECASE)
+_CALENDAR_DAY = re.compile(r"\b(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b", re.IGNORECASE)
+_CALENDAR_TIME = re.compile(r"at\s+(\d{1,2}(?::\d{2})?\s*(?:am|pm)?|\d{1,2}(?::\d{2})?)", re.IGNORECASE)
+_CALENDAR_DURATION = re.compile(r"for\s+(\d+)\s*(?:min|minutes|hour|hours)?", re.IGNORECASE)
+
+
+def _calendar_slots(text: str, text_lower: str) -> dict:
+    """Extract title, date, time and duration from a booking request."""
+    title = "Meeting"  # Default title
+    for pattern in _CALENDAR_TITLES:
+        title_match = pattern.search(text)
+        if title_match:
+            title = title_match.group(1).strip()
+            if not title.lower().startswith("meeting with"):
+                title = f"Meeting with {title}"
+            break
+
+    date_match = _CALENDAR_DATE.search(text)
+    if date_match:
+        date_str = date_match.group(1).strip()
+    else:
+        day_match = _CALENDAR_DAY.search(text_lower)
+        # Default to tomorrow if no date specified
+        date_str = day_match.group(1).strip() if day_match else "tomorrow"
+
+    time_match = _CALENDAR_TIME.search(text)
+    # Default to 9:00 AM if no time specified
+    time_str = time_match.group(1).strip() if time_match else "9:00 AM"
+
+    duration_minutes = 60  # Default duration: 1 hour
+    duration_match = _CALENDAR_DURATION.search(text)
+    if duration_match:
+        duration_val = int(duration_match.group(1))
+        if "hour" in text[duration_match.start():duration_match.end()]:
+            duration_minutes = duration_val * 60
+        else:
+            duration_minutes = duration_val
+
+    return {"title": title, "date": date_str, "time": time_str, "duration_minutes": duration_minutes}
+
+
+# --- Reminder slots ---
+
+_REMINDER_TIME = re.compile(r'(tomorrow|today|in \d+ (hour|minute|day)s?|at \d+(\:\d+)?\s*(am|pm)|morning|afternoon|evening)')
+_REMINDER_TASK = re.compile(r'(to|about)\s+(.+)')
+
+
+def _reminder_slots(text: str, text_lower: str) -> dict:
+    """Extract the time expression and task from a reminder request."""
+    # Pattern 1: "remind me to X at Y"
+    if " at " in text:
+        msg_parts = text.split(" at ")
+        task = msg_parts[0].replace("remind me to ", "").replace("remind me ", "").strip()
+        time_str = msg_parts[1].strip()
+
+        # If we got a time that looks like "18.39 ist", convert to standard format
+        if "ist" in time_str.lower():
+            time_str = time_str.lower().replace("ist", "").strip()
+        if "." in time_str:
+            time_str = time_str.replace(".", ":")
+        return {"time": time_str, "task": task}
+
+    # Pattern 2: "remind me in X to Y"
+    if " in " in text and " to " in text:
+        time_part = text.split(" to ")[0]
+        if " in " in time_part:
+            return {"time": time_part.split(" in ")[1].strip(), "task": text.split(" to ")[1].strip()}
+    # Pattern 3: "remind me tomorrow to X"
+    elif "tomorrow" in text and " to " in text:
+        return {"time": "tomorrow", "task": text.split(" to ")[1].strip()}
+
+    # Try to find time patterns
+    time_match = _REMINDER_TIME.search(text_lower)
+    # Extract everything after "to" or "about" as the task
+    task_match = _REMINDER_TASK.search(text_lower)
+    return {
+        "time": time_match.group(0) if time_match else "tomorrow",
+        "task": task_match.group(2) if task_match else "your task",
+    }
+
+
+# --- Link slots ---
+
+_LIST_REMINDER_NOUNS = frozenset(("reminder", "reminders"))
+_LIST_REMINDER_VERBS = frozenset(("show", "get", "my", "list", "see"))
+_LIST_LINK_VERBS = frozenset(("show", "get", "my", "share", "find"))
+_LIST_LINK_NOUNS = frozenset(("link", "links", "repo", "repository"))
+
+
+_WORD = re.compile(r"\w+")
+
+# Words of a "show my links" request that say what to do rather than what to look for
+_LINK_QUERY_STOPWORDS = frozenset((
+    "show", "get", "my", "share", "find", "list", "see", "give", "me", "please", "can", "you", "could",
+    "link", "links", "repo", "repos", "repository", "repositories", "url", "urls",
+    "saved", "all", "the", "a", "an", "of", "to", "for", "from", "about", "on", "with", "by",
+    "that", "those", "which", "i", "did", "have", "any", "some", "related", "and", "or",
+))
+
+
+def _link_query(lower: str) -> Optional[str]:
+    """Search terms of a "show my links" request, e.g. "find my github links" -> "github"."""
+    terms = [word for word in _WORD.findall(lower) if word not in _LINK_QUERY_STOPWORDS]
+    return " ".join(terms) or None
+
+
+# --- Multi-line messages ---
+
+def _expense_lines(text: str) -> List[Tuple[str, str]]:
+    """Extract (amount, category) from every line of a multi-line expense message."""
+    expenses = []
+    for line in text.split("\n"):
+        line_lower = line.lower()
+        if "spent" not in line_lower:
+            continue
+        keywords = scan_keywords(line_lower)
+        expense = _match_expense(line_lower, keywords) or _match_direct_expense(line_lower, keywords)
+        if expense:
+            expenses.append(expense)
+    return expenses
+
+
+def _budget_lines(text: str) -> Tuple[List[str], bool]:
+    """Extract budget categories from every line; flag lines asking for all budgets."""
+    categories = []
+    wants_all = False
+    for line in text.split("\n"):
+        line_lower = line.lower()
+        if "budget" not in line_lower:
+            continue
+        category = _match_budget(line_lower, scan_keywords(line_lower))
+        if category is not None:
+            categories.append(category)
+        elif "what" in line_lower or "show" in line_lower or "check" in line_lower:
+            # Might be asking for all budgets together
+            wants_all = True
+    return categories, wants_all
+
+
+# --- Router ---
+
+def normalize(text: str) -> str:
+    """Fix the common "remind" typos before routing."""
+    lower = text.lower()
+    if "remnind" in lower:
+        return text.replace("remnind", "remind")
+    if "rmeind" in lower:
+        text = text.replace("rmeind", "remind")
+        LOGGER.info(f"Corrected 'rmeind' to 'remind': {text}")
+    return text
+
+
+def route(message: str) -> Intent:
+    """Classify a message and extract its slots.
+
+    Intents are tried in the same priority order Agent.invoke has always used;
+    the keyword scan lets every intent whose trigger words are absent be
+    skipped without running its patterns.
+    """
+    text = normalize(message)
+    lower = text.lower()
+    keywords = scan_keywords(lower)
+    multiline = "\n" in text
+
+    # FINANCE FEATURES: expense tracking
+    if multiline and "spent" in keywords:
+        expenses = _expense_lines(text)
+        if expenses:
+            return Intent(EXPENSE_BATCH, {"expenses": expenses}, text)
+
+    expense = _match_expense(lower, keywords) or _match_direct_expense(lower, keywords)
+    if expense:
+        return Intent(EXPENSE, {"amount": expense[0], "category": expense[1]}, text)
+
+    # Budget status
+    if multiline and "budget" in keywords:
+        categories, wants_all = _budget_lines(text)
+        if categories:
+            consolidated = wants_all or len(categories) > 2
+            return Intent(BUDGET_BATCH, {"categories": categories, "consolidated": consolidated}, text)
+
+    category = _match_budget(lower, keywords)
+    if category is not None:
+        return Intent(BUDGET, {"category": category}, text)
+
+    if "budget" in keywords and (lower.startswith("this is") or lower.startswith("here is")
+                                 or "show" in keywords or "list" in keywords):
+        return Intent(ALL_BUDGETS, {}, text)
+
+    if not _BUDGET_SUMMARY_PHRASES.isdisjoint(keywords):
+        return Intent(BUDGET_SUMMARY, {}, text)
+
+    # Recent expenses
+    if not _HISTORY_KEYWORDS.isdisjoint(keywords) and not _VIEW_KEYWORDS.isdisjoint(keywords):
+        limit_match = _HISTORY_LIMIT.search(lower)
+        return Intent(EXPENSE_HISTORY, {"limit": int(limit_match.group(1)) if limit_match else 5}, text)
+
+    # Calendar booking
+    if not _CALENDAR_VERBS.isdisjoint(keywords) and not _CALENDAR_NOUNS.isdisjoint(keywords):
+        return Intent(CALENDAR, _calendar_slots(text, lower), text)
+
+    # Reminders
+    if "remind" in keywords:
+        return Intent(REMINDER, _reminder_slots(text, lower), text)
+
+    # Links shared in the message
+    if "http" in keywords and URL_PATTERN.search(text):
+        return Intent(SAVE_LINKS, {}, text)
+
+    if not _LIST_REMINDER_NOUNS.isdisjoint(keywords) and not _LIST_REMINDER_VERBS.isdisjoint(keywords):
+        return Intent(LIST_REMINDERS, {}, text)
+
+    if not _LIST_LINK_VERBS.isdisjoint(keywords) and not _LIST_LINK_NOUNS.isdisjoint(keywords):
+        return Intent(LIST_LINKS, {"query": _link_query(lower)}, text)
+
+    return Intent(UNKNOWN, {}, text)
@@ -0,0 +1,156 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable
+
+from src.langgraph_whatsapp.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def default_holder_id() -> str:
+    """Identifies this process among the workers and hosts sharing the database."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderLease:
+    """Elects one process, among all those sharing the database, to run a singleton job.
+
+    The leader holds the ``name`` row of scheduler_leases until
+    ``expires_at``, and renews it every ``renew_every`` seconds for another
+    ``ttl`` seconds. Every other process tries to take the lease on the same
+    cadence and gets it once it has expired, so a crashed leader is replaced
+    within ``ttl + renew_every`` seconds; a leader that stops cleanly deletes
+    the row and is replaced at the next attempt. Acquire and renew are one
+    conditional upsert, so two processes can never both succeed.
+
+    ``on_elected()`` is called when this process becomes leader and
+    ``on_demoted()`` when it stops being one: on ``stop``, when another
+    process holds the lease, or when renewals have failed (database errors)
+    for so long that the lease could be taken over. That last case leaves a
+    margin of ``renew_every`` seconds before expiry.
+    """
+
+    def __init__(self, name: str, on_elected: Callable[[], None], on_demoted: Callable[[], None],
+                 ttl: float = 15, renew_every: float = 5, holder: str = None, connect=get_db_connection,
+                 clock: Callable[[], float] = time.time):
+        self.name = name
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.ttl = ttl
+        self.renew_every = renew_every
+        self.holder = holder or default_holder_id()
+        self._connect = connect
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._valid_until = 0.0
+        self.is_leader = False
+        self.elections = 0
+        self.demotions = 0
+        self.renew_errors = 0
+
+    def start(self):
+        """Try for the lease now, then keep renewing or retrying in the background."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self.renew()
+            self._thread = threading.Thread(target=self._run, name=f"lease-{self.name}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop campaigning; a leader releases the lease so another process takes over at once."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        with self._lock:
+            if self.is_leader:
+                self._release()
+                self._demote("stopped")
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def renew(self) -> bool:
+        """Take or extend the lease. Returns whether this process is the leader."""
+        with self._lock:
+            now = self._clock()
+            try:
+                held = self._upsert(now)
+            except Exception as e:
+                self.renew_errors += 1
+                logger.error(f"Could not renew the '{self.name}' lease: {e}")
+                # Keep leading only while nobody else can have taken over
+                held = self.is_leader and now < self._valid_until
+                if not held and self.is_leader:
+                    self._demote("renewals failing")
+                return held
+
+            if held:
+                self._valid_until = now + self.ttl - self.renew_every
+                if not self.is_leader:
+                    self.is_leader = True
+                    self.elections += 1
+                    logger.info(f"{self.holder} is now the '{self.name}' leader")
+                    self._call(self.on_elected)
+            elif self.is_leader:
+                self._demote("lease taken over")
+            return held
+
+    def _upsert(self, now: float) -> bool:
+        conn = self._connect()
+        try:
+            taken = conn.execute(
+                """
+                INSERT INTO scheduler_leases (name, holder, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+                WHERE scheduler_leases.holder = excluded.holder OR scheduler_leases.expires_at < ?
+                """,
+                (self.name, self.holder, now + self.ttl, now)
+            ).rowcount
+            conn.commit()
+            return taken == 1
+        finally:
+            conn.close()
+
+    def _release(self):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM scheduler_leases WHERE name = ? AND holder = ?", (self.name, self.holder))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Could not release the '{self.name}' lease: {e}")
+        finally:
+            conn.close()
+
+    def _demote(self, reason: str):
+        self.is_leader = False
+        self.demotions += 1
+        logger.info(f"{self.holder} is no longer the '{self.name}' leader ({reason})")
+        self._call(self.on_demoted)
+
+    def _call(self, callback: Callable[[], None]):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Error in '{self.name}' leadership callback: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.renew_every):
+            self.renew()
+
+    def stats(self) -> dict:
+        return {
+            "holder": self.holder,
+            "is_leader": self.is_leader,
+            "elections": self.elections,
+            "demotions": self.demotions,
+            "renew_errors": self.renew_errors,
+        }
@@ -0,0 +1,87 @@
+import logging
+import re
+from typing import List, NamedTuple, Optional
+
+from src.langgraph_whatsapp.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Tokens that appear in almost every URL and carry no meaning as search terms
+_GENERIC_TERMS = frozenset(("http", "https", "www", "com"))
+
+_TERM = re.compile(r"[^\W_]+")
+
+
+class LinkResult(NamedTuple):
+    link: str
+    title: Optional[str]
+    timestamp: str
+
+
+class LinkPage(NamedTuple):
+    """One page of search results, most relevant first."""
+    results: List[LinkResult]
+    page: int
+    page_size: int
+    has_more: bool
+
+
+def build_match_query(query: str, owner_id: int) -> Optional[str]:
+    """Turn free text into an FTS5 MATCH expression over one user's links.
+
+    Terms carry the owner prefix the index was built with (see
+    database_setup._fts_terms_sql), which keeps the search to that user's
+    postings; search_links still filters on the owner, since link text can
+    forge a prefix. Every term becomes a quoted prefix query
+    ("elon" also finds "elonmusk") and terms are OR-ed, so bm25 ranks links
+    matching more of them first. Returns None when nothing searchable is left.
+    """
+    terms = []
+    for term in _TERM.findall(query.lower()):
+        if term not in _GENERIC_TERMS and term not in terms:
+            terms.append(term)
+    if not terms:
+        return None
+    return " OR ".join(f'"u{owner_id}x{term}"*' for term in terms)
+
+
+def search_links(user_id: str, query: Optional[str] = None, page: int = 1, page_size: int = 20,
+                 recency_weight: float = 0.5, conn=None) -> LinkPage:
+    """Search a user's saved links.
+
+    With a query, results are ordered by bm25 relevance (title matches weigh
+    double) boosted for recent links: a link saved today scores up to
+    ``1 + recency_weight`` times its bm25, decaying with age in days. Without
+    a query, the newest links come first.
+    """
+    page = max(1, page)
+    offset = (page - 1) * page_size
+    own_conn = conn is None
+    conn = conn or get_db_connection()
+    try:
+        if query:
+            owner = conn.execute("SELECT id FROM link_owners WHERE user_id = ?", (user_id,)).fetchone()
+            match = build_match_query(query, owner[0]) if owner else None
+            rows = conn.execute(
+                """
+                SELECT l.link, l.title, l.timestamp
+                FROM links_fts
+                JOIN links l ON l.id = links_fts.rowid
+                WHERE links_fts MATCH ? AND l.user_id = ?
+                ORDER BY bm25(links_fts, 1.0, 2.0)
+                         * (1.0 + ? / (1.0 + julianday('now') - julianday(l.timestamp)))
+                LIMIT ? OFFSET ?
+                """,
+                (match, user_id, recency_weight, page_size + 1, offset)
+            ).fetchall() if match else []
+        else:
+            rows = conn.execute(
+                "SELECT link, title, timestamp FROM links WHERE user_id = ? ORDER BY timestamp DESC LIMIT ? OFFSET ?",
+                (user_id, page_size + 1, offset)
+            ).fetchall()
+    finally:
+        if own_conn:
+            conn.close()
+
+    results = [LinkResult(row[0], row[1], row[2]) for row in rows[:page_size]]
+    return LinkPage(results, page, page_size, len(rows) > page_size)
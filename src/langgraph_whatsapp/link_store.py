@@ -0,0 +1,104 @@
+import hashlib
+import logging
+from typing import Iterable, List, NamedTuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.langgraph_whatsapp.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Query parameters added by share buttons and ad trackers; they never change
+# what the link points to
+_TRACKING_PARAMS = frozenset((
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "ref_src", "ref_url", "si",
+))
+_TRACKING_PREFIXES = ("utm_",)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_url(url: str) -> str:
+    """Canonical form of a URL, used to recognise re-shared links.
+
+    Lowercases the scheme and host, drops default ports, tracking query
+    parameters and trailing slashes. Everything else (path case, remaining
+    parameters and their order, fragment) is kept, since it may matter to
+    the site.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    netloc = host
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        netloc = f"{userinfo}@{netloc}"
+
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _TRACKING_PARAMS and not key.lower().startswith(_TRACKING_PREFIXES)
+    ])
+    return urlunsplit((scheme, netloc, parts.path.rstrip("/"), query, parts.fragment))
+
+
+def url_hash(url: str) -> int:
+    """64-bit key of a URL's canonical form, stored in links.url_hash."""
+    digest = hashlib.blake2b(canonical_url(url).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class SaveResult(NamedTuple):
+    saved: List[str]
+    duplicates: List[str]
+
+
+def save_links(user_id: str, links: Iterable[str], conn=None) -> SaveResult:
+    """Save links for a user in one transaction, skipping ones already saved.
+
+    Links are keyed by url_hash, so a link re-shared with different tracking
+    parameters or host case maps to the existing row; that row's timestamp is
+    bumped so it ranks as recent again. Duplicates within ``links`` collapse
+    to their first occurrence.
+
+    With ``conn``, the writes are part of the caller's transaction and the caller commits.
+    """
+    keyed = {}
+    for link in links:
+        keyed.setdefault(url_hash(link), link)
+    if not keyed:
+        return SaveResult([], [])
+
+    own_conn = conn is None
+    conn = conn or get_db_connection()
+    try:
+        hashes = list(keyed)
+        placeholders = ", ".join("?" * len(hashes))
+        existing = {
+            row[0] for row in conn.execute(
+                f"SELECT url_hash FROM links WHERE user_id = ? AND url_hash IN ({placeholders})",
+                (user_id, *hashes)
+            )
+        }
+        conn.executemany(
+            """
+            INSERT INTO links (user_id, link, url_hash) VALUES (?, ?, ?)
+            ON CONFLICT (user_id, url_hash) DO UPDATE SET timestamp = CURRENT_TIMESTAMP
+            """,
+            [(user_id, link, key) for key, link in keyed.items()]
+        )
+        if own_conn:
+            conn.commit()
+    except Exception:
+        if own_conn:
+            conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
+
+    saved = [link for key, link in keyed.items() if key not in existing]
+    duplicates = [link for key, link in keyed.items() if key in existing]
+    logger.info(f"Saved {len(saved)} new link(s) for {user_id}, {len(duplicates)} already saved")
+    return SaveResult(saved, duplicates)
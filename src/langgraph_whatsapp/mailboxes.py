@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from src.langgraph_whatsapp.config import AGENT_MAX_CONCURRENCY, AGENT_MAILBOX_IDLE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Mailbox:
+    __slots__ = ("pending", "wakeup", "task")
+
+    def __init__(self):
+        self.pending = deque()
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+
+class SenderMailboxes:
+    """One mailbox per sender in front of the agent.
+
+    ``submit(sender, job)`` queues ``job`` (a coroutine function) in the
+    sender's mailbox and returns a future for its result; ``run`` awaits it.
+    Submitting does not await, so a webhook that submits before its first
+    await keeps its place in the order messages arrived. Each mailbox is drained by its
+    own task, one job at a time in arrival order, so "I spent 500 on food"
+    is tracked before the "what's my budget for food" sent right after it
+    is answered. Different senders' mailboxes run in parallel, at most
+    ``max_concurrency`` jobs at once across all of them.
+
+    A mailbox whose task has waited ``idle_seconds`` without a new job is
+    removed, so memory follows the active senders, not every sender seen.
+    """
+
+    def __init__(self, max_concurrency: int = 32, idle_seconds: float = 60):
+        self.max_concurrency = max_concurrency
+        self.idle_seconds = idle_seconds
+        self._mailboxes = {}
+        self._slots = None
+        self._loop = None
+        self.running = 0
+        self.processed = 0
+        self.failed = 0
+        self.created = 0
+        self.reclaimed = 0
+        self.max_depth = 0
+        self.max_wait_ms = 0.0
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._mailboxes = {}
+
+    async def run(self, sender: str, job: Callable[[], Awaitable[T]]) -> T:
+        """Run ``job()`` after every job queued earlier for ``sender``, and return its result."""
+        return await self.submit(sender, job)
+
+    def submit(self, sender: str, job: Callable[[], Awaitable[T]]) -> "asyncio.Future[T]":
+        """Queue ``job()`` behind every job queued earlier for ``sender``; the future resolves to its result."""
+        self._ensure_loop()
+        mailbox = self._mailboxes.get(sender)
+        if mailbox is None:
+            mailbox = self._mailboxes[sender] = _Mailbox()
+            self.created += 1
+        future = self._loop.create_future()
+        mailbox.pending.append((job, future, time.perf_counter()))
+        self.max_depth = max(self.max_depth, len(mailbox.pending))
+        mailbox.wakeup.set()
+        if mailbox.task is None or mailbox.task.done():
+            mailbox.task = self._loop.create_task(self._drain(sender, mailbox), name=f"mailbox-{sender}")
+        return future
+
+    async def _drain(self, sender: str, mailbox: _Mailbox):
+        while True:
+            while mailbox.pending:
+                job, future, enqueued_at = mailbox.pending.popleft()
+                if future.cancelled():
+                    # The caller went away before its turn; nothing is waiting on the result
+                    continue
+                async with self._slots:
+                    self.max_wait_ms = max(self.max_wait_ms, (time.perf_counter() - enqueued_at) * 1000)
+                    self.running += 1
+                    try:
+                        result = await job()
+                    except Exception as e:
+                        self.failed += 1
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        self.processed += 1
+                        if not future.done():
+                            future.set_result(result)
+                    finally:
+                        self.running -= 1
+
+            mailbox.wakeup.clear()
+            try:
+                await asyncio.wait_for(mailbox.wakeup.wait(), self.idle_seconds)
+            except asyncio.TimeoutError:
+                if not mailbox.pending:
+                    # No await between the check and the removal, so no job can slip in
+                    del self._mailboxes[sender]
+                    self.reclaimed += 1
+                    logger.debug(f"Reclaimed the idle mailbox of {sender}")
+                    return
+
+    def stats(self) -> dict:
+        return {
+            "mailboxes": len(self._mailboxes),
+            "queued": sum(len(mailbox.pending) for mailbox in self._mailboxes.values()),
+            "running": self.running,
+            "max_concurrency": self.max_concurrency,
+            "processed": self.processed,
+            "failed": self.failed,
+            "created": self.created,
+            "reclaimed": self.reclaimed,
+            "max_depth": self.max_depth,
+            "max_wait_ms": round(self.max_wait_ms, 1),
+        }
+
+
+SENDER_MAILBOXES = SenderMailboxes(max_concurrency=AGENT_MAX_CONCURRENCY, idle_seconds=AGENT_MAILBOX_IDLE_SECONDS)
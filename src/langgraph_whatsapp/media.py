@@ -0,0 +1,210 @@
+import asyncio
+import base64
+import logging
+import tempfile
+import time
+from typing import List, Optional, Tuple, Union
+
+import httpx
+
+from src.langgraph_whatsapp.async_tools import run_blocking
+from src.langgraph_whatsapp.config import (
+    MEDIA_MAX_CONCURRENCY, MEDIA_PER_MESSAGE_CONCURRENCY, MEDIA_MAX_BYTES,
+    MEDIA_SPOOL_MEMORY_BYTES, MEDIA_DOWNLOAD_TIMEOUT_SECONDS, MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES,
+)
+from src.langgraph_whatsapp.media_cache import MediaCache, CachedMedia, LazyImage
+
+logger = logging.getLogger(__name__)
+
+# Read size when streaming bodies and encoding them; a multiple of 3 so
+# base64 chunks concatenate without padding in the middle
+_CHUNK_SIZE = 3 * 21846
+
+
+class MediaTooLarge(Exception):
+    pass
+
+
+class MediaItem:
+    """One downloaded attachment, spooled to memory or disk up to the size limit."""
+
+    def __init__(self, url: str, content_type: str, spool, size: int):
+        self.url = url
+        self.content_type = content_type
+        self.size = size
+        self._spool = spool
+
+    def read(self) -> bytes:
+        self._spool.seek(0)
+        return self._spool.read()
+
+    def data_uri(self) -> str:
+        """Base64 data-URI built chunk by chunk from the spool."""
+        self._spool.seek(0)
+        parts = [f"data:{self.content_type};base64,"]
+        while chunk := self._spool.read(_CHUNK_SIZE):
+            parts.append(base64.b64encode(chunk).decode())
+        return "".join(parts)
+
+    def as_image(self) -> LazyImage:
+        return LazyImage(self)
+
+    def close(self):
+        self._spool.close()
+
+
+def _image_mime(mime: Optional[str]) -> str:
+    # Ensure we have a proper image mime type
+    if not mime or not mime.startswith('image/'):
+        logger.warning(f"Converting non-image MIME type '{mime}' to 'image/jpeg'")
+        return "image/jpeg"  # Default to jpeg if not an image type
+    return mime
+
+
+class MediaFetcher:
+    """Concurrent downloader for the attachments of incoming messages.
+
+    All downloads share one keep-alive connection pool. ``global_limit``
+    caps downloads across every message being handled and
+    ``per_message_limit`` caps them within one message, so a 10-image message
+    finishes in roughly the time of its slowest image without starving other
+    senders. Bodies are streamed into a SpooledTemporaryFile that rolls over
+    to disk past ``spool_memory`` bytes and are aborted past ``max_bytes``.
+
+    With a ``cache``, attachments already seen (same MediaSid or URL) are
+    served from disk and new downloads are added to it.
+    """
+
+    def __init__(self, global_limit: int = 16, per_message_limit: int = 10, max_bytes: int = 16 * 1024 * 1024,
+                 spool_memory: int = 1024 * 1024, timeout: float = 20, auth: Tuple[str, str] = None,
+                 transport: httpx.AsyncBaseTransport = None, cache: MediaCache = None):
+        self.global_limit = global_limit
+        self.per_message_limit = per_message_limit
+        self.max_bytes = max_bytes
+        self.spool_memory = spool_memory
+        self.timeout = timeout
+        self.auth = auth
+        self._transport = transport
+        self.cache = cache
+        self._client = None
+        self._slots = None
+        self.downloads = 0
+        self.failures = 0
+        self.rejected_too_large = 0
+        self.bytes_downloaded = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.last_message_seconds = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                auth=self.auth,
+                timeout=self.timeout,
+                follow_redirects=True,  # Twilio media URLs redirect to the storage backend
+                limits=httpx.Limits(max_connections=self.global_limit, max_keepalive_connections=self.global_limit),
+                transport=self._transport,
+            )
+            self._slots = asyncio.Semaphore(self.global_limit)
+        return self._client
+
+    async def fetch(self, url: str, content_type: str = None) -> MediaItem:
+        """Stream one attachment into a size-limited spool."""
+        client = self._get_client()
+        async with self._slots:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            spool = tempfile.SpooledTemporaryFile(max_size=self.spool_memory)
+            size = 0
+            try:
+                async with client.stream("GET", url) as resp:
+                    resp.raise_for_status()
+                    declared = int(resp.headers.get("Content-Length") or 0)
+                    if declared > self.max_bytes:
+                        raise MediaTooLarge(f"{url} is {declared} bytes (limit {self.max_bytes})")
+                    async for chunk in resp.aiter_bytes(_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            raise MediaTooLarge(f"{url} exceeds {self.max_bytes} bytes")
+                        spool.write(chunk)
+                    mime = _image_mime(content_type or resp.headers.get("Content-Type"))
+            except MediaTooLarge:
+                spool.close()
+                self.rejected_too_large += 1
+                raise
+            except Exception:
+                spool.close()
+                self.failures += 1
+                raise
+            finally:
+                self.in_flight -= 1
+        self.downloads += 1
+        self.bytes_downloaded += size
+        return MediaItem(url, mime, spool, size)
+
+    async def fetch_all(self, media: List[Tuple[str, str]]) -> List[Optional[Union[MediaItem, CachedMedia]]]:
+        """Download every (url, content_type) concurrently.
+
+        Returns one entry per input in the same order; failed downloads are
+        logged and returned as None.
+        """
+        start = time.perf_counter()
+        message_slots = asyncio.Semaphore(self.per_message_limit)
+
+        async def fetch_one(url, content_type):
+            # The cache hashes, copies files and commits to sqlite: keep it off the event loop
+            if self.cache is not None:
+                cached = await run_blocking(self.cache.get, url)
+                if cached is not None:
+                    return cached
+            async with message_slots:
+                try:
+                    item = await self.fetch(url, content_type)
+                except Exception as err:
+                    logger.error(f"Failed to download media from {url}: {err}")
+                    return None
+            if self.cache is None:
+                return item
+            try:
+                cached = await run_blocking(self.cache.put, url, item.content_type, item._spool)
+            except Exception as err:
+                logger.warning(f"Could not cache media from {url}: {err}")
+                return item
+            item.close()
+            return cached
+
+        items = await asyncio.gather(*(fetch_one(url, ctype) for url, ctype in media))
+        self.last_message_seconds = time.perf_counter() - start
+        logger.info(f"Downloaded {sum(1 for i in items if i)}/{len(media)} attachments in {self.last_message_seconds * 1000:.0f} ms")
+        return items
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "downloads": self.downloads,
+            "failures": self.failures,
+            "rejected_too_large": self.rejected_too_large,
+            "bytes_downloaded": self.bytes_downloaded,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "global_limit": self.global_limit,
+            "per_message_limit": self.per_message_limit,
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "last_message_ms": round(self.last_message_seconds * 1000, 1) if self.last_message_seconds is not None else None,
+        }
+
+
+def create_media_fetcher(auth: Tuple[str, str]) -> MediaFetcher:
+    return MediaFetcher(
+        global_limit=MEDIA_MAX_CONCURRENCY,
+        per_message_limit=MEDIA_PER_MESSAGE_CONCURRENCY,
+        max_bytes=MEDIA_MAX_BYTES,
+        spool_memory=MEDIA_SPOOL_MEMORY_BYTES,
+        timeout=MEDIA_DOWNLOAD_TIMEOUT_SECONDS,
+        auth=auth,
+        cache=MediaCache(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES) if MEDIA_CACHE_MAX_BYTES > 0 else None,
+    )
@@ -0,0 +1,272 @@
+import base64
+import hashlib
+import logging
+import mmap
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Twilio media URLs end in .../Media/ME<32 hex>; the MediaSid survives retries
+# and re-signed URLs, so it is the preferred cache key
+MEDIA_SID_PATTERN = re.compile(r"/Media/(ME[0-9a-fA-F]{32})")
+
+# Multiple of 3 so base64 chunks concatenate without padding in the middle
+_CHUNK_SIZE = 3 * 21846
+
+
+def media_key(url: str) -> str:
+    """Cache key for a media URL: its MediaSid when present, else the URL itself."""
+    match = MEDIA_SID_PATTERN.search(url)
+    return match.group(1) if match else url
+
+
+class CachedMedia:
+    """A cached attachment backed by its blob file.
+
+    The file is opened when the entry is handed out, so a concurrent eviction
+    cannot pull it away; bytes are read through mmap and the data-URI is only
+    built the first time it is asked for.
+    """
+
+    def __init__(self, url: str, content_type: str, path: str, size: int, sha256: str):
+        self.url = url
+        self.content_type = content_type
+        self.size = size
+        self.sha256 = sha256
+        self._file = open(path, "rb")
+        self._data_uri = None
+
+    def read(self) -> bytes:
+        if self.size == 0:
+            return b""
+        with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[:]
+
+    def data_uri(self) -> str:
+        if self._data_uri is None:
+            parts = [f"data:{self.content_type};base64,"]
+            if self.size:
+                with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    view = memoryview(mapped)
+                    try:
+                        for offset in range(0, self.size, _CHUNK_SIZE):
+                            parts.append(base64.b64encode(view[offset:offset + _CHUNK_SIZE]).decode())
+                    finally:
+                        view.release()
+            self._data_uri = "".join(parts)
+        return self._data_uri
+
+    def as_image(self) -> "LazyImage":
+        return LazyImage(self)
+
+    def close(self):
+        self._file.close()
+
+
+class LazyImage(Mapping):
+    """The ``{"url", "data_uri"}`` image dict passed to the agent, encoding on first access."""
+
+    def __init__(self, media):
+        self._media = media
+
+    def __getitem__(self, key):
+        if key == "url":
+            return self._media.url
+        if key == "data_uri":
+            return self._media.data_uri()
+        if key == "content_type":
+            return self._media.content_type
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(("url", "data_uri", "content_type"))
+
+    def __len__(self):
+        return 3
+
+
+class MediaCache:
+    """On-disk, content-addressed cache for downloaded attachments.
+
+    Blobs are stored once per SHA-256 under ``directory`` and any number of
+    keys (MediaSid or URL) point at them, so a retried webhook or a forwarded
+    image is served locally. The key index and access order live in a small
+    SQLite file next to the blobs, and least recently used blobs are evicted
+    once the total size exceeds ``max_bytes``.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._blobs = OrderedDict()  # sha256 -> (size, content_type), least recently used first
+        self._keys = {}  # media key -> sha256
+        self._loaded = False
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self):
+        return sqlite3.connect(os.path.join(self.directory, "index.db"))
+
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.directory, sha256[:2], sha256)
+
+    def _load(self):
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                content_type TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS media_keys (
+                media_key TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL
+            )
+            """)
+            conn.commit()
+            for sha256, size, content_type in conn.execute("SELECT sha256, size, content_type FROM blobs ORDER BY last_used"):
+                if os.path.exists(self._blob_path(sha256)):
+                    self._blobs[sha256] = (size, content_type)
+                    self.bytes += size
+            for key, sha256 in conn.execute("SELECT media_key, sha256 FROM media_keys"):
+                if sha256 in self._blobs:
+                    self._keys[key] = sha256
+        finally:
+            conn.close()
+        self._loaded = True
+        logger.info(f"Media cache loaded: {len(self._blobs)} blobs, {self.bytes} bytes")
+
+    def _touch(self, conn, sha256: str):
+        self._blobs.move_to_end(sha256)
+        conn.execute("UPDATE blobs SET last_used = ? WHERE sha256 = ?", (time.time(), sha256))
+
+    def get(self, url: str) -> Optional[CachedMedia]:
+        """Return the cached attachment for this URL's MediaSid/URL, or None."""
+        key = media_key(url)
+        with self._lock:
+            self._load()
+            sha256 = self._keys.get(key)
+            if sha256 is None:
+                self.misses += 1
+                return None
+            size, content_type = self._blobs[sha256]
+            conn = self._connect()
+            try:
+                try:
+                    media = CachedMedia(url, content_type, self._blob_path(sha256), size, sha256)
+                except FileNotFoundError:
+                    # Blob removed behind our back: forget it and download again
+                    self._drop(sha256, conn)
+                    conn.commit()
+                    self.misses += 1
+                    return None
+                self._touch(conn, sha256)
+                conn.commit()
+            finally:
+                conn.close()
+            self.hits += 1
+            return media
+
+    def put(self, url: str, content_type: str, source) -> CachedMedia:
+        """Store the bytes of a readable file object under this URL's key.
+
+        Identical content already in the cache is not written twice; the key
+        is pointed at the existing blob instead.
+        """
+        key = media_key(url)
+        with self._lock:
+            self._load()
+            source.seek(0)
+            digest = hashlib.sha256()
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".incoming-")
+            size = 0
+            try:
+                with os.fdopen(fd, "wb") as tmp:
+                    while chunk := source.read(_CHUNK_SIZE):
+                        digest.update(chunk)
+                        tmp.write(chunk)
+                        size += len(chunk)
+                sha256 = digest.hexdigest()
+                path = self._blob_path(sha256)
+                if sha256 in self._blobs and os.path.exists(path):
+                    os.unlink(tmp_path)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+
+            conn = self._connect()
+            try:
+                if sha256 not in self._blobs:
+                    self._blobs[sha256] = (size, content_type)
+                    self.bytes += size
+                    conn.execute(
+                        "INSERT OR REPLACE INTO blobs (sha256, size, content_type, last_used) VALUES (?, ?, ?, ?)",
+                        (sha256, size, content_type, time.time())
+                    )
+                else:
+                    self._touch(conn, sha256)
+                self._keys[key] = sha256
+                conn.execute("INSERT OR REPLACE INTO media_keys (media_key, sha256) VALUES (?, ?)", (key, sha256))
+                self._evict(conn, keep=sha256)
+                conn.commit()
+            finally:
+                conn.close()
+            size, content_type = self._blobs[sha256]
+            return CachedMedia(url, content_type, path, size, sha256)
+
+    def _drop(self, sha256: str, conn=None):
+        size, _ = self._blobs.pop(sha256)
+        self.bytes -= size
+        for key in [k for k, v in self._keys.items() if v == sha256]:
+            del self._keys[key]
+        if conn is not None:
+            conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+            conn.execute("DELETE FROM media_keys WHERE sha256 = ?", (sha256,))
+        try:
+            os.unlink(self._blob_path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, conn, keep: str):
+        while self.bytes > self.max_bytes:
+            victim = next((sha for sha in self._blobs if sha != keep), None)
+            if victim is None:
+                break
+            self._drop(victim, conn)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "blobs": len(self._blobs),
+                "keys": len(self._keys),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+            }
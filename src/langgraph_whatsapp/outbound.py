@@ -0,0 +1,374 @@
+import hashlib
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from src.langgraph_whatsapp.config import (
+    TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, TWILIO_SENDER_POOL, TWILIO_API_BASE_URL,
+    OUTBOUND_RATE_PER_SECOND, OUTBOUND_BURST, OUTBOUND_WORKERS, OUTBOUND_MAX_RETRIES,
+    OUTBOUND_MAX_BACKOFF_SECONDS, OUTBOUND_TIMEOUT_SECONDS, OUTBOUND_QUEUE_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class OutboundError(Exception):
+    """A message the Messages API rejected, or gave up on after retries."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class SentMessage(NamedTuple):
+    sid: str
+    to: str
+    attempts: int
+    sender: str
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, at most ``burst`` saved up."""
+
+    def __init__(self, rate: float, burst: float = 1.0, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now."""
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def reserve(self) -> float:
+        """Take a token, possibly borrowed from the future. Returns how long to wait before using it."""
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class _Outgoing:
+    __slots__ = ("to", "body", "future", "enqueued_at", "attempts")
+
+    def __init__(self, to, body):
+        self.to = to
+        self.body = body
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class _Sender:
+    __slots__ = ("address", "bucket", "sent", "failed", "throttled", "spilled_in")
+
+    def __init__(self, address: str, bucket: TokenBucket):
+        self.address = address
+        self.bucket = bucket
+        self.sent = 0
+        self.failed = 0
+        self.throttled = 0
+        self.spilled_in = 0
+
+    def form(self) -> dict:
+        """The sender fields of a Messages API request."""
+        if self.address.startswith("MG"):
+            return {"MessagingServiceSid": self.address}
+        return {"From": _whatsapp_address(self.address)}
+
+    def stats(self) -> dict:
+        return {
+            "rate_per_second": self.bucket.rate,
+            "sent": self.sent,
+            "failed": self.failed,
+            "throttled": self.throttled,
+            "spilled_in": self.spilled_in,
+        }
+
+
+class SenderPool:
+    """Sender numbers (or Messaging Service SIDs, "MG...") each paced by its own token bucket.
+
+    Every recipient has a preferred sender chosen by rendezvous hashing, so a
+    conversation stays on one number and adding or removing a sender only
+    moves the recipients that hashed to it. When the preferred sender has no
+    token left the message spills over to the next sender in that
+    recipient's order that does; when all are saturated it waits for its
+    preferred sender.
+    """
+
+    def __init__(self, senders: Iterable[str], rate: float, burst: float = 1.0, clock=time.monotonic):
+        self.senders = [_Sender(address, TokenBucket(rate, burst, clock)) for address in dict.fromkeys(senders)]
+        if not self.senders:
+            raise ValueError("SenderPool needs at least one sender")
+        self._lock = threading.Lock()
+
+    def ranked(self, recipient: str) -> List[_Sender]:
+        """Senders in ``recipient``'s order of preference."""
+        if len(self.senders) == 1:
+            return self.senders
+        return sorted(
+            self.senders,
+            key=lambda sender: hashlib.blake2b(f"{sender.address}|{recipient}".encode(), digest_size=8).digest(),
+            reverse=True,
+        )
+
+    def acquire(self, recipient: str) -> Tuple[_Sender, float]:
+        """Pick the sender for one attempt. Returns it and how long to wait before sending."""
+        ranked = self.ranked(recipient)
+        for sender in ranked:
+            if sender.bucket.try_acquire():
+                if sender is not ranked[0]:
+                    with self._lock:
+                        sender.spilled_in += 1
+                return sender, 0.0
+        return ranked[0], ranked[0].bucket.reserve()
+
+    def record(self, sender: _Sender, sent: bool = False, status: Optional[int] = None):
+        with self._lock:
+            if sent:
+                sender.sent += 1
+            elif status == 429:
+                sender.throttled += 1
+            else:
+                sender.failed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {sender.address: sender.stats() for sender in self.senders}
+
+
+class OutboundDispatcher:
+    """Queued, rate-paced sender for outbound WhatsApp messages.
+
+    ``send`` puts a message on the queue and returns a Future resolving to a
+    SentMessage (or raising OutboundError). ``workers`` threads share one
+    keep-alive ``requests.Session`` against the Messages API at ``base_url``
+    and a SenderPool pacing each sender in ``from_number`` (one address or a
+    list) to ``rate`` messages per second (``burst`` may go out back to
+    back), so throughput grows with the number of senders. 429 and 5xx
+    responses and errors connecting to the API are retried up to
+    ``max_retries`` times with full-jitter exponential backoff, honouring
+    Retry-After; other 4xx fail the message immediately. So do errors after
+    the request may have been sent (a read timeout, a dropped connection):
+    Twilio may already have accepted the message, and resending it would
+    deliver it twice.
+    """
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: Union[str, Iterable[str]],
+                 base_url: str = "https://api.twilio.com", rate: float = 10.0, burst: float = 10.0,
+                 workers: int = 4, max_retries: int = 5, base_backoff: float = 0.5, max_backoff: float = 30.0,
+                 timeout: float = 10.0, queue_size: int = 10000, session=None):
+        self.account_sid = account_sid
+        self.url = f"{base_url.rstrip('/')}/2010-04-01/Accounts/{account_sid}/Messages.json"
+        self.workers = workers
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.senders = SenderPool([from_number] if isinstance(from_number, str) else from_number, rate, burst)
+        self._auth = (account_sid, auth_token)
+        # Created with the workers, so importing this module does not load requests
+        self._session = session
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._threads = []
+        self._waiting = {}
+        self.in_flight = 0
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.rejected = 0
+        self.max_queue_lag = 0.0
+        self.last_send_seconds = None
+
+    def start(self):
+        with self._start_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+                self._session.mount("https://", adapter)
+                self._session.mount("http://", adapter)
+            self._session.auth = self._auth
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._run, name=f"outbound-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the workers once the messages already queued have been sent."""
+        with self._start_lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout=timeout)
+        if self._session is not None:
+            self._session.close()
+
+    def send(self, to: str, body: str) -> Future:
+        """Queue one message. A full queue fails the returned Future right away."""
+        item = _Outgoing(_whatsapp_address(to), body)
+        self.start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._stats_lock:
+                self.rejected += 1
+            item.future.set_exception(OutboundError("Outbound queue is full"))
+            return item.future
+        with self._stats_lock:
+            self._waiting[id(item)] = item.enqueued_at
+        return item.future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            with self._stats_lock:
+                self._waiting.pop(id(item), None)
+                self.max_queue_lag = max(self.max_queue_lag, time.monotonic() - item.enqueued_at)
+                self.in_flight += 1
+            try:
+                result = self._deliver(item)
+            except Exception as e:
+                with self._stats_lock:
+                    self.failed += 1
+                    self.in_flight -= 1
+                logger.error(f"Giving up on message to {item.to}: {e}")
+                item.future.set_exception(e if isinstance(e, OutboundError) else OutboundError(str(e)))
+            else:
+                with self._stats_lock:
+                    self.sent += 1
+                    self.in_flight -= 1
+                item.future.set_result(result)
+
+    def _deliver(self, item: _Outgoing) -> SentMessage:
+        import requests
+
+        while True:
+            sender, wait = self.senders.acquire(item.to)
+            time.sleep(wait)
+            item.attempts += 1
+            started = time.perf_counter()
+            retry_after = None
+            try:
+                response = self._session.post(
+                    self.url, data={"To": item.to, "Body": item.body, **sender.form()}, timeout=self.timeout
+                )
+            except requests.RequestException as e:
+                error, status = OutboundError(f"Request failed: {e}"), None
+                if not _not_sent(e):
+                    self.senders.record(sender, status=None)
+                    raise error
+            else:
+                self.last_send_seconds = time.perf_counter() - started
+                status = response.status_code
+                if status < 300:
+                    self.senders.record(sender, sent=True)
+                    return SentMessage(response.json().get("sid"), item.to, item.attempts, sender.address)
+                error = OutboundError(f"HTTP {status}: {_error_message(response)}", status)
+            self.senders.record(sender, status=status)
+            if status is not None:
+                if status not in RETRYABLE_STATUSES:
+                    raise error
+                retry_after = _retry_after(response)
+
+            if item.attempts > self.max_retries:
+                raise error
+            delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** (item.attempts - 1)))
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.max_backoff))
+            with self._stats_lock:
+                self.retries += 1
+            logger.warning(f"Retrying message to {item.to} in {delay:.2f}s (attempt {item.attempts}): {error}")
+            time.sleep(delay)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._stats_lock:
+            oldest = min(self._waiting.values(), default=None)
+            return {
+                "workers": len([thread for thread in self._threads if thread.is_alive()]),
+                "queued": self._queue.qsize(),
+                "in_flight": self.in_flight,
+                "queue_lag_ms": round((now - oldest) * 1000, 1) if oldest is not None else 0.0,
+                "max_queue_lag_ms": round(self.max_queue_lag * 1000, 1),
+                "sent": self.sent,
+                "failed": self.failed,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "rate_per_second": self.senders.senders[0].bucket.rate * len(self.senders.senders),
+                "last_send_ms": round(self.last_send_seconds * 1000, 1) if self.last_send_seconds is not None else None,
+                "senders": self.senders.stats(),
+            }
+
+
+def _not_sent(error) -> bool:
+    """True when a request failed before any of it reached the server (DNS, refused connection, connect timeout)."""
+    import requests
+    from urllib3.exceptions import NewConnectionError
+
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and not isinstance(error, requests.exceptions.SSLError):
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+def _whatsapp_address(number: str) -> str:
+    return number if number.startswith("whatsapp:") else f"whatsapp:{number}"
+
+
+def _error_message(response) -> str:
+    try:
+        return response.json().get("message") or response.text[:200]
+    except ValueError:
+        return response.text[:200]
+
+
+def _retry_after(response) -> Optional[float]:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+OUTBOUND_DISPATCHER = OutboundDispatcher(
+    TWILIO_ACCOUNT_SID,
+    TWILIO_AUTH_TOKEN,
+    [sender.strip() for sender in TWILIO_SENDER_POOL.split(",") if sender.strip()] or TWILIO_PHONE_NUMBER,
+    base_url=TWILIO_API_BASE_URL,
+    rate=OUTBOUND_RATE_PER_SECOND,
+    burst=OUTBOUND_BURST,
+    workers=OUTBOUND_WORKERS,
+    max_retries=OUTBOUND_MAX_RETRIES,
+    max_backoff=OUTBOUND_MAX_BACKOFF_SECONDS,
+    timeout=OUTBOUND_TIMEOUT_SECONDS,
+    queue_size=OUTBOUND_QUEUE_SIZE,
+)
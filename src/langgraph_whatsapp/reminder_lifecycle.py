@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from src.langgraph_whatsapp.db import get_db_connection
+from src.langgraph_whatsapp.reminder_scheduler import TIME_FORMAT
+
+logger = logging.getLogger(__name__)
+
+_ARCHIVE_COLUMNS = "id, user_id, task, reminder_time, created_at, fired_at, outcome, outcome_detail"
+
+
+class ReminderLifecycle:
+    """Periodic housekeeping that keeps the reminders table down to live rows.
+
+    Each ``run``:
+
+    * marks reminders more than ``missed_after`` seconds overdue that never
+      fired (the process was down past the scheduler's grace period) as
+      completed with outcome 'missed';
+    * moves finished reminders due more than ``archive_after_days`` ago to
+      reminders_archive, ``batch_size`` rows per transaction so the write
+      lane is never held for long;
+    * returns up to ``vacuum_pages`` free pages to the filesystem with
+      ``PRAGMA incremental_vacuum``.
+    """
+
+    def __init__(self, archive_after_days: float = 30, batch_size: int = 1000, missed_after: float = 3600,
+                 vacuum_pages: int = 2000, connect=get_db_connection,
+                 clock: Callable[[], datetime] = datetime.now):
+        self.archive_after_days = archive_after_days
+        self.batch_size = batch_size
+        self.missed_after = missed_after
+        self.vacuum_pages = vacuum_pages
+        self._connect = connect
+        self._clock = clock
+        self._run_lock = threading.Lock()
+        self.runs = 0
+        self.missed = 0
+        self.archived = 0
+        self.pages_vacuumed = 0
+        self.last_run_ms = None
+
+    def run(self) -> dict:
+        """One housekeeping pass. Returns what it did."""
+        with self._run_lock:
+            started = time.perf_counter()
+            now = self._clock()
+            missed = self._mark_missed((now - timedelta(seconds=self.missed_after)).strftime(TIME_FORMAT))
+            archived = self._archive((now - timedelta(days=self.archive_after_days)).strftime(TIME_FORMAT))
+            pages = self._vacuum()
+            self.runs += 1
+            self.missed += missed
+            self.archived += archived
+            self.pages_vacuumed += pages
+            self.last_run_ms = (time.perf_counter() - started) * 1000
+        if missed or archived or pages:
+            logger.info(f"Reminder housekeeping: {missed} missed, {archived} archived, {pages} pages vacuumed")
+        return {"missed": missed, "archived": archived, "pages_vacuumed": pages}
+
+    def _mark_missed(self, cutoff: str) -> int:
+        conn = self._connect()
+        try:
+            count = conn.execute(
+                """
+                UPDATE reminders SET completed = 1, outcome = 'missed'
+                WHERE completed = 0 AND reminder_time < ?
+                """,
+                (cutoff,)
+            ).rowcount
+            conn.commit()
+            return count
+        finally:
+            conn.close()
+
+    def _archive(self, cutoff: str) -> int:
+        archived = 0
+        while True:
+            conn = self._connect()
+            try:
+                ids = [row[0] for row in conn.execute(
+                    "SELECT id FROM reminders WHERE completed = 1 AND reminder_time < ? LIMIT ?",
+                    (cutoff, self.batch_size)
+                )]
+                if not ids:
+                    return archived
+                placeholders = ", ".join("?" * len(ids))
+                conn.execute(
+                    f"INSERT OR REPLACE INTO reminders_archive ({_ARCHIVE_COLUMNS}) "
+                    f"SELECT {_ARCHIVE_COLUMNS} FROM reminders WHERE id IN ({placeholders})",
+                    ids
+                )
+                conn.execute(f"DELETE FROM reminders WHERE id IN ({placeholders})", ids)
+                conn.commit()
+                archived += len(ids)
+            finally:
+                conn.close()
+            if len(ids) < self.batch_size:
+                return archived
+
+    def _vacuum(self) -> int:
+        if self.vacuum_pages <= 0:
+            return 0
+        conn = self._connect()
+        try:
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            freed = 0
+            # sqlite3 stops stepping the pragma early, so repeat until the budget or the freelist runs out
+            while free and freed < self.vacuum_pages:
+                conn.execute(f"PRAGMA incremental_vacuum({int(self.vacuum_pages - freed)})").fetchall()
+                remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if remaining >= free:
+                    break
+                freed += free - remaining
+                free = remaining
+            conn.commit()
+            return freed
+        finally:
+            conn.close()
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        try:
+            pending = conn.execute("SELECT COUNT(*) FROM reminders WHERE completed = 0").fetchone()[0]
+            finished = conn.execute("SELECT COUNT(*) FROM reminders WHERE completed = 1").fetchone()[0]
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        finally:
+            conn.close()
+        return {
+            "pending": pending,
+            "finished_not_archived": finished,
+            "free_pages": free_pages,
+            "runs": self.runs,
+            "missed": self.missed,
+            "archived": self.archived,
+            "pages_vacuumed": self.pages_vacuumed,
+            "last_run_ms": round(self.last_run_ms, 1) if self.last_run_ms is not None else None,
+        }
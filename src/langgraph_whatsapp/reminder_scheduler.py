@@ -0,0 +1,295 @@
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable
+
+from src.langgraph_whatsapp.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Format of reminders.reminder_time; it sorts chronologically as text
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class ReminderScheduler:
+    """Fires reminders straight from the reminders table, one window at a time.
+
+    Only reminders due in the next ``window`` seconds are held in memory, in a
+    heap ordered by due time. As time advances the window is paged in from
+    the (completed, reminder_time) index with a keyset cursor, ``page_size``
+    rows per query, so startup and memory are proportional to the window,
+    not to the backlog. Nothing is "scheduled" besides the table itself:
+    a restart just pages in from ``now - misfire_grace``. Reminders added in
+    this process are handed over with ``notify``; rows inserted by other
+    processes (workers that are not the scheduling leader) are picked up
+    every ``poll_interval`` seconds by a primary-key range scan over the ids
+    added since the last look.
+
+    Firing marks the row completed (with ``fired_at``) through
+    ``UPDATE ... RETURNING`` before calling ``send(user_id, task)`` on a small
+    thread pool, so a reminder deleted or already fired by someone else is
+    skipped and a slow send does not delay the next one. Rows claimed while
+    ``stop`` shuts the pool down are put back to pending. ``send`` raising
+    records outcome 'failed' (with the error), otherwise 'sent'.
+    """
+
+    def __init__(self, send: Callable[[str, str], object], window: float = 600.0, page_size: int = 5000,
+                 misfire_grace: float = 60.0, send_workers: int = 4, poll_interval: float = 5.0,
+                 connect=get_db_connection, clock: Callable[[], datetime] = datetime.now):
+        self.send = send
+        self.window = window
+        self.page_size = page_size
+        self.misfire_grace = misfire_grace
+        self.send_workers = send_workers
+        self.poll_interval = poll_interval
+        self._connect = connect
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._heap = []
+        self._queued = set()
+        # Rows due up to this time have been paged in
+        self._horizon = None
+        # Highest reminder id already seen, and when to look for newer ones
+        self._last_id = 0
+        self._next_poll = None
+        self.fired = 0
+        self.skipped = 0
+        self.send_errors = 0
+        self.pages = 0
+        self.rows_paged = 0
+        self.rows_polled = 0
+        self.last_page_ms = None
+        self.max_lateness_ms = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._horizon = (self._clock() - timedelta(seconds=self.misfire_grace)).strftime(TIME_FORMAT)
+            self._heap = []
+            self._queued = set()
+            self._last_id = 0
+            self._next_poll = None
+            self._executor = ThreadPoolExecutor(max_workers=self.send_workers, thread_name_prefix="reminder-send")
+            self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def notify(self, reminder_id: int, user_id: str, task: str, reminder_time: str):
+        """Tell the scheduler about a reminder just inserted into the table.
+
+        Reminders inside the loaded window go straight into the heap; later
+        ones are left for the page that covers their time.
+        """
+        with self._lock:
+            if self._horizon is None or reminder_time > self._horizon or reminder_id in self._queued:
+                return
+            heapq.heappush(self._heap, (reminder_time, reminder_id, user_id, task))
+            self._queued.add(reminder_id)
+            self._last_id = max(self._last_id, reminder_id)
+        self._wakeup.set()
+
+    def _page_in(self, now: datetime):
+        """Load pending reminders due up to ``now + window`` that are not in memory yet.
+
+        The whole window is rescanned (from ``now - misfire_grace``), so rows
+        other processes inserted are picked up too; rows already held are
+        skipped. The horizon moves first, so ``notify`` calls racing with the
+        scan push their reminder rather than relying on the scan to see it.
+        """
+        horizon = (now + timedelta(seconds=self.window)).strftime(TIME_FORMAT)
+        with self._lock:
+            self._horizon = max(self._horizon, horizon)
+        started = time.perf_counter()
+        cursor = ((now - timedelta(seconds=self.misfire_grace)).strftime(TIME_FORMAT), 0)
+        conn = self._connect()
+        try:
+            # Read first: a row committed during the scan is in it or above this id, where _poll finds it
+            last_id = conn.execute("SELECT coalesce(max(id), 0) FROM reminders").fetchone()[0]
+            with self._lock:
+                self._last_id = max(self._last_id, last_id)
+            while True:
+                rows = conn.execute(
+                    """
+                    SELECT id, user_id, task, reminder_time FROM reminders
+                    WHERE completed = 0 AND (reminder_time, id) > (?, ?) AND reminder_time <= ?
+                    ORDER BY reminder_time, id
+                    LIMIT ?
+                    """,
+                    (*cursor, horizon, self.page_size)
+                ).fetchall()
+                with self._lock:
+                    for reminder_id, user_id, task, reminder_time in rows:
+                        if reminder_id not in self._queued:
+                            heapq.heappush(self._heap, (reminder_time, reminder_id, user_id, task))
+                            self._queued.add(reminder_id)
+                    self.pages += 1
+                    self.rows_paged += len(rows)
+                if len(rows) < self.page_size:
+                    break
+                cursor = (rows[-1][3], rows[-1][0])
+        finally:
+            conn.close()
+        self.last_page_ms = (time.perf_counter() - started) * 1000
+
+    def _poll(self):
+        """Queue reminders other processes inserted since the last look, if due inside the loaded window."""
+        conn = self._connect()
+        try:
+            # "+completed" keeps this a rowid range scan over the new rows only
+            rows = conn.execute(
+                "SELECT id, user_id, task, reminder_time FROM reminders WHERE id > ? AND +completed = 0 ORDER BY id",
+                (self._last_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        with self._lock:
+            for reminder_id, user_id, task, reminder_time in rows:
+                self._last_id = max(self._last_id, reminder_id)
+                # Later ones are left for the page that covers their time
+                if reminder_time <= self._horizon and reminder_id not in self._queued:
+                    heapq.heappush(self._heap, (reminder_time, reminder_id, user_id, task))
+                    self._queued.add(reminder_id)
+                    self.rows_polled += 1
+
+    def _due(self, now: str) -> list:
+        with self._lock:
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap))
+            return due
+
+    def _fire(self, due: list, now: datetime):
+        conn = self._connect()
+        try:
+            placeholders = ", ".join("?" * len(due))
+            # "+completed" keeps the planner on rowid lookups; the (completed, ...)
+            # index would walk every pending reminder
+            claimed = {
+                row[0] for row in conn.execute(
+                    f"""
+                    UPDATE reminders SET completed = 1, fired_at = ?
+                    WHERE id IN ({placeholders}) AND +completed = 0 RETURNING id
+                    """,
+                    [now.strftime(TIME_FORMAT)] + [reminder_id for _, reminder_id, _, _ in due]
+                ).fetchall()
+            }
+            conn.commit()
+        finally:
+            conn.close()
+
+        unsent = []
+        for reminder_time, reminder_id, user_id, task in due:
+            with self._lock:
+                self._queued.discard(reminder_id)
+            if reminder_id not in claimed:
+                self.skipped += 1
+                continue
+            try:
+                self._executor.submit(self._send, reminder_id, user_id, task)
+            except RuntimeError:
+                # stop() shut the executor down (e.g. lost the lease): hand the reminder back
+                unsent.append(reminder_id)
+                continue
+            lateness = (now - datetime.strptime(reminder_time, TIME_FORMAT)).total_seconds() * 1000
+            self.max_lateness_ms = max(self.max_lateness_ms, lateness)
+            self.fired += 1
+            logger.info(f"Firing reminder [{reminder_id}] for {user_id} due at {reminder_time}")
+        if unsent:
+            self._release(unsent)
+
+    def _release(self, reminder_ids: list):
+        """Return claimed but unsent reminders to pending, for whichever scheduler runs next."""
+        logger.warning(f"Releasing {len(reminder_ids)} reminders claimed while the scheduler was stopping")
+        conn = self._connect()
+        try:
+            placeholders = ", ".join("?" * len(reminder_ids))
+            conn.execute(
+                f"UPDATE reminders SET completed = 0, fired_at = NULL WHERE id IN ({placeholders}) AND outcome IS NULL",
+                reminder_ids
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _send(self, reminder_id: int, user_id: str, task: str):
+        outcome, detail = "sent", None
+        try:
+            self.send(user_id, task)
+        except Exception as e:
+            outcome, detail = "failed", str(e)
+            self.send_errors += 1
+            logger.error(f"Error sending reminder [{reminder_id}] to {user_id}: {e}")
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE reminders SET outcome = ?, outcome_detail = ? WHERE id = ?", (outcome, detail, reminder_id))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error recording outcome of reminder [{reminder_id}]: {e}")
+        finally:
+            conn.close()
+
+    def _run(self):
+        # Refill when less than a fifth of the window is left loaded
+        refill_margin = timedelta(seconds=self.window / 5)
+        while not self._stop.is_set():
+            now = self._clock()
+            try:
+                if (now + refill_margin).strftime(TIME_FORMAT) > self._horizon:
+                    self._page_in(now)
+                    self._next_poll = now + timedelta(seconds=self.poll_interval)
+                elif self.poll_interval and now >= self._next_poll:
+                    self._poll()
+                    self._next_poll = now + timedelta(seconds=self.poll_interval)
+                due = self._due(now.strftime(TIME_FORMAT))
+                if due:
+                    self._fire(due, now)
+            except Exception as e:
+                logger.error(f"Unexpected error in reminder scheduler loop: {e}")
+                self._stop.wait(1)
+                continue
+
+            with self._lock:
+                next_due = self._heap[0][0] if self._heap else self._horizon
+            refill_at = datetime.strptime(self._horizon, TIME_FORMAT) - refill_margin
+            wake_at = min(datetime.strptime(next_due, TIME_FORMAT), refill_at)
+            if self.poll_interval:
+                wake_at = min(wake_at, self._next_poll)
+            self._wakeup.wait(max(0.0, (wake_at - self._clock()).total_seconds()))
+            self._wakeup.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "in_memory": len(self._heap),
+                "next_due": self._heap[0][0] if self._heap else None,
+                "loaded_until": self._horizon,
+                "fired": self.fired,
+                "skipped": self.skipped,
+                "send_errors": self.send_errors,
+                "pages": self.pages,
+                "rows_paged": self.rows_paged,
+                "rows_polled": self.rows_polled,
+                "last_page_ms": round(self.last_page_ms, 1) if self.last_page_ms is not None else None,
+                "max_lateness_ms": round(self.max_lateness_ms, 1),
+            }
@@ -0,0 +1,59 @@
+from typing import Dict, List, NamedTuple, Tuple
+from urllib.parse import parse_qsl
+
+
+def parse_twilio_fields(body: bytes) -> Dict[str, str]:
+    """The url-encoded webhook body as a flat dict; the first value wins for repeated keys."""
+    fields = {}
+    for key, value in parse_qsl(body.decode("utf-8", errors="replace"), keep_blank_values=True):
+        fields.setdefault(key, value)
+    return fields
+
+
+def image_media(fields: Dict[str, str]) -> List[Tuple[str, str]]:
+    """(url, content type) of every image attached to the message."""
+    try:
+        num_media = int(fields.get("NumMedia") or 0)
+    except ValueError:
+        num_media = 0
+    media = []
+    for i in range(num_media):
+        url = fields.get(f"MediaUrl{i}", "")
+        ctype = fields.get(f"MediaContentType{i}", "")
+        if url and ctype.startswith("image/"):
+            media.append((url, ctype))
+    return media
+
+
+class TwilioRequestContext(NamedTuple):
+    """One inbound webhook, parsed once by the middleware and kept on ``request.state.twilio``.
+
+    Handlers read the fields from here instead of calling ``request.form()``,
+    ``request.json()`` or ``request.body()`` again.
+    """
+    body: bytes
+    fields: Dict[str, str]
+    signature_valid: bool
+    media: List[Tuple[str, str]]
+
+    @classmethod
+    def from_body(cls, body: bytes, signature_valid: bool = False) -> "TwilioRequestContext":
+        fields = parse_twilio_fields(body)
+        return cls(body, fields, signature_valid, image_media(fields))
+
+    @property
+    def sender(self) -> str:
+        return self.fields.get("From", "").strip()
+
+    @property
+    def content(self) -> str:
+        return self.fields.get("Body", "").strip()
+
+    @property
+    def message_sid(self) -> str:
+        return self.fields.get("MessageSid", "").strip()
+
+    @property
+    def is_whatsapp_message(self) -> bool:
+        """A Twilio message webhook, as opposed to some other POST (JSON, health checks)."""
+        return "From" in self.fields and "Body" in self.fields
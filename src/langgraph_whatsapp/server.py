@@ -1,8 +1,7 @@
 # server.py
+import asyncio
 import logging
 import os
-import requests
-from urllib.parse import parse_qs
 import atexit
 
 from fastapi import FastAPI, Request, Response, HTTPException, Form
@@ -11,25 +10,75 @@ from starlette.types import Message
 from twilio.request_validator import RequestValidator
 from twilio.twiml.messaging_response import MessagingResponse
 
-from src.langgraph_whatsapp.channel import WhatsAppAgentTwilio
-from src.langgraph_whatsapp.config import TWILIO_AUTH_TOKEN
+from src.langgraph_whatsapp.channel import WhatsAppAgentTwilio, MEDIA_FETCHER
+from src.langgraph_whatsapp.config import TWILIO_AUTH_TOKEN, GOOGLE_WARM_UP_ON_STARTUP, TWILIO_REJECT_INVALID_SIGNATURES
 from src.langgraph_whatsapp.database_setup import setup_database
-from src.langgraph_whatsapp.tools import initialize_scheduler, cleanup_scheduler, extract_links, save_link, retrieve_links, set_reminder
+from src.langgraph_whatsapp.db import POOL
+from src.langgraph_whatsapp.tools import REMINDER_SCHEDULER, REMINDER_LIFECYCLE, SCHEDULER_LEASE, initialize_scheduler, cleanup_scheduler, extract_links, save_link, retrieve_links, set_reminder
+from src.langgraph_whatsapp.sheets_setup import budget_catalog, expense_write_queue
+from src.langgraph_whatsapp.google_clients import SERVICE_REGISTRY, warm_up_google_clients
+from src.langgraph_whatsapp.async_tools import TOOL_EXECUTOR, run_blocking, get_http_client, close_http_client
+from src.langgraph_whatsapp.unfurl import LINK_UNFURLER
+from src.langgraph_whatsapp.outbound import OUTBOUND_DISPATCHER
+from src.langgraph_whatsapp.timeparse import TIME_PARSER
+from src.langgraph_whatsapp.idempotency import WEBHOOK_IDEMPOTENCY
+from src.langgraph_whatsapp.mailboxes import SENDER_MAILBOXES
+from src.langgraph_whatsapp.request_context import TwilioRequestContext
+from src.langgraph_whatsapp.admission import (
+    WEBHOOK_ADMISSION, ADMITTED, THROTTLED, SHED, THROTTLED_REPLY, SHED_REPLY, UNVERIFIED_SENDER,
+)
 
 LOGGER = logging.getLogger("server")
 APP = FastAPI()
 WSP_AGENT = WhatsAppAgentTwilio()
 
-# Initialize database
-db_path = setup_database()
-LOGGER.info(f"Database initialized at {db_path}")
 
-# Initialize and start the scheduler for reminders
-scheduler = initialize_scheduler()
-LOGGER.info("Scheduler initialized for reminders")
+def _canned_twiml(text: str) -> str:
+    twiml = MessagingResponse()
+    twiml.message(text)
+    return str(twiml)
 
-# Register cleanup function to shutdown scheduler gracefully
-atexit.register(cleanup_scheduler)
+
+# Rendered once: throttled and shed requests must stay cheap
+_CANNED_REPLIES = {THROTTLED: _canned_twiml(THROTTLED_REPLY), SHED: _canned_twiml(SHED_REPLY)}
+
+@APP.on_event("startup")
+async def start_background_services():
+    """Apply migrations and start the schedulers.
+
+    Done at startup rather than at import, so importing the app stays cheap
+    and free of side effects. None of it touches the network.
+    """
+    db_path = setup_database()
+    LOGGER.info(f"Database initialized at {db_path}")
+
+    # Initialize and start the scheduler for reminders; the lease holder also
+    # runs the expense write-behind flusher (and flushes rows left over from a previous run)
+    initialize_scheduler()
+    LOGGER.info("Scheduler initialized for reminders")
+
+    # Register cleanup function to shutdown scheduler gracefully
+    atexit.register(cleanup_scheduler)
+
+    # Let messages already queued (reminders, proactive sends) go out before exit
+    atexit.register(OUTBOUND_DISPATCHER.stop)
+
+@APP.on_event("startup")
+async def warm_up_clients():
+    """Build the shared Google API clients before the first webhook arrives."""
+    if not GOOGLE_WARM_UP_ON_STARTUP:
+        return
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, warm_up_google_clients)
+
+@APP.on_event("shutdown")
+async def close_clients():
+    """Let queued webhook messages finish, then close the shared clients, the tool pool and the link unfurler."""
+    await WSP_AGENT.work_queue.stop()
+    await close_http_client()
+    await MEDIA_FETCHER.close()
+    TOOL_EXECUTOR.shutdown(wait=False)
+    LINK_UNFURLER.stop(timeout=0)
 
 class TwilioMiddleware(BaseHTTPMiddleware):
     def __init__(self, app, paths: list = ["/whatsapp", "/"]):
@@ -42,19 +91,22 @@ class TwilioMiddleware(BaseHTTPMiddleware):
         if request.url.path in self.paths and request.method == "POST":
             body = await request.body()
 
+            # Parsed once here; handlers read request.state.twilio instead of the body
+            context = TwilioRequestContext.from_body(body)
+
             # Signature check
-            form_dict = parse_qs(body.decode(), keep_blank_values=True)
-            flat_form_dict = {k: v[0] if isinstance(v, list) and v else v for k, v in form_dict.items()}
-            
             proto = request.headers.get("x-forwarded-proto", request.url.scheme)
             host  = request.headers.get("x-forwarded-host", request.headers.get("host"))
             url   = f"{proto}://{host}{request.url.path}"
             sig   = request.headers.get("X-Twilio-Signature", "")
 
-            if not self.validator.validate(url, flat_form_dict, sig):
+            context = context._replace(signature_valid=self.validator.validate(url, context.fields, sig))
+            request.state.twilio = context
+            if not context.signature_valid:
                 LOGGER.warning("Invalid Twilio signature for %s", url)
-                # Don't reject immediately - some test requests might not have signatures
-                # return Response(status_code=401, content="Invalid Twilio signature")
+                # Only rejected when configured to: some test requests don't have signatures
+                if TWILIO_REJECT_INVALID_SIGNATURES:
+                    return Response(status_code=403, content="Invalid Twilio signature")
 
             # Rewind: body and receive channel
             async def _replay() -> Message:
@@ -63,6 +115,26 @@ class TwilioMiddleware(BaseHTTPMiddleware):
             request._body = body
             request._receive = _replay  # type: ignore[attr-defined]
 
+            # Admission control: per-sender rate, then a global concurrency limit. Only a signed
+            # request is counted against its From; unsigned ones share one bucket
+            sender = context.sender if context.signature_valid else UNVERIFIED_SENDER
+            decision = await WEBHOOK_ADMISSION.acquire(sender)
+            if decision != ADMITTED:
+                # 200 with a reply: Twilio must not retry, the user learns to slow down
+                return Response(content=_CANNED_REPLIES[decision], media_type="application/xml")
+            released_later = False
+            try:
+                response = await call_next(request)
+                # Fast-ack: the agent runs after the response; the slot is held until its reply is computed
+                answered = getattr(request.state, "answered", None)
+                if answered is not None and not answered.done():
+                    answered.add_done_callback(lambda _: WEBHOOK_ADMISSION.release(sender))
+                    released_later = True
+                return response
+            finally:
+                if not released_later:
+                    WEBHOOK_ADMISSION.release(sender)
+
         return await call_next(request)
 
 
@@ -95,13 +167,13 @@ async def test_whatsapp_direct(From: str = Form(...), Body: str = Form(...)):
         if links and any(word in Body.lower() for word in ["save", "store", "keep"]):
             # Save the first link
             LOGGER.info(f"Saving link {links[0]} for user {From}")
-            save_result = save_link(From, links[0])
+            save_result = await run_blocking(save_link, From, links[0])
             reply = f"I've saved that link for you: {save_result}"
         
         # Handle requesting saved links
         elif "links" in Body.lower() and any(word in Body.lower() for word in ["saved", "show", "get", "retrieve"]):
             LOGGER.info(f"Retrieving links for user {From}")
-            links_result = retrieve_links(From)
+            links_result = await run_blocking(retrieve_links, From)
             reply = links_result
         
         # Handle reminder requests
@@ -120,7 +192,7 @@ async def test_whatsapp_direct(From: str = Form(...), Body: str = Form(...)):
             task = task_match.group(2) if task_match else "your task"
             
             LOGGER.info(f"Setting reminder for time: {time_str}, task: {task}")
-            reminder_result = set_reminder(From, time_str, task)
+            reminder_result = await run_blocking(set_reminder, From, time_str, task)
             reply = reminder_result
         
         # Default response
@@ -137,12 +209,34 @@ async def test_whatsapp_direct(From: str = Form(...), Body: str = Form(...)):
         LOGGER.exception("Error in test endpoint: %s", str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+@APP.get("/metrics")
+async def metrics():
+    """Runtime counters for the in-process caches, pools and queues."""
+    return {
+        "budget_cache": budget_catalog.stats(),
+        "google_clients": SERVICE_REGISTRY.stats(),
+        "expense_queue": expense_write_queue.stats(),
+        "tool_executor": TOOL_EXECUTOR.stats(),
+        "media_downloads": MEDIA_FETCHER.stats(),
+        "sqlite": POOL.stats(),
+        "link_unfurl": LINK_UNFURLER.stats(),
+        "reminders": REMINDER_SCHEDULER.stats(),
+        "reminder_lifecycle": REMINDER_LIFECYCLE.stats(),
+        "scheduler_lease": SCHEDULER_LEASE.stats(),
+        "outbound": OUTBOUND_DISPATCHER.stats(),
+        "timeparse": TIME_PARSER.stats(),
+        "idempotency": WEBHOOK_IDEMPOTENCY.stats(),
+        "webhook_queue": WSP_AGENT.work_queue.stats(),
+        "mailboxes": SENDER_MAILBOXES.stats(),
+        "admission": WEBHOOK_ADMISSION.stats(),
+    }
+
 @APP.get("/test-now")
 async def test_now():
     """Endpoint that forwards to the test-reminder endpoint"""
     try:
         # Make a request to the test-reminder endpoint
-        response = requests.get("http://127.0.0.1:8081/test-reminder")
+        response = await get_http_client().get("http://127.0.0.1:8081/test-reminder")
         return response.json()
     except Exception as e:
         LOGGER.error(f"Error testing reminder: {e}")
@@ -1,11 +1,19 @@
 import os
 import logging
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from src.langgraph_whatsapp.google_clients import SERVICE_REGISTRY
 import pickle
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
 from datetime import datetime
+from src.langgraph_whatsapp.config import (
+    BUDGET_CACHE_TTL_SECONDS, BUDGET_CACHE_RETRY_SECONDS, EXPENSE_FLUSH_INTERVAL_SECONDS, EXPENSE_FLUSH_BATCH_SIZE,
+    EXPENSE_FLUSH_MAX_BACKOFF_SECONDS, EXPENSE_FLUSH_CLAIM_TIMEOUT_SECONDS,
+)
+from src.langgraph_whatsapp import expense_aggregates
+from src.langgraph_whatsapp.db import get_db_connection
+from src.langgraph_whatsapp.expense_queue import ExpenseWriteQueue
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +27,11 @@ SPREADSHEET_ID = None
 # Define the sheets and ranges
 EXPENSES_SHEET = 'Expenses'
 BUDGETS_SHEET = 'Budgets'
-EXPENSES_RANGE = 'A:C'  # Date, Amount, Category
+EXPENSES_RANGE = 'A:E'  # Date, Amount, Category, User, Entry ID
 BUDGETS_RANGE = 'A:B'   # Category, Budget Amount
 
-def get_sheets_service():
-    """Get a Google Sheets service object for making API calls."""
+def _load_sheets_credentials(interactive: bool = True):
+    """Load stored Sheets credentials, refreshing them or running the OAuth flow if needed."""
     creds = None
     # The file token.pickle stores the user's access and refresh tokens
     token_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sheets_token.pickle')
@@ -46,12 +54,17 @@ def get_sheets_service():
         if creds and creds.expired and creds.refresh_token:
             logger.info("Refreshing expired sheets credentials")
             try:
+                from google.auth.transport.requests import Request
+
                 creds.refresh(Request())
             except Exception as e:
                 logger.error(f"Error refreshing sheets credentials: {e}")
                 creds = None
         
         if not creds:
+            if not interactive:
+                return None
+            
             if not os.path.exists(credentials_file):
                 logger.error(f"Sheets credentials file not found at {credentials_file}")
                 logger.error("Please download sheets_credentials.json from Google Cloud Console")
@@ -63,6 +76,8 @@ def get_sheets_service():
                 
             logger.info(f"Getting fresh sheets credentials using {credentials_file}")
             try:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+
                 flow = InstalledAppFlow.from_client_secrets_file(credentials_file, SCOPES)
                 creds = flow.run_local_server(port=0)
             except Exception as e:
@@ -74,14 +89,166 @@ def get_sheets_service():
                 pickle.dump(creds, token)
                 logger.info(f"Saved sheets credentials to {token_file}")
     
-    try:
-        service = build('sheets', 'v4', credentials=creds)
-        logger.info("Google Sheets service created successfully")
-        return service
-    except Exception as e:
-        logger.error(f"Error building sheets service: {e}")
+    return creds
+
+SERVICE_REGISTRY.register(
+    'sheets', 'sheets', 'v4', _load_sheets_credentials,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sheets_token.pickle')
+)
+
+def get_sheets_service():
+    """Get the shared Google Sheets service object for making API calls."""
+    return SERVICE_REGISTRY.get('sheets')
+
+class BudgetCatalog:
+    """In-memory copy of the Budgets sheet with a TTL.
+
+    Holds the parsed category -> amount rows plus a lowercase index used for
+    exact and substring category matching. Once loaded, an expired catalog is
+    still served while a background thread re-reads the sheet; after a
+    failed refresh, the next one waits ``retry_after_error`` seconds so a
+    degraded Sheets API is not hit on every lookup. Call invalidate() after
+    writing budgets so the next read goes to the sheet.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, retry_after_error: float = 30, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.retry_after_error = retry_after_error
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._rows = None       # [(category, amount or None)] in sheet order
+        self._exact = {}        # lowercase category -> (category, amount)
+        self._lower_rows = []   # [(lowercase category, category, amount)]
+        self._loaded_at = 0.0
+        self._failed_at = None
+        self._refreshing = False
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    def _fetch(self):
+        """Read and parse the Budgets sheet. Returns None if it can't be read."""
+        spreadsheet_id = get_spreadsheet_id()
+        if not spreadsheet_id:
+            return None
+        service = get_sheets_service()
+        if not service:
+            return None
+        result = service.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id,
+            range=f'{BUDGETS_SHEET}!A1:B100'
+        ).execute()
+
+        rows = []
+        for row in result.get('values', [])[1:]:  # Skip header row
+            if len(row) < 1:
+                continue
+            amount = None
+            if len(row) >= 2:
+                try:
+                    amount = float(row[1])
+                except ValueError:
+                    pass
+            rows.append((row[0], amount))
+        return rows
+
+    def _store(self, rows):
+        exact = {}
+        for category, amount in rows:
+            exact.setdefault(category.lower(), (category, amount))
+        with self._lock:
+            self._rows = rows
+            self._exact = exact
+            self._lower_rows = [(category.lower(), category, amount) for category, amount in rows]
+            self._loaded_at = self._clock()
+            self._failed_at = None
+
+    def _reload(self) -> bool:
+        try:
+            rows = self._fetch()
+        except Exception as e:
+            logger.error(f"Error loading budget catalog: {e}")
+            rows = None
+        if rows is None:
+            with self._lock:
+                self.errors += 1
+                self._failed_at = self._clock()
+            return False
+        self._store(rows)
+        self.refreshes += 1
+        return True
+
+    def _background_refresh(self):
+        try:
+            self._reload()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def rows(self):
+        """Return [(category, amount or None)], or None if the sheet can't be read."""
+        with self._lock:
+            loaded = self._rows is not None
+            now = self._clock()
+            expired = now - self._loaded_at > self.ttl_seconds
+            backing_off = self._failed_at is not None and now - self._failed_at < self.retry_after_error
+            if loaded:
+                self.hits += 1
+                if expired and not self._refreshing and not backing_off:
+                    self._refreshing = True
+                    threading.Thread(target=self._background_refresh, name="budget-catalog-refresh", daemon=True).start()
+                return self._rows
+            self.misses += 1
+
+        if not self._reload():
+            return None
+        with self._lock:
+            return self._rows
+
+    def match(self, category: str, require_amount: bool = False):
+        """Find a budget row for a cleaned, lowercase category.
+
+        Tries an exact match first, then a category containing (or contained
+        in) the search term. Returns (category, amount) or None.
+        """
+        if self.rows() is None:
+            return None
+        with self._lock:
+            exact = self._exact.get(category)
+            if exact and (exact[1] or not require_amount):
+                return exact
+            for lower, name, amount in self._lower_rows:
+                if require_amount and not amount:
+                    continue
+                if category in lower or lower in category:
+                    return name, amount
         return None
 
+    def invalidate(self):
+        """Drop the cached rows so the next read goes to the sheet."""
+        with self._lock:
+            self._rows = None
+            self._exact = {}
+            self._lower_rows = []
+            self._loaded_at = 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "categories": len(self._rows) if self._rows is not None else 0,
+                "age_seconds": round(self._clock() - self._loaded_at, 1) if self._rows is not None else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "refreshes": self.refreshes,
+                "errors": self.errors,
+            }
+
+budget_catalog = BudgetCatalog(ttl_seconds=BUDGET_CACHE_TTL_SECONDS, retry_after_error=BUDGET_CACHE_RETRY_SECONDS)
+
+
 def setup_spreadsheet():
     """Create a new spreadsheet with the required sheets and columns if it doesn't exist."""
     global SPREADSHEET_ID
@@ -130,10 +297,10 @@ def setup_spreadsheet():
             f.write(SPREADSHEET_ID)
         
         # Add headers to Expenses sheet
-        values = [['Date', 'Amount', 'Category']]
+        values = [['Date', 'Amount', 'Category', 'User', 'Entry ID']]
         service.spreadsheets().values().update(
             spreadsheetId=SPREADSHEET_ID,
-            range=f'{EXPENSES_SHEET}!A1:C1',
+            range=f'{EXPENSES_SHEET}!A1:E1',
             valueInputOption='RAW',
             body={'values': values}
         ).execute()
@@ -183,6 +350,8 @@ def setup_spreadsheet():
             body={'values': values}
         ).execute()
         
+        budget_catalog.invalidate()
+        
         logger.info(f"Spreadsheet setup complete. URL: https://docs.google.com/spreadsheets/d/{SPREADSHEET_ID}")
         return SPREADSHEET_ID
         
@@ -190,23 +359,82 @@ def setup_spreadsheet():
         logger.error(f"Error creating spreadsheet: {e}")
         return None
 
-# Make sure we have a valid spreadsheet ID
-if not SPREADSHEET_ID:
-    SPREADSHEET_ID = setup_spreadsheet()
+_discovery_lock = threading.Lock()
+_discovery = None
 
-def add_expense(amount, category):
-    """Add an expense to the Google Sheet."""
-    global SPREADSHEET_ID
-    
-    # Ensure we have a valid spreadsheet
-    if not SPREADSHEET_ID:
-        SPREADSHEET_ID = setup_spreadsheet()
-        if not SPREADSHEET_ID:
-            return "Could not create or access Google Sheet. Please try again later."
+def get_spreadsheet_id():
+    """Return the spreadsheet ID, finding or creating the spreadsheet on first use.
+
+    Discovery is single-flight: concurrent callers wait on the one lookup in
+    progress and share its result, including a failure (the next call after
+    that tries again). Nothing runs at import, so loading this module does no
+    file, network or OAuth work.
+    """
+    global _discovery
+    if SPREADSHEET_ID:
+        return SPREADSHEET_ID
+    with _discovery_lock:
+        if SPREADSHEET_ID:
+            return SPREADSHEET_ID
+        discovery, leader = _discovery, _discovery is None
+        if leader:
+            discovery = _discovery = Future()
+    if leader:
+        try:
+            discovery.set_result(setup_spreadsheet())
+        except Exception as e:
+            logger.error(f"Error setting up spreadsheet: {e}")
+            discovery.set_result(None)
+        finally:
+            with _discovery_lock:
+                _discovery = None
+    return discovery.result()
+
+def _append_expense_rows(rows):
+    """Append a batch of [date, amount, category, user, entry id] rows to the Expenses sheet in one call."""
+    spreadsheet_id = get_spreadsheet_id()
+    if not spreadsheet_id:
+        raise RuntimeError("Could not create or access Google Sheet")
     
     service = get_sheets_service()
     if not service:
-        return "Could not connect to Google Sheets. Please check your credentials."
+        raise RuntimeError("Could not connect to Google Sheets")
+    
+    service.spreadsheets().values().append(
+        spreadsheetId=spreadsheet_id,
+        range=f'{EXPENSES_SHEET}!A2',
+        valueInputOption='USER_ENTERED',
+        insertDataOption='INSERT_ROWS',
+        body={'values': rows}
+    ).execute()
+
+def _written_expense_entries():
+    """Entry ids of the rows already in the Expenses sheet."""
+    spreadsheet_id = get_spreadsheet_id()
+    service = get_sheets_service() if spreadsheet_id else None
+    if not service:
+        raise RuntimeError("Could not read expense entry ids from the sheet")
+    result = service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=f'{EXPENSES_SHEET}!E2:E'
+    ).execute()
+    return {row[0] for row in result.get('values', []) if row}
+
+expense_write_queue = ExpenseWriteQueue(
+    _append_expense_rows,
+    written_entries=_written_expense_entries,
+    interval=EXPENSE_FLUSH_INTERVAL_SECONDS,
+    batch_size=EXPENSE_FLUSH_BATCH_SIZE,
+    max_backoff=EXPENSE_FLUSH_MAX_BACKOFF_SECONDS,
+    claim_timeout=EXPENSE_FLUSH_CLAIM_TIMEOUT_SECONDS,
+)
+
+def add_expense(amount, category, user_id=""):
+    """Add an expense to the Google Sheet and the local month-to-date totals."""
+    # Ensure we have a valid spreadsheet
+    spreadsheet_id = get_spreadsheet_id()
+    if not spreadsheet_id:
+        return "Could not create or access Google Sheet. Please try again later."
     
     try:
         # Format today's date
@@ -220,30 +448,9 @@ def add_expense(amount, category):
         category = category.split(' on')[0].strip()
         category = category.split(' in')[0].strip()
         
-        # Try to match with an existing category
-        budget_result = service.spreadsheets().values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f'{BUDGETS_SHEET}!A1:B100'
-        ).execute()
-        
-        budget_rows = budget_result.get('values', [])
-        matched_category = None
-        
-        # First try exact match
-        for row in budget_rows[1:]:  # Skip header row
-            if len(row) >= 1 and row[0].lower() == category:
-                matched_category = row[0]
-                break
-        
-        # If no exact match, try to find a category that contains the search term
-        if not matched_category:
-            for row in budget_rows[1:]:
-                if len(row) >= 1 and (
-                    category in row[0].lower() or
-                    row[0].lower() in category
-                ):
-                    matched_category = row[0]
-                    break
+        # Try to match with an existing category from the cached budget catalog
+        match = budget_catalog.match(category)
+        matched_category = match[0] if match else None
         
         # Use the matched category if found, otherwise use original with first letter capitalized
         if matched_category:
@@ -252,18 +459,19 @@ def add_expense(amount, category):
             # Capitalize first letter of each word for better formatting
             category = ' '.join(word.capitalize() for word in category.split())
         
-        # Prepare the data to append
-        values = [[today, amount, category]]
-        
-        # Append to the expenses sheet
-        body = {'values': values}
-        result = service.spreadsheets().values().append(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f'{EXPENSES_SHEET}!A2',
-            valueInputOption='USER_ENTERED',
-            insertDataOption='INSERT_ROWS',
-            body=body
-        ).execute()
+        # Queue the row for the sheet (the write-behind queue appends it with other pending rows)
+        # and keep the month-to-date totals in step, in one transaction so that a rebuild's
+        # ledger snapshot sees both or neither
+        conn = get_db_connection()
+        try:
+            with conn:
+                expense_write_queue.enqueue(user_id, today, amount, category, conn=conn)
+                try:
+                    expense_aggregates.record_expense(user_id, today, category, float(amount), conn=conn)
+                except Exception as e:
+                    logger.error(f"Error updating expense totals (will be fixed by reconciliation): {e}")
+        finally:
+            conn.close()
         
         return f"Added expense: {amount} for {category}"
     
@@ -271,31 +479,96 @@ def add_expense(amount, category):
         logger.error(f"Error adding expense: {e}")
         return f"Error adding expense: {e}"
 
+def read_expense_rows():
+    """Read every row of the Expenses sheet (header excluded). Returns None on failure."""
+    spreadsheet_id = get_spreadsheet_id()
+    if not spreadsheet_id:
+        return None
+    service = get_sheets_service()
+    if not service:
+        return None
+    result = service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=f'{EXPENSES_SHEET}!A2:E'
+    ).execute()
+    return result.get('values', [])
+
+@contextmanager
+def ledger_snapshot():
+    """Yield (rows, conn): the sheet plus the rows still queued, or (None, conn) on failure.
+
+    Flushes are held off while the sheet is read, and the queued rows are
+    read inside a write transaction on ``conn`` that stays open until the
+    block ends. add_expense queues a row and updates the totals in one
+    transaction, so an expense added meanwhile is either in the snapshot or
+    recorded after the caller's rebuild, never both or neither. A queued row
+    whose entry id is already in the sheet (appended by a flush that has not
+    deleted it yet) is counted once.
+    """
+    conn = get_db_connection()
+    try:
+        with expense_write_queue.paused():
+            rows = read_expense_rows()
+            if rows is not None:
+                conn.execute("BEGIN IMMEDIATE")
+                written = {row[4] for row in rows if len(row) >= 5}
+                rows = rows + [row for row in expense_write_queue.pending_rows(conn) if row[4] not in written]
+        with conn:
+            yield rows, conn
+    finally:
+        conn.close()
+
+def rebuild_expense_totals():
+    """Rebuild the local month-to-date totals from the full expense ledger."""
+    with ledger_snapshot() as (rows, conn):
+        if rows is None:
+            logger.error("Could not read expenses to rebuild totals")
+            return None
+        return expense_aggregates.rebuild(rows, conn)
+
+def reconcile_expense_totals(repair=True):
+    """Compare the local totals with the Expenses sheet and rebuild them on drift.
+
+    Returns the list of drifted buckets, or None if the sheet couldn't be read.
+    """
+    try:
+        with ledger_snapshot() as (rows, conn):
+            if rows is None:
+                logger.warning("Skipping expense totals reconciliation: sheet unavailable")
+                return None
+            drift = expense_aggregates.find_drift(rows, conn)
+            if drift:
+                logger.warning(f"Expense totals drifted from the sheet in {len(drift)} buckets: {drift[:5]}")
+                if repair:
+                    expense_aggregates.rebuild(rows, conn)
+            else:
+                logger.info("Expense totals match the sheet")
+            return drift
+    except Exception as e:
+        logger.error(f"Error reconciling expense totals: {e}")
+        return None
+
+def get_month_expense_totals(month):
+    """Return {category: total} spent in a 'YYYY-MM' month across all users."""
+    if not expense_aggregates.is_built():
+        rebuild_expense_totals()
+    return expense_aggregates.month_totals(month)
+
 def check_budget(category):
     """Check budget for a specific category."""
-    global SPREADSHEET_ID
-    
     # Ensure we have a valid spreadsheet
-    if not SPREADSHEET_ID:
-        SPREADSHEET_ID = setup_spreadsheet()
-        if not SPREADSHEET_ID:
-            return "Could not create or access Google Sheet. Please try again later."
-    
-    service = get_sheets_service()
-    if not service:
-        return "Could not connect to Google Sheets. Please check your credentials."
+    spreadsheet_id = get_spreadsheet_id()
+    if not spreadsheet_id:
+        return "Could not create or access Google Sheet. Please try again later."
     
     try:
+        # Budgets come from the cached catalog; only expenses are read from the sheet
         # Check if requesting all budgets
         if category.lower() == "all":
-            # Get all budget categories and amounts
-            budget_result = service.spreadsheets().values().get(
-                spreadsheetId=SPREADSHEET_ID,
-                range=f'{BUDGETS_SHEET}!A1:B100'
-            ).execute()
-            
-            budget_rows = budget_result.get('values', [])
-            if not budget_rows or len(budget_rows) <= 1:
+            budget_rows = budget_catalog.rows()
+            if budget_rows is None:
+                return "Could not connect to Google Sheets. Please check your credentials."
+            if not budget_rows:
                 return "No budget data found."
             
             # Create a formatted response with all budget categories
@@ -303,17 +576,13 @@ def check_budget(category):
             
             # Get top categories with higher budgets (up to 8)
             top_categories = []
-            for row in budget_rows[1:]:  # Skip header
-                if len(row) >= 2:
-                    category_name = row[0]
-                    try:
-                        budget_amount = float(row[1])
-                        # Add only main categories, avoiding duplicates like Food/Dining
-                        # and categories with higher budgets
-                        if len(top_categories) < 8 and not any(cat.startswith(category_name.split()[0]) for cat, _ in top_categories):
-                            top_categories.append((category_name, budget_amount))
-                    except ValueError:
-                        continue
+            for category_name, budget_amount in budget_rows:
+                if budget_amount is None:
+                    continue
+                # Add only main categories, avoiding duplicates like Food/Dining
+                # and categories with higher budgets
+                if len(top_categories) < 8 and not any(cat.startswith(category_name.split()[0]) for cat, _ in top_categories):
+                    top_categories.append((category_name, budget_amount))
             
             # Sort by budget amount (highest first)
             top_categories.sort(key=lambda x: x[1], reverse=True)
@@ -334,76 +603,42 @@ def check_budget(category):
         
         logger.info(f"Cleaned category for budget check: '{category}'")
         
-        # Get budgets
-        budget_result = service.spreadsheets().values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f'{BUDGETS_SHEET}!A1:B100'
-        ).execute()
-        
-        budget_rows = budget_result.get('values', [])
-        if not budget_rows:
-            return "No budget data found."
+        # Find budget for the specified category: exact match first, then substring
+        match = budget_catalog.match(category, require_amount=True)
         
-        # Find budget for the specified category
-        budget_amount = 0
-        matched_category = None
-        
-        # First try exact match
-        for row in budget_rows[1:]:  # Skip header row
-            if len(row) >= 2 and row[0].lower() == category:
-                budget_amount = float(row[1])
-                matched_category = row[0]
-                break
-        
-        # If no exact match, try to find a category that contains the search term
-        if budget_amount == 0:
-            for row in budget_rows[1:]:
-                if len(row) >= 2 and (
-                    category in row[0].lower() or
-                    row[0].lower() in category
-                ):
-                    budget_amount = float(row[1])
-                    matched_category = row[0]
-                    break
-        
-        if budget_amount == 0:
+        if not match:
+            budget_rows = budget_catalog.rows()
+            if budget_rows is None:
+                return "Could not connect to Google Sheets. Please check your credentials."
+            if not budget_rows:
+                return "No budget data found."
+            
             # Get all available categories for the error message
-            categories = [row[0] for row in budget_rows[1:] if len(row) >= 1]
+            categories = [name for name, _ in budget_rows]
             categories_str = ", ".join(categories[:10])  # Show first 10 categories
             if len(categories) > 10:
                 categories_str += "..."
                 
             return f"No budget found for category: {category}. Available categories: {categories_str}"
         
-        # Get expenses for the current month
-        current_month = datetime.now().strftime('%Y-%m')
-        
-        expense_result = service.spreadsheets().values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f'{EXPENSES_SHEET}!A1:C100'
-        ).execute()
+        matched_category, budget_amount = match
         
-        expense_rows = expense_result.get('values', [])
-        if not expense_rows or len(expense_rows) <= 1:
+        # Get this month's expense totals from the local aggregate store
+        current_month = datetime.now().strftime('%Y-%m')
+        category_totals = get_month_expense_totals(current_month)
+        if not category_totals:
             return f"Budget for {matched_category}: {budget_amount}. No expenses recorded yet."
         
         # Calculate total expenses for the category this month
+        # Use flexible matching for categories
         total_spent = 0
-        for row in expense_rows[1:]:  # Skip header row
-            if len(row) >= 3:
-                expense_date = row[0]
-                expense_amount = float(row[1])
-                expense_category = row[2].lower()
-                
-                # Check if expense is from current month and for the specified category
-                # Use flexible matching for categories
-                if expense_date.startswith(current_month) and (
-                    expense_category == category.lower() or
-                    category.lower() in expense_category or
-                    expense_category in category.lower() or
-                    expense_category == matched_category.lower()
-                ):
-                    total_spent += expense_amount
+        for expense_category, expense_total in category_totals.items():
+            expense_category = expense_category.lower()
+            if (expense_category == category or
+                category in expense_category or
+                expense_category in category or
+                expense_category == matched_category.lower()):
+                total_spent += expense_total
         
         # Calculate remaining budget
         remaining = budget_amount - total_spent
@@ -416,32 +651,29 @@ def check_budget(category):
 
 def list_recent_expenses(limit=5):
     """List the most recent expenses."""
-    global SPREADSHEET_ID
-    
     # Ensure we have a valid spreadsheet
-    if not SPREADSHEET_ID:
-        SPREADSHEET_ID = setup_spreadsheet()
-        if not SPREADSHEET_ID:
-            return "Could not create or access Google Sheet. Please try again later."
+    spreadsheet_id = get_spreadsheet_id()
+    if not spreadsheet_id:
+        return "Could not create or access Google Sheet. Please try again later."
     
     service = get_sheets_service()
     if not service:
         return "Could not connect to Google Sheets. Please check your credentials."
     
     try:
-        # Get expenses
-        result = service.spreadsheets().values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f'{EXPENSES_SHEET}!A1:C100'
-        ).execute()
-        
-        rows = result.get('values', [])
-        if not rows or len(rows) <= 1:
+        # Expenses still waiting to be written, read before the sheet: a row flushed in between is
+        # then in both, never in neither, and is listed once by its entry id
+        pending = expense_write_queue.pending_rows()
+        # The whole sheet: the latest rows are at the bottom however long it grows
+        rows = read_expense_rows()
+        if rows is None:
+            return "Could not connect to Google Sheets. Please check your credentials."
+        written = {row[4] for row in rows if len(row) >= 5}
+        rows = rows + [row for row in pending if row[4] not in written]
+        if not rows:
             return "No expenses found."
-        
-        # Skip header and get the last 'limit' rows
-        recent_expenses = rows[1:] if len(rows) > 1 else []
-        recent_expenses = recent_expenses[-limit:]
+
+        recent_expenses = rows[-limit:]
         
         if not recent_expenses:
             return "No recent expenses found."
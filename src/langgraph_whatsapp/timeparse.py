@@ -0,0 +1,218 @@
+import logging
+import re
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional, Sequence
+from zoneinfo import ZoneInfo
+
+from src.langgraph_whatsapp.config import TIMEPARSE_LANGUAGES, TIMEPARSE_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+_NUMBERS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "fifteen": 15, "twenty": 20, "thirty": 30, "forty five": 45,
+}
+_UNITS = {
+    "s": "seconds", "sec": "seconds", "secs": "seconds", "second": "seconds", "seconds": "seconds",
+    "m": "minutes", "min": "minutes", "mins": "minutes", "minute": "minutes", "minutes": "minutes",
+    "h": "hours", "hr": "hours", "hrs": "hours", "hour": "hours", "hours": "hours",
+    "d": "days", "day": "days", "days": "days",
+    "w": "weeks", "week": "weeks", "weeks": "weeks",
+}
+_WEEKDAYS = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tues": 1, "tue": 1, "wednesday": 2, "wed": 2,
+    "thursday": 3, "thurs": 3, "thur": 3, "thu": 3, "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5, "sunday": 6, "sun": 6,
+}
+# Times of day given as words, as (hour, minute)
+_DAY_PARTS = {"noon": (12, 0), "midday": (12, 0), "midnight": (0, 0), "morning": (9, 0),
+              "afternoon": (15, 0), "evening": (18, 0), "night": (21, 0), "tonight": (21, 0)}
+
+# Number words need a space before the unit, so "and" is not read as "an" + "d"
+_AMOUNT = r"\d+(?:\.\d+)?\s*|(?:half an?|" + "|".join(sorted(_NUMBERS, key=len, reverse=True)) + r")\s+"
+_UNIT = "|".join(sorted(_UNITS, key=len, reverse=True))
+_DURATION_PART = re.compile(rf"\b(?P<amount>{_AMOUNT})(?P<unit>{_UNIT})\b")
+_DURATION = rf"(?:\b(?:{_AMOUNT})(?:{_UNIT})\b(?:\s+and\s+|\s+)?)+"
+_RELATIVE = re.compile(
+    rf"^(?:in|after)\s+(?P<duration>{_DURATION})(?:\s*from now)?$|^(?P<duration_from_now>{_DURATION})\s*from now$"
+)
+
+_DAY = (
+    r"(?P<day>today|tonight|tomorrow|tmrw|tmr|(?:the\s+)?day after tomorrow"
+    r"|(?:(?P<which>next|this|coming)\s+)?(?P<weekday>" + "|".join(sorted(_WEEKDAYS, key=len, reverse=True)) + r")"
+    r"|(?P<iso_date>\d{4}-\d{2}-\d{2}))"
+)
+_TIME = (
+    r"(?P<time>(?P<part>" + "|".join(_DAY_PARTS) + r")"
+    r"|(?P<hour>\d{1,2})(?:[:.](?P<minute>\d{2}))?(?::(?P<second>\d{2}))?\s*(?P<ampm>[ap])\.?m\.?"
+    r"|(?P<hour24>\d{1,2})[:.](?P<minute24>\d{2})(?::(?P<second24>\d{2}))?"
+    r"|(?P<hhmm>\d{3,4})|(?P<bare_hour>\d{1,2}))"
+)
+# "tomorrow at 10am", "friday 18:30", "2026-10-20T09:00", "7pm", "at 7pm on monday", "18:39"
+_DAY_THEN_TIME = re.compile(rf"^(?:on\s+)?{_DAY}(?:(?:\s+(?:at|@|by|in the)\s+|\s+|t){_TIME})?$")
+_TIME_THEN_DAY = re.compile(rf"^(?:(?:at|@|by)\s+)?{_TIME}(?:\s+(?:on\s+)?{_DAY})?$")
+
+
+class TimeParser:
+    """Turns reminder and calendar time expressions into naive local datetimes.
+
+    The common grammar ("7pm", "18:39", "in 2 hours", "tomorrow at 10am",
+    "next friday 9:30", ISO dates) is handled by precompiled rules in a few
+    microseconds. Anything else goes to ``dateparser`` restricted to
+    ``languages`` (no language detection), behind an LRU memo of
+    ``cache_size`` entries keyed on (text, reference minute, timezone), so a
+    repeated phrase costs a dict lookup for the rest of that minute.
+
+    Times of day without a date are the next such time (today, or tomorrow if
+    already past); a weekday is the next such day. Results are naive, in
+    ``timezone`` when given, otherwise in local time.
+    """
+
+    def __init__(self, languages: Sequence[str] = ("en",), cache_size: int = 1024):
+        self.languages = list(languages)
+        self._dateparse = lru_cache(maxsize=cache_size)(self._dateparse_uncached)
+        self._lock = threading.Lock()
+        self.rule_hits = 0
+        self.fallbacks = 0
+        self.unparsed = 0
+
+    def parse(self, text: str, now: datetime = None, timezone: str = None) -> Optional[datetime]:
+        """Parse ``text`` relative to ``now`` (default: the current time). Returns None if it isn't a time."""
+        if now is None:
+            now = datetime.now(ZoneInfo(timezone)).replace(tzinfo=None) if timezone else datetime.now()
+        normalized = " ".join(text.lower().replace(",", " ").split()).rstrip(".!?")
+        if not normalized:
+            return None
+
+        result = self._parse_rules(normalized, now)
+        if result is not None:
+            with self._lock:
+                self.rule_hits += 1
+            return result
+
+        with self._lock:
+            self.fallbacks += 1
+        result = self._dateparse(normalized, now.replace(second=0, microsecond=0), timezone)
+        if result is None:
+            with self._lock:
+                self.unparsed += 1
+        return result
+
+    def _parse_rules(self, text: str, now: datetime) -> Optional[datetime]:
+        match = _RELATIVE.match(text)
+        if match:
+            delta = timedelta()
+            for part in _DURATION_PART.finditer(match.group("duration") or match.group("duration_from_now")):
+                amount = part.group("amount").strip()
+                if amount.startswith("half"):
+                    value = 0.5
+                else:
+                    value = _NUMBERS[amount] if amount in _NUMBERS else float(amount)
+                delta += timedelta(**{_UNITS[part.group("unit")]: value})
+            return now + delta
+
+        match = _DAY_THEN_TIME.match(text) or _TIME_THEN_DAY.match(text)
+        if not match:
+            return None
+        try:
+            day = self._resolve_day(match, now)
+            clock = self._resolve_time(match, day)
+        except ValueError:
+            # Out-of-range hour, minute or date; let dateparser have a go
+            return None
+        if day is None:
+            if clock is None:
+                return None
+            result = now.replace(hour=clock[0], minute=clock[1], second=clock[2], microsecond=0)
+            return result if result > now else result + timedelta(days=1)
+        if clock is None and match.group("iso_date"):
+            return datetime.combine(day, datetime.min.time())
+        if clock is None and match.group("day") == "tonight":
+            clock = _DAY_PARTS["tonight"] + (0,)
+        if clock is None:
+            # A bare day keeps the current time of day, as dateparser does
+            result = datetime.combine(day, now.time())
+        else:
+            result = datetime.combine(day, datetime.min.time()).replace(hour=clock[0], minute=clock[1], second=clock[2])
+        if match.group("weekday") and result <= now:
+            result += timedelta(days=7)
+        return result
+
+    @staticmethod
+    def _resolve_day(match, now: datetime):
+        day = match.group("day")
+        if day is None:
+            return None
+        today = now.date()
+        if match.group("iso_date"):
+            return datetime.strptime(match.group("iso_date"), "%Y-%m-%d").date()
+        if day in ("today", "tonight"):
+            return today
+        if day in ("tomorrow", "tmrw", "tmr"):
+            return today + timedelta(days=1)
+        if day.endswith("day after tomorrow"):
+            return today + timedelta(days=2)
+        ahead = (_WEEKDAYS[match.group("weekday")] - today.weekday()) % 7
+        if ahead == 0 and match.group("which") == "next":
+            ahead = 7
+        return today + timedelta(days=ahead)
+
+    @staticmethod
+    def _resolve_time(match, day) -> Optional[tuple]:
+        if match.group("time") is None:
+            return None
+        if match.group("part"):
+            return _DAY_PARTS[match.group("part")] + (0,)
+        if match.group("hour"):
+            hour, minute = int(match.group("hour")), int(match.group("minute") or 0)
+            second = int(match.group("second") or 0)
+            if not 1 <= hour <= 12:
+                raise ValueError(f"hour {hour} with am/pm")
+            hour = hour % 12 + (12 if match.group("ampm") == "p" else 0)
+        elif match.group("hour24"):
+            hour, minute = int(match.group("hour24")), int(match.group("minute24"))
+            second = int(match.group("second24") or 0)
+        elif match.group("hhmm"):
+            digits = match.group("hhmm").zfill(4)
+            hour, minute, second = int(digits[:2]), int(digits[2:]), 0
+        else:
+            hour, minute, second = int(match.group("bare_hour")), 0, 0
+            # "tonight at 9" is 21:00
+            if match.group("day") == "tonight" and hour < 12:
+                hour += 12
+        if hour > 23 or minute > 59 or second > 59:
+            raise ValueError(f"{hour}:{minute}:{second}")
+        return hour, minute, second
+
+    def _dateparse_uncached(self, text: str, reference: datetime, timezone: Optional[str]) -> Optional[datetime]:
+        # Imported on first use: dateparser is slow to import and most phrases never need it
+        import dateparser
+
+        settings = {"RELATIVE_BASE": reference}
+        if timezone:
+            settings["TIMEZONE"] = timezone
+        try:
+            return dateparser.parse(text, languages=self.languages, settings=settings)
+        except Exception as e:
+            logger.error(f"dateparser failed on '{text}': {e}")
+            return None
+
+    def stats(self) -> dict:
+        cache = self._dateparse.cache_info()
+        return {
+            "rule_hits": self.rule_hits,
+            "fallbacks": self.fallbacks,
+            "unparsed": self.unparsed,
+            "fallback_cache_hits": cache.hits,
+            "fallback_cache_misses": cache.misses,
+            "fallback_cache_size": cache.currsize,
+        }
+
+
+TIME_PARSER = TimeParser(
+    languages=[language.strip() for language in TIMEPARSE_LANGUAGES.split(",") if language.strip()],
+    cache_size=TIMEPARSE_CACHE_SIZE,
+)
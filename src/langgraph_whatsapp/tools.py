@@ -1,16 +1,27 @@
 import sqlite3
 import os
 import logging
-import re
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
-import dateparser
-from twilio.rest import Client
-from apscheduler.schedulers.background import BackgroundScheduler
 from src.langgraph_whatsapp.db import get_db_connection
+from src.langgraph_whatsapp.intents import URL_PATTERN
 from src.langgraph_whatsapp.calendar_setup import get_calendar_service
-from src.langgraph_whatsapp.sheets_setup import add_expense, check_budget, list_recent_expenses, get_sheets_service, SPREADSHEET_ID, BUDGETS_SHEET, EXPENSES_SHEET
-import pytz
+from src.langgraph_whatsapp.sheets_setup import add_expense, check_budget, list_recent_expenses, budget_catalog, get_month_expense_totals, reconcile_expense_totals, expense_write_queue
+from src.langgraph_whatsapp.config import (
+    EXPENSE_RECONCILE_INTERVAL_MINUTES, LINK_SEARCH_PAGE_SIZE, LINK_SEARCH_RECENCY_WEIGHT,
+    REMINDER_WINDOW_SECONDS, REMINDER_PAGE_SIZE, REMINDER_MISFIRE_GRACE_SECONDS, REMINDER_SEND_WORKERS,
+    REMINDER_MAINTENANCE_INTERVAL_MINUTES, REMINDER_ARCHIVE_AFTER_DAYS, REMINDER_ARCHIVE_BATCH_SIZE,
+    REMINDER_MISSED_AFTER_SECONDS, REMINDER_VACUUM_PAGES, REMINDER_POLL_SECONDS,
+    SCHEDULER_LEASE_TTL_SECONDS, SCHEDULER_LEASE_RENEW_SECONDS,
+)
+from src.langgraph_whatsapp.link_search import LinkPage, search_links
+from src.langgraph_whatsapp.link_store import SaveResult, save_links as store_links
+from src.langgraph_whatsapp.unfurl import LINK_UNFURLER
+from src.langgraph_whatsapp.outbound import OUTBOUND_DISPATCHER
+from src.langgraph_whatsapp.timeparse import TIME_PARSER
+from src.langgraph_whatsapp.reminder_scheduler import ReminderScheduler, TIME_FORMAT as REMINDER_TIME_FORMAT
+from src.langgraph_whatsapp.reminder_lifecycle import ReminderLifecycle
+from src.langgraph_whatsapp.leader import LeaderLease
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +30,8 @@ def extract_links(text: str) -> List[str]:
     if not text:
         return []
     
-    # URL regex pattern - more comprehensive to catch more complex URLs
-    url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+(?:/[-\w%/.\[\]~!$&\'()*+,;=:@]*)*/?' 
-    
-    # Extract all URLs using the better pattern
-    urls = re.findall(url_pattern, text)
+    # Extract all URLs using the shared precompiled pattern
+    urls = URL_PATTERN.findall(text)
     
     # Expand github.com URLs that might have been shortened
     for i, url in enumerate(urls):
@@ -48,11 +56,8 @@ def save_link(user_id: str, link: str) -> str:
         return f"Error: '{link}' doesn't appear to be a valid URL. It should start with http:// or https://"
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO links (user_id, link) VALUES (?, ?)", (user_id, link))
-        conn.commit()
-        conn.close()
+        if save_links(user_id, [link]).duplicates:
+            return f"Link '{link}' was already saved."
         return f"Link '{link}' saved successfully."
     except sqlite3.Error as e:
         logger.error(f"Database error saving link: {e}")
@@ -61,25 +66,27 @@ def save_link(user_id: str, link: str) -> str:
         logger.error(f"Error saving link: {e}")
         return f"An error occurred: {e}"
 
+def save_links(user_id: str, links: List[str]) -> SaveResult:
+    """Saves every link from a message, skipping ones already saved, and queues them for unfurling."""
+    result = store_links(user_id, links)
+    # Titles are fetched in the background; stale metadata of re-shared links is refreshed too
+    LINK_UNFURLER.submit(result.saved + result.duplicates)
+    return result
+
 def retrieve_links(user_id: str, keyword: str = None) -> List[str]:
-    """Retrieves all saved links for the user."""
+    """Retrieves the user's saved links, optionally only those matching a keyword."""
     if not user_id:
         return []
     
     try:
+        if keyword:
+            # Most relevant matches from the full-text index
+            return [result.link for result in find_links(user_id, keyword).results]
+
         conn = get_db_connection()
         cursor = conn.cursor()
-        
-        if keyword:
-            # Filter links by keyword
-            keyword_pattern = f"%{keyword}%"
-            cursor.execute(
-                "SELECT link FROM links WHERE user_id = ? AND link LIKE ? ORDER BY timestamp DESC", 
-                (user_id, keyword_pattern)
-            )
-        else:
-            # Retrieve all links
-            cursor.execute("SELECT link FROM links WHERE user_id = ? ORDER BY timestamp DESC", (user_id,))
+        # Retrieve all links
+        cursor.execute("SELECT link FROM links WHERE user_id = ? ORDER BY timestamp DESC", (user_id,))
             
         links = [row['link'] for row in cursor.fetchall()]
         conn.close()
@@ -92,10 +99,30 @@ def retrieve_links(user_id: str, keyword: str = None) -> List[str]:
         logger.error(f"Error retrieving links: {e}")
         return []
 
+def find_links(user_id: str, query: str = None, page: int = 1) -> LinkPage:
+    """Searches the user's saved links by keyword (host, path words or title); newest first without a query."""
+    return search_links(
+        user_id, query, page=page,
+        page_size=LINK_SEARCH_PAGE_SIZE, recency_weight=LINK_SEARCH_RECENCY_WEIGHT,
+    )
+
+def list_reminders(user_id: str) -> List[sqlite3.Row]:
+    """Returns the user's pending reminders, soonest first."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT task, reminder_time FROM reminders
+            WHERE user_id = ? AND completed = 0
+            ORDER BY reminder_time ASC
+        """, (user_id,))
+        return cursor.fetchall()
+    finally:
+        conn.close()
+
 def set_reminder(user_id: str, reminder_time_str: str, task: str) -> str:
     """Sets a reminder for the user at a specific time for a given task."""
-    global scheduler
-    if scheduler is None:
+    if not SCHEDULER_LEASE.running:
         initialize_scheduler()
     
     if not user_id or not reminder_time_str or not task:
@@ -104,91 +131,9 @@ def set_reminder(user_id: str, reminder_time_str: str, task: str) -> str:
     # Preprocess the time string to handle more formats
     logger.info(f"Original time string: {reminder_time_str}")
     
-    # Handle common time formats like "7pm"
-    am_pm_pattern = re.compile(r'(\d+)(?:[\.:](\d+))?\s*(am|pm)', re.IGNORECASE)
-    am_pm_match = am_pm_pattern.match(reminder_time_str)
-    
-    if am_pm_match:
-        # We have a time like "7pm" or "7:30pm" or "7.03pm"
-        hour = int(am_pm_match.group(1))
-        minute = int(am_pm_match.group(2) or 0)  # Default to 0 if no minutes
-        am_pm = am_pm_match.group(3).lower()
-        
-        # Adjust for PM
-        if am_pm == 'pm' and hour < 12:
-            hour += 12
-        # Adjust for AM
-        elif am_pm == 'am' and hour == 12:
-            hour = 0
-            
-        # Create datetime for today - FIXED: don't use dateparser for simple times
-        now = datetime.now()
-        current_year = now.year
-        current_month = now.month
-        current_day = now.day
-        
-        reminder_dt = datetime(
-            year=current_year,
-            month=current_month,
-            day=current_day,
-            hour=hour,
-            minute=minute,
-            second=0,
-            microsecond=0
-        )
-        
-        # If the time is already past for today, set it for tomorrow
-        if reminder_dt <= now:
-            reminder_dt = reminder_dt + timedelta(days=1)
-            logger.info(f"Time already passed today, setting for tomorrow: {reminder_dt}")
-            
-        logger.info(f"Parsed time from '{reminder_time_str}': {reminder_dt}")
-    
-    # Handle 24-hour times without AM/PM
-    elif reminder_time_str.replace(":", "").replace(".", "").isdigit():
-        # Looks like a 24-hour time without AM/PM
-        if "." in reminder_time_str:
-            # Convert 18.39 to 18:39
-            reminder_time_str = reminder_time_str.replace(".", ":")
-        
-        # Parse hours and minutes
-        if ":" in reminder_time_str:
-            hours, minutes = map(int, reminder_time_str.split(":"))
-        else:
-            # Handle time without colon (e.g., "1830")
-            time_str = reminder_time_str.zfill(4)  # Ensure 4 digits
-            hours, minutes = int(time_str[:2]), int(time_str[2:])
-        
-        # Create datetime for today with the specified time
-        now = datetime.now()
-        reminder_dt = now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
-        
-        # If the time is already past for today, set it for tomorrow
-        if reminder_dt <= now:
-            reminder_dt = reminder_dt + timedelta(days=1)
-            logger.info(f"Time already passed today, setting for tomorrow: {reminder_dt}")
-        
-        logger.info(f"Created datetime from 24-hour time: {reminder_dt}")
-    else:
-        # For other time formats, use dateparser
-        try:
-            now = datetime.now()
-            reminder_dt = dateparser.parse(reminder_time_str)
-            logger.info(f"Parsed datetime using dateparser: {reminder_dt}")
-            
-            # Adjust the year/month/day if dateparser set it far in the future
-            # This ensures reminders are scheduled for today/tomorrow, not next year
-            if reminder_dt and reminder_dt.year > now.year:
-                reminder_dt = reminder_dt.replace(year=now.year, month=now.month, day=now.day)
-                logger.info(f"Adjusted future date to current date: {reminder_dt}")
-                
-                # If time already passed for today, set it for tomorrow
-                if reminder_dt <= now:
-                    reminder_dt = reminder_dt + timedelta(days=1)
-                    logger.info(f"Time already passed today, adjusted to tomorrow: {reminder_dt}")
-        except Exception as e:
-            logger.error(f"Error parsing time '{reminder_time_str}': {e}")
-            return f"Error: I couldn't understand the time '{reminder_time_str}'. Please use a format like '3pm', '15:00', or 'tomorrow at 10am'."
+    # "7pm", "18:39", "in 2 hours", "tomorrow at 10am"... by rule; anything else via dateparser
+    reminder_dt = TIME_PARSER.parse(reminder_time_str)
+    logger.info(f"Parsed time from '{reminder_time_str}': {reminder_dt}")
 
     if not reminder_dt:
         return f"Error: I couldn't understand the time '{reminder_time_str}'. Please use a clearer format (e.g., '9:30 PM', 'tomorrow at 10am', 'in 2 hours')."
@@ -204,40 +149,29 @@ def set_reminder(user_id: str, reminder_time_str: str, task: str) -> str:
         else:
             return f"Error: The reminder time '{reminder_time_str}' seems to be in the past."
 
+    # Force the year to be current year (not 2025)
+    current_year = datetime.now().year
+    if reminder_dt.year != current_year:
+        logger.warning(f"Fixing incorrect year {reminder_dt.year} to current year {current_year}")
+        reminder_dt = reminder_dt.replace(year=current_year)
+        logger.info(f"Updated reminder datetime: {reminder_dt}")
+
     try:
-        # Save the reminder to the database
+        # Save the reminder to the database; the table is the schedule
+        reminder_time = reminder_dt.strftime(REMINDER_TIME_FORMAT)
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute(
             "INSERT INTO reminders (user_id, task, reminder_time) VALUES (?, ?, ?)",
-            (user_id, task, reminder_dt.strftime('%Y-%m-%d %H:%M:%S'))
+            (user_id, task, reminder_time)
         )
         reminder_id = cursor.lastrowid
         conn.commit()
         conn.close()
         
-        # Create a unique job ID for this reminder
-        job_id = f"reminder_{reminder_id}"
-        
-        # Schedule the reminder
-        reminder_text = f"📅 Reminder: {task}"
+        # Hand it to the scheduler in case it is due within the loaded window
         logger.info(f"Scheduling reminder for: {reminder_dt}")
-        
-        # Force the year to be current year (not 2025)
-        current_year = datetime.now().year
-        if reminder_dt.year != current_year:
-            logger.warning(f"Fixing incorrect year {reminder_dt.year} to current year {current_year}")
-            reminder_dt = reminder_dt.replace(year=current_year)
-            logger.info(f"Updated reminder datetime: {reminder_dt}")
-        
-        scheduler.add_job(
-            send_whatsapp_message,
-            'date',
-            run_date=reminder_dt,
-            args=[user_id, reminder_text],
-            id=job_id,
-            replace_existing=True
-        )
+        REMINDER_SCHEDULER.notify(reminder_id, user_id, task, reminder_time)
         
         # Format the confirmation message
         formatted_time = reminder_dt.strftime('%I:%M %p on %A, %B %d, %Y')
@@ -251,24 +185,18 @@ def set_reminder(user_id: str, reminder_time_str: str, task: str) -> str:
 
 # --- Twilio WhatsApp Function ---
 
-def get_twilio_client() -> Optional[Client]:
-    """Get a configured Twilio client from environment variables."""
-    account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-    
-    if not account_sid or not auth_token:
+def twilio_configured() -> bool:
+    """Whether Twilio credentials are set in the environment."""
+    if not os.getenv("TWILIO_ACCOUNT_SID") or not os.getenv("TWILIO_AUTH_TOKEN"):
         logger.warning("Twilio credentials not properly configured in environment variables")
-        return None
-    
-    return Client(account_sid, auth_token)
+        return False
+    return True
 
 def send_whatsapp_message(to_number: str, body: str) -> str:
-    """Sends a WhatsApp message using Twilio."""
-    # Print to console for immediate visibility
-    print(f"\n\n!!! REMINDER ALERT !!!\nTO: {to_number}\nMESSAGE: {body}\n")
+    """Sends a WhatsApp message through the shared outbound dispatcher and waits for the result."""
+    logger.info(f"Outbound message to {to_number}: {body}")
     
-    client = get_twilio_client()
-    if not client:
+    if not twilio_configured():
         error_msg = "Twilio client not configured. Cannot send message."
         logger.error(error_msg)
         # For testing, log the message we would have sent
@@ -279,44 +207,78 @@ def send_whatsapp_message(to_number: str, body: str) -> str:
     if not to_number.startswith('whatsapp:'):
         to_number = f'whatsapp:{to_number}'
     
-    # Get the WhatsApp sender number from env
-    from_number = os.getenv("TWILIO_PHONE_NUMBER")
-    if not from_number:
-        logger.error("TWILIO_PHONE_NUMBER not set in environment variables")
-        from_number = "whatsapp:+14155238886"  # Default to sandbox number
-        logger.info(f"Using default WhatsApp sender: {from_number}")
-    
-    if not from_number.startswith('whatsapp:'):
-        from_number = f'whatsapp:{from_number}'
-    
     try:
-        logger.info(f"Sending WhatsApp message to {to_number}: {body}")
-        logger.info(f"From number: {from_number}")
-        
-        message = client.messages.create(
-            from_=from_number,
-            body=body,
-            to=to_number
-        )
-        logger.info(f"Message sent to {to_number}: SID {message.sid}")
+        # Paced and retried on 429/5xx by the dispatcher; this call only waits
+        message = OUTBOUND_DISPATCHER.send(to_number, body).result()
+        logger.info(f"Message sent to {to_number}: SID {message.sid} after {message.attempts} attempt(s)")
         return f"Message sent successfully to {to_number}."
     except Exception as e:
         logger.error(f"Error sending WhatsApp message to {to_number}: {e}")
-        # For debugging purposes, log what we tried to send
-        logger.info(f"Failed to send message to {to_number} from {from_number}: {body}")
         return f"Error sending message: {e}"
 
 # --- Reminder Tool ---
 
-# Initialize scheduler at module level
+# Initialize scheduler at module level (periodic jobs such as the expense reconcile)
 scheduler = None
 
+def _send_reminder(user_id: str, task: str):
+    result = send_whatsapp_message(user_id, f"📅 Reminder: {task}")
+    # send_whatsapp_message reports failures in its return value; the scheduler records them
+    if not result.startswith("Message sent"):
+        raise RuntimeError(result)
+
+REMINDER_SCHEDULER = ReminderScheduler(
+    _send_reminder,
+    window=REMINDER_WINDOW_SECONDS,
+    page_size=REMINDER_PAGE_SIZE,
+    misfire_grace=REMINDER_MISFIRE_GRACE_SECONDS,
+    send_workers=REMINDER_SEND_WORKERS,
+    poll_interval=REMINDER_POLL_SECONDS,
+)
+
+REMINDER_LIFECYCLE = ReminderLifecycle(
+    archive_after_days=REMINDER_ARCHIVE_AFTER_DAYS,
+    batch_size=REMINDER_ARCHIVE_BATCH_SIZE,
+    missed_after=REMINDER_MISSED_AFTER_SECONDS,
+    vacuum_pages=REMINDER_VACUUM_PAGES,
+)
+
+def _on_elected():
+    REMINDER_SCHEDULER.start()
+    expense_write_queue.start()
+
+def _on_demoted():
+    REMINDER_SCHEDULER.stop()
+    # The new leader flushes what is left; a claim this process still holds is released after the claim timeout
+    expense_write_queue.stop(flush=False)
+
+# With several workers or hosts on one database, only the lease holder fires
+# reminders, flushes queued expense rows to the sheet and runs the periodic
+# jobs; the others take over if it dies
+SCHEDULER_LEASE = LeaderLease(
+    "reminders",
+    on_elected=_on_elected,
+    on_demoted=_on_demoted,
+    ttl=SCHEDULER_LEASE_TTL_SECONDS,
+    renew_every=SCHEDULER_LEASE_RENEW_SECONDS,
+)
+
+def _leader_only(job):
+    """Wrap a periodic job so it only runs in the process holding the scheduler lease."""
+    def run():
+        if SCHEDULER_LEASE.is_leader:
+            return job()
+    run.__name__ = job.__name__
+    return run
+
 def initialize_scheduler():
     """Initialize the background scheduler for reminders."""
     global scheduler
     if scheduler is None or not scheduler.running:
         try:
             logger.info("Initializing scheduler for reminders...")
+            from apscheduler.schedulers.background import BackgroundScheduler
+
             # Set misfire_grace_time to 1 second and check every 1 second for better responsiveness
             scheduler = BackgroundScheduler(
                 timezone="UTC",
@@ -327,70 +289,39 @@ def initialize_scheduler():
             scheduler.start()
             logger.info("Scheduler initialized and started successfully")
             
-            # Load existing reminders from database and reschedule them
-            _load_existing_reminders()
+            # Periodically check the local expense totals against the sheet
+            scheduler.add_job(
+                _leader_only(reconcile_expense_totals),
+                'interval',
+                minutes=EXPENSE_RECONCILE_INTERVAL_MINUTES,
+                id='expense_totals_reconcile',
+                replace_existing=True
+            )
             
-            return scheduler
+            # Keep the reminders table down to live rows
+            scheduler.add_job(
+                _leader_only(REMINDER_LIFECYCLE.run),
+                'interval',
+                minutes=REMINDER_MAINTENANCE_INTERVAL_MINUTES,
+                id='reminder_housekeeping',
+                replace_existing=True
+            )
         except Exception as e:
             logger.error(f"Error initializing scheduler: {e}")
             return None
+    
+    # Fire reminders from the database, a window at a time, once elected (no-op when already campaigning)
+    SCHEDULER_LEASE.start()
     return scheduler
 
-def _load_existing_reminders():
-    """Load existing reminders from the database and schedule them."""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, user_id, task, reminder_time 
-            FROM reminders 
-            WHERE completed = 0 AND reminder_time > datetime('now')
-            ORDER BY reminder_time ASC
-        """)
-        reminders = cursor.fetchall()
-        conn.close()
-        
-        if reminders:
-            logger.info(f"Found {len(reminders)} existing reminders to reschedule")
-            for reminder in reminders:
-                reminder_id = reminder['id']
-                user_id = reminder['user_id']
-                task = reminder['task']
-                reminder_time = reminder['reminder_time']
-                
-                # Parse the reminder time
-                reminder_dt = dateparser.parse(reminder_time)
-                
-                if reminder_dt:
-                    # Fix year if needed
-                    current_year = datetime.now().year
-                    if reminder_dt.year != current_year:
-                        logger.warning(f"Fixing incorrect year {reminder_dt.year} to current year {current_year}")
-                        reminder_dt = reminder_dt.replace(year=current_year)
-                        logger.info(f"Updated reminder datetime: {reminder_dt}")
-                    
-                    # Create a unique job ID for this reminder
-                    job_id = f"reminder_{reminder_id}"
-                    
-                    # Schedule the reminder
-                    reminder_text = f"📅 Reminder: {task}"
-                    scheduler.add_job(
-                        send_whatsapp_message,
-                        'date',
-                        run_date=reminder_dt,
-                        args=[user_id, reminder_text],
-                        id=job_id,
-                        replace_existing=True
-                    )
-                    logger.info(f"Rescheduled reminder [{reminder_id}] for {user_id} at {reminder_time}")
-        else:
-            logger.info("No existing reminders to reschedule")
-    except Exception as e:
-        logger.error(f"Error loading existing reminders: {e}")
-
 def cleanup_scheduler():
     """Shutdown the scheduler gracefully."""
     global scheduler
+    if SCHEDULER_LEASE.is_leader:
+        # Drain the expense rows still queued before handing over
+        expense_write_queue.stop()
+    # Releasing the lease lets another worker take over the reminders right away
+    SCHEDULER_LEASE.stop()
     if scheduler and scheduler.running:
         scheduler.shutdown()
         logger.info("Scheduler shut down")
@@ -422,7 +353,7 @@ def book_calendar_event(user_id: str, title: str, date_str: str, time_str: str,
         logger.info(f"Parsing date and time: {date_time_str}")
         
         # Try to parse the date and time string
-        start_time = dateparser.parse(date_time_str)
+        start_time = TIME_PARSER.parse(date_time_str)
         if not start_time:
             return f"Error: Could not understand the date and time '{date_time_str}'. Please use a clearer format."
         
@@ -485,7 +416,7 @@ def track_expense(user_id: str, amount: str, category: str) -> str:
         amount_float = float(amount.replace('$', '').replace(',', ''))
         
         # Add the expense to Google Sheets
-        result = add_expense(amount_float, category)
+        result = add_expense(amount_float, category, user_id)
         return result
     except ValueError:
         return f"Invalid amount format: {amount}. Please provide a valid number."
@@ -545,49 +476,32 @@ def get_consolidated_budget_report(user_id: str) -> str:
     logger.info(f"Generating consolidated budget report for user: {user_id}")
     
     try:
-        # Get sheets service
-        service = get_sheets_service()
-        if not service:
-            return "Could not connect to Google Sheets. Please check your credentials."
-        
         # Get current month
         current_month = datetime.now().strftime('%Y-%m')
         
-        # Get all budgets
-        budget_result = service.spreadsheets().values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f'{BUDGETS_SHEET}!A1:B100'
-        ).execute()
-        
-        budget_rows = budget_result.get('values', [])
-        if not budget_rows or len(budget_rows) <= 1:
+        # Get all budgets from the cached catalog
+        budget_rows = budget_catalog.rows()
+        if budget_rows is None:
+            return "Could not connect to Google Sheets. Please check your credentials."
+        if not budget_rows:
             return "No budget data found."
         
-        # Get all expenses
-        expense_result = service.spreadsheets().values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f'{EXPENSES_SHEET}!A1:C100'
-        ).execute()
-        
-        expense_rows = expense_result.get('values', [])
-        if not expense_rows or len(expense_rows) <= 1:
+        # Get this month's spent amounts by category from the local aggregate store
+        category_spent = get_month_expense_totals(current_month)
+        if not category_spent:
             # No expenses yet, just report budgets
             categories = []
             total_budget = 0
             
             # Get top budget categories
-            for row in budget_rows[1:]:  # Skip header
-                if len(row) >= 2:
-                    try:
-                        category_name = row[0]
-                        budget_amount = float(row[1])
-                        total_budget += budget_amount
-                        
-                        # Add only main categories, avoiding duplicates
-                        if not any(cat == category_name for cat, _, _ in categories):
-                            categories.append((category_name, budget_amount, 0))
-                    except ValueError:
-                        continue
+            for category_name, budget_amount in budget_rows:
+                if budget_amount is None:
+                    continue
+                total_budget += budget_amount
+                
+                # Add only main categories, avoiding duplicates
+                if not any(cat == category_name for cat, _, _ in categories):
+                    categories.append((category_name, budget_amount, 0))
             
             # Format the response
             response = "💰 Budget Summary 💰\n\n"
@@ -618,53 +532,28 @@ def get_consolidated_budget_report(user_id: str) -> str:
             
             return response
             
-        # Calculate spent amounts by category
-        category_spent = {}
-        total_spent = 0
-        
-        for row in expense_rows[1:]:  # Skip header
-            if len(row) >= 3:
-                expense_date = row[0]
-                try:
-                    expense_amount = float(row[1])
-                    expense_category = row[2]
-                    
-                    # Check if expense is from current month
-                    if expense_date.startswith(current_month):
-                        total_spent += expense_amount
-                        
-                        # Add to category total
-                        if expense_category in category_spent:
-                            category_spent[expense_category] += expense_amount
-                        else:
-                            category_spent[expense_category] = expense_amount
-                except (ValueError, IndexError):
-                    continue
+        total_spent = sum(category_spent.values())
         
         # Combine budget and spent data
         categories = []
         total_budget = 0
         
-        for row in budget_rows[1:]:  # Skip header
-            if len(row) >= 2:
-                try:
-                    category_name = row[0]
-                    budget_amount = float(row[1])
-                    total_budget += budget_amount
-                    
-                    # Get spent amount for this category (with fuzzy matching)
-                    spent = 0
-                    for expense_cat, expense_amount in category_spent.items():
-                        if (category_name.lower() == expense_cat.lower() or
-                            category_name.lower() in expense_cat.lower() or
-                            expense_cat.lower() in category_name.lower()):
-                            spent += expense_amount
-                    
-                    # Add to categories list
-                    if not any(cat == category_name for cat, _, _ in categories):
-                        categories.append((category_name, budget_amount, spent))
-                except ValueError:
-                    continue
+        for category_name, budget_amount in budget_rows:
+            if budget_amount is None:
+                continue
+            total_budget += budget_amount
+            
+            # Get spent amount for this category (with fuzzy matching)
+            spent = 0
+            for expense_cat, expense_amount in category_spent.items():
+                if (category_name.lower() == expense_cat.lower() or
+                    category_name.lower() in expense_cat.lower() or
+                    expense_cat.lower() in category_name.lower()):
+                    spent += expense_amount
+            
+            # Add to categories list
+            if not any(cat == category_name for cat, _, _ in categories):
+                categories.append((category_name, budget_amount, spent))
         
         # Format the response
         response = "💰 Budget Summary 💰\n\n"
@@ -703,4 +592,4 @@ def get_consolidated_budget_report(user_id: str) -> str:
         return f"An error occurred while generating the consolidated budget report: {e}"
 
 # List of all available tools
-all_tools = [save_link, retrieve_links, set_reminder, book_calendar_event, track_expense, get_budget_status, get_recent_expenses, get_consolidated_budget_report] 
\ No newline at end of file
+all_tools = [save_link, save_links, retrieve_links, find_links, list_reminders, set_reminder, book_calendar_event, track_expense, get_budget_status, get_recent_expenses, get_consolidated_budget_report] 
\ No newline at end of file
@@ -0,0 +1,444 @@
+import http.client
+import ipaddress
+import logging
+import queue
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict, deque
+from html.parser import HTMLParser
+from typing import Iterable, NamedTuple, Optional
+from urllib.parse import urljoin, urlsplit
+
+from src.langgraph_whatsapp.config import (
+    LINK_UNFURL_ERROR_RETRY_MINUTES, LINK_UNFURL_MAX_BYTES, LINK_UNFURL_PER_HOST, LINK_UNFURL_QUEUE_SIZE,
+    LINK_UNFURL_REFRESH_HOURS, LINK_UNFURL_TIMEOUT_SECONDS, LINK_UNFURL_WORKERS,
+)
+from src.langgraph_whatsapp.db import get_db_connection
+from src.langgraph_whatsapp.link_store import canonical_url, url_hash
+
+logger = logging.getLogger(__name__)
+
+_USER_AGENT = "whatsappagent-unfurl/1.0 (+link preview)"
+_TITLE_MAX_CHARS = 300
+_SCHEMES = ("http", "https")
+
+
+class BlockedAddressError(OSError):
+    """The link points at a loopback, private, link-local or otherwise non-public address."""
+
+
+def is_public_address(address: str) -> bool:
+    """True for a globally routable unicast IP address."""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def _connect_public(address, timeout=None, source_address=None):
+    """socket.create_connection that only connects to public addresses.
+
+    Every address the host resolves to is checked before connecting, and the
+    socket connects to the checked address itself, so the name cannot be
+    re-resolved to an internal one in between (DNS rebinding).
+    """
+    host, port = address[:2]
+    addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    for *_, sockaddr in addresses:
+        if not is_public_address(sockaddr[0]):
+            raise BlockedAddressError(f"{host} resolves to non-public address {sockaddr[0]}")
+    error = OSError(f"{host} did not resolve")
+    for family, type_, proto, _, sockaddr in addresses:
+        sock = socket.socket(family, type_, proto)
+        try:
+            if isinstance(timeout, (int, float)):
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as e:
+            sock.close()
+            error = e
+    raise error
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _connect_public
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _connect_public
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _HTTPRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Follows redirects to http(s) URLs only; each hop connects through the public-address check."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if urlsplit(newurl).scheme not in _SCHEMES:
+            raise urllib.error.HTTPError(newurl, code, f"redirect to unsupported URL {newurl}", headers, fp)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def public_web_opener() -> urllib.request.OpenerDirector:
+    """An opener that fetches http(s) pages from public addresses only.
+
+    Links come from users, so without this a saved link could make the
+    server fetch its own admin endpoints, cloud metadata (169.254.169.254) or
+    hosts on the private network. There are no file/ftp/data handlers, and
+    environment proxies are ignored: the address check has to see the
+    target's address, not a proxy's.
+    """
+    opener = urllib.request.OpenerDirector()
+    for handler in (urllib.request.ProxyHandler({}), urllib.request.UnknownHandler(),
+                    urllib.request.HTTPDefaultErrorHandler(), _HTTPRedirectHandler(),
+                    urllib.request.HTTPErrorProcessor(), _PublicHTTPHandler(), _PublicHTTPSHandler()):
+        opener.add_handler(handler)
+    return opener
+
+
+class PageMetadata(NamedTuple):
+    title: Optional[str]
+    canonical_url: Optional[str]
+
+
+class _HeadParser(HTMLParser):
+    """Collects <title>, og:title and rel=canonical, stopping at </head>."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.og_title = None
+        self.canonical = None
+        self.done = False
+        self._in_title = False
+        self._title_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "title" and self.title is None:
+            self._in_title = True
+        elif tag == "meta" and (attrs.get("property") or attrs.get("name") or "").lower() == "og:title":
+            self.og_title = self.og_title or (attrs.get("content") or "").strip() or None
+        elif tag == "link" and "canonical" in (attrs.get("rel") or "").lower().split():
+            self.canonical = self.canonical or attrs.get("href")
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self.title = " ".join("".join(self._title_parts).split()) or None
+        elif tag == "head":
+            self.done = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+
+
+def parse_page_metadata(html: str, base_url: str) -> PageMetadata:
+    """Title (og:title preferred) and absolute canonical URL from a page's head."""
+    parser = _HeadParser()
+    try:
+        # Everything needed is in <head>; stop feeding once it is over
+        for start in range(0, len(html), 8192):
+            parser.feed(html[start:start + 8192])
+            if parser.done:
+                break
+    except Exception as e:
+        logger.debug(f"Unparseable HTML from {base_url}: {e}")
+    title = parser.og_title or parser.title
+    canonical = urljoin(base_url, parser.canonical) if parser.canonical else None
+    return PageMetadata(title[:_TITLE_MAX_CHARS] if title else None, canonical)
+
+
+class LinkUnfurler:
+    """Background worker pool that fetches metadata for saved links.
+
+    ``submit`` only puts the URL on an in-memory queue, so the webhook never
+    waits on a remote site (at most ``queue_size`` URLs wait; more are dropped
+    and counted). ``workers`` threads fetch pages with at most ``per_host``
+    requests in flight to any one host; a URL whose host is busy is parked and
+    re-queued when a slot for that host frees up. Results go to the
+    link_metadata table (one row per canonical URL, shared by all users) and
+    fill links.title, which the full-text index picks up.
+
+    Metadata younger than ``refresh_after`` seconds is not fetched again;
+    older rows are revalidated with If-None-Match / If-Modified-Since, so an
+    unchanged page costs a 304 and no body. A failed fetch (timeout, DNS,
+    HTTP error) is tried again after ``error_retry_after`` seconds instead:
+    its row is stored as fetched that much less than ``refresh_after`` ago.
+
+    Only http(s) URLs are fetched, and by default only from public addresses,
+    redirects included (see public_web_opener); ``allow_private_addresses``
+    lifts the address check, for tests against a local server.
+    """
+
+    def __init__(self, workers: int = 8, per_host: int = 2, timeout: float = 10.0,
+                 max_bytes: int = 256 * 1024, refresh_after: float = 24 * 3600, queue_size: int = 1000,
+                 connect=get_db_connection, opener: urllib.request.OpenerDirector = None,
+                 allow_private_addresses: bool = False, error_retry_after: float = 15 * 60):
+        self.workers = workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.refresh_after = refresh_after
+        self.error_retry_after = min(error_retry_after, refresh_after)
+        self._connect = connect
+        if opener is None:
+            opener = urllib.request.build_opener() if allow_private_addresses else public_web_opener()
+        self._opener = opener
+        self.queue_size = queue_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = set()
+        self._host_active = defaultdict(int)
+        self._host_parked = defaultdict(deque)
+        self._threads = []
+        self.submitted = 0
+        self.dropped = 0
+        self.fetched = 0
+        self.revalidated = 0
+        self.fresh = 0
+        self.deferred = 0
+        self.errors = 0
+        self.blocked = 0
+
+    def start(self):
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._run, name=f"link-unfurl-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the workers; URLs still queued are dropped (they are re-submitted on the next save)."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout=timeout)
+
+    def submit(self, urls: Iterable[str]) -> int:
+        """Queue URLs for unfurling without blocking. Returns how many were queued."""
+        if self.workers <= 0:
+            return 0
+        queued = 0
+        for url in urls:
+            key = url_hash(url)
+            with self._lock:
+                if key in self._pending:
+                    continue
+                if len(self._pending) >= self.queue_size:
+                    self.dropped += 1
+                    continue
+                self._pending.add(key)
+            self._queue.put(url)
+            queued += 1
+        with self._lock:
+            self.submitted += queued
+        if queued:
+            self.start()
+        return queued
+
+    def join(self, timeout: float = None) -> bool:
+        """Wait until every submitted URL has been processed (for tests and benchmarks)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            url = self._queue.get()
+            if url is None:
+                return
+            host = urlsplit(url).hostname or ""
+            with self._lock:
+                if self._host_active[host] >= self.per_host:
+                    self._host_parked[host].append(url)
+                    self.deferred += 1
+                    continue
+                self._host_active[host] += 1
+            try:
+                self.unfurl(url)
+            except Exception as e:
+                logger.error(f"Unexpected error unfurling {url}: {e}")
+            finally:
+                with self._lock:
+                    self._host_active[host] -= 1
+                    parked = self._host_parked[host]
+                    if parked:
+                        # The freed slot goes to the next URL waiting on this host
+                        self._queue.put_nowait(parked.popleft())
+                    else:
+                        del self._host_parked[host]
+                        if not self._host_active[host]:
+                            del self._host_active[host]
+                    self._pending.discard(url_hash(url))
+                    self._idle.notify_all()
+
+    def unfurl(self, url: str) -> str:
+        """Fetch or revalidate one URL's metadata. Returns 'fresh', 'revalidated', 'fetched' or 'error'."""
+        key = url_hash(url)
+        if urlsplit(url).scheme.lower() not in _SCHEMES:
+            with self._lock:
+                self.blocked += 1
+            return self._store_error(key, url, None, "unsupported URL scheme", retry=False)
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT etag, last_modified, fetched_at FROM link_metadata WHERE url_hash = ?", (key,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row and row[2] is not None and time.time() - row[2] < self.refresh_after:
+            with self._lock:
+                self.fresh += 1
+            return "fresh"
+
+        request = urllib.request.Request(url, headers={"User-Agent": _USER_AGENT, "Accept": "text/html,*/*;q=0.5"})
+        if row and row[0]:
+            request.add_header("If-None-Match", row[0])
+        if row and row[1]:
+            request.add_header("If-Modified-Since", row[1])
+
+        try:
+            with self._opener.open(request, timeout=self.timeout) as response:
+                status = response.status
+                content_type = response.headers.get_content_type()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                final_url = response.geturl()
+                body = response.read(self.max_bytes) if content_type in ("text/html", "application/xhtml+xml") else b""
+                charset = response.headers.get_content_charset() or "utf-8"
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                self._store_revalidated(key)
+                with self._lock:
+                    self.revalidated += 1
+                return "revalidated"
+            return self._store_error(key, url, e.code, f"HTTP {e.code}")
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            blocked = isinstance(getattr(e, "reason", e), BlockedAddressError)
+            if blocked:
+                with self._lock:
+                    self.blocked += 1
+            return self._store_error(key, url, None, str(e), retry=not blocked)
+
+        metadata = parse_page_metadata(body.decode(charset, errors="replace"), final_url) if body else PageMetadata(None, None)
+        self._store_fetched(key, url, status, content_type, etag, last_modified, metadata)
+        with self._lock:
+            self.fetched += 1
+        return "fetched"
+
+    def _store_fetched(self, key, url, status, content_type, etag, last_modified, metadata: PageMetadata):
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                INSERT INTO link_metadata (url_hash, url, canonical_url, title, content_type, status,
+                                           etag, last_modified, fetched_at, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)
+                ON CONFLICT (url_hash) DO UPDATE SET
+                    url = excluded.url, canonical_url = excluded.canonical_url, title = excluded.title,
+                    content_type = excluded.content_type, status = excluded.status, etag = excluded.etag,
+                    last_modified = excluded.last_modified, fetched_at = excluded.fetched_at, error = NULL
+                """,
+                (key, url, metadata.canonical_url and canonical_url(metadata.canonical_url), metadata.title,
+                 content_type, status, etag, last_modified, time.time())
+            )
+            if metadata.title:
+                # Every user's copy of the link gets the title (and is re-indexed with it)
+                conn.execute(
+                    "UPDATE links SET title = ? WHERE url_hash = ? AND title IS NOT ?", (metadata.title, key, metadata.title)
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _store_revalidated(self, key):
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE link_metadata SET fetched_at = ? WHERE url_hash = ?", (time.time(), key))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _store_error(self, key, url, status, error, retry: bool = True) -> str:
+        """Record a failed fetch; unless ``retry`` is False it is tried again after ``error_retry_after``."""
+        logger.info(f"Could not unfurl {url}: {error}")
+        fetched_at = time.time()
+        if retry:
+            fetched_at -= self.refresh_after - self.error_retry_after
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                INSERT INTO link_metadata (url_hash, url, status, fetched_at, error) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (url_hash) DO UPDATE SET
+                    status = excluded.status, fetched_at = excluded.fetched_at, error = excluded.error
+                """,
+                (key, url, status, fetched_at, error)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        with self._lock:
+            self.errors += 1
+        return "error"
+
+    def stats(self) -> dict:
+        with self._lock:
+            checked = self.fetched + self.revalidated
+            return {
+                "workers": len([thread for thread in self._threads if thread.is_alive()]),
+                "queued": self._queue.qsize(),
+                "pending": len(self._pending),
+                "parked": sum(len(parked) for parked in self._host_parked.values()),
+                "submitted": self.submitted,
+                "dropped": self.dropped,
+                "fetched": self.fetched,
+                "revalidated": self.revalidated,
+                "fresh": self.fresh,
+                "deferred": self.deferred,
+                "errors": self.errors,
+                "blocked": self.blocked,
+                "revalidation_ratio": round(self.revalidated / checked, 3) if checked else None,
+            }
+
+
+LINK_UNFURLER = LinkUnfurler(
+    workers=LINK_UNFURL_WORKERS,
+    per_host=LINK_UNFURL_PER_HOST,
+    timeout=LINK_UNFURL_TIMEOUT_SECONDS,
+    max_bytes=LINK_UNFURL_MAX_BYTES,
+    refresh_after=LINK_UNFURL_REFRESH_HOURS * 3600,
+    queue_size=LINK_UNFURL_QUEUE_SIZE,
+    error_retry_after=LINK_UNFURL_ERROR_RETRY_MINUTES * 60,
+)
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Future
+from typing import Callable, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_REPLY = "I'm sorry, I encountered a technical issue. Please try again later."
+
+
+class InboundMessage(NamedTuple):
+    """What the agent needs from one webhook delivery, copied out of the request form."""
+    sender: str
+    content: str
+    media: Sequence[Tuple[str, str]] = ()
+    message_sid: str = ""
+
+
+class WebhookWorkQueue:
+    """Fast-ack processing for inbound messages.
+
+    The webhook ``submit``s the message together with ``start``, which
+    queues the computation of its reply (the channel puts it in the
+    sender's mailbox) and returns a future for the reply text, and answers
+    Twilio with empty TwiML straight away. Once the future is done, a
+    done-callback hands the reply to ``send(to, body)`` (the outbound
+    dispatcher, returning a Future): nothing waits on one sender's mailbox
+    while other senders' replies are ready. A reply of None means the
+    message was already answered (a retried delivery), and nothing is sent.
+    Slow tools then only delay the reply, never the webhook response, and
+    don't hold server connections open.
+
+    At most ``queue_size`` messages are accepted and not yet answered;
+    beyond that ``submit`` does not call ``start`` at all, and the caller
+    processes the message inline. Messages still pending when the process
+    dies are lost: Twilio already has its 200, and will not retry.
+    """
+
+    def __init__(self, send: Callable[[str, str], Future], queue_size: int = 1000):
+        self.send = send
+        self.queue_size = queue_size
+        self._pending = set()
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.max_queue_lag_ms = 0.0
+
+    def submit(self, message: InboundMessage,
+               start: Callable[[], "asyncio.Future[Optional[str]]"]) -> Optional["asyncio.Future[Optional[str]]"]:
+        """Start computing the reply to ``message`` and send it when ready.
+
+        Returns the future from ``start()``, or None without calling it if
+        ``queue_size`` messages are already pending; the caller should then
+        process the message inline.
+        """
+        if len(self._pending) >= self.queue_size:
+            self.rejected += 1
+            logger.warning(f"Webhook work queue is full, processing {message.message_sid or message.sender} inline")
+            return None
+        answered = start()
+        self._pending.add(answered)
+        self.accepted += 1
+        enqueued_at = time.perf_counter()
+        answered.add_done_callback(lambda future: self._deliver(message, future, enqueued_at))
+        return answered
+
+    def _deliver(self, message: InboundMessage, answered: "asyncio.Future[Optional[str]]", enqueued_at: float):
+        self._pending.discard(answered)
+        self.max_queue_lag_ms = max(self.max_queue_lag_ms, (time.perf_counter() - enqueued_at) * 1000)
+        if answered.cancelled():
+            self.failed += 1
+            logger.error(f"Queued message from {message.sender} was cancelled before it was answered")
+            return
+        error = answered.exception()
+        if error is not None:
+            logger.error(f"Error processing queued message from {message.sender}: {error}")
+            self.failed += 1
+            reply = FALLBACK_REPLY
+        else:
+            self.processed += 1
+            reply = answered.result()
+        if reply is None:
+            logger.info(f"{message.message_sid} was already answered, not sending it again")
+            return
+
+        def sent(future: Future):
+            if future.exception() is not None:
+                logger.error(f"Could not send the reply to {message.sender}: {future.exception()}")
+        self.send(message.sender, reply).add_done_callback(sent)
+
+    async def stop(self, timeout: float = 10.0):
+        """Give pending messages up to ``timeout`` seconds to be answered."""
+        pending = [future for future in self._pending if future.get_loop() is asyncio.get_running_loop()]
+        if pending:
+            _, still_pending = await asyncio.wait(pending, timeout=timeout)
+            if still_pending:
+                logger.warning(f"Stopping the webhook queue with {len(still_pending)} messages still pending")
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._pending),
+            "queue_size": self.queue_size,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "max_queue_lag_ms": round(self.max_queue_lag_ms, 1),
+        }
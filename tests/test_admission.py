@@ -0,0 +1,75 @@
+import asyncio
+
+from src.langgraph_whatsapp.admission import ADMITTED, SHED, THROTTLED, AdmissionController
+
+
+def test_per_sender_bucket_throttles_only_the_chatty_sender():
+    now = [0.0]
+    controller = AdmissionController(sender_rate_per_minute=60, sender_burst=3, clock=lambda: now[0])
+
+    async def main():
+        chatty = []
+        for _ in range(5):
+            chatty.append(await controller.acquire("whatsapp:+1"))
+            controller.release("whatsapp:+1")
+        quiet = await controller.acquire("whatsapp:+2")
+        controller.release("whatsapp:+2")
+        now[0] += 1
+        refilled = await controller.acquire("whatsapp:+1")
+        controller.release("whatsapp:+1")
+        return chatty, quiet, refilled
+
+    chatty, quiet, refilled = asyncio.run(main())
+    assert chatty == [ADMITTED] * 3 + [THROTTLED] * 2
+    assert (quiet, refilled) == (ADMITTED, ADMITTED)
+    stats = controller.stats()
+    assert (stats["admitted"], stats["throttled"], stats["in_flight"]) == (5, 2, 0)
+
+
+def test_a_sender_cannot_hold_more_than_its_share_of_slots():
+    controller = AdmissionController(sender_rate_per_minute=0, sender_max_in_flight=2)
+
+    async def main():
+        held = [await controller.acquire("whatsapp:+1") for _ in range(3)]
+        other = await controller.acquire("whatsapp:+2")
+        controller.release("whatsapp:+1")
+        again = await controller.acquire("whatsapp:+1")
+        return held, other, again
+
+    held, other, again = asyncio.run(main())
+    assert held == [ADMITTED, ADMITTED, THROTTLED]
+    assert (other, again) == (ADMITTED, ADMITTED)
+
+
+def test_concurrency_limit_queues_then_sheds():
+    controller = AdmissionController(sender_rate_per_minute=0, max_concurrency=2, max_waiting=1, max_wait=0.05)
+
+    async def main():
+        running = [await controller.acquire(), await controller.acquire()]
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        # The queue is full: shed without waiting
+        overflow = await controller.acquire()
+        controller.release()
+        handed_over = await waiting
+        # Nobody releases in time
+        timed_out = await controller.acquire()
+        return running, overflow, handed_over, timed_out
+
+    running, overflow, handed_over, timed_out = asyncio.run(main())
+    assert running == [ADMITTED, ADMITTED]
+    assert (overflow, handed_over, timed_out) == (SHED, ADMITTED, SHED)
+    stats = controller.stats()
+    assert (stats["in_flight"], stats["waiting"], stats["shed"]) == (2, 0, 2)
+
+
+def test_sender_buckets_are_bounded():
+    controller = AdmissionController(max_senders=3)
+
+    async def main():
+        for i in range(10):
+            await controller.acquire(f"whatsapp:+{i}")
+            controller.release(f"whatsapp:+{i}")
+
+    asyncio.run(main())
+    assert controller.stats()["tracked_senders"] == 3
@@ -0,0 +1,13 @@
+import asyncio
+
+from src.langgraph_whatsapp import agent as agent_module
+
+
+def test_expense_batch_where_every_line_fails_replies_with_an_error(monkeypatch):
+    async def failing(func, *args, **kwargs):
+        raise RuntimeError("sheets down")
+
+    monkeypatch.setattr(agent_module, "run_blocking", failing)
+    result = asyncio.run(agent_module.Agent().invoke("whatsapp:+1", "spent 500 on groceries\nspent 120 on coffee"))
+    assert result["response"].startswith("Sorry, I couldn't track those expenses")
+    assert result["error"]
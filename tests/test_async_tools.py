@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.langgraph_whatsapp.async_tools import ToolExecutor
+
+
+def test_blocking_tools_do_not_stall_the_event_loop():
+    executor = ToolExecutor(size=4)
+    ticks = []
+
+    async def heartbeat():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(heartbeat(), *(executor.run(time.sleep, 0.1) for _ in range(4)))
+        return start
+
+    start = asyncio.run(main())
+    executor.shutdown()
+    # The heartbeat kept running while all four tools were sleeping
+    assert ticks[-1] - start < 0.09
+    assert executor.stats()["completed"] == 4
+
+
+def test_pool_is_bounded_and_failures_propagate():
+    executor = ToolExecutor(size=2)
+    active, peak = 0, 0
+    lock = threading.Lock()
+
+    def tool():
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+
+    def broken():
+        raise ValueError("sheet unavailable")
+
+    async def main():
+        await asyncio.gather(*(executor.run(tool) for _ in range(6)))
+        with pytest.raises(ValueError):
+            await executor.run(broken)
+
+    asyncio.run(main())
+    executor.shutdown()
+    stats = executor.stats()
+    assert peak == 2
+    assert stats["max_in_flight"] == 2
+    assert stats["failed"] == 1
+    assert stats["completed"] == 7
+    assert stats["queued"] == 0
@@ -0,0 +1,103 @@
+import threading
+
+from src.langgraph_whatsapp.sheets_setup import BudgetCatalog
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _SheetCatalog(BudgetCatalog):
+    """A catalog reading from an in-memory sheet instead of the Sheets API."""
+
+    def __init__(self, sheet, **kwargs):
+        super().__init__(**kwargs)
+        self.sheet = sheet
+        self.fetches = 0
+        self.gate = None
+
+    def _fetch(self):
+        self.fetches += 1
+        if self.gate:
+            self.gate.wait(5)
+        return list(self.sheet)
+
+
+def test_rows_are_served_from_memory_until_the_ttl_expires():
+    clock = _Clock()
+    catalog = _SheetCatalog([("Food", 5000.0)], ttl_seconds=60, clock=clock)
+    assert catalog.rows() == [("Food", 5000.0)]
+    clock.now += 59
+    catalog.sheet = [("Food", 6000.0)]
+    assert catalog.match("food") == ("Food", 5000.0)
+    assert catalog.fetches == 1
+    stats = catalog.stats()
+    assert (stats["misses"], stats["hits"], stats["refreshes"]) == (1, 1, 1)
+
+
+def test_invalidate_makes_the_next_read_go_to_the_sheet():
+    catalog = _SheetCatalog([("Food", 5000.0)], ttl_seconds=60, clock=_Clock())
+    catalog.rows()
+    catalog.sheet = [("Food", 5000.0), ("Rent", 20000.0)]
+    catalog.invalidate()
+    assert catalog.match("rent") == ("Rent", 20000.0)
+    assert catalog.fetches == 2
+
+
+def test_expired_rows_are_served_while_a_background_refresh_runs():
+    clock = _Clock()
+    catalog = _SheetCatalog([("Food", 5000.0)], ttl_seconds=60, clock=clock)
+    catalog.rows()
+    clock.now += 61
+    catalog.sheet = [("Food", 6000.0)]
+    catalog.gate = threading.Event()
+
+    # Stale rows come back at once, and only one refresh is started
+    assert catalog.rows() == [("Food", 5000.0)]
+    assert catalog.rows() == [("Food", 5000.0)]
+    catalog.gate.set()
+    for _ in range(100):
+        if catalog.stats()["refreshes"] == 2:
+            break
+        threading.Event().wait(0.01)
+    assert catalog.fetches == 2
+    assert catalog.rows() == [("Food", 6000.0)]
+
+
+def test_unreadable_sheet_is_not_cached():
+    catalog = _SheetCatalog(None, clock=_Clock())
+    catalog._fetch = lambda: None
+    assert catalog.rows() is None
+    assert catalog.match("food") is None
+    assert catalog.stats()["errors"] == 2
+
+
+def test_a_failed_refresh_backs_off_before_the_next_one():
+    clock = _Clock()
+    catalog = _SheetCatalog([("Food", 5000.0)], ttl_seconds=60, retry_after_error=30, clock=clock)
+    catalog.rows()
+    catalog.sheet = None
+
+    def wait_for_fetches(count):
+        for _ in range(100):
+            if catalog.fetches == count and not catalog._refreshing:
+                return
+            threading.Event().wait(0.01)
+
+    clock.now += 61
+    assert catalog.rows() == [("Food", 5000.0)]
+    wait_for_fetches(2)
+    # Sheets is failing: stale rows are served without asking it again on every lookup
+    for _ in range(5):
+        assert catalog.rows() == [("Food", 5000.0)]
+    assert catalog.fetches == 2 and catalog.stats()["errors"] == 1
+
+    clock.now += 30
+    catalog.sheet = [("Food", 6000.0)]
+    catalog.rows()
+    wait_for_fetches(3)
+    assert catalog.rows() == [("Food", 6000.0)]
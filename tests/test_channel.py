@@ -0,0 +1,86 @@
+import asyncio
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+from src.langgraph_whatsapp import channel as channel_module
+from src.langgraph_whatsapp.channel import WhatsAppAgentTwilio
+from src.langgraph_whatsapp.request_context import TwilioRequestContext
+from src.langgraph_whatsapp.webhook_queue import WebhookWorkQueue
+
+
+class _SlowMedia:
+    async def fetch_all(self, media):
+        await asyncio.sleep(0.05)
+        return []
+
+
+class _Agent:
+    def __init__(self):
+        self.invoked = []
+
+    async def invoke(self, sender, content, images=None):
+        self.invoked.append(content)
+        return {"response": f"got {content}"}
+
+
+def _request(body: bytes):
+    return SimpleNamespace(state=SimpleNamespace(twilio=TwilioRequestContext.from_body(body)))
+
+
+def _channel():
+    channel = WhatsAppAgentTwilio.__new__(WhatsAppAgentTwilio)
+    channel.agent = _Agent()
+    return channel
+
+
+PHOTO = b"From=whatsapp%3A%2B1&Body=&NumMedia=1&MediaUrl0=https%3A%2F%2Fapi.twilio.com%2Fm&MediaContentType0=image%2Fjpeg"
+TEXT = b"From=whatsapp%3A%2B1&Body=what+was+that"
+
+
+def test_a_text_does_not_overtake_the_photo_sent_before_it(monkeypatch):
+    monkeypatch.setattr(channel_module, "MEDIA_FETCHER", _SlowMedia())
+    monkeypatch.setattr(channel_module, "WEBHOOK_FAST_ACK", False)
+    channel = _channel()
+
+    async def main():
+        return await asyncio.gather(channel.handle_message(_request(PHOTO)), channel.handle_message(_request(TEXT)))
+
+    photo, text = asyncio.run(main())
+    assert channel.agent.invoked == ["", "what was that"]
+    assert "got what was that" in text
+
+
+def test_fast_ack_sends_replies_in_arrival_order(monkeypatch):
+    monkeypatch.setattr(channel_module, "MEDIA_FETCHER", _SlowMedia())
+    monkeypatch.setattr(channel_module, "WEBHOOK_FAST_ACK", True)
+    channel = _channel()
+    sent = []
+
+    def send(to, body):
+        sent.append(body)
+        future = Future()
+        future.set_result(None)
+        return future
+
+    async def main():
+        channel.work_queue = WebhookWorkQueue(send)
+        acks = [await channel.handle_message(_request(PHOTO)), await channel.handle_message(_request(TEXT))]
+        await channel.work_queue.stop()
+        return acks
+
+    acks = asyncio.run(main())
+    assert all("<Message>" not in ack for ack in acks)
+    assert channel.agent.invoked == ["", "what was that"]
+    assert sent == ["got ", "got what was that"]
+
+
+def test_fast_ack_with_a_full_queue_answers_inline_once(monkeypatch):
+    monkeypatch.setattr(channel_module, "WEBHOOK_FAST_ACK", True)
+    channel = _channel()
+
+    async def main():
+        channel.work_queue = WebhookWorkQueue(lambda to, body: None, queue_size=0)
+        return await channel.handle_message(_request(TEXT))
+
+    assert "got what was that" in asyncio.run(main())
+    assert channel.agent.invoked == ["what was that"]
@@ -0,0 +1,69 @@
+import subprocess
+import sys
+import threading
+import time
+
+from src.langgraph_whatsapp import sheets_setup
+
+DEFERRED = ["googleapiclient", "google_auth_oauthlib", "httplib2", "dateparser", "apscheduler", "requests", "twilio.rest"]
+
+
+def test_importing_the_app_defers_heavy_dependencies_and_side_effects():
+    probe = (
+        "import sys, src.langgraph_whatsapp.server as server, src.langgraph_whatsapp.sheets_setup as sheets, "
+        "src.langgraph_whatsapp.tools as tools; "
+        f"print([m for m in {DEFERRED!r} if m in sys.modules], sheets.SPREADSHEET_ID, tools.REMINDER_SCHEDULER.running)"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "[] None False"
+
+
+def test_spreadsheet_discovery_is_single_flight(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def slow_setup():
+        calls.append(1)
+        release.wait(5)
+        sheets_setup.SPREADSHEET_ID = "sheet-123"
+        return "sheet-123"
+
+    monkeypatch.setattr(sheets_setup, "SPREADSHEET_ID", None)
+    monkeypatch.setattr(sheets_setup, "setup_spreadsheet", slow_setup)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(sheets_setup.get_spreadsheet_id())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["sheet-123"] * 8
+    assert sheets_setup.get_spreadsheet_id() == "sheet-123"
+
+
+def test_failed_discovery_is_shared_then_retried(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def failing_setup():
+        calls.append(1)
+        release.wait(5)
+        return None
+
+    monkeypatch.setattr(sheets_setup, "SPREADSHEET_ID", None)
+    monkeypatch.setattr(sheets_setup, "setup_spreadsheet", failing_setup)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(sheets_setup.get_spreadsheet_id())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1] and results == [None] * 4
+    assert sheets_setup.get_spreadsheet_id() is None
+    assert len(calls) == 2
@@ -0,0 +1,102 @@
+import sqlite3
+import threading
+from collections import Counter
+
+from src.langgraph_whatsapp import database_setup
+from src.langgraph_whatsapp.database_setup import SCHEMA_VERSION, migrate, schema_version, setup_database
+
+
+def query_plan(conn, sql, params=()):
+    return " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+
+def test_fresh_database_is_at_latest_version(tmp_path):
+    conn = sqlite3.connect(setup_database(str(tmp_path / "fresh.db")))
+    assert schema_version(conn) == SCHEMA_VERSION
+    conn.close()
+
+
+def test_unversioned_database_is_migrated_in_place(tmp_path):
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+    CREATE TABLE links (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        link TEXT NOT NULL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    conn.execute("INSERT INTO links (user_id, link) VALUES ('u1', 'https://kept.example')")
+    conn.commit()
+    conn.close()
+
+    setup_database(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    assert schema_version(conn) == SCHEMA_VERSION
+    assert conn.execute("SELECT link FROM links").fetchall() == [("https://kept.example",)]
+    # Running again is a no-op
+    assert migrate(conn) == SCHEMA_VERSION
+    conn.close()
+
+
+def test_concurrent_workers_apply_each_migration_once(tmp_path, monkeypatch):
+    applied = Counter()
+
+    def counted(version, apply):
+        def step(conn):
+            applied[version] += 1
+            return apply(conn)
+        return step
+
+    monkeypatch.setattr(database_setup, "MIGRATIONS", [
+        (version, description, counted(version, apply)) for version, description, apply in database_setup.MIGRATIONS
+    ])
+    db_path = str(tmp_path / "shared.db")
+    barrier = threading.Barrier(6)
+    errors = []
+
+    def worker():
+        barrier.wait()
+        try:
+            setup_database(db_path)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert applied == Counter({version: 1 for version, _, _ in database_setup.MIGRATIONS})
+    conn = sqlite3.connect(db_path)
+    assert schema_version(conn) == SCHEMA_VERSION
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    conn.close()
+
+
+def test_lookups_use_the_composite_indexes(tmp_path):
+    conn = sqlite3.connect(setup_database(str(tmp_path / "plan.db")))
+
+    plan = query_plan(conn, "SELECT link FROM links WHERE user_id = ? ORDER BY timestamp DESC", ("u1",))
+    assert "USING INDEX idx_links_user_timestamp (user_id=?)" in plan
+    assert "TEMP B-TREE" not in plan
+
+    plan = query_plan(conn, """
+        SELECT id, user_id, task, reminder_time FROM reminders
+        WHERE completed = 0 AND reminder_time > datetime('now')
+        ORDER BY reminder_time ASC
+    """)
+    assert "USING INDEX idx_reminders_completed_time (completed=? AND reminder_time>?)" in plan
+    assert "TEMP B-TREE" not in plan
+
+    plan = query_plan(conn, """
+        SELECT task, reminder_time FROM reminders
+        WHERE user_id = ? AND completed = 0
+        ORDER BY reminder_time ASC
+    """, ("u1",))
+    assert "USING INDEX idx_reminders_user_pending (user_id=?)" in plan
+    assert "TEMP B-TREE" not in plan
+    conn.close()
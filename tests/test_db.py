@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from src.langgraph_whatsapp.database_setup import setup_database
+from src.langgraph_whatsapp.db import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(setup_database(str(tmp_path / "test.db")), busy_timeout_ms=10_000)
+    yield pool
+    pool.close_all()
+
+
+def test_threads_reuse_one_wal_connection(pool):
+    first = pool.connection()
+    assert first.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    first.close()
+    second = pool.connection()
+    assert second._raw is first._raw
+    second.close()
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool.connection()._raw))
+    thread.start()
+    thread.join()
+    assert other[0] is not first._raw
+    assert pool.stats()["opened"] == 2
+
+
+def test_close_discards_uncommitted_writes_and_frees_the_write_lane(pool):
+    conn = pool.connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO links (user_id, link) VALUES (?, ?)", ("u1", "https://a.example"))
+    assert pool._write_lane.locked()
+    conn.close()
+    assert not pool._write_lane.locked()
+
+    conn = pool.connection()
+    conn.execute("INSERT INTO links (user_id, link) VALUES (?, ?)", ("u1", "https://b.example"))
+    conn.commit()
+    assert not pool._write_lane.locked()
+    assert [row["link"] for row in conn.execute("SELECT link FROM links")] == ["https://b.example"]
+    conn.close()
+
+
+def test_concurrent_writers_do_not_hit_database_is_locked(pool):
+    errors = []
+
+    def writer(n):
+        for i in range(20):
+            try:
+                conn = pool.connection()
+                conn.execute("INSERT INTO links (user_id, link) VALUES (?, ?)", (f"u{n}", f"https://x/{i}"))
+                conn.commit()
+                conn.close()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    conn = pool.connection()
+    assert conn.execute("SELECT COUNT(*) FROM links").fetchone()[0] == 1000
+    conn.close()
+
+
+def test_close_all_reopens_on_next_checkout(pool):
+    conn = pool.connection()
+    raw = conn._raw
+    conn.close()
+    pool.close_all()
+    conn = pool.connection()
+    assert conn._raw is not raw
+    assert conn.execute("SELECT COUNT(*) FROM links").fetchone()[0] == 0
+    conn.close()
@@ -0,0 +1,49 @@
+import sqlite3
+
+import pytest
+
+from src.langgraph_whatsapp import expense_aggregates
+from src.langgraph_whatsapp.database_setup import setup_database
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = setup_database(str(tmp_path / "test.db"))
+    conn = sqlite3.connect(db_path)
+    yield conn
+    conn.close()
+
+
+ROWS = [
+    ["2026-10-01", "500", "Food", "whatsapp:+1"],
+    ["2026-10-02", "1,000", "Rent", "whatsapp:+2"],
+    ["2026-10-03", "250.5", "Food"],
+    ["2026-09-30", "75", "Food", "whatsapp:+1"],
+    ["bad row"],
+    ["2026-10-04", "not a number", "Food"],
+]
+
+
+def test_rebuild_and_month_totals(conn):
+    assert not expense_aggregates.is_built(conn)
+    expense_aggregates.rebuild(ROWS, conn)
+    assert expense_aggregates.is_built(conn)
+    assert expense_aggregates.month_totals("2026-10", conn=conn) == {"Food": 750.5, "Rent": 1000.0}
+    assert expense_aggregates.month_totals("2026-10", "whatsapp:+1", conn) == {"Food": 500.0}
+
+
+def test_record_expense_updates_user_and_all_buckets(conn):
+    expense_aggregates.rebuild(ROWS, conn)
+    expense_aggregates.record_expense("whatsapp:+1", "2026-10-05", "Food", 20, conn)
+    assert expense_aggregates.month_totals("2026-10", conn=conn)["Food"] == 770.5
+    assert expense_aggregates.month_totals("2026-10", "whatsapp:+1", conn)["Food"] == 520.0
+
+
+def test_find_drift(conn):
+    expense_aggregates.rebuild(ROWS, conn)
+    assert expense_aggregates.find_drift(ROWS, conn) == []
+
+    # An expense written to the sheet but never recorded locally
+    rows = ROWS + [["2026-10-06", "40", "Fuel", "whatsapp:+2"]]
+    drift = expense_aggregates.find_drift(rows, conn)
+    assert {(d["user_id"], d["category"]) for d in drift} == {("whatsapp:+2", "Fuel"), ("*", "Fuel")}
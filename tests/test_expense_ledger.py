@@ -0,0 +1,80 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from src.langgraph_whatsapp import expense_aggregates, sheets_setup
+from src.langgraph_whatsapp.database_setup import setup_database
+from src.langgraph_whatsapp.db import ConnectionPool
+from src.langgraph_whatsapp.expense_queue import ExpenseWriteQueue
+
+MONTH = datetime.now().strftime('%Y-%m')
+SHEET = [[f"{MONTH}-01", "500", "Food", "whatsapp:+1"]]
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    pool = ConnectionPool(setup_database(str(tmp_path / "test.db")))
+    queue = ExpenseWriteQueue(lambda rows: None, interval=60, connect=pool.connection)
+    monkeypatch.setattr(sheets_setup, "get_db_connection", pool.connection)
+    monkeypatch.setattr(sheets_setup, "expense_write_queue", queue)
+    monkeypatch.setattr(sheets_setup, "get_spreadsheet_id", lambda: "sheet")
+    monkeypatch.setattr(sheets_setup, "get_sheets_service", lambda: None)
+    monkeypatch.setattr(sheets_setup, "read_expense_rows", lambda: [list(row) for row in SHEET])
+    yield pool
+    queue.stop(flush=False)
+    pool.close_all()
+
+
+def _food_total(pool):
+    conn = pool.connection()
+    try:
+        return expense_aggregates.month_totals(MONTH, conn=conn).get("Food")
+    finally:
+        conn.close()
+
+
+def test_expense_added_during_a_rebuild_is_counted_once(ledger, monkeypatch):
+    find_drift = expense_aggregates.find_drift
+    adder = threading.Thread(target=sheets_setup.add_expense, args=(20, "food", "whatsapp:+2"))
+
+    def find_drift_while_adding(rows, conn):
+        # The snapshot is taken; an expense arriving now must wait for the rebuild
+        adder.start()
+        adder.join(0.2)
+        return find_drift(rows, conn)
+
+    monkeypatch.setattr(expense_aggregates, "find_drift", find_drift_while_adding)
+    drift = sheets_setup.reconcile_expense_totals()
+    adder.join()
+
+    assert drift and drift[0]["sheet_total"] == 500
+    assert _food_total(ledger) == 520
+
+
+def test_rebuild_counts_queued_rows_once(ledger):
+    sheets_setup.add_expense(20, "food", "whatsapp:+2")
+    assert sheets_setup.rebuild_expense_totals() == 3
+    assert _food_total(ledger) == 520
+
+
+def test_queued_row_already_in_the_sheet_is_counted_once(ledger, monkeypatch):
+    sheets_setup.add_expense(20, "food", "whatsapp:+2")
+    queued = sheets_setup.expense_write_queue.pending_rows()
+    # A flush appended the row but has not deleted it from the queue yet
+    monkeypatch.setattr(sheets_setup, "read_expense_rows", lambda: [list(row) for row in SHEET] + queued)
+    sheets_setup.rebuild_expense_totals()
+    assert _food_total(ledger) == 520
+
+
+def test_recent_expenses_are_the_last_rows_of_a_long_sheet(ledger, monkeypatch):
+    sheets_setup.add_expense(20, "food", "whatsapp:+2")
+    sheets_setup.add_expense(30, "travel", "whatsapp:+2")
+    flushed = sheets_setup.expense_write_queue.pending_rows()[0]
+    # 150 rows, the last of them appended by a flush that has not deleted its queued row yet
+    sheet = [[f"{MONTH}-01", str(i), "Food", "whatsapp:+1", f"e{i}"] for i in range(149)] + [flushed]
+    monkeypatch.setattr(sheets_setup, "read_expense_rows", lambda: sheet)
+    monkeypatch.setattr(sheets_setup, "get_sheets_service", lambda: object())
+
+    listed = sheets_setup.list_recent_expenses(limit=3).splitlines()[1:]
+    assert listed == [f"- {MONTH}-01: 148 on Food", f"- {flushed[0]}: 20.0 on Food", f"- {flushed[0]}: 30.0 on Travel"]
@@ -0,0 +1,170 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src.langgraph_whatsapp.database_setup import setup_database
+from src.langgraph_whatsapp.expense_queue import ExpenseWriteQueue
+from src.langgraph_whatsapp.leader import LeaderLease
+
+
+class QuotaError(Exception):
+    class resp:
+        status = 429
+
+
+@pytest.fixture
+def connect(tmp_path):
+    db_path = setup_database(str(tmp_path / "test.db"))
+    return lambda: sqlite3.connect(db_path)
+
+
+def test_pending_rows_from_all_users_are_coalesced_into_one_append(connect):
+    batches = []
+    queue = ExpenseWriteQueue(batches.append, interval=60, connect=connect)
+    for i in range(5):
+        queue.enqueue(f"whatsapp:+{i}", "2026-10-01", 100 + i, "Food")
+
+    assert queue.stats()["depth"] == 5
+    assert queue.flush() == 5
+    assert [[row[:4] for row in batch] for batch in batches] == [
+        [["2026-10-01", 100.0 + i, "Food", f"whatsapp:+{i}"] for i in range(5)]
+    ]
+    assert len({row[4] for row in batches[0]}) == 5
+    assert queue.stats()["depth"] == 0
+    queue.stop(flush=False)
+
+
+def test_retryable_failure_keeps_rows_and_backs_off(connect):
+    def fail(rows):
+        raise QuotaError("quota exceeded")
+
+    queue = ExpenseWriteQueue(fail, interval=60, connect=connect)
+    queue.enqueue("whatsapp:+1", "2026-10-01", 100, "Food")
+    queue.stop(flush=False)
+
+    assert queue.flush() == 0
+    stats = queue.stats()
+    assert stats["depth"] == 1
+    assert stats["failures"] == 1
+    assert stats["backoff_seconds"] > 0
+    assert [row[:4] for row in queue.pending_rows()] == [["2026-10-01", 100.0, "Food", "whatsapp:+1"]]
+
+
+def test_non_retryable_rows_are_dead_lettered(connect):
+    def fail(rows):
+        raise ValueError("bad request")
+
+    queue = ExpenseWriteQueue(fail, interval=60, max_attempts=1, connect=connect)
+    queue.enqueue("whatsapp:+1", "2026-10-01", 100, "Food")
+    queue.stop(flush=False)
+
+    queue.flush()
+    stats = queue.stats()
+    assert stats["depth"] == 0
+    assert stats["failed_rows"] == 1
+
+
+class _Sheet:
+    def __init__(self):
+        self.rows = []
+        self.lock = threading.Lock()
+
+    def append(self, rows):
+        with self.lock:
+            self.rows.extend(rows)
+
+    def entries(self):
+        with self.lock:
+            return {row[4] for row in self.rows}
+
+
+def test_batch_appended_before_a_crash_is_not_appended_again(connect):
+    sheet = _Sheet()
+
+    def append_then_crash(rows):
+        sheet.append(rows)
+        raise KeyboardInterrupt  # the process dies before the rows are deleted
+
+    crashed = ExpenseWriteQueue(append_then_crash, interval=60, holder="a", connect=connect)
+    for i in range(3):
+        crashed.enqueue("whatsapp:+1", "2026-10-01", 100 + i, "Food")
+    crashed.stop(flush=False)
+    with pytest.raises(KeyboardInterrupt):
+        crashed.flush()
+    assert crashed.stats()["claimed_rows"] == 3
+
+    survivor = ExpenseWriteQueue(sheet.append, interval=60, written_entries=sheet.entries, claim_timeout=0,
+                                 holder="b", connect=connect)
+    assert survivor.flush() == 0
+    stats = survivor.stats()
+    assert (stats["depth"], stats["claimed_rows"], stats["reclaimed"], stats["skipped_duplicates"]) == (0, 0, 3, 3)
+    assert len(sheet.rows) == 3
+
+
+def test_failed_append_that_went_through_is_not_repeated(connect):
+    sheet = _Sheet()
+    calls = []
+
+    def append_then_time_out(rows):
+        sheet.append(rows)
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise TimeoutError("read timed out")
+
+    queue = ExpenseWriteQueue(append_then_time_out, interval=60, written_entries=sheet.entries, connect=connect)
+    queue.enqueue("whatsapp:+1", "2026-10-01", 100, "Food")
+    queue.enqueue("whatsapp:+1", "2026-10-01", 200, "Food")
+    queue.stop(flush=False)
+    assert queue.flush() == 0
+    queue.enqueue("whatsapp:+1", "2026-10-01", 300, "Food")
+    assert queue.flush() == 1
+    assert sorted(row[1] for row in sheet.rows) == [100.0, 200.0, 300.0]
+
+
+def test_concurrent_flushers_append_each_row_once(connect):
+    sheet = _Sheet()
+    queues = [ExpenseWriteQueue(sheet.append, interval=60, batch_size=7, holder=f"worker-{i}", connect=connect)
+              for i in range(4)]
+    for i in range(100):
+        queues[0].enqueue(f"whatsapp:+{i}", "2026-10-01", i, "Food")
+    for queue in queues:
+        queue.stop(flush=False)
+
+    threads = [threading.Thread(target=queue.flush) for queue in queues]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(row[1] for row in sheet.rows) == [float(i) for i in range(100)]
+    assert queues[0].stats()["depth"] == 0
+
+
+def test_only_the_lease_holder_runs_the_flusher(connect):
+    sheet = _Sheet()
+    now = [1000.0]
+    workers = {}
+    for name in ("a", "b"):
+        queue = ExpenseWriteQueue(sheet.append, interval=0.01, holder=name, connect=connect)
+        lease = LeaderLease("reminders", queue.start, lambda queue=queue: queue.stop(flush=False),
+                            holder=name, connect=connect, clock=lambda: now[0])
+        workers[name] = queue, lease
+    (a, a_lease), (b, b_lease) = workers["a"], workers["b"]
+
+    assert a_lease.renew() is True and b_lease.renew() is False
+    # Any worker queues rows; only the leader's flusher writes them
+    for i in range(3):
+        b.enqueue(f"whatsapp:+{i}", "2026-10-01", 100 + i, "Food")
+    deadline = time.monotonic() + 5
+    while len(sheet.rows) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(sheet.rows) == 3
+    assert a.running and not b.running
+
+    # The leader stops: the other worker takes over the flusher
+    a_lease.stop()
+    assert not a.running
+    assert b_lease.renew() is True and b.running
+    b_lease.stop()
+    assert not b.running
@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import httplib2
+from google.oauth2.credentials import Credentials
+
+from src.langgraph_whatsapp.google_clients import GoogleServiceRegistry, TransportPool
+
+
+def _credentials():
+    return Credentials(token="token", expiry=datetime.utcnow() + timedelta(hours=1))
+
+
+class _Loader:
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, interactive):
+        self.calls += 1
+        time.sleep(self.delay)
+        return _credentials()
+
+
+class _FakeHttp:
+    """Stands in for an authorized httplib2 transport; answers every request with an empty range."""
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.requests = 0
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        self.requests += 1
+        time.sleep(self.delay)
+        return httplib2.Response({"status": "200"}), json.dumps({"values": []}).encode()
+
+
+def _registry(loader, pool_size=2):
+    registry = GoogleServiceRegistry(pool_size=pool_size)
+    registry.register("sheets", "sheets", "v4", loader, "unused.pickle")
+    return registry
+
+
+def test_service_is_built_once_and_reused():
+    loader = _Loader()
+    registry = _registry(loader)
+    service = registry.get("sheets")
+    assert service is not None
+    assert registry.get("sheets") is service
+    assert loader.calls == 1
+    stats = registry.stats()["sheets"]
+    assert (stats["built"], stats["builds"], stats["refreshes"]) == (True, 1, 0)
+    assert 3500 < stats["expires_in_seconds"] <= 3600
+
+
+def test_concurrent_first_gets_build_a_single_service():
+    loader = _Loader(delay=0.05)
+    registry = _registry(loader)
+    barrier = threading.Barrier(16)
+    services = []
+
+    def get():
+        barrier.wait()
+        services.append(registry.get("sheets"))
+
+    threads = [threading.Thread(target=get) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loader.calls == 1
+    assert len(services) == 16 and all(service is services[0] for service in services)
+    assert registry.stats()["sheets"]["builds"] == 1
+
+
+def test_missing_credentials_are_retried_on_the_next_get():
+    registry = _registry(lambda interactive: None)
+    assert registry.get("sheets", interactive=False) is None
+    assert registry.stats()["sheets"] == {
+        "built": False, "builds": 0, "refreshes": 0, "expires_in_seconds": None,
+        "transports": 0, "transports_in_use": 0, "pool_size": 2,
+    }
+
+
+def test_requests_run_on_a_bounded_pool_of_reused_transports(monkeypatch):
+    transports = []
+
+    def create(pool):
+        http = _FakeHttp(delay=0.05)
+        transports.append(http)
+        pool.created += 1
+        return http
+
+    monkeypatch.setattr(TransportPool, "_create", create)
+    registry = _registry(_Loader(), pool_size=2)
+    service = registry.get("sheets")
+
+    def read():
+        request = service.spreadsheets().values().get(spreadsheetId="sheet", range="A1:B2")
+        assert request.execute() == {"values": []}
+
+    threads = [threading.Thread(target=read) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    read()
+
+    stats = registry.stats()["sheets"]
+    assert (stats["transports"], stats["transports_in_use"]) == (2, 0)
+    assert len(transports) == 2
+    assert sum(http.requests for http in transports) == 7
+
+
+def test_lease_blocks_once_every_transport_is_in_use(monkeypatch):
+    monkeypatch.setattr(TransportPool, "_create", lambda pool: _FakeHttp())
+    pool = TransportPool(_credentials(), size=1, timeout=5)
+    second_leased = threading.Event()
+
+    def lease_second():
+        with pool.lease():
+            second_leased.set()
+
+    with pool.lease() as first:
+        thread = threading.Thread(target=lease_second)
+        thread.start()
+        assert not second_leased.wait(0.05)
+        assert pool.in_use == 1
+    thread.join()
+    assert second_leased.is_set()
+    with pool.lease() as again:
+        assert again is first
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from src.langgraph_whatsapp.database_setup import setup_database
+from src.langgraph_whatsapp.db import ConnectionPool
+from src.langgraph_whatsapp.idempotency import IdempotencyStore
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(setup_database(str(tmp_path / "test.db")))
+    yield pool
+    pool.close_all()
+
+
+def test_retry_is_answered_from_memory_without_recomputing(pool):
+    store = IdempotencyStore(connect=pool.connection)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return "<Response>once</Response>"
+
+    async def main():
+        return [await store.run("SM1", compute) for _ in range(3)]
+
+    assert asyncio.run(main()) == ["<Response>once</Response>"] * 3
+    assert calls == [1]
+    stats = store.stats()
+    assert (stats["computed"], stats["memory_hits"], stats["in_flight"]) == (1, 2, 0)
+
+
+def test_concurrent_deliveries_share_one_computation(pool):
+    store = IdempotencyStore(connect=pool.connection)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "<Response>slow</Response>"
+
+    async def main():
+        first = asyncio.ensure_future(store.run("SM2", compute))
+        await asyncio.sleep(0.01)
+        # The original delivery's connection dropped; its retries still get the result
+        retries = [asyncio.ensure_future(store.run("SM2", compute)) for _ in range(3)]
+        first.cancel()
+        return await asyncio.gather(*retries)
+
+    assert asyncio.run(main()) == ["<Response>slow</Response>"] * 3
+    assert calls == [1]
+    assert store.stats()["joined"] == 3
+
+
+def test_response_survives_a_restart_until_retention_expires(pool):
+    now = [1_000_000.0]
+    first = IdempotencyStore(connect=pool.connection, clock=lambda: now[0])
+
+    async def compute():
+        return "<Response>stored</Response>"
+
+    async def fail():
+        raise AssertionError("recomputed")
+
+    asyncio.run(first.run("SM3", compute))
+    restarted = IdempotencyStore(retention_hours=1, connect=pool.connection, clock=lambda: now[0])
+    assert asyncio.run(restarted.run("SM3", fail)) == "<Response>stored</Response>"
+    assert restarted.stats()["db_hits"] == 1
+
+    now[0] += 7200
+    expired = IdempotencyStore(retention_hours=1, connect=pool.connection, clock=lambda: now[0])
+    assert asyncio.run(expired.run("SM3", lambda: asyncio.sleep(0, "<Response>again</Response>"))) == "<Response>again</Response>"
+
+
+def test_memory_is_bounded_and_expired_rows_are_purged(pool):
+    now = [1_000_000.0]
+    store = IdempotencyStore(cache_size=2, memory_ttl=60, retention_hours=1, purge_every=3,
+                             connect=pool.connection, clock=lambda: now[0])
+    store.save("SM-old", "<Response/>")
+    now[0] += 7200
+    for sid in ("SM4", "SM5", "SM6"):
+        asyncio.run(store.run(sid, lambda: asyncio.sleep(0, "<Response/>")))
+
+    assert store.stats()["entries"] == 2
+    assert store.stats()["purged"] == 1
+    conn = pool.connection()
+    assert conn.execute("SELECT count(*) FROM webhook_responses").fetchone()[0] == 3
+    conn.close()
+
+
+def test_a_retry_reaching_another_worker_waits_for_the_first(pool):
+    first = IdempotencyStore(holder="a", connect=pool.connection)
+    other = IdempotencyStore(holder="b", poll_interval=0.01, connect=pool.connection)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "<Response>slow</Response>"
+
+    async def main():
+        running = asyncio.ensure_future(first.run("SM7", compute))
+        await asyncio.sleep(0.02)
+        retry = await other.run("SM7", compute)
+        return await running, retry
+
+    assert asyncio.run(main()) == ("<Response>slow</Response>",) * 2
+    assert calls == [1]
+    assert (other.stats()["waited"], other.stats()["db_hits"], other.stats()["computed"]) == (1, 1, 0)
+
+
+def test_the_claim_of_a_dead_worker_is_taken_over(pool):
+    now = [1_000_000.0]
+    dead = IdempotencyStore(holder="a", connect=pool.connection, clock=lambda: now[0])
+    assert dead.claim("SM8") == (None, True)
+
+    other = IdempotencyStore(holder="b", claim_timeout=120, poll_interval=0.01, connect=pool.connection,
+                             clock=lambda: now[0])
+    assert other.claim("SM8") == (None, False)
+    now[0] += 121
+    assert asyncio.run(other.run("SM8", lambda: asyncio.sleep(0, "<Response>again</Response>"))) == \
+        "<Response>again</Response>"
+    assert dead.claim("SM8") == ("<Response>again</Response>", False)
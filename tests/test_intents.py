@@ -0,0 +1,48 @@
+from src.langgraph_whatsapp import intents
+from src.langgraph_whatsapp.intents import route, scan_keywords
+
+
+def test_scan_keywords_reports_overlapping_and_nested_keywords():
+    keywords = scan_keywords("show my reminders")
+    assert {"show", "my", "remind", "reminder", "reminders"} <= keywords
+    assert "#digit" in scan_keywords("last 5")
+
+
+def test_expense_slots():
+    assert route("I spent 500 on groceries").slots == {"amount": "500", "category": "groceries"}
+    assert route("I paid 1000 for rent").slots == {"amount": "1000", "category": "rent"}
+    assert route("i spent on food 500").slots == {"amount": "500", "category": "food"}
+
+
+def test_generic_expense_fallback_takes_last_on_or_for():
+    intent = route("gave 50 to the guy for lunch on monday")
+    assert intent.name == intents.EXPENSE
+    assert intent.slots == {"amount": "50", "category": "monday"}
+
+
+def test_multiline_messages():
+    intent = route("I spent 200 on food\nI spent 100 on fuel")
+    assert intent.name == intents.EXPENSE_BATCH
+    assert intent.slots["expenses"] == [("200", "food"), ("100", "fuel")]
+
+    intent = route("budget for food\nbudget for fuel\nbudget for rent")
+    assert intent.name == intents.BUDGET_BATCH
+    assert intent.slots == {"categories": ["food", "fuel", "rent"], "consolidated": True}
+
+
+def test_priority_order():
+    assert route("What's my budget for groceries?").name == intents.BUDGET
+    assert route("this is the budget").name == intents.ALL_BUDGETS
+    assert route("Show my last 5 expenses").slots == {"limit": 5}
+    assert route("Book a meeting with John at 3 PM").slots["title"] == "Meeting with John"
+    assert route("Remind me tomorrow to check email").slots == {"time": "tomorrow", "task": "check email"}
+    assert route("save https://github.com/foo/bar").name == intents.SAVE_LINKS
+    assert route("Find my GitHub links").slots == {"query": "github"}
+    assert route("Show my saved links").slots == {"query": None}
+    assert route("hello").name == intents.UNKNOWN
+
+
+def test_reminder_typo_is_normalized():
+    intent = route("rmeind me to drink water at 18.39 ist")
+    assert intent.name == intents.REMINDER
+    assert intent.slots == {"time": "18:39", "task": "drink water"}
@@ -0,0 +1,76 @@
+import pytest
+
+from src.langgraph_whatsapp.database_setup import setup_database
+from src.langgraph_whatsapp.db import ConnectionPool
+from src.langgraph_whatsapp.leader import LeaderLease
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(setup_database(str(tmp_path / "test.db")))
+    yield pool
+    pool.close_all()
+
+
+class Worker:
+    """One process's lease, recording its leadership changes."""
+
+    def __init__(self, pool, name, clock, connect=None):
+        self.events = []
+        self.lease = LeaderLease(
+            "reminders", lambda: self.events.append("elected"), lambda: self.events.append("demoted"),
+            ttl=15, renew_every=5, holder=name, connect=connect or pool.connection, clock=clock,
+        )
+
+
+def test_exactly_one_worker_leads_and_a_dead_leaders_lease_expires(pool):
+    now = [1000.0]
+    a, b = Worker(pool, "a", lambda: now[0]), Worker(pool, "b", lambda: now[0])
+
+    assert a.lease.renew() is True
+    assert b.lease.renew() is False
+    now[0] += 5
+    assert a.lease.renew() is True and b.lease.renew() is False
+
+    # a dies without releasing: b takes over once the lease has expired
+    now[0] += 14
+    assert b.lease.renew() is False
+    now[0] += 2
+    assert b.lease.renew() is True
+    assert a.events == ["elected"] and b.events == ["elected"]
+
+    # a comes back: it finds the lease taken and steps down
+    assert a.lease.renew() is False
+    assert a.events == ["elected", "demoted"] and a.lease.stats()["demotions"] == 1
+
+
+def test_stop_releases_the_lease_for_immediate_takeover(pool):
+    now = [1000.0]
+    a, b = Worker(pool, "a", lambda: now[0]), Worker(pool, "b", lambda: now[0])
+    a.lease.start()
+    try:
+        assert a.lease.is_leader and b.lease.renew() is False
+    finally:
+        a.lease.stop()
+    assert a.events == ["elected", "demoted"]
+    assert b.lease.renew() is True
+
+
+def test_leader_steps_down_before_its_lease_can_be_taken_when_renewals_fail(pool):
+    now = [1000.0]
+    broken = [False]
+
+    def connect():
+        if broken[0]:
+            raise OSError("database unavailable")
+        return pool.connection()
+
+    a = Worker(pool, "a", lambda: now[0], connect=connect)
+    assert a.lease.renew() is True
+    broken[0] = True
+    now[0] += 5
+    assert a.lease.renew() is True
+    # Ten seconds after the last renewal is one renew interval before expiry
+    now[0] += 5
+    assert a.lease.renew() is False
+    assert a.events == ["elected", "demoted"] and a.lease.stats()["renew_errors"] == 2
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+from src.langgraph_whatsapp.database_setup import setup_database
+from src.langgraph_whatsapp.link_search import build_match_query, search_links
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(setup_database(str(tmp_path / "test.db")))
+    yield conn
+    conn.close()
+
+
+def save(conn, user_id, link, days_ago=0, title=None):
+    conn.execute(
+        "INSERT INTO links (user_id, link, title, timestamp) VALUES (?, ?, ?, datetime('now', ?))",
+        (user_id, link, title, f"-{days_ago} days")
+    )
+    conn.commit()
+
+
+def links(page):
+    return [result.link for result in page.results]
+
+
+def test_match_query_uses_owner_scoped_prefix_terms():
+    assert build_match_query("GitHub repos", 7) == '"u7xgithub"* OR "u7xrepos"*'
+    assert build_match_query("https www com", 7) is None
+
+
+def test_host_path_and_title_terms_are_searchable(conn):
+    save(conn, "u1", "https://github.com/SkyworkAI/SkyReels-V2")
+    save(conn, "u1", "https://x.com/elonmusk/status/1")
+    save(conn, "u1", "https://example.com/post", title="Notes on Rust async")
+    save(conn, "u2", "https://github.com/someone/else")
+
+    assert links(search_links("u1", "github", conn=conn)) == ["https://github.com/SkyworkAI/SkyReels-V2"]
+    assert links(search_links("u1", "skyreels", conn=conn)) == ["https://github.com/SkyworkAI/SkyReels-V2"]
+    assert links(search_links("u1", "elon", conn=conn)) == ["https://x.com/elonmusk/status/1"]
+    assert links(search_links("u1", "rust", conn=conn)) == ["https://example.com/post"]
+    assert links(search_links("u1", "linkedin", conn=conn)) == []
+
+
+def test_triggers_keep_the_index_in_sync(conn):
+    save(conn, "u1", "https://example.com/a")
+    conn.execute("UPDATE links SET title = 'Kubernetes guide' WHERE link = 'https://example.com/a'")
+    assert links(search_links("u1", "kubernetes", conn=conn)) == ["https://example.com/a"]
+    conn.execute("DELETE FROM links")
+    assert links(search_links("u1", "kubernetes", conn=conn)) == []
+    assert links(search_links("u1", "example", conn=conn)) == []
+
+
+def test_ranking_prefers_more_matching_terms_then_recency(conn):
+    save(conn, "u1", "https://github.com/langchain-ai/langgraph", days_ago=30)
+    save(conn, "u1", "https://pypi.org/project/langgraph", days_ago=60)
+    save(conn, "u1", "https://docs.example.org/langgraph", days_ago=0)
+
+    ranked = links(search_links("u1", "langgraph github", conn=conn))
+    assert ranked[0] == "https://github.com/langchain-ai/langgraph"
+    assert ranked[1:] == ["https://docs.example.org/langgraph", "https://pypi.org/project/langgraph"]
+
+
+def test_pagination_and_listing_without_query(conn):
+    for i in range(5):
+        save(conn, "u1", f"https://example.com/{i}", days_ago=i)
+
+    first = search_links("u1", page=1, page_size=2, conn=conn)
+    assert links(first) == ["https://example.com/0", "https://example.com/1"] and first.has_more
+    last = search_links("u1", page=3, page_size=2, conn=conn)
+    assert links(last) == ["https://example.com/4"] and not last.has_more
+    assert len(search_links("u1", "example", page_size=10, conn=conn).results) == 5
+
+
+def test_forged_owner_prefix_does_not_expose_other_users_links(conn):
+    save(conn, "victim", "https://example.com/mine")
+    save(conn, "attacker", "https://evil.com/x@u1xsecret")
+    save(conn, "attacker", "https://evil.com/x[u1xsecret|u1xsecret*u1xsecret$")
+
+    assert links(search_links("victim", "secret", conn=conn)) == []
+    assert links(search_links("victim", "example", conn=conn)) == ["https://example.com/mine"]
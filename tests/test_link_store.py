@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+from src.langgraph_whatsapp.database_setup import MIGRATIONS, migrate, setup_database
+from src.langgraph_whatsapp.intents import URL_PATTERN
+from src.langgraph_whatsapp.link_search import search_links
+from src.langgraph_whatsapp.link_store import canonical_url, save_links, url_hash
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(setup_database(str(tmp_path / "test.db")))
+    yield conn
+    conn.close()
+
+
+def test_canonical_url():
+    assert canonical_url("HTTPS://GitHub.com:443/Foo/Bar/") == "https://github.com/Foo/Bar"
+    assert canonical_url("https://example.com/") == "https://example.com"
+    assert canonical_url("http://example.com:8080/a?b=1&utm_source=x&fbclid=y&c=2#top") == "http://example.com:8080/a?b=1&c=2#top"
+    assert url_hash("https://youtu.be/abc?si=share") == url_hash("https://YOUTU.BE/abc/")
+    assert url_hash("http://example.com/a") != url_hash("https://example.com/a")
+
+
+def test_url_pattern_keeps_query_strings():
+    text = "see https://example.com/watch?v=abc&utm_source=wa and http://localhost:8000/x"
+    assert URL_PATTERN.findall(text) == ["https://example.com/watch?v=abc&utm_source=wa", "http://localhost:8000/x"]
+
+
+def test_save_links_upserts_on_canonical_url(conn):
+    result = save_links("u1", ["https://github.com/a/b", "https://GITHUB.com/a/b/", "https://x.com/post"], conn=conn)
+    assert result.saved == ["https://github.com/a/b", "https://x.com/post"] and result.duplicates == []
+
+    conn.execute("UPDATE links SET timestamp = datetime('now', '-30 days')")
+    conn.commit()
+    result = save_links("u1", ["https://github.com/a/b?utm_medium=share", "https://new.example"], conn=conn)
+    assert result.saved == ["https://new.example"]
+    assert result.duplicates == ["https://github.com/a/b?utm_medium=share"]
+
+    rows = conn.execute("SELECT link, julianday('now') - julianday(timestamp) < 1 FROM links ORDER BY id").fetchall()
+    assert rows == [("https://github.com/a/b", 1), ("https://x.com/post", 0), ("https://new.example", 1)]
+    # Other users keep their own copy, and the bumped row is still indexed once
+    assert save_links("u2", ["https://github.com/a/b"], conn=conn).saved == ["https://github.com/a/b"]
+    assert [r.link for r in search_links("u1", "github", conn=conn).results] == ["https://github.com/a/b"]
+
+
+def test_save_links_leaves_the_callers_transaction_open(conn):
+    conn.execute("INSERT INTO links (user_id, link, url_hash) VALUES ('u1', 'https://a.example', 1)")
+    save_links("u1", ["https://b.example"], conn=conn)
+    assert conn.in_transaction
+    conn.rollback()
+    assert conn.execute("SELECT COUNT(*) FROM links").fetchone()[0] == 0
+
+
+def test_migration_collapses_existing_duplicates(tmp_path):
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    # A database at version 3, before links had a dedupe key
+    for version, _, apply in MIGRATIONS[:3]:
+        apply(conn)
+        conn.execute(f"PRAGMA user_version = {version}")
+    conn.executemany("INSERT INTO links (user_id, link) VALUES (?, ?)", [
+        ("u1", "https://example.com/a"), ("u1", "https://EXAMPLE.com/a/"), ("u1", "https://example.com/b"),
+    ])
+
+    migrate(conn)
+    assert conn.execute("SELECT link FROM links ORDER BY id").fetchall() == [("https://EXAMPLE.com/a/",), ("https://example.com/b",)]
+    assert len(search_links("u1", "example", conn=conn).results) == 2
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO links (user_id, link, url_hash) VALUES ('u1', 'https://example.com/b', ?)",
+                      (url_hash("https://example.com/b"),))
+    conn.close()
+
+
+def test_migration_4_keys_match_the_current_canonical_url():
+    from src.langgraph_whatsapp.database_setup import _v4_url_hash
+
+    # If this fails, canonical_url changed: add a migration that re-keys links.url_hash
+    for url in ("HTTPS://GitHub.com:443/Foo/Bar/", "http://user:pw@example.com:8080/a?b=1&utm_source=x&si=y#top",
+                "https://youtu.be/abc?si=share", "https://example.com./"):
+        assert _v4_url_hash(url) == url_hash(url)
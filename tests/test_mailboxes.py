@@ -0,0 +1,107 @@
+import asyncio
+
+from src.langgraph_whatsapp.mailboxes import SenderMailboxes
+
+
+def test_one_senders_messages_run_in_arrival_order():
+    mailboxes = SenderMailboxes(max_concurrency=8)
+    log = []
+
+    def job(name, delay):
+        async def run():
+            log.append(f"start {name}")
+            await asyncio.sleep(delay)
+            log.append(f"end {name}")
+            return name
+        return run
+
+    async def main():
+        # The slow expense must finish before the budget question starts
+        return await asyncio.gather(
+            mailboxes.run("whatsapp:+1", job("expense", 0.05)),
+            mailboxes.run("whatsapp:+1", job("budget", 0)),
+        )
+
+    assert asyncio.run(main()) == ["expense", "budget"]
+    assert log == ["start expense", "end expense", "start budget", "end budget"]
+
+
+def test_senders_run_in_parallel_up_to_the_limit():
+    mailboxes = SenderMailboxes(max_concurrency=3)
+    running = []
+    peak = []
+
+    async def job():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.05)
+        running.pop()
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.gather(*(mailboxes.run(f"whatsapp:+{i}", job) for i in range(6)))
+        return loop.time() - started
+
+    elapsed = asyncio.run(main())
+    assert max(peak) == 3
+    assert 0.1 <= elapsed < 0.2
+    assert mailboxes.stats()["processed"] == 6
+
+
+def test_failures_reach_the_caller_and_do_not_block_the_mailbox():
+    mailboxes = SenderMailboxes()
+
+    async def fail():
+        raise ValueError("sheets down")
+
+    async def ok():
+        return "ok"
+
+    async def main():
+        return await asyncio.gather(mailboxes.run("whatsapp:+1", fail), mailboxes.run("whatsapp:+1", ok),
+                                    return_exceptions=True)
+
+    first, second = asyncio.run(main())
+    assert isinstance(first, ValueError) and second == "ok"
+
+
+def test_idle_mailboxes_are_reclaimed():
+    mailboxes = SenderMailboxes(idle_seconds=0.02)
+
+    async def job():
+        return None
+
+    async def main():
+        await asyncio.gather(*(mailboxes.run(f"whatsapp:+{i}", job) for i in range(5)))
+        busy = mailboxes.stats()["mailboxes"]
+        await asyncio.sleep(0.1)
+        # A sender coming back gets a fresh mailbox
+        await mailboxes.run("whatsapp:+0", job)
+        return busy
+
+    assert asyncio.run(main()) == 5
+    stats = mailboxes.stats()
+    assert (stats["reclaimed"], stats["created"], stats["mailboxes"]) == (5, 6, 1)
+
+
+def test_submit_takes_its_place_before_the_caller_awaits():
+    mailboxes = SenderMailboxes()
+    log = []
+
+    def job(name):
+        async def run():
+            log.append(name)
+        return run
+
+    async def webhook(name, delay):
+        answered = mailboxes.submit("whatsapp:+1", job(name))
+        # Whatever the webhook awaits after submitting does not change its turn
+        await asyncio.sleep(delay)
+        await answered
+
+    async def main():
+        await asyncio.gather(webhook("photo", 0.05), webhook("text", 0))
+
+    asyncio.run(main())
+    assert log == ["photo", "text"]
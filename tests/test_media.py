@@ -0,0 +1,66 @@
+import asyncio
+import base64
+import time
+
+import httpx
+import pytest
+
+from src.langgraph_whatsapp.media import MediaFetcher, MediaTooLarge
+
+
+def slow_transport(delay: float, body: bytes = b"\xff\xd8jpeg-bytes"):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        return httpx.Response(200, content=body, headers={"Content-Type": "image/jpeg"})
+    return httpx.MockTransport(handler)
+
+
+def test_attachments_of_one_message_download_concurrently():
+    fetcher = MediaFetcher(global_limit=16, per_message_limit=10, transport=slow_transport(0.1))
+    media = [(f"https://api.twilio.com/media/{i}", "image/jpeg") for i in range(10)]
+
+    async def main():
+        start = time.perf_counter()
+        items = await fetcher.fetch_all(media)
+        elapsed = time.perf_counter() - start
+        await fetcher.close()
+        return items, elapsed
+
+    items, elapsed = asyncio.run(main())
+    assert elapsed < 0.5  # about one download, not ten
+    assert [item.url for item in items] == [url for url, _ in media]
+    assert items[0].data_uri() == "data:image/jpeg;base64," + base64.b64encode(b"\xff\xd8jpeg-bytes").decode()
+    assert fetcher.stats()["max_in_flight"] == 10
+
+
+def test_per_message_limit_caps_concurrency():
+    fetcher = MediaFetcher(global_limit=16, per_message_limit=2, transport=slow_transport(0.02))
+
+    async def main():
+        await fetcher.fetch_all([(f"https://example.com/{i}", "image/png") for i in range(6)])
+        await fetcher.close()
+
+    asyncio.run(main())
+    assert fetcher.stats()["max_in_flight"] == 2
+    assert fetcher.stats()["downloads"] == 6
+
+
+def test_oversized_bodies_are_rejected_and_large_ones_spool_to_disk():
+    body = bytes(range(256)) * 400  # ~100 KB
+    fetcher = MediaFetcher(max_bytes=50_000, transport=slow_transport(0, body))
+
+    async def main():
+        with pytest.raises(MediaTooLarge):
+            await fetcher.fetch("https://example.com/big", "image/png")
+        fetcher.max_bytes = 200_000
+        fetcher.spool_memory = 10_000
+        item = await fetcher.fetch("https://example.com/big", "image/png")
+        await fetcher.close()
+        return item
+
+    item = asyncio.run(main())
+    assert item._spool._rolled  # written to disk past the in-memory threshold
+    assert item.read() == body
+    assert item.data_uri() == "data:image/png;base64," + base64.b64encode(body).decode()
+    item.close()
+    assert fetcher.stats()["rejected_too_large"] == 1
@@ -0,0 +1,106 @@
+import asyncio
+import base64
+import io
+import threading
+
+import httpx
+
+from src.langgraph_whatsapp.media import MediaFetcher
+from src.langgraph_whatsapp.media_cache import MediaCache, media_key
+
+SID_A = "ME" + "a" * 32
+SID_B = "ME" + "b" * 32
+
+
+def twilio_url(sid: str, signature: str = "") -> str:
+    return f"https://api.twilio.com/2010-04-01/Accounts/AC1/Messages/MM1/Media/{sid}{signature}"
+
+
+def test_media_key_prefers_media_sid():
+    assert media_key(twilio_url(SID_A)) == SID_A
+    assert media_key("https://example.com/cat.png") == "https://example.com/cat.png"
+
+
+def test_hits_and_content_addressed_dedup(tmp_path):
+    cache = MediaCache(str(tmp_path), max_bytes=10_000)
+    assert cache.get(twilio_url(SID_A)) is None
+
+    cache.put(twilio_url(SID_A), "image/png", io.BytesIO(b"same bytes")).close()
+    # A forward of the same image arrives with a new MediaSid: stored once
+    cache.put(twilio_url(SID_B), "image/png", io.BytesIO(b"same bytes")).close()
+
+    hit = cache.get(twilio_url(SID_A, "?retry=1"))
+    assert hit.read() == b"same bytes"
+    assert hit.as_image()["data_uri"] == "data:image/png;base64," + base64.b64encode(b"same bytes").decode()
+    hit.close()
+    stats = cache.stats()
+    assert (stats["blobs"], stats["keys"], stats["bytes"]) == (1, 2, 10)
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_lru_eviction_under_byte_budget_and_reload(tmp_path):
+    cache = MediaCache(str(tmp_path), max_bytes=250)
+    for i in range(3):
+        cache.put(f"https://example.com/{i}", "image/jpeg", io.BytesIO(bytes([i]) * 100)).close()
+    # 300 bytes > 250: the least recently used blob (0) was evicted
+    assert cache.get("https://example.com/0") is None
+    cache.get("https://example.com/1").close()  # 1 is now more recent than 2
+    cache.put("https://example.com/3", "image/jpeg", io.BytesIO(b"\x03" * 100)).close()
+    assert cache.get("https://example.com/2") is None
+    assert cache.stats()["evictions"] == 2
+
+    reloaded = MediaCache(str(tmp_path), max_bytes=250)
+    assert reloaded.get("https://example.com/1").read() == b"\x01" * 100
+    assert reloaded.stats()["bytes"] == 200
+
+
+def test_fetcher_serves_retried_webhooks_from_the_cache(tmp_path):
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(str(request.url))
+        return httpx.Response(200, content=b"jpeg", headers={"Content-Type": "image/jpeg"})
+
+    fetcher = MediaFetcher(transport=httpx.MockTransport(handler), cache=MediaCache(str(tmp_path), 10_000))
+    media = [(twilio_url(SID_A), "image/jpeg"), (twilio_url(SID_B), "image/jpeg")]
+
+    async def main():
+        first = await fetcher.fetch_all(media)
+        retry = await fetcher.fetch_all(media)
+        await fetcher.close()
+        return first, retry
+
+    first, retry = asyncio.run(main())
+    assert len(requests_seen) == 2
+    assert [item.read() for item in retry] == [b"jpeg", b"jpeg"]
+    assert fetcher.stats()["cache"]["hits"] == 2
+    for item in first + retry:
+        item.close()
+
+
+def test_fetcher_uses_the_cache_off_the_event_loop(tmp_path):
+    threads = []
+
+    class RecordingCache(MediaCache):
+        def get(self, url):
+            threads.append(threading.current_thread())
+            return super().get(url)
+
+        def put(self, url, content_type, source):
+            threads.append(threading.current_thread())
+            return super().put(url, content_type, source)
+
+    def handler(request):
+        return httpx.Response(200, content=b"jpeg", headers={"Content-Type": "image/jpeg"})
+
+    fetcher = MediaFetcher(transport=httpx.MockTransport(handler), cache=RecordingCache(str(tmp_path), 10_000))
+
+    async def main():
+        items = await fetcher.fetch_all([(twilio_url(SID_A), "image/jpeg")])
+        await fetcher.close()
+        return items
+
+    items = asyncio.run(main())
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+    items[0].close()
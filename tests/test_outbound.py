@@ -0,0 +1,193 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from src.langgraph_whatsapp.outbound import OutboundDispatcher, OutboundError, SenderPool, TokenBucket
+
+
+class _Twilio(BaseHTTPRequestHandler):
+    """Stand-in for the Messages API: answers with the next scripted status (201 when none is left)."""
+    protocol_version = "HTTP/1.1"
+    script = []
+    received = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        cls = type(self)
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        with cls.lock:
+            status = cls.script.pop(0) if cls.script else 201
+            cls.received.append((time.monotonic(), self.path, self.headers.get("Authorization"), form, status))
+        if status == "slow":
+            # Accepted, but the answer comes after the client has timed out
+            time.sleep(0.5)
+            status = 201
+        body = json.dumps({"sid": f"SM{len(cls.received)}", "message": f"status {status}"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def twilio():
+    handler = type("Twilio", (_Twilio,), {"script": [], "received": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield handler, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _dispatcher(base_url, **kwargs):
+    kwargs.setdefault("base_backoff", 0.01)
+    return OutboundDispatcher("AC123", "secret", "+14155238886", base_url=base_url, **kwargs)
+
+
+def test_sends_form_with_auth_and_whatsapp_prefixes(twilio):
+    handler, base_url = twilio
+    dispatcher = _dispatcher(base_url)
+    message = dispatcher.send("+15550001", "hello").result(timeout=5)
+    dispatcher.stop()
+
+    assert message.sid == "SM1" and message.attempts == 1
+    _, path, auth, form, _ = handler.received[0]
+    assert path == "/2010-04-01/Accounts/AC123/Messages.json"
+    assert auth.startswith("Basic ")
+    assert form == {"To": ["whatsapp:+15550001"], "From": ["whatsapp:+14155238886"], "Body": ["hello"]}
+    assert dispatcher.stats()["sent"] == 1
+
+
+def test_paces_to_rate_after_burst(twilio):
+    handler, base_url = twilio
+    dispatcher = _dispatcher(base_url, rate=20, burst=1, workers=4)
+    futures = [dispatcher.send(f"+1555000{i}", "hi") for i in range(6)]
+    for future in futures:
+        future.result(timeout=5)
+    dispatcher.stop()
+
+    times = sorted(received[0] for received in handler.received)
+    # One token up front, then one every 50 ms
+    assert times[-1] - times[0] >= 5 * 0.05 * 0.8
+    assert dispatcher.stats()["max_queue_lag_ms"] > 0
+
+
+def test_retries_429_and_5xx(twilio):
+    handler, base_url = twilio
+    handler.script = [429, 503]
+    dispatcher = _dispatcher(base_url, workers=1)
+    message = dispatcher.send("+15550001", "hello").result(timeout=5)
+    dispatcher.stop()
+
+    assert message.attempts == 3
+    assert [received[4] for received in handler.received] == [429, 503, 201]
+    assert dispatcher.stats()["retries"] == 2
+
+
+def test_client_errors_fail_without_retry(twilio):
+    handler, base_url = twilio
+    handler.script = [400]
+    dispatcher = _dispatcher(base_url, workers=1)
+    with pytest.raises(OutboundError) as error:
+        dispatcher.send("+15550001", "hello").result(timeout=5)
+    dispatcher.stop()
+
+    assert error.value.status == 400
+    assert len(handler.received) == 1
+    assert dispatcher.stats()["failed"] == 1
+
+
+def test_gives_up_after_max_retries(twilio):
+    handler, base_url = twilio
+    handler.script = [500] * 10
+    dispatcher = _dispatcher(base_url, workers=1, max_retries=2)
+    with pytest.raises(OutboundError):
+        dispatcher.send("+15550001", "hello").result(timeout=5)
+    dispatcher.stop()
+
+    assert len(handler.received) == 3
+
+
+def test_read_timeout_is_not_retried(twilio):
+    handler, base_url = twilio
+    handler.script = ["slow"]
+    dispatcher = _dispatcher(base_url, workers=1, timeout=0.2)
+    with pytest.raises(OutboundError):
+        dispatcher.send("+15550001", "hello").result(timeout=5)
+    dispatcher.stop()
+
+    assert len(handler.received) == 1
+    assert dispatcher.stats()["retries"] == 0
+
+
+def test_connection_refused_is_retried():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        closed_port = probe.getsockname()[1]
+    dispatcher = _dispatcher(f"http://127.0.0.1:{closed_port}", workers=1, max_retries=2)
+    with pytest.raises(OutboundError):
+        dispatcher.send("+15550001", "hello").result(timeout=5)
+    dispatcher.stop()
+
+    assert dispatcher.stats()["retries"] == 2
+
+
+def test_token_bucket_reserve_spaces_out_waits():
+    now = [0.0]
+    bucket = TokenBucket(rate=10, burst=2, clock=lambda: now[0])
+    assert [bucket.reserve() for _ in range(4)] == pytest.approx([0.0, 0.0, 0.1, 0.2])
+    now[0] = 1.0
+    assert bucket.try_acquire()
+
+
+def test_pool_keeps_recipients_on_one_sender_until_saturated():
+    now = [0.0]
+    pool = SenderPool(["+1001", "+1002", "+1003", "MG123"], rate=1, burst=1000, clock=lambda: now[0])
+    recipients = [f"whatsapp:+1555{i:04d}" for i in range(200)]
+    first = {recipient: pool.acquire(recipient)[0].address for recipient in recipients}
+    again = {recipient: pool.acquire(recipient)[0].address for recipient in recipients}
+
+    assert first == again
+    # Rendezvous hashing spreads recipients over every sender
+    assert set(first.values()) == {"+1001", "+1002", "+1003", "MG123"}
+    assert all(stats["spilled_in"] == 0 for stats in pool.stats().values())
+
+
+def test_pool_spills_over_when_preferred_sender_is_saturated():
+    now = [0.0]
+    pool = SenderPool(["+1001", "+1002"], rate=1, burst=1, clock=lambda: now[0])
+    preferred, second = pool.ranked("whatsapp:+15550001")
+
+    assert pool.acquire("whatsapp:+15550001") == (preferred, 0.0)
+    assert pool.acquire("whatsapp:+15550001") == (second, 0.0)
+    assert pool.stats()[second.address]["spilled_in"] == 1
+    # Everyone saturated: wait for the preferred sender
+    sender, wait = pool.acquire("whatsapp:+15550001")
+    assert sender is preferred and wait == pytest.approx(1.0)
+
+
+def test_dispatcher_spreads_over_senders_and_messaging_services(twilio):
+    handler, base_url = twilio
+    handler.script = [201, 429]
+    dispatcher = OutboundDispatcher("AC123", "secret", ["+1001", "MG123"], base_url=base_url, base_backoff=0.01)
+    messages = [dispatcher.send(f"+1555{i:04d}", "hi").result(timeout=5) for i in range(20)]
+    dispatcher.stop()
+
+    assert {message.sender for message in messages} == {"+1001", "MG123"}
+    forms = [received[3] for received in handler.received]
+    assert {form.get("From", form.get("MessagingServiceSid"))[0] for form in forms} == {"whatsapp:+1001", "MG123"}
+    assert not any("From" in form and "MessagingServiceSid" in form for form in forms)
+    senders = dispatcher.stats()["senders"]
+    assert sum(stats["sent"] for stats in senders.values()) == 20
+    assert sum(stats["throttled"] for stats in senders.values()) == 1
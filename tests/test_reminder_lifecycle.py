@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.langgraph_whatsapp.database_setup import setup_database
+from src.langgraph_whatsapp.db import ConnectionPool
+from src.langgraph_whatsapp.reminder_lifecycle import ReminderLifecycle
+from src.langgraph_whatsapp.reminder_scheduler import TIME_FORMAT
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(setup_database(str(tmp_path / "test.db")))
+    yield pool
+    pool.close_all()
+
+
+def add(pool, rows):
+    conn = pool.connection()
+    conn.executemany(
+        "INSERT INTO reminders (user_id, task, reminder_time, completed, outcome) VALUES ('u1', ?, ?, ?, ?)",
+        [(task, (datetime.now() + offset).strftime(TIME_FORMAT), completed, outcome)
+         for task, offset, completed, outcome in rows]
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_marks_missed_and_archives_old_finished_reminders(pool):
+    add(pool, [
+        ("never fired", timedelta(hours=-2), 0, None),
+        ("upcoming", timedelta(hours=2), 0, None),
+        ("sent long ago", timedelta(days=-40), 1, "sent"),
+        ("sent yesterday", timedelta(days=-1), 1, "sent"),
+    ])
+    lifecycle = ReminderLifecycle(archive_after_days=30, missed_after=3600, connect=pool.connection)
+    assert lifecycle.run() == {"missed": 1, "archived": 1, "pages_vacuumed": 0}
+
+    conn = pool.connection()
+    live = dict(conn.execute("SELECT task, coalesce(outcome, 'pending') FROM reminders").fetchall())
+    assert live == {"never fired": "missed", "upcoming": "pending", "sent yesterday": "sent"}
+    assert [tuple(row) for row in conn.execute("SELECT task, outcome FROM reminders_archive")] == [("sent long ago", "sent")]
+    conn.close()
+
+
+def test_archives_in_batches_and_returns_free_pages(pool):
+    add(pool, [(f"old task {i} " + "x" * 200, timedelta(days=-60), 1, "sent") for i in range(2500)])
+    conn = pool.connection()
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    conn.execute("DELETE FROM reminders_archive")
+    conn.commit()
+    conn.close()
+
+    lifecycle = ReminderLifecycle(batch_size=1000, vacuum_pages=100_000, connect=pool.connection)
+    result = lifecycle.run()
+    assert result["archived"] == 2500 and result["pages_vacuumed"] > 0
+    stats = lifecycle.stats()
+    assert (stats["pending"], stats["finished_not_archived"], stats["free_pages"]) == (0, 0, 0)
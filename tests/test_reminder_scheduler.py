@@ -0,0 +1,169 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.langgraph_whatsapp.database_setup import setup_database
+from src.langgraph_whatsapp.db import ConnectionPool
+from src.langgraph_whatsapp.reminder_scheduler import TIME_FORMAT, ReminderScheduler
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(setup_database(str(tmp_path / "test.db")))
+    yield pool
+    pool.close_all()
+
+
+def add(pool, task, seconds_from_now):
+    due = (datetime.now() + timedelta(seconds=seconds_from_now)).strftime(TIME_FORMAT)
+    conn = pool.connection()
+    reminder_id = conn.execute(
+        "INSERT INTO reminders (user_id, task, reminder_time) VALUES ('u1', ?, ?)", (task, due)
+    ).lastrowid
+    conn.commit()
+    conn.close()
+    return reminder_id, due
+
+
+def pending(pool):
+    conn = pool.connection()
+    try:
+        return sorted(row[0] for row in conn.execute("SELECT task FROM reminders WHERE completed = 0"))
+    finally:
+        conn.close()
+
+
+class Recorder:
+    def __init__(self):
+        self.sent = []
+        self.event = threading.Event()
+
+    def __call__(self, user_id, task):
+        self.sent.append(task)
+        self.event.set()
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while len(self.sent) < count and time.monotonic() < deadline:
+            time.sleep(0.02)
+        return sorted(self.sent)
+
+
+def test_only_the_window_is_loaded_and_due_reminders_fire_once(pool):
+    add(pool, "long overdue", -600)
+    add(pool, "just missed", -30)
+    add(pool, "soon", 1)
+    add(pool, "later", 3600)
+    send = Recorder()
+    scheduler = ReminderScheduler(send, window=60, page_size=1, misfire_grace=60, connect=pool.connection)
+    scheduler.start()
+    try:
+        assert send.wait_for(2) == ["just missed", "soon"]
+        stats = scheduler.stats()
+        assert stats["in_memory"] == 0 and stats["fired"] == 2 and stats["pages"] >= 3
+        # Fired rows are completed; outside the grace period or the window nothing was touched
+        assert pending(pool) == ["later", "long overdue"]
+    finally:
+        scheduler.stop()
+
+
+def test_notify_and_deleted_reminders(pool):
+    send = Recorder()
+    scheduler = ReminderScheduler(send, window=60, connect=pool.connection)
+    scheduler.start()
+    try:
+        time.sleep(0.1)
+        kept_id, kept_due = add(pool, "added after start", 1)
+        scheduler.notify(kept_id, "u1", "added after start", kept_due)
+        dropped_id, dropped_due = add(pool, "cancelled", 1)
+        scheduler.notify(dropped_id, "u1", "cancelled", dropped_due)
+        conn = pool.connection()
+        conn.execute("DELETE FROM reminders WHERE id = ?", (dropped_id,))
+        conn.commit()
+        conn.close()
+
+        assert send.wait_for(1) == ["added after start"]
+        time.sleep(0.2)
+        assert send.sent == ["added after start"] and scheduler.stats()["skipped"] == 1
+    finally:
+        scheduler.stop()
+
+
+def test_reminders_inserted_by_other_workers_are_polled(pool):
+    send = Recorder()
+    scheduler = ReminderScheduler(send, window=600, poll_interval=0.1, connect=pool.connection)
+    scheduler.start()
+    try:
+        time.sleep(0.1)
+        # Another worker's set_reminder: no notify reaches this process
+        add(pool, "from another worker", 1)
+        add(pool, "next week", 7 * 86400)
+        assert send.wait_for(1) == ["from another worker"]
+        stats = scheduler.stats()
+        assert stats["rows_polled"] == 1 and stats["in_memory"] == 0
+    finally:
+        scheduler.stop()
+
+
+def test_window_and_claim_queries_use_indexes(pool):
+    conn = pool.connection()
+    plan = " | ".join(row[3] for row in conn.execute("""
+        EXPLAIN QUERY PLAN SELECT id, user_id, task, reminder_time FROM reminders
+        WHERE completed = 0 AND (reminder_time, id) > (?, ?) AND reminder_time <= ?
+        ORDER BY reminder_time, id LIMIT ?
+    """, ("a", 0, "b", 10)))
+    assert "USING INDEX idx_reminders_completed_time" in plan and "TEMP B-TREE" not in plan
+    plan = " | ".join(row[3] for row in conn.execute(
+        "EXPLAIN QUERY PLAN UPDATE reminders SET completed = 1 WHERE id IN (?, ?) AND +completed = 0 RETURNING id", (1, 2)
+    ))
+    assert "INTEGER PRIMARY KEY" in plan
+    plan = " | ".join(row[3] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id, user_id, task, reminder_time FROM reminders WHERE id > ? AND +completed = 0 ORDER BY id",
+        (1,)
+    ))
+    assert "INTEGER PRIMARY KEY" in plan and "TEMP B-TREE" not in plan
+    conn.close()
+
+
+def test_delivery_outcome_is_recorded(pool):
+    def send(user_id, task):
+        if task == "bad":
+            raise RuntimeError("Twilio says no")
+
+    add(pool, "good", -1)
+    add(pool, "bad", -1)
+    scheduler = ReminderScheduler(send, window=60, connect=pool.connection)
+    scheduler.start()
+    try:
+        deadline = time.monotonic() + 5
+        conn = pool.connection()
+        while time.monotonic() < deadline:
+            rows = conn.execute(
+                "SELECT task, outcome, outcome_detail, fired_at IS NOT NULL FROM reminders ORDER BY task"
+            ).fetchall()
+            if all(row[1] for row in rows):
+                break
+            time.sleep(0.02)
+        conn.close()
+        assert [tuple(row) for row in rows] == [("bad", "failed", "Twilio says no", 1), ("good", "sent", None, 1)]
+    finally:
+        scheduler.stop()
+
+
+def test_reminders_claimed_while_stopping_are_released(pool):
+    reminder_id, due = add(pool, "due while stopping", -1)
+    send = Recorder()
+    scheduler = ReminderScheduler(send, window=60, connect=pool.connection)
+    # stop() has shut the send pool down while the loop was firing a due batch
+    scheduler._executor = ThreadPoolExecutor(max_workers=1)
+    scheduler._executor.shutdown()
+    scheduler._fire([(due, reminder_id, "u1", "due while stopping")], datetime.now())
+
+    assert send.sent == [] and scheduler.stats()["fired"] == 0
+    assert pending(pool) == ["due while stopping"]
+    conn = pool.connection()
+    assert conn.execute("SELECT fired_at FROM reminders WHERE id = ?", (reminder_id,)).fetchone()[0] is None
+    conn.close()
@@ -0,0 +1,29 @@
+from urllib.parse import urlencode
+
+from src.langgraph_whatsapp.request_context import TwilioRequestContext
+
+
+def test_fields_and_image_media_are_parsed_once():
+    body = urlencode([
+        ("From", "whatsapp:+15550001"), ("Body", " I spent 500 on food "), ("MessageSid", "SM123"),
+        ("NumMedia", "3"),
+        ("MediaUrl0", "https://api.twilio.com/Media/ME1"), ("MediaContentType0", "image/jpeg"),
+        ("MediaUrl1", "https://api.twilio.com/Media/ME2"), ("MediaContentType1", "audio/ogg"),
+        ("MediaUrl2", "https://api.twilio.com/Media/ME3"), ("MediaContentType2", "image/png"),
+        ("Body", "ignored repeat"),
+    ]).encode()
+    context = TwilioRequestContext.from_body(body)
+
+    assert context.body == body and context.signature_valid is False
+    assert (context.sender, context.content, context.message_sid) == ("whatsapp:+15550001", "I spent 500 on food", "SM123")
+    assert context.media == [("https://api.twilio.com/Media/ME1", "image/jpeg"),
+                             ("https://api.twilio.com/Media/ME3", "image/png")]
+    assert context.is_whatsapp_message
+
+
+def test_other_posts_are_not_whatsapp_messages():
+    context = TwilioRequestContext.from_body(b'{"ping": true}')
+    assert not context.is_whatsapp_message and context.sender == "" and context.media == []
+    assert TwilioRequestContext.from_body(b"From=x&Body=&NumMedia=lots").media == []
+    # Undecodable bytes don't make the webhook fail
+    assert not TwilioRequestContext.from_body(b"\xff\xfe").is_whatsapp_message
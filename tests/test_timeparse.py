@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+
+from src.langgraph_whatsapp.timeparse import TimeParser
+
+# A Saturday afternoon
+NOW = datetime(2026, 10, 17, 14, 30, 15)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("7pm", datetime(2026, 10, 17, 19, 0)),
+    ("7.03pm", datetime(2026, 10, 17, 19, 3)),
+    ("at 7:30 PM", datetime(2026, 10, 17, 19, 30)),
+    ("18:39", datetime(2026, 10, 17, 18, 39)),
+    ("1830", datetime(2026, 10, 17, 18, 30)),
+    ("9am", datetime(2026, 10, 18, 9, 0)),
+    ("12am", datetime(2026, 10, 18, 0, 0)),
+    ("in 2 hours", datetime(2026, 10, 17, 16, 30, 15)),
+    ("in 1 hour and 30 minutes", datetime(2026, 10, 17, 16, 0, 15)),
+    ("in half an hour", datetime(2026, 10, 17, 15, 0, 15)),
+    ("in two days", datetime(2026, 10, 19, 14, 30, 15)),
+    ("3 days from now", datetime(2026, 10, 20, 14, 30, 15)),
+    ("tomorrow", datetime(2026, 10, 18, 14, 30, 15)),
+    ("Tomorrow at 10am", datetime(2026, 10, 18, 10, 0)),
+    ("10am tomorrow", datetime(2026, 10, 18, 10, 0)),
+    ("tonight at 9", datetime(2026, 10, 17, 21, 0)),
+    ("monday", datetime(2026, 10, 19, 14, 30, 15)),
+    ("next friday 9:30", datetime(2026, 10, 23, 9, 30)),
+    ("at 3 pm on fri", datetime(2026, 10, 23, 15, 0)),
+    ("saturday 4pm", datetime(2026, 10, 17, 16, 0)),
+    ("saturday 10am", datetime(2026, 10, 24, 10, 0)),
+    ("evening", datetime(2026, 10, 17, 18, 0)),
+    ("morning", datetime(2026, 10, 18, 9, 0)),
+    ("2026-10-20", datetime(2026, 10, 20)),
+    ("2026-10-20T09:15:30", datetime(2026, 10, 20, 9, 15, 30)),
+])
+def test_rules(text, expected):
+    parser = TimeParser()
+    assert parser.parse(text, now=NOW) == expected
+    assert parser.stats()["rule_hits"] == 1 and parser.stats()["fallbacks"] == 0
+
+
+def test_out_of_range_times_are_not_rule_matches():
+    parser = TimeParser()
+    assert parser._parse_rules("25:00", NOW) is None
+    assert parser._parse_rules("13pm", NOW) is None
+    assert parser._parse_rules("in andy", NOW) is None
+
+
+def test_fallback_is_memoized_per_reference_minute():
+    parser = TimeParser(languages=["en"], cache_size=8)
+    first = parser.parse("May 1 3:00 PM", now=NOW)
+    assert (first.month, first.day, first.hour) == (5, 1, 15)
+    assert parser.parse("may 1  3:00 pm", now=NOW.replace(second=59)) == first
+    parser.parse("May 1 3:00 PM", now=NOW.replace(minute=31))
+
+    stats = parser.stats()
+    assert stats["fallbacks"] == 3
+    assert (stats["fallback_cache_hits"], stats["fallback_cache_misses"]) == (1, 2)
+
+
+def test_unparseable_text_returns_none():
+    parser = TimeParser()
+    assert parser.parse("whenever you feel like it", now=NOW) is None
+    assert parser.parse("  ", now=NOW) is None
+    assert parser.stats()["unparsed"] == 1
@@ -0,0 +1,191 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.langgraph_whatsapp.database_setup import setup_database
+from src.langgraph_whatsapp.db import ConnectionPool
+from src.langgraph_whatsapp.link_search import search_links
+from src.langgraph_whatsapp.link_store import save_links, url_hash
+from src.langgraph_whatsapp import unfurl
+from src.langgraph_whatsapp.unfurl import LinkUnfurler, is_public_address, parse_page_metadata
+
+
+class _Site(BaseHTTPRequestHandler):
+    """Serves /page/<n> as HTML with an ETag; tracks concurrent requests."""
+    delay = 0.0
+    active = 0
+    max_active = 0
+    statuses = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            time.sleep(cls.delay)
+            etag = f'"{self.path}"'
+            if self.headers.get("If-None-Match") == etag:
+                cls.statuses.append(304)
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = (f"<html><head><title> Page\n{self.path} </title>"
+                    f"<link rel=canonical href='{self.path}/'></head><body>x</body></html>").encode()
+            cls.statuses.append(200)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    handler = type("Site", (_Site,), {"statuses": [], "active": 0, "max_active": 0, "delay": 0.0})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield handler, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(setup_database(str(tmp_path / "test.db")))
+    yield pool
+    pool.close_all()
+
+
+def test_parse_page_metadata_prefers_og_title():
+    html = ("<head><title>Fallback</title><meta property='og:title' content=' Real title '>"
+            "<link rel='canonical' href='/a'></head>")
+    assert parse_page_metadata(html, "https://example.com/a?x=1") == ("Real title", "https://example.com/a")
+    assert parse_page_metadata("<p>no head", "https://example.com") == (None, None)
+
+
+def test_unfurl_fills_titles_and_revalidates_with_etag(site, pool):
+    handler, base = site
+    conn = pool.connection()
+    save_links("u1", [f"{base}/page/1"], conn=conn)
+    save_links("u2", [f"{base}/page/1"], conn=conn)
+    conn.commit()
+    conn.close()
+
+    unfurler = LinkUnfurler(workers=2, connect=pool.connection, allow_private_addresses=True)
+    assert unfurler.submit([f"{base}/page/1", f"{base}/page/1"]) == 1
+    assert unfurler.join(timeout=10)
+
+    conn = pool.connection()
+    assert [row[0] for row in conn.execute("SELECT title FROM links")] == ["Page /page/1"] * 2
+    assert [r.link for r in search_links("u2", "page", conn=conn).results] == [f"{base}/page/1"]
+    row = conn.execute("SELECT canonical_url, content_type, etag FROM link_metadata WHERE url_hash = ?",
+                       (url_hash(f"{base}/page/1"),)).fetchone()
+    assert tuple(row) == (f"{base}/page/1", "text/html", '"/page/1"')
+
+    # Fresh metadata is not fetched again; stale metadata costs a 304
+    unfurler.submit([f"{base}/page/1"])
+    assert unfurler.join(timeout=10)
+    conn.execute("UPDATE link_metadata SET fetched_at = 0")
+    conn.commit()
+    conn.close()
+    unfurler.submit([f"{base}/page/1"])
+    assert unfurler.join(timeout=10)
+    unfurler.stop()
+
+    assert handler.statuses == [200, 304]
+    stats = unfurler.stats()
+    assert (stats["fetched"], stats["fresh"], stats["revalidated"]) == (1, 1, 1)
+    assert stats["revalidation_ratio"] == 0.5
+
+
+def test_per_host_limit_parks_excess_urls(site, pool):
+    handler, base = site
+    handler.delay = 0.1
+    unfurler = LinkUnfurler(workers=6, per_host=2, connect=pool.connection, allow_private_addresses=True)
+    unfurler.submit([f"{base}/page/{i}" for i in range(6)])
+    assert unfurler.join(timeout=10)
+    unfurler.stop()
+
+    assert handler.max_active == 2
+    assert unfurler.stats()["fetched"] == 6 and unfurler.stats()["deferred"] > 0
+
+
+def test_unreachable_links_are_recorded_as_errors(pool):
+    unfurler = LinkUnfurler(workers=1, timeout=1, connect=pool.connection, allow_private_addresses=True)
+    assert unfurler.unfurl("http://127.0.0.1:9/nothing-listens-here") == "error"
+    conn = pool.connection()
+    assert conn.execute("SELECT error IS NOT NULL FROM link_metadata").fetchone()[0] == 1
+    conn.close()
+
+
+def test_a_failed_fetch_is_retried_after_the_error_backoff(pool):
+    unfurler = LinkUnfurler(workers=1, timeout=1, connect=pool.connection, allow_private_addresses=True,
+                            error_retry_after=0.2)
+    url = "http://127.0.0.1:9/nothing-listens-here"
+    assert unfurler.unfurl(url) == "error"
+    # Not hammered while it is down, but not left alone for the whole refresh window either
+    assert unfurler.unfurl(url) == "fresh"
+    time.sleep(0.25)
+    assert unfurler.unfurl(url) == "error"
+    assert (unfurler.stats()["errors"], unfurler.stats()["fresh"]) == (2, 1)
+
+
+class _Redirect(BaseHTTPRequestHandler):
+    target = ""
+
+    def do_GET(self):
+        self.send_response(302)
+        self.send_header("Location", self.target)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_public_address_check():
+    assert is_public_address("93.184.216.34")
+    assert is_public_address("2606:2800:220:1::1")
+    for address in ("127.0.0.1", "10.0.0.5", "192.168.1.1", "172.16.0.1", "169.254.169.254", "0.0.0.0",
+                    "100.64.0.1", "224.0.0.1", "::1", "fe80::1", "fc00::1", "::ffff:127.0.0.1"):
+        assert not is_public_address(address), address
+
+
+def test_private_and_non_http_links_are_not_fetched(site, pool):
+    handler, base = site
+    unfurler = LinkUnfurler(workers=1, timeout=1, connect=pool.connection)
+    assert unfurler.unfurl(f"{base}/page/1") == "error"
+    assert unfurler.unfurl("http://localhost:9/admin") == "error"
+    assert unfurler.unfurl("file:///etc/passwd") == "error"
+    assert unfurler.unfurl("ftp://127.0.0.1/x") == "error"
+    assert handler.statuses == []
+    assert unfurler.stats()["blocked"] == 4
+
+
+def test_redirects_to_private_addresses_are_not_followed(site, pool, monkeypatch):
+    handler, base = site
+    # Treat the redirecting server as public; its redirect points at another loopback address
+    monkeypatch.setattr(unfurl, "is_public_address", lambda address: address == "127.0.0.1")
+    redirect = type("Redirect", (_Redirect,), {"target": f"http://127.0.0.2:{base.rsplit(':', 1)[1]}/page/1"})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), redirect)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        unfurler = LinkUnfurler(workers=1, timeout=1, connect=pool.connection)
+        assert unfurler.unfurl(f"http://127.0.0.1:{server.server_port}/go") == "error"
+        redirect.target = "file:///etc/passwd"
+        assert unfurler.unfurl(f"http://127.0.0.1:{server.server_port}/go2") == "error"
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert handler.statuses == []
+    assert unfurler.stats()["blocked"] == 1
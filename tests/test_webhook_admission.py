@@ -0,0 +1,72 @@
+import asyncio
+from concurrent.futures import Future
+
+import httpx
+from twilio.request_validator import RequestValidator
+
+from src.langgraph_whatsapp import channel as channel_module
+from src.langgraph_whatsapp import server
+from src.langgraph_whatsapp.admission import THROTTLED_REPLY, AdmissionController
+from src.langgraph_whatsapp.config import TWILIO_AUTH_TOKEN
+
+
+class _Agent:
+    def __init__(self, gate=None):
+        self.gate = gate
+
+    async def invoke(self, sender, content, images=None):
+        if self.gate is not None:
+            await self.gate.wait()
+        return {"response": "ok"}
+
+
+def _post(client, sender, signed=True):
+    form = {"From": sender, "Body": "I spent 500 on groceries"}
+    headers = {}
+    if signed:
+        headers["X-Twilio-Signature"] = RequestValidator(TWILIO_AUTH_TOKEN).compute_signature(
+            "http://test/whatsapp", form)
+    return client.post("/whatsapp", data=form, headers=headers)
+
+
+def _client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=server.APP), base_url="http://test")
+
+
+def test_unsigned_requests_share_one_bucket_whatever_their_from(monkeypatch):
+    controller = AdmissionController(sender_rate_per_minute=1, sender_burst=2, clock=lambda: 0.0)
+    monkeypatch.setattr(server, "WEBHOOK_ADMISSION", controller)
+    monkeypatch.setattr(server.WSP_AGENT, "agent", _Agent())
+    monkeypatch.setattr(channel_module, "WEBHOOK_FAST_ACK", False)
+
+    async def main():
+        async with _client() as client:
+            forged = [(await _post(client, f"whatsapp:+1{i}", signed=False)).text for i in range(3)]
+            signed = [(await _post(client, f"whatsapp:+2{i}")).text for i in range(3)]
+        return forged, signed
+
+    forged, signed = asyncio.run(main())
+    assert [THROTTLED_REPLY in text for text in forged] == [False, False, True]
+    assert not any(THROTTLED_REPLY in text for text in signed)
+
+
+def test_fast_ack_holds_the_admission_slot_until_the_reply_is_computed(monkeypatch):
+    controller = AdmissionController(sender_rate_per_minute=0)
+    monkeypatch.setattr(server, "WEBHOOK_ADMISSION", controller)
+    monkeypatch.setattr(channel_module, "WEBHOOK_FAST_ACK", True)
+    monkeypatch.setattr(server.WSP_AGENT.work_queue, "send", lambda to, body: Future())
+
+    async def main():
+        gate = asyncio.Event()
+        monkeypatch.setattr(server.WSP_AGENT, "agent", _Agent(gate))
+        async with _client() as client:
+            response = await _post(client, "whatsapp:+1")
+        acked = controller.stats()["in_flight"]
+        gate.set()
+        await server.WSP_AGENT.work_queue.stop()
+        return response, acked
+
+    response, acked = asyncio.run(main())
+    assert response.status_code == 200 and "<Message>" not in response.text
+    assert acked == 1
+    assert controller.stats()["in_flight"] == 0
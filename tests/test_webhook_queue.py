@@ -0,0 +1,133 @@
+import asyncio
+from concurrent.futures import Future
+
+from src.langgraph_whatsapp.webhook_queue import FALLBACK_REPLY, InboundMessage, WebhookWorkQueue
+
+
+class _Outbox:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, to, body):
+        self.sent.append((to, body))
+        future = Future()
+        future.set_result(None)
+        return future
+
+
+def _started(coroutine):
+    return lambda: asyncio.ensure_future(coroutine)
+
+
+def test_submit_returns_at_once_and_replies_go_through_send():
+    outbox = _Outbox()
+
+    async def answer(message):
+        await asyncio.sleep(0.05)
+        return f"echo {message.content}"
+
+    async def main():
+        work_queue = WebhookWorkQueue(outbox.send)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        messages = [InboundMessage(f"whatsapp:+1{i}", f"m{i}") for i in range(8)]
+        accepted = [work_queue.submit(message, _started(answer(message))) is not None for message in messages]
+        assert loop.time() - started < 0.01
+        await work_queue.stop()
+        return accepted, work_queue.stats()
+
+    accepted, stats = asyncio.run(main())
+    assert accepted == [True] * 8
+    assert sorted(outbox.sent) == sorted((f"whatsapp:+1{i}", f"echo m{i}") for i in range(8))
+    assert (stats["processed"], stats["queued"]) == (8, 0)
+
+
+def test_failed_answer_sends_the_fallback_reply():
+    outbox = _Outbox()
+
+    async def answer():
+        raise RuntimeError("sheets down")
+
+    async def main():
+        work_queue = WebhookWorkQueue(outbox.send)
+        work_queue.submit(InboundMessage("whatsapp:+1", "hi"), _started(answer()))
+        await work_queue.stop()
+        return work_queue.stats()
+
+    assert asyncio.run(main())["failed"] == 1
+    assert outbox.sent == [("whatsapp:+1", FALLBACK_REPLY)]
+
+
+def test_full_queue_is_rejected_without_starting_the_work():
+    started = []
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def answer(i):
+            await gate.wait()
+            return "ok"
+
+        def start(i):
+            def run():
+                started.append(i)
+                return asyncio.ensure_future(answer(i))
+            return run
+
+        work_queue = WebhookWorkQueue(_Outbox().send, queue_size=2)
+        results = [work_queue.submit(InboundMessage("whatsapp:+1", str(i)), start(i)) is not None for i in range(3)]
+        gate.set()
+        await work_queue.stop()
+        # Answered messages free their place
+        results.append(work_queue.submit(InboundMessage("whatsapp:+1", "3"), start(3)) is not None)
+        await work_queue.stop()
+        return results, work_queue.stats()
+
+    results, stats = asyncio.run(main())
+    assert results == [True, True, False, True]
+    assert started == [0, 1, 3]
+    assert (stats["accepted"], stats["rejected"], stats["processed"]) == (3, 1, 3)
+
+
+def test_a_slow_sender_does_not_hold_up_other_replies():
+    outbox = _Outbox()
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def slow():
+            await gate.wait()
+            return "slow"
+
+        async def fast():
+            return "fast"
+
+        work_queue = WebhookWorkQueue(outbox.send)
+        for _ in range(20):
+            work_queue.submit(InboundMessage("whatsapp:+1", "slow"), _started(slow()))
+        work_queue.submit(InboundMessage("whatsapp:+2", "fast"), _started(fast()))
+        await asyncio.sleep(0.01)
+        delivered = list(outbox.sent)
+        gate.set()
+        await work_queue.stop()
+        return delivered
+
+    assert asyncio.run(main()) == [("whatsapp:+2", "fast")]
+    assert len(outbox.sent) == 21
+
+
+def test_a_reply_already_sent_is_not_sent_again():
+    outbox = _Outbox()
+
+    async def answered(reply):
+        return reply
+
+    async def main():
+        work_queue = WebhookWorkQueue(outbox.send)
+        work_queue.submit(InboundMessage("whatsapp:+1", "hi", message_sid="SM1"), _started(answered("hello")))
+        # A retried delivery of a message that was already answered
+        work_queue.submit(InboundMessage("whatsapp:+1", "hi", message_sid="SM1"), _started(answered(None)))
+        await work_queue.stop()
+
+    asyncio.run(main())
+    assert outbox.sent == [("whatsapp:+1", "hello")]